@@ -0,0 +1,64 @@
+"""
+Helpers for batch endpoints
+Runs per-item work concurrently and collects per-item failures
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from app.services.admission import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+
+
+def check_batch_size(items: Sequence[Any]) -> None:
+    """Reject oversized batches before doing any work."""
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(items)} items (max {MAX_BATCH_SIZE})"
+        )
+
+
+async def run_batch(
+    items: Sequence[Any],
+    fn: Callable[[Any], Awaitable[Any]],
+    concurrency: int = BATCH_CONCURRENCY
+) -> Tuple[List[Optional[Any]], Dict[str, str]]:
+    """
+    Apply an async function to every item with bounded concurrency.
+
+    Returns:
+        Results in item order (None where the item failed) and error
+        messages keyed by the item index as a string
+
+    Raises:
+        AdmissionRejected: Every item was refused admission, so the batch
+            did no work; carries the longest retry hint
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results: List[Optional[Any]] = [None] * len(items)
+    errors: Dict[str, str] = {}
+    rejections: List[AdmissionRejected] = []
+
+    async def run_one(index: int, item: Any) -> None:
+        async with semaphore:
+            try:
+                results[index] = await fn(item)
+            except AdmissionRejected as e:
+                rejections.append(e)
+                errors[str(index)] = str(e)
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {e}")
+                errors[str(index)] = str(e)
+
+    await asyncio.gather(*(run_one(i, item) for i, item in enumerate(items)))
+    if items and len(rejections) == len(items):
+        raise max(rejections, key=lambda e: e.retry_after)
+    return results, errors
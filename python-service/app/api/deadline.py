@@ -0,0 +1,116 @@
+"""
+Deadline propagation middleware
+Reads the caller's timeout header, exposes it as the request deadline and
+cancels the request handler once the deadline passes or the client disconnects
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from app.api.transport import dumps
+from app.services.request_context import set_deadline, reset_deadline
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = b"x-request-timeout-ms"
+# Upper bound applied to caller-supplied timeouts, and default when none is sent (0 = none)
+MAX_REQUEST_TIMEOUT_MS = int(os.getenv("MAX_REQUEST_TIMEOUT_MS", "300000"))
+DEFAULT_REQUEST_TIMEOUT_MS = int(os.getenv("DEFAULT_REQUEST_TIMEOUT_MS", "0"))
+
+
+def parse_timeout(headers) -> Optional[float]:
+    """Timeout in seconds from the request headers, capped by MAX_REQUEST_TIMEOUT_MS."""
+    raw = dict(headers).get(DEADLINE_HEADER)
+    try:
+        timeout_ms = int(raw) if raw is not None else DEFAULT_REQUEST_TIMEOUT_MS
+    except ValueError:
+        timeout_ms = DEFAULT_REQUEST_TIMEOUT_MS
+    if timeout_ms <= 0:
+        return None
+    return min(timeout_ms, MAX_REQUEST_TIMEOUT_MS) / 1000.0
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware enforcing request deadlines and client disconnects.
+
+    POST requests run as a task. The task is cancelled when the deadline
+    passes (answering 504 if nothing was sent yet) or when the client
+    disconnects, so in-flight LLM calls and searches stop consuming capacity.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = parse_timeout(scope.get("headers") or [])
+        body_received = asyncio.Event()
+        response_started = False
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.disconnect" or not message.get("more_body", False):
+                body_received.set()
+            return message
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def wait_for_disconnect():
+            await body_received.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+
+        token = set_deadline(timeout)
+        try:
+            handler = asyncio.create_task(self.app(scope, receive_wrapper, send_wrapper))
+        finally:
+            reset_deadline(token)
+        watcher = asyncio.create_task(wait_for_disconnect())
+
+        try:
+            done, _ = await asyncio.wait({handler, watcher}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            handler.cancel()
+            watcher.cancel()
+            raise
+
+        if handler in done:
+            watcher.cancel()
+            handler.result()
+            return
+
+        handler.cancel()
+        watcher.cancel()
+        try:
+            await handler
+        except asyncio.CancelledError:
+            pass
+
+        path = scope.get("path", "")
+        if watcher in done:
+            logger.info(f"Client disconnected, cancelled {path}")
+            return
+
+        logger.warning(f"Deadline of {timeout:.1f}s exceeded, cancelled {path}")
+        if not response_started:
+            body = dumps({"detail": "Request deadline exceeded"})
+            await send({
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
@@ -2,12 +2,25 @@
 Entity Resolution API endpoint
 Uses dedupe library for probabilistic record linkage and fuzzy matching
 """
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
 import logging
 
-from app.models.schemas import EntityResolutionRequest, EntityResolutionResponse
+from app.models.schemas import (
+    EntityResolutionRequest,
+    EntityResolutionResponse,
+    EntityResolutionBatchRequest,
+    EntityResolutionBatchResponse,
+    ModelListResponse,
+)
+from app.api.batching import check_batch_size, run_batch
+from app.api.transport import FastAPIRoute, respond
+from app.api.scheduling import admission_slot, too_many_requests
+from app.services.admission import AdmissionRejected, BULK
+from app.services.request_context import DeadlineExceeded
 
-router = APIRouter()
+router = APIRouter(route_class=FastAPIRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -18,7 +31,7 @@ def get_dedupe_service():
 
 
 @router.post("/resolve-entities", response_model=EntityResolutionResponse)
-async def resolve_entities(request: EntityResolutionRequest):
+async def resolve_entities(request: EntityResolutionRequest, http_request: Request):
     """
     Resolve entities (product codes, supplier names, etc.) between tenants
     using probabilistic matching.
@@ -39,17 +52,26 @@ async def resolve_entities(request: EntityResolutionRequest):
                 detail="Dedupe service not initialized"
             )
 
-        result = await dedupe_service.resolve_entities(
-            request.extractedData,
-            request.sourceTenantCode,
-            request.targetTenantCode
-        )
+        async with admission_slot(
+            http_request, request.targetTenantCode, source_tenant_code=request.sourceTenantCode
+        ):
+            result = await dedupe_service.resolve_entities(
+                request.extractedData,
+                request.sourceTenantCode,
+                request.targetTenantCode
+            )
 
         logger.info("Entity resolution completed successfully")
-        return result
+        return respond(http_request, result)
 
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        logger.warning(f"Entity resolution rejected: {str(e)}")
+        raise too_many_requests(e)
+    except DeadlineExceeded as e:
+        logger.warning(f"Entity resolution abandoned: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Entity resolution failed: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -58,10 +80,90 @@ async def resolve_entities(request: EntityResolutionRequest):
         )
 
 
+@router.post("/resolve-entities/batch", response_model=EntityResolutionBatchResponse)
+async def resolve_entities_batch(request: EntityResolutionBatchRequest, http_request: Request):
+    """
+    Resolve entities for many records in one round trip.
+
+    Items may belong to different tenant pairs and are processed
+    concurrently; a failing item yields a null result and an entry in
+    `errors` instead of failing the whole batch. A batch whose every item
+    is refused admission gets a 429.
+    """
+    try:
+        check_batch_size(request.items)
+        logger.info(f"Resolving entities for batch of {len(request.items)} records")
+
+        dedupe_service = get_dedupe_service()
+        if not dedupe_service:
+            raise HTTPException(
+                status_code=503,
+                detail="Dedupe service not initialized"
+            )
+
+        async def resolve_item(item):
+            async with admission_slot(
+                http_request, item.targetTenantCode, default_priority=BULK,
+                source_tenant_code=item.sourceTenantCode
+            ):
+                return await dedupe_service.resolve_entities(
+                    item.extractedData,
+                    item.sourceTenantCode,
+                    item.targetTenantCode
+                )
+
+        results, errors = await run_batch(request.items, resolve_item)
+
+        return respond(http_request, {"results": results, "errors": errors})
+
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        logger.warning(f"Batch entity resolution rejected: {str(e)}")
+        raise too_many_requests(e)
+    except Exception as e:
+        logger.error(f"Batch entity resolution failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch entity resolution failed: {str(e)}"
+        )
+
+
+@router.get("/models", response_model=ModelListResponse)
+async def list_models(
+    sourceTenantCode: Optional[str] = Query(None, description="Only models of this source tenant"),
+    targetTenantCode: Optional[str] = Query(None, description="Only models of this target tenant"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """
+    List trained tenant-pair models from the model registry.
+    """
+    try:
+        dedupe_service = get_dedupe_service()
+        if not dedupe_service:
+            raise HTTPException(
+                status_code=503,
+                detail="Dedupe service not initialized"
+            )
+
+        return dedupe_service.list_models(sourceTenantCode, targetTenantCode, limit=limit, offset=offset)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to list models: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to list models: {str(e)}"
+        )
+
+
 @router.get("/model-stats/{source_tenant}/{target_tenant}")
 async def get_model_stats(source_tenant: str, target_tenant: str):
     """
-    Get statistics about the trained model for a tenant pair.
+    Get statistics about the trained model for a tenant pair; with shared
+    models, the target tenant's model and the source's overlay.
     """
     try:
         dedupe_service = get_dedupe_service()
@@ -71,8 +173,7 @@ async def get_model_stats(source_tenant: str, target_tenant: str):
                 detail="Dedupe service not initialized"
             )
 
-        model_key = f"{source_tenant}_{target_tenant}"
-        return dedupe_service.get_model_stats(model_key)
+        return dedupe_service.get_pair_model_stats(source_tenant, target_tenant)
 
     except HTTPException:
         raise
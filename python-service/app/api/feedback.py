@@ -2,12 +2,15 @@
 Active Learning Feedback API endpoint
 Receives user corrections to retrain the dedupe model
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 import logging
 
 from app.models.schemas import FeedbackRequest, FeedbackResponse
+from app.api.scheduling import admission_slot, too_many_requests
+from app.api.transport import FastAPIRoute
+from app.services.admission import AdmissionRejected
 
-router = APIRouter()
+router = APIRouter(route_class=FastAPIRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -18,7 +21,7 @@ def get_training_service():
 
 
 @router.post("/feedback", response_model=FeedbackResponse)
-async def submit_feedback(request: FeedbackRequest):
+async def submit_feedback(request: FeedbackRequest, http_request: Request):
     """
     Submit user corrections for active learning.
 
@@ -38,14 +41,17 @@ async def submit_feedback(request: FeedbackRequest):
                 detail="Training service not initialized"
             )
 
-        success = await training_service.process_feedback(
-            source_tenant=request.sourceTenantCode,
-            target_tenant=request.targetTenantCode,
-            source_field=request.sourceField,
-            source_value=request.sourceValue,
-            target_field=request.targetField,
-            corrected_value=request.correctedValue
-        )
+        async with admission_slot(
+            http_request, request.targetTenantCode, source_tenant_code=request.sourceTenantCode
+        ):
+            success = await training_service.process_feedback(
+                source_tenant=request.sourceTenantCode,
+                target_tenant=request.targetTenantCode,
+                source_field=request.sourceField,
+                source_value=request.sourceValue,
+                target_field=request.targetField,
+                corrected_value=request.correctedValue
+            )
 
         if success:
             logger.info("Feedback processed successfully")
@@ -61,6 +67,9 @@ async def submit_feedback(request: FeedbackRequest):
 
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        logger.warning(f"Feedback rejected: {str(e)}")
+        raise too_many_requests(e)
     except Exception as e:
         logger.error(f"Feedback processing failed: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -0,0 +1,185 @@
+"""
+Reference Data API endpoints
+Uploads of target-tenant data that entity resolution matches against
+"""
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+import logging
+import time
+
+from app.models.schemas import CounterpartiesRequest, CounterpartiesResponse, CatalogIngestResponse
+from app.api.scheduling import admission_slot, too_many_requests
+from app.api.transport import BodyTooLarge, FastAPIRoute, stream_decompressor
+from app.services.admission import AdmissionRejected, BULK
+from app.services.catalog_ingest import CatalogIngest, LineTooLong, catalog_format
+
+router = APIRouter(route_class=FastAPIRoute)
+logger = logging.getLogger(__name__)
+
+
+def get_dedupe_service():
+    """Dependency to get Dedupe service from main app"""
+    from app.main import get_dedupe_service as _get_dedupe_service
+    return _get_dedupe_service()
+
+
+@router.put("/counterparties/{target_tenant}", response_model=CounterpartiesResponse)
+async def replace_counterparties(target_tenant: str, request: CounterpartiesRequest):
+    """
+    Replace the counterparties supplier values are resolved against for
+    every pair targeting this tenant.
+
+    Exported by the Symfony app from relation mappings and purchase
+    contracts (app:export-counterparties).
+    """
+    try:
+        dedupe_service = get_dedupe_service()
+        if not dedupe_service:
+            raise HTTPException(
+                status_code=503,
+                detail="Dedupe service not initialized"
+            )
+
+        stats = dedupe_service.set_counterparties(
+            target_tenant,
+            [counterparty.model_dump() for counterparty in request.counterparties]
+        )
+        logger.info(f"Counterparties replaced for {target_tenant}: {stats['counterparties']}")
+
+        return CounterpartiesResponse(
+            targetTenantCode=target_tenant,
+            counterparties=stats["counterparties"],
+            aliases=stats["aliases"]
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Counterparty upload failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Counterparty upload failed: {str(e)}"
+        )
+
+
+@router.get("/counterparties/{target_tenant}")
+async def get_counterparty_stats(target_tenant: str):
+    """Get statistics about a tenant's counterparties"""
+    dedupe_service = get_dedupe_service()
+    if not dedupe_service:
+        raise HTTPException(status_code=503, detail="Dedupe service not initialized")
+
+    return dedupe_service.get_counterparty_stats(target_tenant)
+
+
+@router.put("/catalog/{target_tenant}", response_model=CatalogIngestResponse)
+async def replace_catalog(target_tenant: str, http_request: Request):
+    """
+    Replace a tenant's canonical catalog (its product master).
+
+    The body is streamed as NDJSON (one object per line) or CSV with a
+    header row, optionally gzip/zstd-encoded; columns named after match
+    fields (product, supplier) are indexed. Only the difference to the
+    current catalog is applied. Fields absent from the upload are kept.
+    """
+    return await _ingest_catalog(target_tenant, http_request, replace=True)
+
+
+@router.patch("/catalog/{target_tenant}", response_model=CatalogIngestResponse)
+async def update_catalog(target_tenant: str, http_request: Request):
+    """
+    Add values to a tenant's catalog, or remove those on rows with
+    `_op` set to "delete". Same body formats as PUT.
+    """
+    return await _ingest_catalog(target_tenant, http_request, replace=False)
+
+
+@router.get("/catalog/{target_tenant}")
+async def get_catalog_stats(target_tenant: str):
+    """Get statistics about a tenant's catalog indexes"""
+    dedupe_service = get_dedupe_service()
+    if not dedupe_service:
+        raise HTTPException(status_code=503, detail="Dedupe service not initialized")
+
+    return {
+        field: dedupe_service.get_catalog_stats(target_tenant, field)
+        for field in dedupe_service.match_fields
+    }
+
+
+async def _ingest_catalog(target_tenant: str, http_request: Request, replace: bool) -> CatalogIngestResponse:
+    started = time.perf_counter()
+    try:
+        dedupe_service = get_dedupe_service()
+        if not dedupe_service:
+            raise HTTPException(
+                status_code=503,
+                detail="Dedupe service not initialized"
+            )
+
+        try:
+            ingest = CatalogIngest(
+                catalog_format(http_request.headers.get("content-type", "")),
+                dedupe_service.match_fields,
+                stream_decompressor(http_request.headers.get("content-encoding", ""))
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+
+        async with admission_slot(http_request, target_tenant, default_priority=BULK):
+            # Parse off the event loop, one received chunk at a time
+            async for chunk in http_request.stream():
+                if chunk:
+                    await run_in_threadpool(ingest.feed, chunk)
+            await run_in_threadpool(ingest.close)
+            parsed = time.perf_counter()
+
+            if ingest.rows and not ingest.present_fields:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"No catalog rows with any of: {', '.join(dedupe_service.match_fields)}"
+                )
+
+            async with dedupe_service.catalog_lock(target_tenant):
+                fields = await run_in_threadpool(
+                    dedupe_service.apply_catalog,
+                    target_tenant,
+                    ingest.upserts,
+                    None if replace else ingest.deletes,
+                    replace
+                )
+        finished = time.perf_counter()
+
+        elapsed = finished - started
+        logger.info(
+            f"Catalog {'replaced' if replace else 'updated'} for {target_tenant}: "
+            f"{ingest.rows} rows in {elapsed:.2f}s ({ingest.invalid_rows} invalid)"
+        )
+
+        return CatalogIngestResponse(
+            targetTenantCode=target_tenant,
+            mode="replace" if replace else "update",
+            rows=ingest.rows,
+            invalidRows=ingest.invalid_rows,
+            bytes=ingest.bytes,
+            fields=fields,
+            parseMs=round((parsed - started) * 1000, 2),
+            indexMs=round((finished - parsed) * 1000, 2),
+            elapsedMs=round(elapsed * 1000, 2),
+            rowsPerSecond=round(ingest.rows / elapsed, 1) if elapsed > 0 else 0.0
+        )
+
+    except HTTPException:
+        raise
+    except (BodyTooLarge, LineTooLong) as e:
+        logger.warning(f"Catalog upload rejected: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except AdmissionRejected as e:
+        logger.warning(f"Catalog upload rejected: {str(e)}")
+        raise too_many_requests(e)
+    except Exception as e:
+        logger.error(f"Catalog upload failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Catalog upload failed: {str(e)}"
+        )
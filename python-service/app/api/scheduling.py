@@ -0,0 +1,66 @@
+"""
+Request scheduling helpers
+Maps requests onto the admission controller's tenants and priority classes
+and turns rejections into 429 responses
+"""
+import math
+from contextlib import nullcontext
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from app.services.admission import AdmissionRejected, INTERACTIVE, PRIORITIES, pair_key
+
+PRIORITY_HEADER = "x-request-priority"
+TENANT_HEADER = "x-tenant-code"
+
+
+def get_admission_controller():
+    """Dependency to get the admission controller from main app"""
+    from app.main import get_admission_controller as _get_admission_controller
+    return _get_admission_controller()
+
+
+def request_priority(http_request: Request, default: str) -> str:
+    """Priority class requested by the caller, or the endpoint default."""
+    priority = http_request.headers.get(PRIORITY_HEADER, "").strip().lower()
+    return priority if priority in PRIORITIES else default
+
+
+def request_tenant(
+    http_request: Request,
+    tenant_code: Optional[str] = None,
+    source_tenant_code: Optional[str] = None
+) -> str:
+    """
+    Key a request is accounted to: the body's tenant, else the tenant
+    header, paired with the source tenant when the request has one, so
+    sources sharing a target tenant do not compete for one share.
+    """
+    tenant = tenant_code or http_request.headers.get(TENANT_HEADER) or "anonymous"
+    return pair_key(source_tenant_code, tenant) if source_tenant_code else tenant
+
+
+def admission_slot(
+    http_request: Request,
+    tenant_code: Optional[str] = None,
+    default_priority: str = INTERACTIVE,
+    source_tenant_code: Optional[str] = None
+):
+    """Async context manager holding an admission slot for this request's tenant (pair)."""
+    controller = get_admission_controller()
+    if controller is None:
+        return nullcontext()
+    return controller.admit(
+        request_tenant(http_request, tenant_code, source_tenant_code),
+        request_priority(http_request, default_priority)
+    )
+
+
+def too_many_requests(e: AdmissionRejected) -> HTTPException:
+    """429 response carrying a Retry-After hint."""
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(int(math.ceil(e.retry_after)))}
+    )
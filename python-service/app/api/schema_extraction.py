@@ -2,12 +2,25 @@
 Schema Extraction API endpoint
 Uses LangChain + OpenAI to map source fields to target schema
 """
-from fastapi import APIRouter, HTTPException, Depends
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
 import logging
 
-from app.models.schemas import SchemaExtractionRequest, SchemaExtractionResponse
+from app.models.schemas import (
+    SchemaExtractionRequest,
+    SchemaExtractionResponse,
+    SchemaExtractionBatchRequest,
+    SchemaExtractionBatchResponse,
+)
+from app.api.batching import check_batch_size, run_batch
+from app.api.transport import EventStreamResponse, FastAPIRoute, respond, sse_event
+from app.api.scheduling import admission_slot, too_many_requests
+from app.services.admission import AdmissionRejected, BULK
+from app.services.request_context import DeadlineExceeded
 
-router = APIRouter()
+router = APIRouter(route_class=FastAPIRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -17,8 +30,42 @@ def get_llm_service():
     return _get_llm_service()
 
 
+async def stream_events(
+    http_request: Request,
+    events: AsyncIterator[Tuple[str, Dict[str, Any]]],
+    operation: str
+) -> EventStreamResponse:
+    """
+    Send a service's (event, data) stream as Server-Sent Events.
+
+    The admission slot is taken before the response starts, so a rejection
+    is still a 429; it is held until the stream ends, and released by the
+    response even if the stream never starts. Failures after that end the
+    stream with an "error" event carrying the status code the
+    non-streaming endpoint would have answered with.
+    """
+    slot = AsyncExitStack()
+    await slot.enter_async_context(admission_slot(http_request))
+
+    async def body():
+        try:
+            async for event, data in events:
+                yield sse_event(event, data)
+        except DeadlineExceeded as e:
+            logger.warning(f"{operation} abandoned: {str(e)}")
+            yield sse_event("error", {"status": 504, "detail": str(e)})
+        except Exception as e:
+            logger.error(f"{operation} failed: {str(e)}", exc_info=True)
+            yield sse_event("error", {"status": 500, "detail": f"{operation} failed: {str(e)}"})
+        finally:
+            await slot.aclose()
+
+    # Closing the exit stack again is a no-op
+    return EventStreamResponse(body(), on_close=slot.aclose)
+
+
 @router.post("/extract-schema", response_model=SchemaExtractionResponse)
-async def extract_schema(request: SchemaExtractionRequest):
+async def extract_schema(request: SchemaExtractionRequest, http_request: Request):
     """
     Extract and normalize schema from raw document data using LLM.
 
@@ -35,13 +82,20 @@ async def extract_schema(request: SchemaExtractionRequest):
                 detail="LLM service not initialized"
             )
 
-        result = await llm_service.extract_schema(request.rawData)
+        async with admission_slot(http_request):
+            result = await llm_service.extract_schema(request.rawData)
 
         logger.info("Schema extraction completed successfully")
-        return result
+        return respond(http_request, result)
 
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        logger.warning(f"Schema extraction rejected: {str(e)}")
+        raise too_many_requests(e)
+    except DeadlineExceeded as e:
+        logger.warning(f"Schema extraction abandoned: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Schema extraction failed: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -50,8 +104,85 @@ async def extract_schema(request: SchemaExtractionRequest):
         )
 
 
+@router.post("/extract-schema/stream")
+async def extract_schema_stream(request: SchemaExtractionRequest, http_request: Request):
+    """
+    Extract schema as a stream of Server-Sent Events, for interactive use.
+
+    Each field mapping is sent as a "field" event as soon as the LLM has
+    written it, followed by "confidence" events and a final "result" event
+    with the same body /extract-schema returns.
+    """
+    try:
+        llm_service = get_llm_service()
+        if not llm_service:
+            raise HTTPException(
+                status_code=503,
+                detail="LLM service not initialized"
+            )
+
+        return await stream_events(
+            http_request, llm_service.stream_extract_schema(request.rawData), "Schema extraction"
+        )
+
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        logger.warning(f"Schema extraction rejected: {str(e)}")
+        raise too_many_requests(e)
+    except Exception as e:
+        logger.error(f"Schema extraction failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Schema extraction failed: {str(e)}"
+        )
+
+
+@router.post("/extract-schema/batch", response_model=SchemaExtractionBatchResponse)
+async def extract_schema_batch(request: SchemaExtractionBatchRequest, http_request: Request):
+    """
+    Extract schemas for many documents in one round trip.
+
+    Items are processed concurrently; a failing item yields a null result
+    and an entry in `errors` instead of failing the whole batch. A batch
+    whose every item is refused admission gets a 429.
+    """
+    try:
+        check_batch_size(request.items)
+        logger.info(f"Extracting schema for batch of {len(request.items)} documents")
+
+        llm_service = get_llm_service()
+        if not llm_service:
+            raise HTTPException(
+                status_code=503,
+                detail="LLM service not initialized"
+            )
+
+        async def extract_item(item):
+            async with admission_slot(http_request, default_priority=BULK):
+                return await llm_service.extract_schema(item.rawData, normalize=False)
+
+        results, errors = await run_batch(request.items, extract_item)
+        # Values are normalized for the whole batch at once
+        results = llm_service.normalize_results(results)
+
+        return respond(http_request, {"results": results, "errors": errors})
+
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        logger.warning(f"Batch schema extraction rejected: {str(e)}")
+        raise too_many_requests(e)
+    except Exception as e:
+        logger.error(f"Batch schema extraction failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch schema extraction failed: {str(e)}"
+        )
+
+
 @router.post("/analyze-document")
-async def analyze_document(request: SchemaExtractionRequest):
+async def analyze_document(request: SchemaExtractionRequest, http_request: Request):
     """
     Analyze document structure (useful for understanding new partner formats).
     """
@@ -63,11 +194,49 @@ async def analyze_document(request: SchemaExtractionRequest):
                 detail="LLM service not initialized"
             )
 
-        result = await llm_service.analyze_document_structure(request.rawData)
+        async with admission_slot(http_request):
+            result = await llm_service.analyze_document_structure(request.rawData)
         return result
 
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        logger.warning(f"Document analysis rejected: {str(e)}")
+        raise too_many_requests(e)
+    except DeadlineExceeded as e:
+        logger.warning(f"Document analysis abandoned: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Document analysis failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Document analysis failed: {str(e)}"
+        )
+
+
+@router.post("/analyze-document/stream")
+async def analyze_document_stream(request: SchemaExtractionRequest, http_request: Request):
+    """
+    Analyze document structure as a stream of Server-Sent Events: "delta"
+    events with the analysis text as it is written, then a "result" event.
+    """
+    try:
+        llm_service = get_llm_service()
+        if not llm_service:
+            raise HTTPException(
+                status_code=503,
+                detail="LLM service not initialized"
+            )
+
+        return await stream_events(
+            http_request, llm_service.stream_analyze_document(request.rawData), "Document analysis"
+        )
+
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        logger.warning(f"Document analysis rejected: {str(e)}")
+        raise too_many_requests(e)
     except Exception as e:
         logger.error(f"Document analysis failed: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -0,0 +1,342 @@
+"""
+Fast JSON serialization and compressed transport
+orjson encoding/decoding, gzip/zstd request and response compression,
+and response-model bypass for trusted internal callers
+"""
+import gzip
+import io
+import json
+import os
+import secrets
+import zlib
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+# Largest size a compressed request body may decode to (bytes)
+MAX_DECOMPRESSED_SIZE = int(os.getenv("MAX_DECOMPRESSED_SIZE", str(64 * 1024 * 1024)))
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+
+# Shared secret identifying trusted internal callers (the Symfony app).
+# When unset, every caller gets full response-model validation.
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "")
+INTERNAL_TOKEN_HEADER = "x-internal-token"
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def supported_encodings() -> tuple:
+    """Content codings this service can decode and produce, in preference order."""
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+class BodyTooLarge(ValueError):
+    """A compressed request body decodes to more than the allowed size."""
+
+
+def decompress(body: bytes, encoding: str, max_size: int = MAX_DECOMPRESSED_SIZE) -> bytes:
+    """
+    Decode a request body according to its Content-Encoding, a chunk at a
+    time, raising BodyTooLarge as soon as it exceeds max_size bytes.
+    """
+    encoding = encoding.strip().lower()
+    if encoding in ("", "identity"):
+        return body
+    if encoding == "gzip":
+        reader = gzip.GzipFile(fileobj=io.BytesIO(body))
+    elif encoding == "zstd" and zstandard is not None:
+        reader = zstandard.ZstdDecompressor().stream_reader(body)
+    else:
+        raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+
+    decoded = bytearray()
+    with reader:
+        while True:
+            chunk = reader.read(DECOMPRESS_CHUNK_SIZE)
+            if not chunk:
+                break
+            decoded += chunk
+            if len(decoded) > max_size:
+                raise BodyTooLarge(f"Decompressed request body exceeds {max_size} bytes")
+    return bytes(decoded)
+
+
+class _Sink:
+    """Output side of a zstd stream writer, forwarding to the current callback."""
+
+    def __init__(self, emit: Callable[[bytes], None]):
+        self.emit = emit
+
+    def write(self, data: bytes) -> int:
+        self.emit(bytes(data))
+        return len(data)
+
+
+class StreamDecompressor:
+    """
+    Incremental decoder of a streamed request body.
+
+    Output is handed to a callback in pieces of at most
+    DECOMPRESS_CHUNK_SIZE bytes, however much a chunk of input expands, and
+    BodyTooLarge is raised once the total exceeds max_size.
+    """
+
+    def __init__(self, encoding: str, max_size: int = MAX_DECOMPRESSED_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self._output: Optional[Callable[[bytes], None]] = None
+        self._zlib = None
+        self._zstd = None
+        if encoding == "gzip":
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self._zstd = zstandard.ZstdDecompressor().stream_writer(
+                _Sink(self._emit), write_size=DECOMPRESS_CHUNK_SIZE
+            )
+
+    def _emit(self, piece: bytes) -> None:
+        if not piece:
+            return
+        self.size += len(piece)
+        if self.size > self.max_size:
+            raise BodyTooLarge(f"Decompressed request body exceeds {self.max_size} bytes")
+        self._output(piece)
+
+    def decompress(self, data: bytes, output: Callable[[bytes], None]) -> None:
+        """Decode the next chunk of the body, passing its output on."""
+        self._output = output
+        if self._zlib is not None:
+            while data:
+                self._emit(self._zlib.decompress(data, DECOMPRESS_CHUNK_SIZE))
+                data = self._zlib.unconsumed_tail
+        else:
+            self._zstd.write(data)
+
+    def flush(self, output: Callable[[bytes], None]) -> None:
+        """Pass on what the decoder still buffers once the body is complete."""
+        self._output = output
+        if self._zlib is not None:
+            self._emit(self._zlib.flush())
+
+
+def stream_decompressor(encoding: str, max_size: int = MAX_DECOMPRESSED_SIZE) -> Optional[StreamDecompressor]:
+    """Bounded incremental decoder for a streamed request body, or None if it is not encoded."""
+    encoding = encoding.strip().lower()
+    if encoding in ("", "identity"):
+        return None
+    if encoding == "gzip" or (encoding == "zstd" and zstandard is not None):
+        return StreamDecompressor(encoding, max_size)
+    raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Encode a response body with the negotiated content coding."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the preferred supported coding from an Accept-Encoding header."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+
+    for encoding in supported_encodings():
+        if offered.get(encoding, offered.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def is_trusted(request: Request) -> bool:
+    """True when the caller presented the internal API token."""
+    if not INTERNAL_API_TOKEN:
+        return False
+    return secrets.compare_digest(request.headers.get(INTERNAL_TOKEN_HEADER, ""), INTERNAL_API_TOKEN)
+
+
+def respond(request: Request, payload: Any) -> Any:
+    """
+    Return a service result from a route.
+
+    Trusted internal callers get the payload serialized directly, skipping
+    the route's response_model validation (the services already build
+    well-formed results). Everyone else gets the normal validated response.
+    """
+    if is_trusted(request):
+        return FastJSONResponse(payload)
+    return payload
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Events message with a JSON payload."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    Server-Sent Events response. Proxies are asked not to buffer it, and
+    CompressionMiddleware passes it through so each event is sent at once.
+
+    on_close runs once the response is over however it ended, including
+    when it was cancelled before the stream started; it may also be called
+    by the stream itself, so it must be safe to call twice.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, content: Any, on_close: Optional[Callable[[], Awaitable[Any]]] = None, **kwargs):
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **kwargs.pop("headers", {})}
+        super().__init__(content, headers=headers, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.on_close is not None:
+                await self.on_close()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class CompressedJSONRequest(Request):
+    """Request that transparently decodes compressed bodies and parses JSON with orjson."""
+
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            encoding = self.headers.get("content-encoding", "")
+            try:
+                self._body = decompress(body, encoding) if encoding else body
+            except BodyTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+        return self._body
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = loads(await self.body())
+        return self._json
+
+
+class FastAPIRoute(APIRoute):
+    """APIRoute using CompressedJSONRequest for body decoding."""
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+
+        async def custom_route_handler(request: Request) -> Response:
+            # Decoding errors surface as FastAPI's standard 400 body-parsing error
+            request = CompressedJSONRequest(request.scope, request.receive)
+            return await original_route_handler(request)
+
+        return custom_route_handler
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with zstd or gzip.
+
+    The coding is negotiated from Accept-Encoding. Small bodies, already
+    encoded responses and streaming responses are passed through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                response_headers = dict(message.get("headers") or [])
+                content_type = response_headers.get(b"content-type", b"")
+                if b"content-encoding" in response_headers or content_type.startswith(b"text/event-stream"):
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                # Streaming response: flush what we have and stop buffering
+                passthrough = True
+                await send(start_message)
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                return
+
+            body = b"".join(chunks)
+            response_headers = [
+                (k, v) for k, v in start_message.get("headers", []) if k.lower() != b"content-length"
+            ]
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+                response_headers.append((b"vary", b"Accept-Encoding"))
+            response_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -2,16 +2,20 @@
 QbilHub Intelligence Microservice
 FastAPI application for schema extraction and entity resolution
 """
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
-from app.api import schema_extraction, entity_resolution, feedback
+from app.api import schema_extraction, entity_resolution, feedback, reference_data
+from app.api.transport import FastJSONResponse, CompressionMiddleware
+from app.api.deadline import DeadlineMiddleware
 from app.services.llm_service import LLMService
 from app.services.dedupe_service import DedupeService
 from app.services.training_service import TrainingService
+from app.services.admission import AdmissionController
 
 # Configure logging
 logging.basicConfig(
@@ -28,6 +32,7 @@ class ServiceContainer:
     llm_service: LLMService = None
     dedupe_service: DedupeService = None
     training_service: TrainingService = None
+    admission_controller: AdmissionController = None
 
 
 services = ServiceContainer()
@@ -42,6 +47,16 @@ async def lifespan(app: FastAPI):
     services.llm_service = LLMService()
     services.dedupe_service = DedupeService()
     services.training_service = TrainingService(dedupe_service=services.dedupe_service)
+    services.admission_controller = AdmissionController()
+
+    # Restore the previous process's warm state and keep snapshotting it
+    warm_state_tasks = []
+    if services.dedupe_service.warm_state_interval > 0:
+        services.dedupe_service.restore_warm_state()
+        warm_state_tasks = [
+            asyncio.create_task(services.dedupe_service.warm_up()),
+            asyncio.create_task(services.dedupe_service.run_warm_state_snapshots()),
+        ]
 
     logger.info("Services initialized successfully")
 
@@ -49,6 +64,16 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down services...")
+    await services.training_service.coordinator.close()
+    for task in warm_state_tasks:
+        task.cancel()
+    await asyncio.gather(*warm_state_tasks, return_exceptions=True)
+    if warm_state_tasks:
+        try:
+            await services.dedupe_service.snapshot_warm_state()
+        except Exception as e:
+            logger.error(f"Final warm-state snapshot failed: {e}")
+    services.dedupe_service.close()
 
 
 # Create FastAPI app
@@ -56,7 +81,8 @@ app = FastAPI(
     title="QbilHub Intelligence Service",
     description="AI-powered schema extraction and entity resolution for B2B document exchange",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -68,10 +94,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated gzip/zstd response compression for large payloads
+app.add_middleware(CompressionMiddleware)
+
+# Cancel work once the caller's X-Request-Timeout-Ms passes or it disconnects
+app.add_middleware(DeadlineMiddleware)
+
 # Include routers
 app.include_router(schema_extraction.router, prefix="/api", tags=["Schema Extraction"])
 app.include_router(entity_resolution.router, prefix="/api", tags=["Entity Resolution"])
 app.include_router(feedback.router, prefix="/api", tags=["Active Learning"])
+app.include_router(reference_data.router, prefix="/api", tags=["Reference Data"])
 
 
 def get_llm_service() -> LLMService:
@@ -89,6 +122,11 @@ def get_training_service() -> TrainingService:
     return services.training_service
 
 
+def get_admission_controller() -> AdmissionController:
+    """Get the admission controller instance"""
+    return services.admission_controller
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -107,6 +145,7 @@ async def health_check():
 
     # Check if LLM is using OpenAI or rule-based
     llm_mode = "openai" if (services.llm_service and services.llm_service.use_llm) else "rule-based"
+    scoring_workers = len(services.dedupe_service.scoring_pool or ()) if services.dedupe_service else 0
 
     return {
         "status": "healthy",
@@ -114,7 +153,8 @@ async def health_check():
             "api": "operational",
             "dedupe": dedupe_status,
             "llm": llm_status,
-            "llm_mode": llm_mode
+            "llm_mode": llm_mode,
+            "scoring": f"{scoring_workers} workers" if scoring_workers else "in-process"
         },
         "config": {
             "openai_configured": bool(os.getenv("OPENAI_API_KEY")),
@@ -124,6 +164,33 @@ async def health_check():
     }
 
 
+@app.get("/api/admission/stats")
+async def get_admission_stats():
+    """Current admission control load per tenant and priority class"""
+    if not services.admission_controller:
+        return {"error": "Admission controller not initialized"}
+
+    return services.admission_controller.get_stats()
+
+
+@app.get("/api/resolution/stats")
+async def get_resolution_stats():
+    """Resolution cascade hit rates and time per tier"""
+    if not services.dedupe_service:
+        return {"error": "Dedupe service not initialized"}
+
+    return services.dedupe_service.get_cascade_stats()
+
+
+@app.get("/api/scoring/stats")
+async def get_scoring_stats():
+    """Scoring worker load and loaded models"""
+    if not services.dedupe_service:
+        return {"error": "Dedupe service not initialized"}
+
+    return services.dedupe_service.get_scoring_stats()
+
+
 @app.get("/api/training/stats/{source_tenant}/{target_tenant}")
 async def get_training_stats(source_tenant: str, target_tenant: str):
     """Get training statistics for a tenant pair"""
@@ -16,6 +16,17 @@ class SchemaExtractionResponse(BaseModel):
     fieldMappings: Dict[str, str] = Field(..., description="Source to target field mappings")
 
 
+class SchemaExtractionBatchRequest(BaseModel):
+    """Request model for batched schema extraction"""
+    items: List[SchemaExtractionRequest] = Field(..., description="Documents to extract, processed concurrently")
+
+
+class SchemaExtractionBatchResponse(BaseModel):
+    """Response model for batched schema extraction"""
+    results: List[Optional[SchemaExtractionResponse]] = Field(..., description="Results in request order, null on failure")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Error messages keyed by item index")
+
+
 class EntityResolutionRequest(BaseModel):
     """Request model for entity resolution"""
     extractedData: Dict[str, Any] = Field(..., description="Extracted data from schema extraction")
@@ -29,6 +40,17 @@ class EntityResolutionResponse(BaseModel):
     confidenceScores: Dict[str, float] = Field(..., description="Confidence scores for each field (0-1)")
 
 
+class EntityResolutionBatchRequest(BaseModel):
+    """Request model for batched entity resolution"""
+    items: List[EntityResolutionRequest] = Field(..., description="Records to resolve, processed concurrently")
+
+
+class EntityResolutionBatchResponse(BaseModel):
+    """Response model for batched entity resolution"""
+    results: List[Optional[EntityResolutionResponse]] = Field(..., description="Results in request order, null on failure")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Error messages keyed by item index")
+
+
 class FeedbackRequest(BaseModel):
     """Request model for active learning feedback"""
     sourceTenantCode: str
@@ -43,3 +65,63 @@ class FeedbackResponse(BaseModel):
     """Response model for feedback submission"""
     success: bool
     message: str
+
+
+class ModelInfo(BaseModel):
+    """A trained tenant-pair model in the model registry"""
+    modelKey: str = Field(..., description="sourceTenant_targetTenant")
+    version: int = Field(..., description="Increases with every training run")
+    sizeBytes: int = Field(..., description="Settings file size")
+    canonicalRecords: int
+    trainedAt: float = Field(..., description="Unix timestamp of the last training run")
+    mode: Optional[str] = Field(None, description="full or incremental, if trained by this service")
+    cached: bool = Field(..., description="Loaded for scoring")
+
+
+class ModelListResponse(BaseModel):
+    """Response model for the model listing"""
+    total: int = Field(..., description="Models matching the filters")
+    models: List[ModelInfo]
+    registry: Dict[str, Any] = Field(..., description="Registry lookup counters")
+
+
+class Counterparty(BaseModel):
+    """A trading partner known to the target tenant"""
+    name: str = Field(..., min_length=1, description="Canonical counterparty name")
+    relationId: Optional[str] = Field(None, description="Relation id in the tenant's own system")
+    tenantCode: Optional[str] = Field(None, description="Hub tenant code, if the counterparty is on the hub")
+    aliases: List[str] = Field(default_factory=list, description="Other known spellings")
+
+
+class CounterpartiesRequest(BaseModel):
+    """Request model for replacing a tenant's counterparties"""
+    counterparties: List[Counterparty] = Field(..., description="Complete list of the tenant's counterparties")
+
+
+class CounterpartiesResponse(BaseModel):
+    """Response model for counterparty uploads"""
+    targetTenantCode: str
+    counterparties: int = Field(..., description="Counterparties indexed")
+    aliases: int = Field(..., description="Aliases indexed, including those learned from feedback")
+
+
+class CatalogFieldResult(BaseModel):
+    """Outcome of a catalog upload for one match field"""
+    mode: str = Field(..., description="built, rebuilt, delta or unchanged")
+    values: int = Field(..., description="Distinct values in the index afterwards")
+    added: int
+    removed: int
+
+
+class CatalogIngestResponse(BaseModel):
+    """Response model for catalog uploads, with ingest throughput"""
+    targetTenantCode: str
+    mode: str = Field(..., description="replace (PUT) or update (PATCH)")
+    rows: int = Field(..., description="Rows read")
+    invalidRows: int = Field(..., description="Rows without any usable match field value")
+    bytes: int = Field(..., description="Request body size as transferred")
+    fields: Dict[str, CatalogFieldResult]
+    parseMs: float
+    indexMs: float
+    elapsedMs: float
+    rowsPerSecond: float
@@ -0,0 +1,242 @@
+"""
+Admission control with per-tenant fair scheduling
+Bounds concurrent work, shares it fairly between tenants and prefers
+interactive requests over bulk ones
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Deque, Optional, Tuple
+
+from app.services.request_context import remaining
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Joins source and target tenant in the admission key of a tenant pair
+PAIR_SEPARATOR = "->"
+
+
+def pair_key(source_tenant: str, target_tenant: str) -> str:
+    """Admission key of a tenant pair."""
+    return f"{source_tenant}{PAIR_SEPARATOR}{target_tenant}"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be queued or waited too long for a slot."""
+
+    def __init__(self, tenant: str, reason: str, retry_after: float):
+        super().__init__(f"Tenant {tenant} over capacity: {reason}")
+        self.tenant = tenant
+        self.retry_after = retry_after
+
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    """Parse 'TENANT_A=2,TENANT_B=0.5' into a weight map."""
+    weights = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        tenant, _, weight = part.partition("=")
+        weights[tenant.strip()] = float(weight)
+    return weights
+
+
+class _TenantQueue:
+    """Waiters of one tenant in one priority class."""
+
+    __slots__ = ("tenant", "waiters", "virtual_time")
+
+    def __init__(self, tenant: str, virtual_time: float):
+        self.tenant = tenant
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.virtual_time = virtual_time
+
+
+class AdmissionController:
+    """
+    Weighted fair admission of requests keyed by tenant, or by tenant pair
+    (see pair_key) where a request has both a source and a target tenant.
+
+    At most `max_concurrency` requests run at once and at most
+    `tenant_concurrency` of them belong to one tenant. When a slot frees up,
+    waiting interactive requests are always served before bulk ones; within
+    a class the tenant with the lowest virtual time goes next, and a
+    tenant's virtual time advances by 1/weight per admitted request
+    (start-time fair queueing). A pair without a weight of its own has its
+    target tenant's. Requests are rejected with a retry hint when a
+    tenant's queue is full or the wait would outlive the request.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        tenant_concurrency: Optional[int] = None,
+        tenant_queue_size: Optional[int] = None,
+        max_queue_wait: Optional[float] = None,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        self.max_concurrency = max_concurrency if max_concurrency is not None else int(
+            os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+        self.tenant_concurrency = tenant_concurrency if tenant_concurrency is not None else int(
+            os.getenv("ADMISSION_TENANT_CONCURRENCY", "8"))
+        self.tenant_queue_size = tenant_queue_size if tenant_queue_size is not None else int(
+            os.getenv("ADMISSION_TENANT_QUEUE_SIZE", "200"))
+        self.max_queue_wait = max_queue_wait if max_queue_wait is not None else float(
+            os.getenv("ADMISSION_MAX_QUEUE_WAIT_MS", "10000")) / 1000.0
+        self.weights = weights if weights is not None else _parse_weights(
+            os.getenv("ADMISSION_TENANT_WEIGHTS", ""))
+
+        self.active = 0
+        self.active_by_tenant: Dict[str, int] = {}
+        self.queues: Dict[str, Dict[str, _TenantQueue]] = {p: {} for p in PRIORITIES}
+        self.virtual_clock = {p: 0.0 for p in PRIORITIES}
+
+        # Exponentially weighted service time, used for Retry-After hints
+        self.avg_service_time = 0.05
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def _weight(self, tenant: str) -> float:
+        weight = self.weights.get(tenant)
+        if weight is None:
+            weight = self.weights.get(tenant.rpartition(PAIR_SEPARATOR)[2], 1.0)
+        return max(weight, 0.01)
+
+    def _retry_after(self, tenant: str) -> float:
+        queued = sum(len(q[tenant].waiters) for q in self.queues.values() if tenant in q)
+        slots = max(1, min(self.tenant_concurrency, self.max_concurrency))
+        return max(1.0, math.ceil((queued + 1) * self.avg_service_time / slots))
+
+    def _can_run(self, tenant: str) -> bool:
+        return (
+            self.active < self.max_concurrency
+            and self.active_by_tenant.get(tenant, 0) < self.tenant_concurrency
+        )
+
+    def _start(self, tenant: str) -> None:
+        self.active += 1
+        self.active_by_tenant[tenant] = self.active_by_tenant.get(tenant, 0) + 1
+        self.admitted += 1
+
+    def _release(self, tenant: str, elapsed: float) -> None:
+        self.active -= 1
+        self.active_by_tenant[tenant] -= 1
+        if not self.active_by_tenant[tenant]:
+            del self.active_by_tenant[tenant]
+        self.avg_service_time = 0.9 * self.avg_service_time + 0.1 * elapsed
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting requests in fair order."""
+        while self.active < self.max_concurrency:
+            candidate: Optional[Tuple[str, _TenantQueue]] = None
+            for priority in PRIORITIES:
+                eligible = [
+                    q for q in self.queues[priority].values()
+                    if q.waiters and self.active_by_tenant.get(q.tenant, 0) < self.tenant_concurrency
+                ]
+                if eligible:
+                    candidate = (priority, min(eligible, key=lambda q: q.virtual_time))
+                    break
+            if candidate is None:
+                return
+
+            priority, queue = candidate
+            waiter = queue.waiters.popleft()
+            if waiter.done():
+                continue
+            self.virtual_clock[priority] = queue.virtual_time
+            queue.virtual_time += 1.0 / self._weight(queue.tenant)
+            if not queue.waiters:
+                del self.queues[priority][queue.tenant]
+            self._start(queue.tenant)
+            waiter.set_result(None)
+
+    def _enqueue(self, tenant: str, priority: str) -> asyncio.Future:
+        queues = self.queues[priority]
+        queue = queues.get(tenant)
+        if len(queue.waiters if queue else ()) >= self.tenant_queue_size:
+            self.rejected += 1
+            raise AdmissionRejected(tenant, "queue full", self._retry_after(tenant))
+        if queue is None:
+            # A tenant becoming active starts at the current virtual time
+            queue = queues[tenant] = _TenantQueue(tenant, self.virtual_clock[priority])
+        waiter = asyncio.get_running_loop().create_future()
+        queue.waiters.append(waiter)
+        return waiter
+
+    def _abandon(self, tenant: str, priority: str, waiter: asyncio.Future) -> None:
+        queue = self.queues[priority].get(tenant)
+        if queue is not None and waiter in queue.waiters:
+            queue.waiters.remove(waiter)
+            if not queue.waiters:
+                del self.queues[priority][tenant]
+
+    @asynccontextmanager
+    async def admit(self, tenant: str, priority: str = INTERACTIVE):
+        """Hold a slot for the duration of the block."""
+        if not self.enabled:
+            yield
+            return
+
+        priority = priority if priority in PRIORITIES else INTERACTIVE
+        tenant = tenant or "anonymous"
+
+        if self._can_run(tenant) and not any(self.queues[p] for p in PRIORITIES[:PRIORITIES.index(priority) + 1]):
+            self._start(tenant)
+        else:
+            waiter = self._enqueue(tenant, priority)
+            # Free slots may be held back only by other tenants' caps
+            self._dispatch()
+            wait = self.max_queue_wait
+            left = remaining()
+            if left is not None:
+                wait = min(wait, max(left, 0.0))
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=wait)
+            except asyncio.TimeoutError:
+                self._abandon(tenant, priority, waiter)
+                if waiter.done() and not waiter.cancelled():
+                    # Slot was granted just as we timed out; give it back
+                    self._release(tenant, 0.0)
+                self.rejected += 1
+                raise AdmissionRejected(tenant, "queue wait exceeded", self._retry_after(tenant))
+            except asyncio.CancelledError:
+                self._abandon(tenant, priority, waiter)
+                if waiter.done() and not waiter.cancelled():
+                    self._release(tenant, 0.0)
+                waiter.cancel()
+                raise
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(tenant, time.monotonic() - started)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current load and counters."""
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "maxConcurrency": self.max_concurrency,
+            "tenantConcurrency": self.tenant_concurrency,
+            "activeByTenant": dict(self.active_by_tenant),
+            "queued": {
+                priority: {tenant: len(q.waiters) for tenant, q in queues.items()}
+                for priority, queues in self.queues.items()
+            },
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avgServiceTimeMs": round(self.avg_service_time * 1000, 2),
+        }
@@ -0,0 +1,166 @@
+"""
+Streaming catalog ingestion
+Incremental NDJSON/CSV parsing of a target tenant's product master into index deltas
+"""
+import codecs
+import csv
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Sequence, Set
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "ndjson"
+CSV = "csv"
+
+# Row attribute marking a PATCH row as a removal
+OP_FIELD = "_op"
+DELETE_OP = "delete"
+
+# Longest line (or quoted CSV record) buffered while waiting for its end, in characters
+MAX_LINE_LENGTH = int(os.getenv("CATALOG_MAX_LINE_LENGTH", str(1024 * 1024)))
+
+_CONTENT_TYPES = {
+    "application/x-ndjson": NDJSON,
+    "application/ndjson": NDJSON,
+    "application/jsonl": NDJSON,
+    "application/x-jsonlines": NDJSON,
+    "text/csv": CSV,
+    "application/csv": CSV,
+}
+
+
+def catalog_format(content_type: str) -> str:
+    """Catalog format for a request Content-Type (NDJSON when unspecified)."""
+    media_type = content_type.split(";")[0].strip().lower()
+    if not media_type:
+        return NDJSON
+    if media_type not in _CONTENT_TYPES:
+        raise ValueError(f"Unsupported catalog content type: {content_type}")
+    return _CONTENT_TYPES[media_type]
+
+
+class LineTooLong(ValueError):
+    """A catalog line runs on past MAX_LINE_LENGTH without ending."""
+
+
+class CatalogIngest:
+    """
+    Reduce a streamed catalog to per-field sets of values to upsert and delete.
+
+    Raw body chunks are fed as they arrive; complete lines are parsed right
+    away and only the distinct values of each match field are kept, so
+    memory grows with the number of distinct names rather than with the
+    size of the upload. NDJSON rows are objects keyed by field name; CSV
+    has a header row. Rows with `_op` set to "delete" list values to remove.
+
+    A compressed body is decoded through `decompressor` (see
+    transport.stream_decompressor), which hands its output on in bounded
+    pieces; a line longer than max_line_length raises LineTooLong.
+    """
+
+    def __init__(
+        self,
+        fmt: str,
+        fields: Sequence[str],
+        decompressor: Optional[Any] = None,
+        max_line_length: int = MAX_LINE_LENGTH
+    ):
+        self.fmt = fmt
+        self.fields = tuple(fields)
+        self.max_line_length = max_line_length
+        self.upserts: Dict[str, Set[str]] = {field: set() for field in self.fields}
+        self.deletes: Dict[str, Set[str]] = {field: set() for field in self.fields}
+        # Fields that occur in the catalog at all
+        self.present_fields: Set[str] = set()
+        self.rows = 0
+        self.invalid_rows = 0
+        self.bytes = 0
+
+        self._decompressor = decompressor
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._pending = ""
+        self._record = ""
+        self._header: Optional[list] = None
+
+    def feed(self, chunk: bytes) -> None:
+        self.bytes += len(chunk)
+        if self._decompressor is not None:
+            self._decompressor.decompress(chunk, self._text)
+        else:
+            self._text(chunk)
+
+    def _text(self, data: bytes) -> None:
+        lines = (self._pending + self._decoder.decode(data)).split("\n")
+        self._pending = lines.pop()
+        if len(self._pending) > self.max_line_length:
+            raise LineTooLong(f"Catalog line longer than {self.max_line_length} characters")
+        for line in lines:
+            self._line(line)
+
+    def close(self) -> None:
+        if self._decompressor is not None:
+            self._decompressor.flush(self._text)
+        text = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        for line in text.split("\n"):
+            self._line(line)
+        if self._record:
+            # Unterminated quoted CSV field
+            self._record = ""
+            self.invalid_rows += 1
+
+    def _line(self, line: str) -> None:
+        line = line.rstrip("\r")
+        if self.fmt == NDJSON:
+            if line.strip():
+                self._ndjson_row(line)
+            return
+
+        # CSV records may span lines inside quoted fields
+        self._record = f"{self._record}\n{line}" if self._record else line
+        if self._record.count('"') % 2:
+            if len(self._record) > self.max_line_length:
+                raise LineTooLong(f"Quoted CSV record longer than {self.max_line_length} characters")
+            return
+        record, self._record = self._record, ""
+        if not record.strip():
+            return
+        values = next(csv.reader([record]))
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            return
+        self._row(dict(zip(self._header, values)))
+
+    def _ndjson_row(self, line: str) -> None:
+        try:
+            row = orjson.loads(line) if orjson is not None else json.loads(line)
+        except ValueError:
+            self.rows += 1
+            self.invalid_rows += 1
+            return
+        if not isinstance(row, dict):
+            self.rows += 1
+            self.invalid_rows += 1
+            return
+        self._row(row)
+
+    def _row(self, row: Dict[str, Any]) -> None:
+        self.rows += 1
+        target = self.deletes if str(row.get(OP_FIELD) or "").lower() == DELETE_OP else self.upserts
+
+        found = False
+        for field in self.fields:
+            value = row.get(field)
+            if isinstance(value, str) and value.strip():
+                target[field].add(value.strip())
+                self.present_fields.add(field)
+                found = True
+        if not found:
+            self.invalid_rows += 1
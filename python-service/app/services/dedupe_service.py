@@ -3,16 +3,37 @@ Dedupe Service for Entity Resolution
 Uses the dedupe library for probabilistic record linkage with active learning
 """
 import os
+import io
+import asyncio
+import copy
 import json
 import logging
 import pickle
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
 from difflib import SequenceMatcher
 
 import dedupe
 import numpy as np
 
+from app.services.resolution_cache import ResolutionCache, SingleFlight, PASSTHROUGH, normalize_value
+from app.services.resolution_cascade import AliasAutomaton, CascadeStats, parse_thresholds, parse_tiers
+from app.services.model_artifact import (
+    CANONICAL, FEATURES, OVERLAYS, SETTINGS, STATS, ArtifactError, ModelArtifact, artifact_path, decode_json, encode_json,
+    resolve_compression, write_artifact
+)
+from app.services.model_overlay import SHARED_SOURCE, SourceOverlay, parse_sharing, shared_model_key
+from app.services.model_registry import LEGACY_SUFFIXES, ModelRegistry
+from app.services.negative_miner import NegativeMiner
+from app.services.records import LabelledPair, RecordPool, ResolvedFields, intern_value
+from app.services.request_context import check_deadline
+from app.services.scoring_pool import PooledModel, ScoringPool, load_gazetteer, score_pairs, search_best
+from app.services.supplier_matcher import SupplierMatcher
+from app.services.vector_index import NgramVectorIndex, calibration_path, fit_calibration, save_calibration
+from app.services.warm_state import WarmSnapshot, file_fingerprint, write_snapshot
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,21 +82,130 @@ class DedupeService:
         'oats': 'Oats',
     }
 
+    # Knowledge-base aliases compared character by character per fuzzy lookup
+    KB_FUZZY_CANDIDATES = 8
+    # Labels a source needs before a shared model's scores are calibrated for it
+    OVERLAY_CALIBRATION_LABELS = 20
+
     def __init__(self):
         self.model_path = Path(os.getenv("DEDUPE_MODEL_PATH", "./models"))
         self.model_path.mkdir(parents=True, exist_ok=True)
 
         self.min_training_samples = int(os.getenv("DEDUPE_MIN_TRAINING_SAMPLES", "50"))
         self.confidence_threshold = float(os.getenv("DEDUPE_CONFIDENCE_THRESHOLD", "0.7"))
+        # Incremental retrains reuse the previous blocking predicates until the
+        # new labels exceed this fraction of the labels the model was trained on
+        self.full_retrain_ratio = float(os.getenv("FULL_RETRAIN_RATIO", "0.5"))
 
         self.models: Dict[str, Any] = {}
         self.gazetteer_cache: Dict[str, dedupe.Gazetteer] = {}
+        # Registry version of each cached gazetteer
+        self.gazetteer_versions: Dict[str, int] = {}
+
+        # "pair": one model per tenant pair; "target": one shared model per
+        # target tenant, trained on the labels of all its sources, with
+        # per-source overlays applied at query time
+        self.model_sharing = parse_sharing(os.getenv("MODEL_SHARING", "pair"))
+        # Target tenant -> (shared model version, source tenant -> overlay)
+        self.overlay_cache: Dict[str, Tuple[int, Dict[str, SourceOverlay]]] = {}
+        # Target tenant -> source tenant -> aliases learned from feedback
+        # that the shared model was not trained on yet
+        self.feedback_overlays: Dict[str, Dict[str, SourceOverlay]] = {}
+
+        # Model artifacts: section compression (zstd, zlib or none) and an
+        # optional signing key; with a key, unsigned model files are not loaded
+        self.artifact_compression = resolve_compression(os.getenv("MODEL_ARTIFACT_COMPRESSION", "zstd"))
+        self.artifact_key = os.getenv("MODEL_ARTIFACT_KEY", "").encode("utf-8") or None
+
+        # Which pairs have a model, answered from memory; processes sharing
+        # the model path re-read its manifest at most this often
+        self.model_registry = ModelRegistry(
+            self.model_path,
+            refresh_seconds=float(os.getenv("MODEL_REGISTRY_REFRESH_SECONDS", "10"))
+        )
+
+        # Score trained models in this many worker processes (0 scores in the
+        # event loop's process), pinned one per CPU, each keeping its most
+        # recently used models loaded
+        scoring_workers = int(os.getenv("SCORING_WORKERS", "0"))
+        self.scoring_pool: Optional[ScoringPool] = None
+        if scoring_workers > 0:
+            self.scoring_pool = ScoringPool(
+                self.model_path,
+                scoring_workers,
+                pin_cpus=os.getenv("SCORING_PIN_CPUS", "true").lower() == "true",
+                spill_depth=int(os.getenv("SCORING_SPILL_DEPTH", "4")),
+                artifact_key=self.artifact_key,
+                max_models=int(os.getenv("SCORING_WORKER_MAX_MODELS", "32"))
+            )
+
+        # Vector retrieval over each target tenant's canonical catalog
+        self.catalog_path = self.model_path / "catalogs"
+        self.catalog_path.mkdir(parents=True, exist_ok=True)
+        self.vector_index_options = {
+            "dim": int(os.getenv("VECTOR_INDEX_DIM", "512")),
+            "quantize": os.getenv("VECTOR_INDEX_QUANTIZE", "false").lower() == "true",
+            "partitions": int(os.getenv("VECTOR_INDEX_PARTITIONS", "0")),
+            "probes": int(os.getenv("VECTOR_INDEX_PROBES", "8")),
+        }
+        self.vector_candidates = int(os.getenv("VECTOR_CANDIDATES", "10"))
+        # Catalog updates touching more than this fraction of an index rebuild it
+        self.catalog_rebuild_ratio = float(os.getenv("CATALOG_REBUILD_RATIO", "0.25"))
+        self.catalog_indexes: Dict[Tuple[str, str], Optional[NgramVectorIndex]] = {}
+        # Hard-negative miners over catalog values, with the index they were built from
+        self.catalog_miners: Dict[Tuple[str, str], Tuple[NgramVectorIndex, NegativeMiner]] = {}
+        # Serializes catalog updates per target tenant
+        self.catalog_locks: Dict[str, asyncio.Lock] = {}
+        # Supplier matching against each target tenant's known counterparties
+        self.counterparty_path = self.model_path / "counterparties"
+        self.counterparty_path.mkdir(parents=True, exist_ok=True)
+        self.supplier_matchers: Dict[str, Optional[SupplierMatcher]] = {}
+        # Bumped per target tenant whenever its catalogs or counterparties change
+        self.catalog_generations: Dict[str, int] = {}
 
         # Define the fields for dedupe matching
         self.fields = [
             {'field': 'product', 'type': 'String', 'has missing': True},
             {'field': 'supplier', 'type': 'String', 'has missing': True},
         ]
+        self.match_fields = tuple(intern_value(f['field']) for f in self.fields)
+        self.match_field_index = {field: i for i, field in enumerate(self.match_fields)}
+
+        # Memoized resolutions of repeated (product, supplier) lookups
+        self.resolution_cache = ResolutionCache(
+            max_entries_per_pair=int(os.getenv("RESOLUTION_CACHE_SIZE", "10000"))
+        )
+        self.single_flight = SingleFlight()
+        # Target tenant of each pair with cached resolutions
+        self.pair_targets: Dict[str, str] = {}
+        # Bumped whenever the shared knowledge base changes
+        self.kb_generation = 0
+        # Knowledge-base entries learned from feedback by this process
+        self.knowledge_base_additions: Dict[str, str] = {}
+        # (state, aliases, automaton, trigram index) of the knowledge base,
+        # and the rebuild that replaces them after a change
+        self._kb_indexes = None
+        self._kb_rebuild: Optional[asyncio.Task] = None
+        # Aliases added to the serving alias map while a rebuild was running,
+        # re-applied to the map it swaps in
+        self._kb_pending: Dict[str, str] = {}
+        # Bumped whenever the indexes answering knowledge-base lookups change
+        self._kb_serving_generation = 0
+
+        # Resolution cascade: tier order and the confidence at which each
+        # tier's answer ends it
+        self.resolution_tiers = parse_tiers(os.getenv("RESOLUTION_TIERS", "exact,automaton,ngram,model"))
+        self.tier_thresholds = parse_thresholds(os.getenv("RESOLUTION_TIER_THRESHOLDS", ""))
+        self.knowledge_base_tiers = tuple(t for t in self.resolution_tiers if t in ("exact", "automaton", "ngram"))
+        self.cascade_stats = CascadeStats(self.resolution_tiers)
+
+        # Warm state (hot models and indexes, learned aliases, memoized
+        # resolutions) is snapshot to this file every WARM_STATE_SNAPSHOT_SECONDS
+        # and restored at startup; 0 disables both
+        self.warm_state_path = Path(os.getenv("WARM_STATE_PATH") or self.model_path / "warm_state.snapshot")
+        self.warm_state_interval = float(os.getenv("WARM_STATE_SNAPSHOT_SECONDS", "300"))
+        self.warm_snapshot: Optional[WarmSnapshot] = None
+        self._snapshot_lock = threading.Lock()
 
         logger.info(f"DedupeService initialized with model path: {self.model_path}")
 
@@ -96,211 +226,589 @@ class DedupeService:
         Returns:
             Dictionary with mappedData and confidenceScores
         """
-        model_key = f"{source_tenant}_{target_tenant}"
+        model_key = intern_value(f"{source_tenant}_{target_tenant}")
+        resolved = await self._resolve_match_fields(extracted_data, model_key, intern_value(target_tenant))
 
-        # Try to load trained model, fall back to knowledge base
-        model = self._load_model(model_key)
+        mapped_data = {}
+        confidence_scores = {}
 
-        if model is not None:
-            logger.info(f"Using trained dedupe model for {model_key}")
-            mapped_data, confidence_scores = await self._dedupe_matching(
-                extracted_data, model, model_key
-            )
-        else:
-            logger.info(f"No trained model for {model_key}, using knowledge base")
-            mapped_data, confidence_scores = self._knowledge_base_matching(extracted_data)
+        for field, value in extracted_data.items():
+            index = self.match_field_index.get(field)
+            match = resolved[index] if index is not None else None
+            if match is not None:
+                mapped_value, score = match
+                mapped_data[field] = value if mapped_value is PASSTHROUGH else mapped_value
+                confidence_scores[field] = score
+            else:
+                mapped_data[field] = value
+                confidence_scores[field] = 0.98 if value else 0.5
 
         return {
             "mappedData": mapped_data,
             "confidenceScores": confidence_scores
         }
 
-    def _load_model(self, model_key: str) -> Optional[dedupe.Gazetteer]:
-        """Load a trained dedupe model from disk."""
-        if model_key in self.gazetteer_cache:
-            return self.gazetteer_cache[model_key]
+    async def _resolve_match_fields(
+        self,
+        match_data: Dict[str, Any],
+        model_key: str,
+        target_tenant: str
+    ) -> ResolvedFields:
+        """
+        Resolve the match fields of a record, memoized per tenant pair.
+
+        Concurrent identical lookups share a single computation. Keys carry
+        the target's catalog generation, so results resolved against an
+        older catalog are never served; results that used the knowledge
+        base are tagged with the generation its serving indexes reflect.
+        Key values are interned: the same names recur across requests and
+        tenant pairs.
+        """
+        if self.warm_snapshot is not None and model_key in self.warm_snapshot.pending:
+            self._restore_resolutions(model_key, target_tenant)
+
+        try:
+            cache_key = (self.catalog_generations.get(target_tenant, 0),) + tuple(
+                intern_value(normalize_value(match_data.get(f))) for f in self.match_fields
+            )
+            hash(cache_key)
+        except TypeError:
+            # Unhashable values (lists, dicts) are never memoized
+            return (await self._compute_match_fields(match_data, model_key, target_tenant))[0]
+
+        kb_generation = self._indexed_kb_generation()
+        cached = self.resolution_cache.get(model_key, cache_key, kb_generation)
+        if cached is not None:
+            return cached
 
-        model_file = self.model_path / f"{model_key}_model.pkl"
-        settings_file = self.model_path / f"{model_key}_settings"
+        version = self.resolution_cache.version(model_key)
 
-        if settings_file.exists():
+        async def compute():
+            fields, uses_knowledge_base = await self._compute_match_fields(match_data, model_key, target_tenant)
+            self.pair_targets[model_key] = target_tenant
+            self.resolution_cache.put(
+                model_key, cache_key, fields, version,
+                kb_generation=kb_generation if uses_knowledge_base else None
+            )
+            return fields
+
+        # Lookups after an invalidation or knowledge-base change start a new
+        # flight instead of joining one computed against the old state
+        return await self.single_flight.do((model_key, cache_key, version, kb_generation), compute)
+
+    async def _compute_match_fields(
+        self,
+        match_data: Dict[str, Any],
+        model_key: str,
+        target_tenant: str
+    ) -> Tuple[ResolvedFields, bool]:
+        """
+        Run the actual matcher for the match fields of a record.
+
+        With shared models, the source's overlay aliases answer first.
+        Suppliers are then matched against the target tenant's
+        counterparties. Other string fields go through the resolution
+        cascade (see _cascade).
+
+        Returns:
+            (mapped value or PASSTHROUGH, confidence) per match field, None
+            for fields not in the record, and whether the result depends on
+            the shared knowledge base
+        """
+        overlay = None
+        if self.model_sharing == "target":
+            overlay = self._target_overlays(target_tenant).get(model_key[:-(len(target_tenant) + 1)])
+
+        model = None
+        if "model" in self.resolution_tiers:
+            check_deadline("model_load")
+            model = self._trained_model(self._model_key_for(model_key, target_tenant))
+
+        fields: List[Optional[Tuple[Any, float]]] = [None] * len(self.match_fields)
+        uses_knowledge_base = False
+        for index, field in enumerate(self.match_fields):
+            if field not in match_data:
+                continue
+            value = match_data[field]
+            if not isinstance(value, str) or not value:
+                fields[index] = (PASSTHROUGH, 0.98 if value else 0.5)
+                continue
+
+            # The source's own corrections come first
+            alias = overlay.alias(field, value) if overlay is not None else None
+            if alias is not None:
+                fields[index] = (PASSTHROUGH if alias == value else alias, 0.98)
+                continue
+
+            if field == 'supplier':
+                supplier_match = self._supplier_matching(value, target_tenant)
+                if supplier_match is not None:
+                    name, score = supplier_match
+                    if score >= self.confidence_threshold:
+                        fields[index] = (PASSTHROUGH if name == value else name, score)
+                        continue
+
+            if field == 'product' and self.knowledge_base_tiers:
+                uses_knowledge_base = True
+            match = await self._cascade(field, value, match_data, target_tenant, model, overlay)
+            if match is not None:
+                mapped_value, score = match
+                fields[index] = (PASSTHROUGH if mapped_value == value else mapped_value, score)
+            elif field == 'product' or (field == 'supplier' and supplier_match is not None):
+                fields[index] = (PASSTHROUGH, 0.5)
+            else:
+                fields[index] = (PASSTHROUGH, 0.98)
+
+        return tuple(fields), uses_knowledge_base
+
+    async def _cascade(
+        self,
+        field: str,
+        value: str,
+        record: Dict[str, Any],
+        target_tenant: str,
+        model: Union[dedupe.Gazetteer, PooledModel, None],
+        overlay: Optional[SourceOverlay] = None
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Resolve one field value through the configured tiers, cheapest first.
+
+        exact      knowledge-base alias lookup (product)
+        automaton  knowledge-base aliases occurring inside the value (product)
+        ngram      the target tenant's catalog index and a trigram index of
+                   knowledge-base aliases
+        model      the pair's trained gazetteer (product) and its classifier
+                   over the catalog candidates; a shared model's scores are
+                   calibrated by the source's overlay
+
+        A tier's answer ends the cascade once it reaches the tier's
+        threshold. Otherwise the best answer of all tiers is used if it
+        reaches the confidence threshold. Tiers that do not apply to the
+        field (no catalog, no model) are skipped without being counted.
+
+        Returns:
+            Mapped value and confidence, or None to pass the value through
+        """
+        best: Optional[Tuple[str, float, str]] = None
+        catalog_candidates = None
+        ran = False
+
+        for tier in self.resolution_tiers:
+            if tier in ("exact", "automaton") and field != 'product':
+                continue
+            if tier == "model" and model is None:
+                continue
+
+            check_deadline(tier)
+            started = time.perf_counter()
+            if tier == "exact":
+                match = self._exact_tier(value)
+            elif tier == "automaton":
+                match = self._knowledge_base_indexes()[1].find(value)
+            elif tier == "ngram":
+                catalog_candidates = self._catalog_candidates(field, value, target_tenant)
+                if catalog_candidates is None and field != 'product':
+                    continue
+                match = self._ngram_tier(field, value, catalog_candidates)
+            else:
+                if catalog_candidates is None:
+                    catalog_candidates = self._catalog_candidates(field, value, target_tenant)
+                match = await self._model_tier(field, value, record, model, catalog_candidates, overlay)
+
+            ran = True
+            exited = match is not None and match[1] >= self.tier_thresholds[tier]
+            self.cascade_stats.record(tier, time.perf_counter() - started, match is not None, exited)
+            if match is not None and (best is None or match[1] > best[1]):
+                best = (match[0], match[1], tier)
+            if exited:
+                break
+
+        if not ran:
+            return None
+        if best is None or best[1] < self.confidence_threshold:
+            self.cascade_stats.finish(None)
+            return None
+        self.cascade_stats.finish(best[2])
+        return best[0], best[1]
+
+    def _exact_tier(self, value: str) -> Optional[Tuple[str, float]]:
+        canonical = self._knowledge_base_indexes()[0].get(normalize_value(value))
+        return (canonical, 0.98) if canonical is not None else None
+
+    def _ngram_tier(
+        self,
+        field: str,
+        value: str,
+        catalog_candidates: Optional[List[Tuple[str, float]]]
+    ) -> Optional[Tuple[str, float]]:
+        """Best of the catalog's calibrated candidates and fuzzy knowledge-base aliases."""
+        matches = list(catalog_candidates or ())[:1]
+        if field == 'product':
+            fuzzy = self._fuzzy_knowledge_base(value)
+            if fuzzy is not None:
+                matches.append(fuzzy)
+        return max(matches, key=lambda match: match[1]) if matches else None
+
+    async def _model_tier(
+        self,
+        field: str,
+        value: str,
+        record: Dict[str, Any],
+        model: Union[dedupe.Gazetteer, PooledModel],
+        catalog_candidates: Optional[List[Tuple[str, float]]],
+        overlay: Optional[SourceOverlay] = None
+    ) -> Optional[Tuple[str, float]]:
+        """Best of the gazetteer's match and the classifier's scores of catalog candidates."""
+        matches = []
+        if field == 'product':
             try:
-                with open(settings_file, 'rb') as f:
-                    gazetteer = dedupe.StaticGazetteer(f)
+                found = await self._model_search(model, self._record(record))
+            except Exception as e:
+                logger.error(f"Dedupe matching failed: {e}")
+                found = None
+            if found is not None and found[0]['product']:
+                matches.append((found[0]['product'], found[1]))
+        if catalog_candidates:
+            matches.extend(await self._rescore_candidates(model, field, value, [c for c, _ in catalog_candidates]))
+        if overlay is not None:
+            matches = [(match, overlay.adjust(score)) for match, score in matches]
+        return max(matches, key=lambda match: match[1]) if matches else None
+
+    def _model_key_for(self, model_key: str, target_tenant: str) -> str:
+        """Key of the model that resolves a pair: its own, or its target's shared one."""
+        return shared_model_key(target_tenant) if self.model_sharing == "target" else model_key
+
+    def _target_overlays(self, target_tenant: str) -> Dict[str, SourceOverlay]:
+        """
+        Source overlays of a target's shared model, read from its artifact
+        once per model version, plus aliases learned from feedback since.
+        """
+        model_key = shared_model_key(target_tenant)
+        entry = self.model_registry.get(model_key)
+        version = entry.version if entry is not None else 0
+        cached = self.overlay_cache.get(target_tenant)
+        if cached is not None and cached[0] == version:
+            return cached[1]
 
-                self.gazetteer_cache[model_key] = gazetteer
-                logger.info(f"Loaded trained model for {model_key}")
-                return gazetteer
+        overlays: Dict[str, SourceOverlay] = {}
+        if entry is not None:
+            try:
+                section = self._model_section(model_key, OVERLAYS)
+                if section is not None:
+                    overlays = {
+                        source: SourceOverlay.from_dict(values)
+                        for source, values in decode_json(section).items()
+                    }
             except Exception as e:
-                logger.error(f"Failed to load model {model_key}: {e}")
-                return None
+                logger.error(f"Failed to load source overlays of {target_tenant}: {e}")
+        for source, feedback in self.feedback_overlays.get(target_tenant, {}).items():
+            overlay = overlays.setdefault(source, SourceOverlay())
+            for field, aliases in feedback.aliases.items():
+                overlay.aliases.setdefault(field, {}).update(aliases)
 
-        return None
+        self.overlay_cache[target_tenant] = (version, overlays)
+        return overlays
 
-    async def _dedupe_matching(
+    def add_overlay_alias(
         self,
-        extracted_data: Dict[str, Any],
-        model: dedupe.Gazetteer,
-        model_key: str
-    ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        source_tenant: str,
+        target_tenant: str,
+        field: str,
+        source_value: str,
+        corrected_value: str
+    ) -> None:
         """
-        Use trained dedupe model for entity matching.
+        Apply a correction to the source's overlay at once, ahead of the
+        shared model's next retrain. Used for active learning updates.
         """
-        mapped_data = {}
-        confidence_scores = {}
+        feedback = self.feedback_overlays.setdefault(target_tenant, {}).setdefault(source_tenant, SourceOverlay())
+        if feedback.add_alias(field, source_value, corrected_value):
+            overlay = self._target_overlays(target_tenant).setdefault(source_tenant, SourceOverlay())
+            overlay.add_alias(field, source_value, corrected_value)
+            self.resolution_cache.invalidate_pair(f"{source_tenant}_{target_tenant}")
+            logger.info(f"Added {field} alias for {source_tenant} -> {target_tenant}: {source_value} -> {corrected_value}")
 
-        # Prepare the record for matching
-        record = {
-            'product': extracted_data.get('product', ''),
-            'supplier': extracted_data.get('supplier', ''),
-        }
+    def _trained_model(self, model_key: str) -> Union[dedupe.Gazetteer, PooledModel, None]:
+        """The pair's trained model: loaded here, or a reference for the scoring workers."""
+        if self.scoring_pool is None:
+            return self._load_model(model_key)
+        entry = self.model_registry.get(model_key)
+        return PooledModel(model_key, entry.version) if entry is not None else None
 
-        # Match using gazetteer
-        try:
-            matches = model.search([record], threshold=self.confidence_threshold)
-
-            for field, value in extracted_data.items():
-                if field == 'product' and matches:
-                    # Get the best match for this record
-                    if matches[0]:  # If there are matches for the first (only) record
-                        best_match = max(matches[0], key=lambda x: x[1])
-                        matched_product, score = best_match
-                        mapped_data['product'] = matched_product
-                        confidence_scores['product'] = float(score)
-                    else:
-                        mapped_data['product'] = value
-                        confidence_scores['product'] = 0.5
-                else:
-                    mapped_data[field] = value
-                    confidence_scores[field] = 0.98 if value else 0.5
+    def _load_model(self, model_key: str) -> Optional[dedupe.Gazetteer]:
+        """
+        Load a trained dedupe model from disk and index its canonical records.
+        The model registry says whether there is one, so pairs without a
+        model never touch the model directory.
+        """
+        entry = self.model_registry.get(model_key)
+        if entry is None:
+            self.gazetteer_cache.pop(model_key, None)
+            self.gazetteer_versions.pop(model_key, None)
+            return None
+        if self.gazetteer_versions.get(model_key) == entry.version:
+            return self.gazetteer_cache[model_key]
 
+        try:
+            gazetteer = load_gazetteer(self.model_path, model_key, self.artifact_key)
         except Exception as e:
-            logger.error(f"Dedupe matching failed: {e}")
-            return self._knowledge_base_matching(extracted_data)
+            logger.error(f"Failed to load model {model_key}: {e}")
+            return None
 
-        return mapped_data, confidence_scores
+        if gazetteer is not None:
+            self.gazetteer_cache[model_key] = gazetteer
+            self.gazetteer_versions[model_key] = entry.version
+            logger.info(f"Loaded trained model for {model_key} ({len(gazetteer.indexed_data)} canonical records)")
+        return gazetteer
 
-    def _knowledge_base_matching(
+    async def _model_search(
         self,
-        extracted_data: Dict[str, Any]
-    ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        model: Union[dedupe.Gazetteer, PooledModel],
+        record: Dict[str, Any]
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Best canonical record of a trained model for a record, scored in a worker if pooled."""
+        if isinstance(model, PooledModel):
+            return await self.scoring_pool.search(model, record, self.confidence_threshold)
+        return search_best(model, record, self.confidence_threshold)
+
+    def _catalog_candidates(self, field: str, value: str, target_tenant: str) -> Optional[List[Tuple[str, float]]]:
         """
-        Knowledge base matching with fuzzy string matching fallback.
+        Closest catalog values with calibrated scores, best first, or None
+        when the target tenant has no catalog for the field.
         """
-        mapped_data = {}
-        confidence_scores = {}
+        index = self._catalog_index(target_tenant, field)
+        if index is None:
+            return None
+        return [
+            (index.values[row], score)
+            for row, score in index.search([value], k=self.vector_candidates)[0]
+        ]
 
-        for field, value in extracted_data.items():
-            if field == 'product' and isinstance(value, str):
-                matched_product, confidence = self._match_product(value)
-                mapped_data[field] = matched_product
-                confidence_scores[field] = confidence
+    def _supplier_matching(self, supplier: str, target_tenant: str) -> Optional[Tuple[str, float]]:
+        """
+        Match a supplier against the target tenant's counterparties.
+
+        Returns the counterparty name and confidence (0 without a candidate),
+        or None when the tenant has no counterparties to match against.
+        """
+        matcher = self._supplier_matcher(target_tenant)
+        if matcher is None:
+            return None
+        match = matcher.match(supplier)
+        if match is None:
+            return supplier, 0.0
+        counterparty, score = match
+        return counterparty['name'], score
+
+    async def _rescore_candidates(
+        self,
+        model: Union[dedupe.Gazetteer, PooledModel],
+        field: str,
+        value: str,
+        candidates: List[str]
+    ) -> List[Tuple[str, float]]:
+        """Score catalog candidates with a trained model's classifier."""
+        try:
+            messy = self._record({field: value})
+            pairs = [(messy, self._record({field: candidate})) for candidate in candidates]
+            if isinstance(model, PooledModel):
+                scores = await self.scoring_pool.score_pairs(model, pairs)
             else:
-                mapped_data[field] = value
-                confidence_scores[field] = 0.98 if value else 0.5
+                scores = score_pairs(model, pairs)
+            return list(zip(candidates, scores))
+        except Exception as e:
+            logger.warning(f"Cannot rescore catalog candidates with the trained model: {e}")
+            return []
+
+    def _knowledge_base_indexes(self) -> Tuple[Dict[str, str], AliasAutomaton, NegativeMiner]:
+        """
+        Normalized alias map, alias automaton and alias trigram index of the
+        knowledge base. Built on first use; after a change, the previous
+        automaton and trigram index keep answering until a rebuild swaps in
+        new ones. Aliases added through add_to_knowledge_base go into the
+        alias map right away.
+        """
+        if self._kb_indexes is None:
+            self._kb_indexes = self._index_knowledge_base(self._kb_state(), self.PRODUCT_KNOWLEDGE_BASE)
+        elif self._kb_indexes[0] != self._kb_state():
+            self._refresh_knowledge_base_indexes()
+        return self._kb_indexes[1:]
+
+    def _kb_state(self) -> Tuple[int, int, int]:
+        knowledge_base = self.PRODUCT_KNOWLEDGE_BASE
+        return id(knowledge_base), len(knowledge_base), self.kb_generation
 
-        return mapped_data, confidence_scores
+    def _indexed_kb_generation(self) -> int:
+        """Generation of the indexes answering knowledge-base lookups."""
+        return self._kb_serving_generation
 
-    def _match_product(self, product_name: str) -> Tuple[str, float]:
+    def _kb_indexes_current(self) -> bool:
+        """Whether the serving indexes reflect every knowledge-base change."""
+        return self._kb_indexes is None or self._kb_indexes[0] == self._kb_state()
+
+    @staticmethod
+    def _index_knowledge_base(state: Tuple[int, int, int], knowledge_base: Dict[str, str]) -> Tuple:
+        aliases = {normalize_value(alias): canonical for alias, canonical in knowledge_base.items()}
+        indexes = (state, aliases, AliasAutomaton(aliases), NegativeMiner(list(aliases)))
+        logger.info(f"Indexed {len(aliases)} knowledge base aliases")
+        return indexes
+
+    def _refresh_knowledge_base_indexes(self) -> None:
         """
-        Match a product name against the knowledge base.
-        Uses exact matching first, then fuzzy matching.
+        Rebuild the knowledge-base indexes after a change: in a worker thread
+        when called on the event loop, inline otherwise.
         """
-        product_lower = product_name.lower().strip()
+        if self._kb_indexes is None or (self._kb_rebuild is not None and not self._kb_rebuild.done()):
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._kb_indexes = self._index_knowledge_base(self._kb_state(), self.PRODUCT_KNOWLEDGE_BASE)
+            self._kb_serving_generation += 1
+            return
+        self._kb_rebuild = asyncio.create_task(self._rebuild_knowledge_base_indexes())
 
-        # Try exact match
-        if product_lower in self.PRODUCT_KNOWLEDGE_BASE:
-            return self.PRODUCT_KNOWLEDGE_BASE[product_lower], 0.98
+    async def _rebuild_knowledge_base_indexes(self) -> None:
+        # Changes made during a rebuild are picked up by another round
+        while self._kb_indexes[0] != self._kb_state():
+            state = self._kb_state()
+            knowledge_base = dict(self.PRODUCT_KNOWLEDGE_BASE)
+            self._kb_pending.clear()
+            try:
+                indexes = await asyncio.to_thread(self._index_knowledge_base, state, knowledge_base)
+            except Exception as e:
+                logger.error(f"Failed to rebuild the knowledge base indexes: {e}")
+                return
+            indexes[1].update(self._kb_pending)
+            self._kb_indexes = indexes
+            self._kb_serving_generation += 1
+
+    def _fuzzy_knowledge_base(self, product_name: str) -> Optional[Tuple[str, float]]:
+        """
+        Closest knowledge-base alias by character similarity. Only the
+        aliases sharing the most trigrams with the name are compared.
+        """
+        aliases, _, trigram_index = self._knowledge_base_indexes()
+        product_lower = product_name.lower().strip()
 
-        # Try fuzzy matching
         best_match = None
         best_score = 0.0
-
-        for known_product, canonical_name in self.PRODUCT_KNOWLEDGE_BASE.items():
+        for known_product, _ in trigram_index.similar(product_lower, k=self.KB_FUZZY_CANDIDATES):
             score = SequenceMatcher(None, product_lower, known_product).ratio()
             if score > best_score:
                 best_score = score
-                best_match = canonical_name
-
-        # Return match if above threshold
-        if best_score >= 0.7:
-            return best_match, best_score
+                best_match = aliases[known_product]
 
-        # No good match, return original
-        return product_name, 0.5
+        return (best_match, best_score) if best_match is not None else None
 
     async def train_model(
         self,
         model_key: str,
-        training_data: List[Dict[str, Any]]
+        training_data: List[Union[LabelledPair, Dict[str, Any]]],
+        incremental: bool = False,
+        min_samples: Optional[int] = None
     ) -> Dict[str, Any]:
         """
-        Train a new dedupe model for a tenant pair.
+        Train a dedupe model for a tenant pair.
+
+        A full retrain learns blocking predicates and the classifier from
+        scratch. An incremental retrain warm-starts from the previous
+        model: it keeps its predicates, refits its classifier from the
+        previous weights using cached features (only new labels are
+        featurized) and adds only new canonical records to the index.
+        Item weights (`weight`, default 1) are applied by incremental
+        refits; dedupe's own training treats all labels equally.
+
+        A target tenant's shared model is trained on the labels of all its
+        sources, each item carrying its `source`; the model then gets an
+        overlay per source with the source's aliases and a calibration of
+        the model's scores on its labels.
+
+        Records are pooled (see RecordPool): every distinct messy or
+        canonical record exists once, however many examples refer to it,
+        and dedupe samples each distinct messy record once.
 
         Args:
             model_key: Tenant pair identifier (source_target)
-            training_data: List of training examples with labeled pairs
+            training_data: Labelled pairs (LabelledPair or the equivalent
+                dicts), the complete labelled history of the pair, optionally
+                weighted and tagged with their source tenant
+            incremental: Warm-start from the previous model when possible
+            min_samples: Minimum number of examples for this call,
+                defaults to DEDUPE_MIN_TRAINING_SAMPLES
 
         Returns:
             Training result with metrics
         """
-        if len(training_data) < self.min_training_samples:
+        if min_samples is None:
+            min_samples = self.min_training_samples
+        if len(training_data) < min_samples:
             return {
                 "success": False,
-                "message": f"Need at least {self.min_training_samples} samples, got {len(training_data)}"
+                "message": f"Need at least {min_samples} samples, got {len(training_data)}"
             }
 
         logger.info(f"Training dedupe model for {model_key} with {len(training_data)} samples")
 
         try:
-            # Create deduper with field definitions
-            gazetteer = dedupe.Gazetteer(self.fields)
-
-            # Prepare canonical data (target values)
-            canonical_data = {}
-            messy_data = {}
-
-            for i, item in enumerate(training_data):
-                if 'canonical' in item:
-                    canonical_data[f"c_{i}"] = {
-                        'product': item['canonical'].get('product', ''),
-                        'supplier': item['canonical'].get('supplier', ''),
-                    }
-                if 'messy' in item:
-                    messy_data[f"m_{i}"] = {
-                        'product': item['messy'].get('product', ''),
-                        'supplier': item['messy'].get('supplier', ''),
-                    }
-
-            # Sample and prepare for training
-            gazetteer.prepare_training(messy_data, canonical_data)
+            items = [
+                item if isinstance(item, LabelledPair) else LabelledPair.from_dict(item)
+                for item in training_data
+                if isinstance(item, LabelledPair) or ('messy' in item and 'canonical' in item)
+            ]
+            fit = await asyncio.to_thread(self._fit_model, model_key, items, incremental)
+            if not fit["success"]:
+                return fit
+            mode, classifier, new_canonical, overlays = fit["mode"], fit["classifier"], fit["new_canonical"], fit["overlays"]
+            new_labels = fit["new_labels"]
 
-            # If we have labeled pairs, use them for training
-            labeled_pairs = self._extract_labeled_pairs(training_data)
-            if labeled_pairs['match'] or labeled_pairs['distinct']:
-                gazetteer.mark_pairs(labeled_pairs)
-
-            # Train the model
-            gazetteer.train()
+            entry = self.model_registry.record(
+                model_key,
+                size=fit["size"],
+                canonical_records=fit["canonical_records"],
+                mode=mode
+            )
 
-            # Save the model
-            settings_file = self.model_path / f"{model_key}_settings"
-            with open(settings_file, 'wb') as f:
-                gazetteer.write_settings(f)
+            cached = self.gazetteer_cache.get(model_key)
+            if mode == "incremental" and cached is not None and self.gazetteer_versions.get(model_key) == entry.version - 1:
+                # Same predicates: swap the classifier and index only new records
+                cached.classifier = classifier
+                if new_canonical:
+                    cached.index(new_canonical)
+                self.gazetteer_versions[model_key] = entry.version
+            else:
+                self.gazetteer_cache.pop(model_key, None)
+                self.gazetteer_versions.pop(model_key, None)
+                if self.scoring_pool is None:
+                    await asyncio.to_thread(self._load_model, model_key)
+            if self.scoring_pool is not None:
+                self.scoring_pool.release(model_key, entry.version)
 
-            # Index the canonical data
-            gazetteer.index(canonical_data)
+            # Earlier resolutions for this pair are now stale
+            self.resolution_cache.invalidate_pair(model_key)
+            if overlays is not None:
+                # and those of every pair resolved by this shared model
+                target_tenant = model_key[len(SHARED_SOURCE) + 1:]
+                self._prune_feedback_overlays(target_tenant, overlays)
+                self.overlay_cache.pop(target_tenant, None)
+                self._bump_catalog_generation(target_tenant)
 
-            # Cache the model
-            self.gazetteer_cache[model_key] = gazetteer
-
-            logger.info(f"Successfully trained model for {model_key}")
+            logger.info(
+                f"Successfully trained model for {model_key} ({mode}, {new_labels} new labels, "
+                f"{len(new_canonical)} new canonical records)"
+            )
 
-            return {
+            result = {
                 "success": True,
                 "message": f"Model trained with {len(training_data)} samples",
-                "model_key": model_key
+                "model_key": model_key,
+                "mode": mode,
+                "newLabels": new_labels,
+                "newCanonicalRecords": len(new_canonical)
             }
+            if overlays is not None:
+                result["sources"] = len(overlays)
+            return result
 
         except Exception as e:
             logger.error(f"Training failed for {model_key}: {e}")
@@ -309,32 +817,286 @@ class DedupeService:
                 "message": str(e)
             }
 
+    def _fit_model(self, model_key: str, items: List[LabelledPair], incremental: bool) -> Dict[str, Any]:
+        """
+        The CPU- and file-bound part of train_model, run in a worker thread:
+        fit the model and write its artifact. Touches no state shared with
+        requests; train_model publishes the result on the event loop.
+        """
+        pool = RecordPool(self.match_fields)
+        labeled_pairs = self._extract_labeled_pairs(items, pool)
+        examples = labeled_pairs['match'] + labeled_pairs['distinct']
+        labels = [1] * len(labeled_pairs['match']) + [0] * len(labeled_pairs['distinct'])
+        # Labelled items in the same order as examples
+        labelled_items = [item for is_match in (True, False) for item in items if item.is_match == is_match]
+        weights = [item.weight for item in labelled_items]
+        if len(set(labels)) < 2:
+            return {
+                "success": False,
+                "message": "Training data needs both matching and distinct examples"
+            }
+
+        # Canonical records, keeping ids of those already indexed
+        canonical_data = self._load_canonical(model_key) if incremental else {}
+        known = {self._record_key(r) for r in canonical_data.values()}
+        new_canonical = {}
+        for _, canonical in examples:
+            key = self._record_key(canonical)
+            if key not in known:
+                known.add(key)
+                new_canonical[f"c_{len(canonical_data) + len(new_canonical)}"] = canonical
+        canonical_data.update(new_canonical)
+
+        feature_cache = self._load_features(model_key) if incremental else {}
+        example_keys = [
+            json.dumps([messy, canonical, label], sort_keys=True)
+            for (messy, canonical), label in zip(examples, labels)
+        ]
+        new_labels = sum(1 for key in example_keys if key not in feature_cache)
+
+        previous = self._read_settings(model_key) if incremental else None
+        warm = (
+            previous is not None
+            and len(feature_cache) > 0
+            and new_labels <= self.full_retrain_ratio * len(feature_cache)
+        )
+
+        if warm:
+            data_model, previous_classifier, predicates = previous
+            classifier = copy.deepcopy(getattr(previous_classifier, 'best_estimator_', previous_classifier))
+            classifier.set_params(warm_start=True)
+        else:
+            gazetteer = dedupe.Gazetteer(self.fields, num_cores=0)
+            # Pooled records: one entry per distinct messy record
+            distinct_messy = {id(messy): messy for messy, _ in examples}
+            messy_data = {f"m_{i}": messy for i, messy in enumerate(distinct_messy.values())}
+            gazetteer.prepare_training(
+                messy_data,
+                canonical_data,
+                training_file=io.StringIO(json.dumps(labeled_pairs))
+            )
+            gazetteer.train()
+            data_model, classifier, predicates = gazetteer.data_model, gazetteer.classifier, gazetteer.predicates
+            gazetteer.cleanup_training()
+            feature_cache = {}
+
+        # Featurize only labels that were not seen by an earlier run
+        missing = [i for i, key in enumerate(example_keys) if key not in feature_cache]
+        if missing:
+            distances = data_model.distances([examples[i] for i in missing])
+            for row, i in zip(distances, missing):
+                feature_cache[example_keys[i]] = row
+
+        X = np.array([feature_cache[key] for key in example_keys])
+        if warm:
+            classifier.fit(X, np.array(labels), sample_weight=np.array(weights))
+
+        overlays = None
+        if any(item.source is not None for item in labelled_items):
+            overlays = self._build_overlays(labelled_items, labels, classifier.predict_proba(X)[:, -1])
+
+        mode = "incremental" if warm else "full"
+        size = self._write_model(
+            model_key,
+            self._settings_bytes(data_model, classifier, predicates),
+            canonical_data,
+            {key: feature_cache[key] for key in example_keys},
+            metadata={"mode": mode, "labels": len(examples)},
+            stats={
+                "matches": len(labeled_pairs['match']),
+                "distinct": len(labeled_pairs['distinct']),
+                "newLabels": new_labels,
+                "newCanonicalRecords": len(new_canonical),
+                "predicates": [str(predicate) for predicate in predicates],
+            },
+            overlays=overlays
+        )
+
+        return {
+            "success": True,
+            "mode": mode,
+            "classifier": classifier,
+            "new_labels": new_labels,
+            "new_canonical": new_canonical,
+            "canonical_records": len(canonical_data),
+            "size": size,
+            "overlays": overlays,
+        }
+
+    def _build_overlays(
+        self,
+        items: List[LabelledPair],
+        labels: List[int],
+        scores: np.ndarray
+    ) -> Dict[str, SourceOverlay]:
+        """
+        Overlay of each source of a shared model from its labels: the
+        source's matches as aliases and, given enough matches and
+        non-matches, Platt scaling of the model's scores on its labels.
+        """
+        rows_by_source: Dict[str, List[int]] = {}
+        for i, item in enumerate(items):
+            if item.source is not None:
+                rows_by_source.setdefault(item.source, []).append(i)
+
+        overlays = {}
+        for source, rows in rows_by_source.items():
+            source_labels = [labels[i] for i in rows]
+            overlay = SourceOverlay(labels=sum(source_labels))
+            for i in rows:
+                if not labels[i]:
+                    continue
+                for field, value in items[i].messy.items():
+                    corrected_value = items[i].canonical.get(field)
+                    if value and corrected_value:
+                        overlay.add_alias(field, value, corrected_value)
+            if len(rows) >= self.OVERLAY_CALIBRATION_LABELS and 0 < sum(source_labels) < len(rows):
+                overlay.calibration = fit_calibration([float(scores[i]) for i in rows], source_labels)
+            overlays[source] = overlay
+        return overlays
+
+    def _prune_feedback_overlays(self, target_tenant: str, overlays: Dict[str, SourceOverlay]) -> None:
+        """Forget feedback aliases a retrained shared model has learned."""
+        for source, feedback in self.feedback_overlays.get(target_tenant, {}).items():
+            trained = overlays.get(source)
+            if trained is None:
+                continue
+            for field, aliases in feedback.aliases.items():
+                for value in [v for v, corrected in aliases.items() if trained.aliases.get(field, {}).get(v) == corrected]:
+                    del aliases[value]
+
+    def _record(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Dedupe record with every match field; missing values are None."""
+        record = {}
+        for field in self.match_fields:
+            value = values.get(field)
+            record[field] = str(value) if value not in (None, '') else None
+        return record
+
+    def _record_key(self, record: Dict[str, Any]) -> Tuple:
+        return tuple(normalize_value(record.get(f)) for f in self.match_fields)
+
     def _extract_labeled_pairs(
         self,
-        training_data: List[Dict[str, Any]]
+        items: List[LabelledPair],
+        pool: RecordPool
     ) -> Dict[str, List]:
-        """Extract labeled pairs for dedupe training."""
+        """Extract labeled pairs of pooled records for dedupe training."""
         matches = []
         distinct = []
 
-        for item in training_data:
-            if 'messy' in item and 'canonical' in item:
-                messy = {
-                    'product': item['messy'].get('product', ''),
-                    'supplier': item['messy'].get('supplier', ''),
-                }
-                canonical = {
-                    'product': item['canonical'].get('product', ''),
-                    'supplier': item['canonical'].get('supplier', ''),
-                }
-
-                if item.get('is_match', True):
-                    matches.append((messy, canonical))
-                else:
-                    distinct.append((messy, canonical))
+        for item in items:
+            pair = (pool.record(item.messy), pool.record(item.canonical))
+            if item.is_match:
+                matches.append(pair)
+            else:
+                distinct.append(pair)
 
         return {'match': matches, 'distinct': distinct}
 
+    def _model_section(self, model_key: str, name: str) -> Optional[bytes]:
+        """A section of the pair's model artifact, or None if it has none."""
+        artifact_file = artifact_path(self.model_path, model_key)
+        if not artifact_file.exists():
+            return None
+        with ModelArtifact(artifact_file, self.artifact_key) as artifact:
+            return artifact.read(name) if name in artifact else None
+
+    def _legacy_file(self, model_key: str, suffix: str) -> Optional[Path]:
+        """A model file of the format before artifacts, read while the pair has no artifact."""
+        if self.artifact_key is not None or artifact_path(self.model_path, model_key).exists():
+            return None
+        legacy_file = self.model_path / f"{model_key}{suffix}"
+        return legacy_file if legacy_file.exists() else None
+
+    def _read_settings(self, model_key: str) -> Optional[Tuple[Any, Any, Any]]:
+        """Data model, classifier and predicates of the previous model, if any."""
+        try:
+            settings = self._model_section(model_key, SETTINGS)
+            if settings is None:
+                legacy_file = self._legacy_file(model_key, "_settings")
+                if legacy_file is None:
+                    return None
+                settings = legacy_file.read_bytes()
+            f = io.BytesIO(settings)
+            return pickle.load(f), pickle.load(f), pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Cannot warm-start from settings of {model_key}: {e}")
+            return None
+
+    def _settings_bytes(self, data_model, classifier, predicates) -> bytes:
+        """Settings in dedupe's format, as read by StaticGazetteer."""
+        f = io.BytesIO()
+        pickle.dump(data_model, f)
+        pickle.dump(classifier, f)
+        pickle.dump(predicates, f)
+        return f.getvalue()
+
+    def _write_model(
+        self,
+        model_key: str,
+        settings: bytes,
+        canonical_data: Dict[str, Dict[str, Any]],
+        features: Dict[str, np.ndarray],
+        metadata: Dict[str, Any],
+        stats: Dict[str, Any],
+        overlays: Optional[Dict[str, SourceOverlay]] = None
+    ) -> int:
+        """
+        Write the pair's model artifact, replacing the old one atomically,
+        and remove its files of the format before artifacts.
+        Returns the artifact's size in bytes.
+        """
+        sections = {
+            SETTINGS: settings,
+            CANONICAL: encode_json(canonical_data),
+        }
+        if features:
+            f = io.BytesIO()
+            np.savez(f, keys=np.array(list(features.keys())), features=np.array(list(features.values())))
+            sections[FEATURES] = f.getvalue()
+        sections[STATS] = encode_json(stats)
+        if overlays is not None:
+            sections[OVERLAYS] = encode_json({source: overlay.to_dict() for source, overlay in overlays.items()})
+
+        artifact_file = artifact_path(self.model_path, model_key)
+        write_artifact(
+            artifact_file,
+            sections,
+            metadata={
+                "modelKey": model_key,
+                "fields": self.match_fields,
+                "canonicalRecords": len(canonical_data),
+                **metadata
+            },
+            compression=self.artifact_compression,
+            key=self.artifact_key
+        )
+        for suffix in LEGACY_SUFFIXES:
+            (self.model_path / f"{model_key}{suffix}").unlink(missing_ok=True)
+        return artifact_file.stat().st_size
+
+    def _load_canonical(self, model_key: str) -> Dict[str, Dict[str, Any]]:
+        """Canonical records indexed by a pair's model."""
+        canonical = self._model_section(model_key, CANONICAL)
+        if canonical is None:
+            legacy_file = self._legacy_file(model_key, "_canonical.json")
+            if legacy_file is None:
+                return {}
+            canonical = legacy_file.read_bytes()
+        return decode_json(canonical)
+
+    def _load_features(self, model_key: str) -> Dict[str, np.ndarray]:
+        """Cached distance features of previously trained labels."""
+        features = self._model_section(model_key, FEATURES)
+        if features is None:
+            legacy_file = self._legacy_file(model_key, "_features.npz")
+            if legacy_file is None:
+                return {}
+            features = legacy_file.read_bytes()
+        with np.load(io.BytesIO(features)) as data:
+            return dict(zip(data['keys'].tolist(), data['features']))
+
     def add_to_knowledge_base(
         self,
         source_value: str,
@@ -347,30 +1109,585 @@ class DedupeService:
         source_lower = source_value.lower().strip()
         if source_lower not in self.PRODUCT_KNOWLEDGE_BASE:
             self.PRODUCT_KNOWLEDGE_BASE[source_lower] = canonical_value
+            self.knowledge_base_additions[source_lower] = canonical_value
+            self.kb_generation += 1
+            if self._kb_indexes is not None:
+                # Exact lookups see the correction now; the automaton and
+                # trigram index pick it up from the rebuild
+                alias = normalize_value(source_lower)
+                self._kb_indexes[1][alias] = canonical_value
+                if self._kb_rebuild is not None and not self._kb_rebuild.done():
+                    self._kb_pending[alias] = canonical_value
+            self._kb_serving_generation += 1
+            self._refresh_knowledge_base_indexes()
             logger.info(f"Added to knowledge base: {source_value} -> {canonical_value}")
 
+    def _catalog_file(self, target_tenant: str, field: str) -> Path:
+        return self.catalog_path / f"{target_tenant}_{field}.npz"
+
+    def _catalog_index(self, target_tenant: str, field: str) -> Optional[NgramVectorIndex]:
+        """Load (once) the vector index of a target tenant's catalog field."""
+        key = (target_tenant, field)
+        if key not in self.catalog_indexes:
+            catalog_file = self._catalog_file(target_tenant, field)
+            index = None
+            if catalog_file.exists():
+                try:
+                    index = NgramVectorIndex.load(catalog_file)
+                    logger.info(f"Loaded {field} catalog of {target_tenant} ({len(index)} values)")
+                except Exception as e:
+                    logger.error(f"Failed to load {field} catalog of {target_tenant}: {e}")
+            self.catalog_indexes[key] = index
+        return self.catalog_indexes[key]
+
+    def set_catalog(self, target_tenant: str, field: str, values: List[str]) -> Dict[str, Any]:
+        """
+        Replace a target tenant's canonical values for a match field.
+
+        Builds and persists the vector index used to resolve that field for
+        every pair targeting the tenant, including pairs without a model.
+        """
+        if field not in self.match_fields:
+            raise ValueError(f"Unknown match field: {field}")
+
+        self.apply_catalog(target_tenant, {field: set(values)}, replace=True)
+        return self.get_catalog_stats(target_tenant, field)
+
+    def apply_catalog(
+        self,
+        target_tenant: str,
+        upserts: Dict[str, Set[str]],
+        deletes: Optional[Dict[str, Set[str]]] = None,
+        replace: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Apply catalog changes to a target tenant's field indexes.
+
+        With replace, upserts are the field's complete value set and the
+        difference to the current index is applied; otherwise upserts are
+        added and deletes removed. Small deltas update the index in place
+        (new values use the existing IDF); once changes exceed
+        CATALOG_REBUILD_RATIO of the index it is rebuilt. Updated indexes
+        are swapped in whole, so concurrent lookups never see a partial
+        update.
+
+        Returns:
+            Per field: mode (built, rebuilt, delta or unchanged), values,
+            added and removed
+        """
+        deletes = deletes or {}
+        results = {}
+
+        for field in self.match_fields:
+            new_values = upserts.get(field) or set()
+            removed_values = deletes.get(field) or set()
+            if not new_values and not removed_values:
+                continue
+
+            current = self._catalog_index(target_tenant, field)
+            if current is None:
+                values = sorted(new_values - removed_values)
+                if not values:
+                    continue
+                index = NgramVectorIndex.build(values, **self.vector_index_options)
+                mode, added, removed = "built", len(index), 0
+            else:
+                known = set(current.values)
+                if replace:
+                    to_add, to_remove = new_values - known, known - new_values
+                else:
+                    to_add, to_remove = new_values - removed_values - known, removed_values & known
+
+                if not to_add and not to_remove:
+                    results[field] = {"mode": "unchanged", "values": len(current), "added": 0, "removed": 0}
+                    continue
+
+                if len(to_add) + len(to_remove) > self.catalog_rebuild_ratio * len(current):
+                    index = NgramVectorIndex.build(sorted((known - to_remove) | to_add), **self.vector_index_options)
+                    index.calibration = current.calibration
+                    mode = "rebuilt"
+                else:
+                    index = current.clone()
+                    index.remove(to_remove)
+                    index.add(sorted(to_add))
+                    mode = "delta"
+                added, removed = len(to_add), len(to_remove)
+
+            index.save(self._catalog_file(target_tenant, field))
+            self.catalog_indexes[(target_tenant, field)] = index
+            results[field] = {"mode": mode, "values": len(index), "added": added, "removed": removed}
+            logger.info(
+                f"Catalog {field} of {target_tenant} {mode}: {len(index)} values "
+                f"(+{added}, -{removed})"
+            )
+
+        if any(result["mode"] != "unchanged" for result in results.values()):
+            self._bump_catalog_generation(target_tenant)
+
+        return results
+
+    async def calibrate_catalog(self, target_tenant: str, field: str, labels: List[Tuple[str, str]]) -> bool:
+        """
+        Refit the score calibration of a catalog index from labelled
+        (source value, canonical value) pairs: a retrieval counts as
+        correct when its top candidate is the labelled canonical value.
+
+        The search over the labels and the write run in a worker thread
+        under the catalog's lock; only the calibration is rewritten, not
+        the index.
+        """
+        async with self.catalog_lock(target_tenant):
+            index = await asyncio.to_thread(self._catalog_index, target_tenant, field)
+            if index is None or not labels:
+                return False
+            calibration = await asyncio.to_thread(
+                self._fit_catalog_calibration, index, labels, self._catalog_file(target_tenant, field)
+            )
+            index.calibration = calibration
+            self._bump_catalog_generation(target_tenant)
+        logger.info(f"Recalibrated {field} catalog of {target_tenant}: a={calibration[0]:.2f}, b={calibration[1]:.2f}")
+        return True
+
+    @staticmethod
+    def _fit_catalog_calibration(
+        index: NgramVectorIndex,
+        labels: List[Tuple[str, str]],
+        catalog_file: Path
+    ) -> Tuple[float, float]:
+        results = index.search([source for source, _ in labels], k=1, calibrated=False)
+        scores, correct = [], []
+        for (_, canonical), result in zip(labels, results):
+            if result:
+                row, score = result[0]
+                scores.append(score)
+                correct.append(int(index.values[row] == canonical))
+
+        calibration = fit_calibration(scores, correct)
+        save_calibration(catalog_file, calibration)
+        return calibration
+
+    def catalog_miner(self, target_tenant: str, field: str) -> Optional[NegativeMiner]:
+        """
+        Near-miss index over a target tenant's catalog values for a field,
+        rebuilt once the catalog changes. Building one over a large catalog
+        takes seconds, so call it off the event loop.
+        """
+        index = self._catalog_index(target_tenant, field)
+        if index is None:
+            return None
+        cached = self.catalog_miners.get((target_tenant, field))
+        if cached is None or cached[0] is not index:
+            cached = (index, NegativeMiner(index.values))
+            self.catalog_miners[(target_tenant, field)] = cached
+        return cached[1]
+
+    def catalog_lock(self, target_tenant: str) -> asyncio.Lock:
+        """Lock held while a target tenant's catalog is being updated."""
+        return self.catalog_locks.setdefault(target_tenant, asyncio.Lock())
+
+    def _bump_catalog_generation(self, target_tenant: str) -> None:
+        self.catalog_generations[target_tenant] = self.catalog_generations.get(target_tenant, 0) + 1
+
+    def _counterparty_file(self, target_tenant: str) -> Path:
+        return self.counterparty_path / f"{target_tenant}.json"
+
+    def _supplier_matcher(self, target_tenant: str) -> Optional[SupplierMatcher]:
+        """Load (once) the supplier matcher of a target tenant."""
+        if target_tenant not in self.supplier_matchers:
+            counterparty_file = self._counterparty_file(target_tenant)
+            matcher = None
+            if counterparty_file.exists():
+                try:
+                    with open(counterparty_file, 'r') as f:
+                        matcher = SupplierMatcher(json.load(f))
+                    logger.info(f"Loaded {len(matcher)} counterparties of {target_tenant}")
+                except Exception as e:
+                    logger.error(f"Failed to load counterparties of {target_tenant}: {e}")
+            self.supplier_matchers[target_tenant] = matcher
+        return self.supplier_matchers[target_tenant]
+
+    def _save_counterparties(self, target_tenant: str, matcher: SupplierMatcher) -> None:
+        counterparty_file = self._counterparty_file(target_tenant)
+        tmp_file = counterparty_file.with_name(f"{counterparty_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(matcher.to_list(), f)
+        tmp_file.replace(counterparty_file)
+
+    def set_counterparties(self, target_tenant: str, counterparties: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Replace a target tenant's counterparties (name, relationId,
+        tenantCode, aliases). Aliases learned from supplier feedback are
+        kept for counterparties that are still present.
+        """
+        previous = self._supplier_matcher(target_tenant)
+        learned = {c['name']: c['learnedAliases'] for c in previous.counterparties} if previous is not None else {}
+
+        merged = []
+        for counterparty in counterparties:
+            counterparty = dict(counterparty)
+            counterparty['learnedAliases'] = learned.get(counterparty['name'], [])
+            merged.append(counterparty)
+
+        matcher = SupplierMatcher(merged)
+        self._save_counterparties(target_tenant, matcher)
+        self.supplier_matchers[target_tenant] = matcher
+        self._bump_catalog_generation(target_tenant)
+        logger.info(f"Indexed {len(matcher)} counterparties of {target_tenant}")
+
+        return self.get_counterparty_stats(target_tenant)
+
+    def add_supplier_alias(self, target_tenant: str, source_value: str, corrected_value: str) -> None:
+        """
+        Learn a supplier correction as an alias of the corrected counterparty.
+        Used for active learning updates.
+        """
+        matcher = self._supplier_matcher(target_tenant)
+        if matcher is None:
+            matcher = self.supplier_matchers[target_tenant] = SupplierMatcher([])
+        if matcher.add_alias(source_value, corrected_value):
+            self._save_counterparties(target_tenant, matcher)
+            self._bump_catalog_generation(target_tenant)
+            logger.info(f"Added supplier alias for {target_tenant}: {source_value} -> {corrected_value}")
+
+    def get_counterparty_stats(self, target_tenant: str) -> Dict[str, Any]:
+        """Get statistics about a target tenant's counterparties."""
+        matcher = self._supplier_matcher(target_tenant)
+        if matcher is None:
+            return {"exists": False, "target_tenant": target_tenant}
+
+        return {
+            "exists": True,
+            "target_tenant": target_tenant,
+            "counterparties": len(matcher),
+            "aliases": sum(len(c['aliases']) + len(c['learnedAliases']) for c in matcher.counterparties),
+            "with_relation_id": sum(1 for c in matcher.counterparties if c['relationId'])
+        }
+
+    def get_catalog_stats(self, target_tenant: str, field: str) -> Dict[str, Any]:
+        """Get statistics about a target tenant's catalog index."""
+        index = self._catalog_index(target_tenant, field)
+        if index is None:
+            return {"exists": False, "target_tenant": target_tenant, "field": field}
+
+        return {
+            "exists": True,
+            "target_tenant": target_tenant,
+            "field": field,
+            "values": len(index),
+            "bytes": index.nbytes,
+            "quantized": index.quantize,
+            "partitions": index.partitions if index.centroids is not None else 0,
+            "calibration": list(index.calibration)
+        }
+
     def get_model_stats(self, model_key: str) -> Dict[str, Any]:
-        """Get statistics about a trained model."""
-        settings_file = self.model_path / f"{model_key}_settings"
+        """Get statistics about a trained model, from the model registry."""
+        entry = self.model_registry.get(model_key)
 
-        if not settings_file.exists():
+        if entry is None:
             return {
                 "exists": False,
                 "model_key": model_key
             }
 
-        stat = settings_file.stat()
         return {
             "exists": True,
             "model_key": model_key,
-            "file_size": stat.st_size,
-            "last_modified": stat.st_mtime,
-            "cached": model_key in self.gazetteer_cache
+            "version": entry.version,
+            "file_size": entry.size,
+            "last_modified": entry.trained_at,
+            "cached": self._is_cached(model_key),
+            "canonical_records": entry.canonical_records,
+            "artifact": self._artifact_info(model_key),
+            "resolution_cache": self.resolution_cache.get_stats(model_key)
+        }
+
+    def get_pair_model_stats(self, source_tenant: str, target_tenant: str) -> Dict[str, Any]:
+        """Statistics about the model resolving a tenant pair, and the source's overlay if it is shared."""
+        model_key = f"{source_tenant}_{target_tenant}"
+        if self.model_sharing != "target":
+            return self.get_model_stats(model_key)
+
+        stats = self.get_model_stats(shared_model_key(target_tenant))
+        overlay = self._target_overlays(target_tenant).get(source_tenant)
+        stats["model_key"] = model_key
+        stats["shared_model_key"] = shared_model_key(target_tenant)
+        stats["overlay"] = {
+            "aliases": sum(len(aliases) for aliases in overlay.aliases.values()),
+            "labels": overlay.labels,
+            "calibration": list(overlay.calibration) if overlay.calibration is not None else None,
+        } if overlay is not None else None
+        return stats
+
+    def _artifact_info(self, model_key: str) -> Optional[Dict[str, Any]]:
+        """Header summary of the pair's model artifact, read without loading the model."""
+        artifact_file = artifact_path(self.model_path, model_key)
+        if not artifact_file.exists():
+            return None
+        try:
+            with ModelArtifact(artifact_file, self.artifact_key) as artifact:
+                return artifact.describe()
+        except (OSError, ArtifactError) as e:
+            return {"error": str(e)}
+
+    def _is_cached(self, model_key: str) -> bool:
+        if self.scoring_pool is not None:
+            return self.scoring_pool.has_model(model_key)
+        return model_key in self.gazetteer_cache
+
+    def list_models(
+        self,
+        source_tenant: Optional[str] = None,
+        target_tenant: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """Registered models, optionally of one source and/or target tenant."""
+        entries = self.model_registry.entries(source_tenant, target_tenant)
+        return {
+            "total": len(entries),
+            "models": [
+                {**entry.to_dict(), "cached": self._is_cached(entry.model_key)}
+                for entry in entries[offset:offset + limit]
+            ],
+            "registry": self.model_registry.get_stats()
         }
 
-    def save_model(self, model_key: str, model) -> None:
-        """Save a trained dedupe model."""
-        settings_file = self.model_path / f"{model_key}_settings"
-        with open(settings_file, 'wb') as f:
-            model.write_settings(f)
+    def save_model(
+        self,
+        model_key: str,
+        model,
+        canonical_data: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Save a trained dedupe model with the canonical records to index:
+        by default those the model has indexed, else the pair's current ones.
+        Cached training features belong to the replaced model and are dropped.
+        """
+        settings = io.BytesIO()
+        model.write_settings(settings)
+        if canonical_data is None:
+            canonical_data = dict(getattr(model, 'indexed_data', None) or {}) or self._load_canonical(model_key)
+        size = self._write_model(
+            model_key,
+            settings.getvalue(),
+            canonical_data,
+            {},
+            metadata={"mode": "saved"},
+            stats={}
+        )
+        entry = self.model_registry.record(
+            model_key,
+            size=size,
+            canonical_records=len(canonical_data)
+        )
+        if self.scoring_pool is not None:
+            self.scoring_pool.release(model_key, entry.version)
+        self.resolution_cache.invalidate_pair(model_key)
         logger.info(f"Saved model for {model_key}")
+
+    # Warm state
+
+    def _warm_settings(self) -> Dict[str, Any]:
+        """Settings memoized resolutions depend on; snapshots taken under others are not restored."""
+        return {
+            "modelSharing": self.model_sharing,
+            "tiers": list(self.resolution_tiers),
+            "thresholds": self.tier_thresholds,
+            "confidenceThreshold": self.confidence_threshold,
+            "matchFields": list(self.match_fields),
+        }
+
+    def _reference_fingerprint(self, target_tenant: str) -> List[List[Any]]:
+        """Fingerprint of a target tenant's catalog and counterparty files."""
+        return file_fingerprint(
+            [self._catalog_file(target_tenant, field) for field in self.match_fields]
+            + [calibration_path(self._catalog_file(target_tenant, field)) for field in self.match_fields]
+            + [self._counterparty_file(target_tenant)]
+        )
+
+    def _collect_warm_state(self) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+        """
+        The warm state as JSON-able values: the state section and each
+        pair's current resolutions (those resolved against the current
+        catalogs and knowledge base) with what they depend on.
+        """
+        pairs = {}
+        resolutions = {}
+        # Knowledge-base results are kept only if they reflect the whole knowledge base
+        kb_generation = self._indexed_kb_generation() if self._kb_indexes_current() else None
+        for model_key in self.resolution_cache.pair_keys():
+            target_tenant = self.pair_targets.get(model_key)
+            if target_tenant is None:
+                continue
+            generation = self.catalog_generations.get(target_tenant, 0)
+            entries = [
+                [
+                    list(key[1:]),
+                    [None if field is None else [None if field[0] is PASSTHROUGH else field[0], field[1]]
+                     for field in fields],
+                    entry_kb_generation is not None,
+                ]
+                for key, fields, entry_kb_generation in self.resolution_cache.entries(model_key)
+                if key[0] == generation and entry_kb_generation in (None, kb_generation)
+            ]
+            if not entries:
+                continue
+            model = self.model_registry.get(self._model_key_for(model_key, target_tenant))
+            pairs[model_key] = {
+                "target": target_tenant,
+                "modelVersion": model.version if model is not None else None,
+                "reference": self._reference_fingerprint(target_tenant),
+            }
+            resolutions[model_key] = entries
+
+        state = {
+            "settings": self._warm_settings(),
+            "models": [
+                model_key for model_key in self.gazetteer_cache
+                if self.gazetteer_versions.get(model_key) is not None
+            ],
+            "catalogs": [list(key) for key, index in self.catalog_indexes.items() if index is not None],
+            "counterparties": [target for target, matcher in self.supplier_matchers.items() if matcher is not None],
+            "knowledgeBase": dict(self.knowledge_base_additions),
+            "feedbackOverlays": {
+                target_tenant: {source: overlay.to_dict() for source, overlay in overlays.items()}
+                for target_tenant, overlays in self.feedback_overlays.items()
+            },
+            "pairs": pairs,
+        }
+        return state, resolutions
+
+    async def snapshot_warm_state(self) -> int:
+        """
+        Write the warm-state snapshot. The state is collected on the event
+        loop, so it is consistent; encoding and writing happen in a thread.
+        Returns the snapshot's size in bytes.
+        """
+        state, resolutions = self._collect_warm_state()
+
+        def write() -> int:
+            with self._snapshot_lock:
+                return write_snapshot(
+                    self.warm_state_path, state, resolutions, self.artifact_compression, self.artifact_key
+                )
+
+        size = await asyncio.to_thread(write)
+        logger.info(
+            f"Saved warm state: {len(state['models'])} models, "
+            f"{sum(len(entries) for entries in resolutions.values())} resolutions of {len(resolutions)} pairs "
+            f"({size} bytes)"
+        )
+        return size
+
+    async def run_warm_state_snapshots(self) -> None:
+        """Snapshot the warm state every warm_state_interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.warm_state_interval)
+            try:
+                await self.snapshot_warm_state()
+            except Exception as e:
+                logger.error(f"Warm-state snapshot failed: {e}")
+
+    def restore_warm_state(self) -> bool:
+        """
+        Restore the warm-state snapshot, if there is a usable one: learned
+        knowledge-base and feedback aliases right away, each pair's
+        resolutions when the pair is first resolved (if its model and the
+        target's reference data are unchanged). warm_up() then loads the
+        models and indexes that were hot.
+        """
+        snapshot = WarmSnapshot.open(self.warm_state_path, self.artifact_key)
+        if snapshot is None:
+            return False
+        state = snapshot.state
+        if state.get("settings") != self._warm_settings():
+            logger.info("Not restoring warm state: it was saved with other resolution settings")
+            snapshot.close()
+            return False
+
+        for alias, canonical_value in state.get("knowledgeBase", {}).items():
+            if alias not in self.PRODUCT_KNOWLEDGE_BASE:
+                self.PRODUCT_KNOWLEDGE_BASE[alias] = canonical_value
+                self.knowledge_base_additions[alias] = canonical_value
+                self.kb_generation += 1
+        for target_tenant, overlays in state.get("feedbackOverlays", {}).items():
+            feedback = self.feedback_overlays.setdefault(target_tenant, {})
+            for source, overlay in overlays.items():
+                feedback.setdefault(source, SourceOverlay.from_dict(overlay))
+
+        self.warm_snapshot = snapshot
+        logger.info(
+            f"Restored warm state: {len(state.get('knowledgeBase', {}))} knowledge-base aliases, "
+            f"resolutions of {len(snapshot.pending)} pairs pending"
+        )
+        return True
+
+    def _restore_resolutions(self, model_key: str, target_tenant: str) -> None:
+        """Move a pair's restored resolutions into the resolution cache, if they are still valid."""
+        entries = self.warm_snapshot.take(model_key)
+        pair = self.warm_snapshot.state["pairs"].get(model_key)
+        if not entries or pair is None or pair["target"] != target_tenant:
+            return
+        model = self.model_registry.get(self._model_key_for(model_key, target_tenant))
+        if (model.version if model is not None else None) != pair["modelVersion"] \
+                or self._reference_fingerprint(target_tenant) != pair["reference"]:
+            logger.info(f"Not restoring warm resolutions of {model_key}: its model or reference data changed")
+            return
+
+        generation = self.catalog_generations.get(target_tenant, 0)
+        restored = self.resolution_cache.restore(model_key, (
+            (
+                (generation, *(intern_value(value) for value in values)),
+                tuple(
+                    None if field is None else (PASSTHROUGH if field[0] is None else field[0], field[1])
+                    for field in fields
+                ),
+                self._indexed_kb_generation() if uses_knowledge_base else None,
+            )
+            for values, fields, uses_knowledge_base in entries
+        ))
+        self.pair_targets[model_key] = target_tenant
+        logger.info(f"Restored {restored} warm resolutions of {model_key}")
+
+    async def warm_up(self) -> None:
+        """Load the catalogs, counterparties and models that were hot when the warm state was saved."""
+        if self.warm_snapshot is None:
+            return
+        state = self.warm_snapshot.state
+        started = time.perf_counter()
+        for target_tenant, field in state.get("catalogs", []):
+            await asyncio.to_thread(self._catalog_index, target_tenant, field)
+        for target_tenant in state.get("counterparties", []):
+            await asyncio.to_thread(self._supplier_matcher, target_tenant)
+        models = 0
+        if self.scoring_pool is None:
+            for model_key in state.get("models", []):
+                if self.model_registry.get(model_key) is not None and model_key not in self.gazetteer_cache:
+                    if await asyncio.to_thread(self._load_model, model_key) is not None:
+                        models += 1
+        logger.info(f"Warmed up {models} models in {time.perf_counter() - started:.1f}s")
+
+    def get_cascade_stats(self) -> Dict[str, Any]:
+        """Per-tier hit rates and time of the resolution cascade."""
+        return {
+            "order": list(self.resolution_tiers),
+            "thresholds": {tier: self.tier_thresholds[tier] for tier in self.resolution_tiers},
+            "confidenceThreshold": self.confidence_threshold,
+            **self.cascade_stats.get_stats()
+        }
+
+    def get_scoring_stats(self) -> Dict[str, Any]:
+        """Scoring worker load, or in-process scoring."""
+        if self.scoring_pool is None:
+            return {"workers": 0, "cachedModels": len(self.gazetteer_cache)}
+        return self.scoring_pool.get_stats()
+
+    def close(self) -> None:
+        """Stop the scoring workers."""
+        if self._kb_rebuild is not None:
+            self._kb_rebuild.cancel()
+        if self.scoring_pool is not None:
+            self.scoring_pool.close()
+        if self.warm_snapshot is not None:
+            self.warm_snapshot.close()
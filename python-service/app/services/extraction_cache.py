@@ -0,0 +1,65 @@
+"""
+LLM result cache for schema extraction and document analysis
+Bounded LRU cache of completed LLM results keyed on the document contents
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def document_key(kind: str, raw_data: Dict[str, Any]) -> Tuple[str, bytes]:
+    """Cache key of a document: what was asked, and a digest of its canonical JSON."""
+    canonical = json.dumps(raw_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return kind, hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+class ExtractionCache:
+    """
+    LRU cache of LLM results.
+
+    Results are stored as the LLM returned them (before value
+    normalization) by both the streaming and the non-streaming endpoints,
+    so a document extracted by one is answered from memory by the other.
+    get() returns a copy of the top-level result, so callers can replace
+    its members freely.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, kind: str, raw_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        key = document_key(kind, raw_data)
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(result)
+
+    def put(self, kind: str, raw_data: Dict[str, Any], result: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        key = document_key(kind, raw_data)
+        self._entries[key] = dict(result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
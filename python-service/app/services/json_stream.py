@@ -0,0 +1,122 @@
+"""
+Incremental JSON parsing of streamed LLM output
+Yields the members of a JSON object's nested objects as soon as each one
+is complete, so results can be forwarded while the completion is still streaming
+"""
+import json
+import logging
+import re
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Characters that change the parser state; everything else is skipped over
+_STRUCTURAL = re.compile(r'["\\{}\[\],:]')
+_STRING = re.compile(r'["\\]')
+
+# Result of decoding a member that is not valid JSON
+_INVALID = object()
+
+
+class _Container:
+    __slots__ = ("kind", "member_start", "key", "value_start")
+
+    def __init__(self, kind: str, member_start: int):
+        self.kind = kind
+        self.member_start = member_start
+        self.key: Optional[str] = None
+        self.value_start: Optional[int] = None
+
+
+class JsonMemberStream:
+    """
+    Incremental parser for a streamed JSON object of objects, such as
+    {"extractedSchema": {...}, "fieldMappings": {...}, "confidence": {...}}.
+
+    feed() takes the next chunk of text and returns the (section, key,
+    value) members of the nested objects completed by it, in order. Text
+    before the outer object (e.g. a ```json fence) and after it is ignored;
+    a member that is not valid JSON is skipped, leaving the final parse of
+    the whole text to report the error.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self._pos = 0
+        self._in_string = False
+        self._stack: List[_Container] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        members = []
+        if self.done:
+            return members
+        self.text += chunk
+        text = self.text
+
+        if not self._stack:
+            start = text.find("{", self._pos)
+            if start < 0:
+                self._pos = len(text)
+                return members
+            self._stack.append(_Container("{", start + 1))
+            self._pos = start + 1
+
+        while self._stack:
+            if self._in_string:
+                match = _STRING.search(text, self._pos)
+                if match is None:
+                    self._pos = max(self._pos, len(text))
+                    break
+                if match.group() == "\\":
+                    # Skip the escaped character, which may not have arrived yet
+                    self._pos = match.end() + 1
+                    continue
+                self._in_string = False
+                self._pos = match.end()
+                continue
+
+            match = _STRUCTURAL.search(text, self._pos)
+            if match is None:
+                self._pos = len(text)
+                break
+            char = match.group()
+            i = match.start()
+            self._pos = match.end()
+            top = self._stack[-1]
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append(_Container(char, i + 1))
+            elif char == ":" and top.kind == "{":
+                top.key = self._decode(text[top.member_start:i])
+                top.value_start = i + 1
+            elif char == ",":
+                self._complete(top, i, members)
+                top.member_start = i + 1
+            elif char in "}]":
+                self._complete(top, i, members)
+                self._stack.pop()
+                if not self._stack:
+                    self.done = True
+        return members
+
+    def _complete(self, container: _Container, end: int, members: List[Tuple[str, str, Any]]) -> None:
+        """Emit the member ending at end, if it belongs to a nested object."""
+        if container.kind == "{" and len(self._stack) == 2 and container.value_start is not None:
+            value = self._decode(self.text[container.value_start:end])
+            section = self._stack[0].key
+            if isinstance(container.key, str) and isinstance(section, str) and value is not _INVALID:
+                members.append((section, container.key, value))
+        container.key = None
+        container.value_start = None
+
+    @staticmethod
+    def _decode(fragment: str) -> Any:
+        try:
+            return json.loads(fragment)
+        except ValueError:
+            logger.debug(f"Skipping unparseable streamed JSON member: {fragment[:80]!r}")
+            return _INVALID
+
@@ -5,26 +5,38 @@ Provides intelligent field mapping from diverse document formats
 import os
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import AbstractSet, Dict, Any, AsyncIterator, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
+from app.services.extraction_cache import ExtractionCache
+from app.services.json_stream import JsonMemberStream
+from app.services.request_context import DeadlineExceeded, check_deadline, with_deadline
+from app.services.value_normalizer import ValueNormalizer
+
 logger = logging.getLogger(__name__)
 
+# Result cache kinds
+EXTRACTION = "extract"
+ANALYSIS = "analyze"
+
 
 class SchemaExtractionResult(BaseModel):
-    """Pydantic model for LLM output parsing"""
-    extractedSchema: Dict[str, Any] = Field(
-        description="Normalized schema with standard field names"
-    )
+    """
+    Pydantic model for LLM output parsing. The LLM writes the members in
+    this order, so streamed field mappings arrive first.
+    """
     fieldMappings: Dict[str, str] = Field(
         description="Mapping from source field names to target field names"
     )
     confidence: Dict[str, float] = Field(
         description="Confidence score (0-1) for each field mapping"
     )
+    extractedSchema: Dict[str, Any] = Field(
+        description="Normalized schema with standard field names"
+    )
 
 
 class LLMService:
@@ -92,7 +104,20 @@ class LLMService:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        # Optional OpenAI-compatible endpoint (e.g. the local stub used for load tests)
+        self.base_url = os.getenv("OPENAI_BASE_URL") or None
+        self.request_timeout = float(os.getenv("OPENAI_TIMEOUT", "30"))
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
         self.use_llm = bool(self.api_key)
+        # Quantities, units, prices, currencies and dates are parsed after
+        # extraction instead of by the LLM; numeric dates are read day first
+        # (07/03/2025 is 7 March) unless DATE_DAY_FIRST=false
+        if os.getenv("VALUE_NORMALIZATION", "true").lower() == "true":
+            self.normalizer = ValueNormalizer(day_first=os.getenv("DATE_DAY_FIRST", "true").lower() == "true")
+        else:
+            self.normalizer = None
+        # LLM results of recently seen documents (entries, 0 disables)
+        self.result_cache = ExtractionCache(int(os.getenv("LLM_RESULT_CACHE_SIZE", "1000")))
 
         if self.use_llm:
             logger.info(f"LLM Service initialized with model: {self.model_name}")
@@ -105,11 +130,17 @@ class LLMService:
         self.llm = ChatOpenAI(
             model=self.model_name,
             temperature=0.1,  # Low temperature for consistent extraction
-            api_key=self.api_key
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.request_timeout,
+            max_retries=self.max_retries
         )
 
         self.output_parser = PydanticOutputParser(pydantic_object=SchemaExtractionResult)
 
+        # Values are normalized after extraction; the LLM only maps fields
+        self.date_rule = "" if self.normalizer else "\n5. For dates, try to normalize to ISO format (YYYY-MM-DD) if possible"
+
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a document schema extraction specialist for B2B commodity trading.
 Your task is to map fields from incoming documents to a standard contract schema.
@@ -121,60 +152,144 @@ Rules:
 1. Map each source field to the most appropriate target field
 2. If a source field doesn't match any target field, keep it with its original name
 3. Preserve all values exactly as they appear
-4. Provide a confidence score (0-1) for each mapping based on how certain you are
-5. For dates, try to normalize to ISO format (YYYY-MM-DD) if possible
+4. Provide a confidence score (0-1) for each mapping based on how certain you are{date_rule}
 
 {format_instructions}"""),
             ("human", """Extract and map the schema from this document data:
 
 {raw_data}
 
-Return the extracted schema with normalized field names, the field mappings, and confidence scores.""")
+Return the field mappings, the confidence scores, and the extracted schema with normalized field names.""")
+        ])
+
+        self.analysis_prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are a document structure analyst for B2B commodity trading.
+Analyze the given document and describe:
+1. The document type (purchase order, contract, invoice, etc.)
+2. Key fields and their purposes
+3. Any non-standard or partner-specific field naming conventions
+4. Suggestions for field mapping improvements"""),
+            ("human", "Analyze this document structure:\n\n{document}")
         ])
 
-    async def extract_schema(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def extract_schema(self, raw_data: Dict[str, Any], normalize: bool = True) -> Dict[str, Any]:
         """
         Extract and normalize schema from raw document data.
 
         Args:
             raw_data: Raw data from incoming document
+            normalize: Normalize the extracted values (callers extracting many
+                documents pass False and use normalize_results)
 
         Returns:
             Dictionary containing extractedSchema, fieldMappings, and confidence
         """
         if self.use_llm:
             try:
-                return await self._llm_extract_schema(raw_data)
+                result = self.result_cache.get(EXTRACTION, raw_data)
+                if result is None:
+                    result = await self._llm_extract_schema(raw_data)
+                    self.result_cache.put(EXTRACTION, raw_data, result)
+            except DeadlineExceeded:
+                # Nobody is waiting for a fallback result any more
+                raise
             except Exception as e:
                 logger.error(f"LLM extraction failed, falling back to rules: {e}")
-                return self._rule_based_extract_schema(raw_data)
+                result = self._rule_based_extract_schema(raw_data)
         else:
-            return self._rule_based_extract_schema(raw_data)
+            result = self._rule_based_extract_schema(raw_data)
 
-    async def _llm_extract_schema(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        if normalize and self.normalizer:
+            result["extractedSchema"] = self.normalizer.normalize(result["extractedSchema"])
+        return result
+
+    async def stream_extract_schema(self, raw_data: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
         """
-        Use LLM to intelligently extract and map schema.
+        extract_schema() as a stream of (event, data) pairs, for interactive callers.
+
+        The LLM completion is streamed and parsed as it arrives: a "field"
+        event (sourceField, targetField, value) is sent as soon as the LLM
+        has mapped a field, a "confidence" event (targetField, confidence)
+        for each confidence score, and finally a "result" event with the
+        same result extract_schema() returns. Field values are the
+        document's (the LLM preserves them), normalized one by one; the
+        result normalizes the whole record. Cached and rule-based results
+        are sent at once.
         """
-        logger.info("Using LLM-based schema extraction")
-
+        result = self.result_cache.get(EXTRACTION, raw_data) if self.use_llm else None
+        if result is None and self.use_llm:
+            sent = set()
+            try:
+                async for event in self._llm_stream_extract_schema(raw_data, sent):
+                    if event[0] == "result":
+                        result = event[1]
+                    else:
+                        yield event
+                self.result_cache.put(EXTRACTION, raw_data, result)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.error(f"LLM extraction failed, falling back to rules: {e}")
+                result = self._rule_based_extract_schema(raw_data)
+                # Fields already sent stay as the LLM mapped them
+                for event in self._extraction_events(result, skip=sent):
+                    yield event
+        else:
+            if result is None:
+                result = self._rule_based_extract_schema(raw_data)
+            for event in self._extraction_events(result):
+                yield event
+
+        if self.normalizer:
+            result["extractedSchema"] = self.normalizer.normalize(result["extractedSchema"])
+        yield "result", result
+
+    def _field_event(self, source_field: str, target_field: str, value: Any) -> Tuple[str, Dict[str, Any]]:
+        if self.normalizer:
+            value = self.normalizer.normalize({target_field: value}).get(target_field, value)
+        return "field", {"sourceField": source_field, "targetField": target_field, "value": value}
+
+    def _extraction_events(self, result: Dict[str, Any], skip: AbstractSet[str] = frozenset()) -> List[Tuple[str, Dict[str, Any]]]:
+        """The field and confidence events of a complete extraction result."""
+        events = [
+            self._field_event(source_field, target_field, result["extractedSchema"].get(target_field))
+            for source_field, target_field in result["fieldMappings"].items()
+            if source_field not in skip
+        ]
+        events.extend(
+            ("confidence", {"targetField": target_field, "confidence": confidence})
+            for target_field, confidence in result["confidence"].items()
+        )
+        return events
+
+    def normalize_results(self, results: List[Optional[Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
+        """Normalize the values of many extraction results at once, column-wise."""
+        extracted = [result for result in results if result is not None]
+        if not self.normalizer or not extracted:
+            return results
+        schemas = self.normalizer.normalize_records([result["extractedSchema"] for result in extracted])
+        for result, schema in zip(extracted, schemas):
+            result["extractedSchema"] = schema
+        return results
+
+    def _extraction_messages(self, raw_data: Dict[str, Any]) -> List[Any]:
+        """The schema extraction prompt for a document."""
         # Format target schema for prompt
         target_schema_str = "\n".join(
             f"- {field}: {desc}"
             for field, desc in self.TARGET_SCHEMA.items()
         )
 
-        # Create the prompt
-        messages = self.prompt.format_messages(
+        return self.prompt.format_messages(
             target_schema=target_schema_str,
+            date_rule=self.date_rule,
             format_instructions=self.output_parser.get_format_instructions(),
             raw_data=json.dumps(raw_data, indent=2)
         )
 
-        # Call the LLM
-        response = await self.llm.ainvoke(messages)
-
-        # Parse the response
-        result = self.output_parser.parse(response.content)
+    def _parse_extraction(self, content: str) -> Dict[str, Any]:
+        """Parse a complete schema extraction answer."""
+        result = self.output_parser.parse(content)
 
         logger.info(f"LLM extracted {len(result.extractedSchema)} fields")
 
@@ -184,6 +299,54 @@ Return the extracted schema with normalized field names, the field mappings, and
             "confidence": result.confidence
         }
 
+    async def _llm_extract_schema(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Use LLM to intelligently extract and map schema.
+        """
+        logger.info("Using LLM-based schema extraction")
+
+        messages = self._extraction_messages(raw_data)
+
+        # Call the LLM; cancelled if the caller's deadline passes first
+        check_deadline("llm_call")
+        response = await with_deadline(self.llm.ainvoke(messages), "llm_call")
+
+        # Parse the response
+        check_deadline("llm_parse")
+        return self._parse_extraction(response.content)
+
+    async def _llm_stream_extract_schema(
+        self,
+        raw_data: Dict[str, Any],
+        sent: set
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the LLM's extraction: field and confidence events as their
+        JSON members complete, then the parsed (not normalized) result.
+        Source fields whose events were sent are added to sent.
+        """
+        logger.info("Using streaming LLM-based schema extraction")
+
+        messages = self._extraction_messages(raw_data)
+        parser = JsonMemberStream()
+        # Extracted values, if the LLM writes them before the mappings after all
+        values: Dict[str, Any] = {}
+
+        check_deadline("llm_call")
+        async for chunk in self.llm.astream(messages):
+            check_deadline("llm_call")
+            for section, key, value in parser.feed(chunk.content):
+                if section == "fieldMappings" and isinstance(value, str):
+                    sent.add(key)
+                    yield self._field_event(key, value, values[value] if value in values else raw_data.get(key))
+                elif section == "confidence":
+                    yield "confidence", {"targetField": key, "confidence": value}
+                elif section == "extractedSchema":
+                    values[key] = value
+
+        check_deadline("llm_parse")
+        yield "result", self._parse_extraction(parser.text)
+
     def _rule_based_extract_schema(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Rule-based schema extraction fallback.
@@ -236,23 +399,49 @@ Return the extracted schema with normalized field names, the field mappings, and
         if not self.use_llm:
             return {"analysis": "LLM not available", "detected_fields": list(raw_data.keys())}
 
-        analysis_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a document structure analyst for B2B commodity trading.
-Analyze the given document and describe:
-1. The document type (purchase order, contract, invoice, etc.)
-2. Key fields and their purposes
-3. Any non-standard or partner-specific field naming conventions
-4. Suggestions for field mapping improvements"""),
-            ("human", "Analyze this document structure:\n\n{document}")
-        ])
+        result = self.result_cache.get(ANALYSIS, raw_data)
+        if result is not None:
+            return result
 
-        messages = analysis_prompt.format_messages(
+        messages = self.analysis_prompt.format_messages(
             document=json.dumps(raw_data, indent=2)
         )
 
-        response = await self.llm.ainvoke(messages)
+        response = await with_deadline(self.llm.ainvoke(messages), "llm_analysis")
 
-        return {
+        result = {
             "analysis": response.content,
             "detected_fields": list(raw_data.keys())
         }
+        self.result_cache.put(ANALYSIS, raw_data, result)
+        return result
+
+    async def stream_analyze_document(self, raw_data: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        analyze_document_structure() as a stream of (event, data) pairs:
+        "delta" events with the analysis text as the LLM writes it, then a
+        "result" event with the complete result. Cached results are sent
+        as a single delta.
+        """
+        result = self.result_cache.get(ANALYSIS, raw_data) if self.use_llm else None
+        if result is None and self.use_llm:
+            messages = self.analysis_prompt.format_messages(
+                document=json.dumps(raw_data, indent=2)
+            )
+            parts = []
+            check_deadline("llm_analysis")
+            async for chunk in self.llm.astream(messages):
+                check_deadline("llm_analysis")
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield "delta", {"text": chunk.content}
+            result = {
+                "analysis": "".join(parts),
+                "detected_fields": list(raw_data.keys())
+            }
+            self.result_cache.put(ANALYSIS, raw_data, result)
+        else:
+            if result is None:
+                result = await self.analyze_document_structure(raw_data)
+            yield "delta", {"text": result["analysis"]}
+        yield "result", result
@@ -0,0 +1,275 @@
+"""
+Model artifacts
+Single-file container for a trained model: a checksummed header followed by
+sections (settings, canonical records, features, stats) that load independently
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional, json is used instead
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional, zlib is used instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"QBHMODEL"
+FORMAT = 1
+ARTIFACT_SUFFIX = ".model"
+
+# Sections written by the training path
+SETTINGS = "settings"
+CANONICAL = "canonical"
+FEATURES = "features"
+STATS = "stats"
+# Per-source overlays of a target tenant's shared model
+OVERLAYS = "overlays"
+
+COMPRESSIONS = ("none", "zlib", "zstd")
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+# Sections are read in parallel once together they are at least this large
+PARALLEL_READ_BYTES = 1 << 20
+
+_SIGNED = 1
+# magic, format, flags, header length, header crc32, header signature
+_PREFIX = struct.Struct("<8sHHII32s")
+
+try:
+    DEDUPE_VERSION = version("dedupe")
+except PackageNotFoundError:  # pragma: no cover - dedupe is a hard dependency
+    DEDUPE_VERSION = "unknown"
+
+
+class ArtifactError(Exception):
+    """Raised when a model artifact is corrupt, incompatible or not signed with our key."""
+
+
+def artifact_path(model_path: Path, model_key: str) -> Path:
+    return model_path / f"{model_key}{ARTIFACT_SUFFIX}"
+
+
+def encode_json(obj: Any) -> bytes:
+    """JSON section content."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def decode_json(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def resolve_compression(compression: str) -> str:
+    """Configured compression, falling back to zlib without zstandard."""
+    compression = compression.strip().lower() or "none"
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown model artifact compression: {compression} (known: {', '.join(COMPRESSIONS)})")
+    if compression == "zstd" and zstandard is None:
+        return "zlib"
+    return compression
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if compression == "zlib":
+        return zlib.compress(data, ZLIB_LEVEL)
+    return data
+
+
+def _decompress(data: bytes, compression: str, size: int) -> bytes:
+    if compression == "zstd":
+        if zstandard is None:
+            raise ArtifactError("Section is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+    if compression == "zlib":
+        # Never inflate past the recorded size, whatever the section holds
+        decompressor = zlib.decompressobj()
+        decompressed = decompressor.decompress(data, size)
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise ArtifactError("Section does not decompress to its recorded size")
+        return decompressed
+    return data
+
+
+def write_artifact(
+    path: Path,
+    sections: Dict[str, bytes],
+    metadata: Optional[Dict[str, Any]] = None,
+    compression: str = "zstd",
+    key: Optional[bytes] = None
+) -> Dict[str, Any]:
+    """
+    Write a model artifact, replacing the old one atomically, and return its header.
+
+    Sections are compressed one by one (left uncompressed when that does not
+    make them smaller) and checksummed as stored, so a reader rejects a
+    damaged section before decompressing it. With a key the header, which
+    carries every section checksum, is signed with HMAC-SHA256.
+    """
+    compression = resolve_compression(compression)
+    entries = {}
+    payloads = []
+    offset = 0
+    for name, data in sections.items():
+        stored, method = _compress(data, compression), compression
+        if len(stored) >= len(data):
+            stored, method = data, "none"
+        entries[name] = {
+            "offset": offset,
+            "length": len(stored),
+            "size": len(data),
+            "compression": method,
+            "sha256": hashlib.sha256(stored).hexdigest(),
+        }
+        payloads.append(stored)
+        offset += len(stored)
+
+    header = {
+        "format": FORMAT,
+        "dedupe": DEDUPE_VERSION,
+        "createdAt": time.time(),
+        "metadata": metadata or {},
+        "sections": entries,
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    signature = hmac.new(key, header_bytes, hashlib.sha256).digest() if key else bytes(32)
+    prefix = _PREFIX.pack(
+        MAGIC, FORMAT, _SIGNED if key else 0, len(header_bytes), zlib.crc32(header_bytes), signature
+    )
+
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'wb') as f:
+        f.write(prefix)
+        f.write(header_bytes)
+        for payload in payloads:
+            f.write(payload)
+    tmp_file.replace(path)
+    return header
+
+
+class ModelArtifact:
+    """
+    Read access to a model artifact.
+
+    Opening one reads and validates only the fixed prefix and the header:
+    magic, format version, header checksum, the signature when a key is
+    configured and the dedupe version the model was trained with. A file
+    that fails any of these is rejected without reading its sections, let
+    alone unpickling them.
+
+    Sections are then read on demand, each verified against its checksum
+    before it is decompressed. The file stays open, so all sections come
+    from the same file even if a retrain replaces it meanwhile; use the
+    artifact as a context manager or close() it.
+    """
+
+    def __init__(self, path: Path, key: Optional[bytes] = None):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        try:
+            self.header = self._read_header(key)
+        except Exception:
+            os.close(self._fd)
+            raise
+        self.sections: Dict[str, Dict[str, Any]] = self.header["sections"]
+        self.metadata: Dict[str, Any] = self.header.get("metadata", {})
+
+    def __enter__(self) -> "ModelArtifact":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _read_header(self, key: Optional[bytes]) -> Dict[str, Any]:
+        prefix = os.pread(self._fd, _PREFIX.size, 0)
+        if len(prefix) < _PREFIX.size or prefix[:len(MAGIC)] != MAGIC:
+            raise ArtifactError(f"{self.path.name} is not a model artifact")
+        _, file_format, flags, header_length, header_crc, signature = _PREFIX.unpack(prefix)
+        if file_format > FORMAT:
+            raise ArtifactError(f"{self.path.name} has format {file_format}, newer than supported {FORMAT}")
+
+        header_bytes = os.pread(self._fd, header_length, _PREFIX.size)
+        if len(header_bytes) != header_length or zlib.crc32(header_bytes) != header_crc:
+            raise ArtifactError(f"{self.path.name} has a corrupt header")
+        if key is not None:
+            expected = hmac.new(key, header_bytes, hashlib.sha256).digest()
+            if not flags & _SIGNED or not hmac.compare_digest(signature, expected):
+                raise ArtifactError(f"{self.path.name} is not signed with the configured key")
+
+        header = json.loads(header_bytes)
+        trained_with = header.get("dedupe", "unknown")
+        if trained_with.split(".")[:2] != DEDUPE_VERSION.split(".")[:2]:
+            raise ArtifactError(
+                f"{self.path.name} was trained with dedupe {trained_with}, incompatible with {DEDUPE_VERSION}"
+            )
+        self.signed = bool(flags & _SIGNED)
+        self._data_offset = _PREFIX.size + header_length
+        return header
+
+    def read(self, name: str) -> bytes:
+        """A section's content, verified and decompressed."""
+        section = self.sections.get(name)
+        if section is None:
+            raise KeyError(f"{self.path.name} has no section {name}")
+        stored = os.pread(self._fd, section["length"], self._data_offset + section["offset"])
+        if len(stored) != section["length"] or hashlib.sha256(stored).hexdigest() != section["sha256"]:
+            raise ArtifactError(f"Section {name} of {self.path.name} is corrupt")
+        data = _decompress(stored, section["compression"], section["size"])
+        if len(data) != section["size"]:
+            raise ArtifactError(f"Section {name} of {self.path.name} has the wrong size")
+        return data
+
+    def read_many(self, names: Iterable[str]) -> Dict[str, bytes]:
+        """
+        The present sections among names, read in parallel when large: reads,
+        hashing and decompression release the GIL, so the sections overlap.
+        """
+        names = [name for name in names if name in self.sections]
+        if len(names) < 2 or sum(self.sections[name]["length"] for name in names) < PARALLEL_READ_BYTES:
+            return {name: self.read(name) for name in names}
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            return dict(zip(names, executor.map(self.read, names)))
+
+    def describe(self) -> Dict[str, Any]:
+        """Header summary for model stats."""
+        return {
+            "format": self.header["format"],
+            "dedupeVersion": self.header.get("dedupe"),
+            "createdAt": self.header.get("createdAt"),
+            "signed": self.signed,
+            "sections": {
+                name: {
+                    "bytes": section["length"],
+                    "uncompressedBytes": section["size"],
+                    "compression": section["compression"],
+                }
+                for name, section in self.sections.items()
+            },
+        }
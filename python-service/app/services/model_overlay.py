@@ -0,0 +1,77 @@
+"""
+Per-source model overlays
+Source-specific aliases and score calibration on top of a target tenant's shared model
+"""
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.resolution_cache import normalize_value
+
+logger = logging.getLogger(__name__)
+
+# Source tenant code of a target tenant's shared model; tenant codes never start with "_"
+SHARED_SOURCE = "_shared"
+
+SHARING_MODES = ("pair", "target")
+
+
+def shared_model_key(target_tenant: str) -> str:
+    return f"{SHARED_SOURCE}_{target_tenant}"
+
+
+def parse_sharing(value: str) -> str:
+    mode = value.strip().lower() or "pair"
+    if mode not in SHARING_MODES:
+        raise ValueError(f"Unknown model sharing mode: {mode} (known: {', '.join(SHARING_MODES)})")
+    return mode
+
+
+@dataclass
+class SourceOverlay:
+    """
+    What a shared model learned about one source tenant: the source's own
+    corrections as aliases (field -> normalized source value -> corrected
+    value) and a Platt calibration of the shared model's scores on the
+    source's labels, when it has enough of them.
+    """
+    aliases: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    calibration: Optional[Tuple[float, float]] = None
+    labels: int = 0
+
+    def alias(self, field_name: str, value: str) -> Optional[str]:
+        aliases = self.aliases.get(field_name)
+        return aliases.get(normalize_value(value)) if aliases else None
+
+    def add_alias(self, field_name: str, value: str, corrected_value: str) -> bool:
+        """Learn a correction; False if it was already known."""
+        aliases = self.aliases.setdefault(field_name, {})
+        key = normalize_value(value)
+        if aliases.get(key) == corrected_value:
+            return False
+        aliases[key] = corrected_value
+        return True
+
+    def adjust(self, score: float) -> float:
+        """A shared model score, calibrated for this source."""
+        if self.calibration is None:
+            return score
+        a, b = self.calibration
+        return round(1.0 / (1.0 + math.exp(-(a * score + b))), 4)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "aliases": self.aliases,
+            "calibration": list(self.calibration) if self.calibration is not None else None,
+            "labels": self.labels,
+        }
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "SourceOverlay":
+        calibration = values.get("calibration")
+        return cls(
+            aliases=values.get("aliases") or {},
+            calibration=tuple(calibration) if calibration else None,
+            labels=values.get("labels", 0)
+        )
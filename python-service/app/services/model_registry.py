@@ -0,0 +1,245 @@
+"""
+Model registry
+In-memory index of trained models, persisted as a manifest next to the model files
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.model_artifact import ARTIFACT_SUFFIX, ArtifactError, ModelArtifact
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+SETTINGS_SUFFIX = "_settings"
+# Per-pair model files of the format before model artifacts
+LEGACY_SUFFIXES = (SETTINGS_SUFFIX, "_canonical.json", "_features.npz")
+
+
+@dataclass
+class ModelEntry:
+    """A trained model of a tenant pair."""
+    model_key: str
+    # Increases with every training run of the pair, across processes
+    version: int
+    size: int
+    canonical_records: int
+    trained_at: float
+    mode: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "modelKey": self.model_key,
+            "version": self.version,
+            "sizeBytes": self.size,
+            "canonicalRecords": self.canonical_records,
+            "trainedAt": self.trained_at,
+            "mode": self.mode,
+        }
+
+
+class ModelRegistry:
+    """
+    Which tenant pairs have a trained model, which version and how big.
+
+    Lookups are dictionary reads: pairs without a model are answered from
+    memory as well, so the knowledge-base path never touches the model
+    directory. The training path records every model it writes; the
+    manifest is rewritten atomically under a lock file, so several service
+    processes sharing DEDUPE_MODEL_PATH each pick up the others' models by
+    re-reading it once it changes, checked at most every refresh_seconds
+    (0 only reloads on this process's own writes).
+
+    Without a manifest (first start after an upgrade) the model directory
+    is scanned once to build it.
+    """
+
+    def __init__(self, model_path: Path, refresh_seconds: float = 10.0):
+        self.model_path = model_path
+        self.manifest_file = model_path / MANIFEST_NAME
+        self.refresh_seconds = refresh_seconds
+
+        self._entries: Dict[str, ModelEntry] = {}
+        self._stamp = None
+        self._checked_at = time.monotonic()
+        self.hits = 0
+        self.negatives = 0
+        self.reloads = 0
+
+        if not self._read_manifest():
+            with self._locked():
+                if not self._read_manifest():
+                    self._entries = self._scan()
+                    self._write_manifest()
+                    logger.info(f"Built model manifest with {len(self._entries)} models from {model_path}")
+        logger.info(f"Model registry loaded with {len(self._entries)} models")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, model_key: str) -> Optional[ModelEntry]:
+        """The current model of a pair, or None if it has none."""
+        self._maybe_refresh()
+        entry = self._entries.get(model_key)
+        if entry is None:
+            self.negatives += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def record(
+        self,
+        model_key: str,
+        size: int,
+        canonical_records: int,
+        mode: Optional[str] = None
+    ) -> ModelEntry:
+        """Register a model the training path has just written."""
+        with self._locked():
+            # Pick up models other processes registered since our last read
+            self._read_manifest(only_if_changed=True)
+            previous = self._entries.get(model_key)
+            entry = ModelEntry(
+                model_key=model_key,
+                version=previous.version + 1 if previous else 1,
+                size=size,
+                canonical_records=canonical_records,
+                trained_at=time.time(),
+                mode=mode
+            )
+            self._entries[model_key] = entry
+            self._write_manifest()
+        return entry
+
+    def entries(self, source_tenant: Optional[str] = None, target_tenant: Optional[str] = None) -> List[ModelEntry]:
+        """Models sorted by key, optionally of one source and/or target tenant."""
+        self._maybe_refresh()
+        entries = [
+            entry for key, entry in self._entries.items()
+            if (source_tenant is None or key.startswith(f"{source_tenant}_"))
+            and (target_tenant is None or key.endswith(f"_{target_tenant}"))
+        ]
+        return sorted(entries, key=lambda entry: entry.model_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "models": len(self._entries),
+            "hits": self.hits,
+            "negatives": self.negatives,
+            "reloads": self.reloads,
+            "refreshSeconds": self.refresh_seconds,
+        }
+
+    def _maybe_refresh(self) -> None:
+        if self.refresh_seconds <= 0:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        self._read_manifest(only_if_changed=True)
+
+    def _manifest_stamp(self):
+        try:
+            stat = self.manifest_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_manifest(self, only_if_changed: bool = False) -> bool:
+        """Load the manifest; False if there is none (or it is unreadable)."""
+        stamp = self._manifest_stamp()
+        if stamp is None:
+            return False
+        if only_if_changed and stamp == self._stamp:
+            return True
+        try:
+            with open(self.manifest_file, 'r') as f:
+                manifest = json.load(f)
+            entries = {key: ModelEntry(**values) for key, values in manifest["models"].items()}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Cannot read model manifest {self.manifest_file}: {e}")
+            return False
+        if self._stamp is not None:
+            self.reloads += 1
+        self._entries = entries
+        self._stamp = stamp
+        return True
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "models": {key: asdict(entry) for key, entry in sorted(self._entries.items())},
+        }
+        tmp_file = self.manifest_file.with_name(f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f)
+        tmp_file.replace(self.manifest_file)
+        self._stamp = self._manifest_stamp()
+
+    def _scan(self) -> Dict[str, ModelEntry]:
+        """Registry entries for the model files found in the model directory."""
+        entries = {}
+        for settings_file in self.model_path.glob(f"*{SETTINGS_SUFFIX}"):
+            model_key = settings_file.name[:-len(SETTINGS_SUFFIX)]
+            stat = settings_file.stat()
+            canonical_records = 0
+            canonical_file = self.model_path / f"{model_key}_canonical.json"
+            if canonical_file.exists():
+                try:
+                    with open(canonical_file, 'r') as f:
+                        canonical_records = len(json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Cannot read canonical records of {model_key}: {e}")
+            entries[model_key] = ModelEntry(
+                model_key=model_key,
+                version=1,
+                size=stat.st_size,
+                canonical_records=canonical_records,
+                trained_at=stat.st_mtime
+            )
+
+        # Artifacts take precedence over settings files of the same pair
+        for artifact_file in self.model_path.glob(f"*{ARTIFACT_SUFFIX}"):
+            model_key = artifact_file.name[:-len(ARTIFACT_SUFFIX)]
+            try:
+                with ModelArtifact(artifact_file) as artifact:
+                    metadata = artifact.metadata
+                    trained_at = artifact.header.get("createdAt")
+            except (OSError, ArtifactError, ValueError) as e:
+                logger.warning(f"Skipping model artifact {artifact_file.name}: {e}")
+                continue
+            stat = artifact_file.stat()
+            entries[model_key] = ModelEntry(
+                model_key=model_key,
+                version=1,
+                size=stat.st_size,
+                canonical_records=metadata.get("canonicalRecords", 0),
+                trained_at=trained_at or stat.st_mtime,
+                mode=metadata.get("mode")
+            )
+        return entries
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock on the manifest across processes sharing the model path."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.model_path / f"{MANIFEST_NAME}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
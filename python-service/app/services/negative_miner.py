@@ -0,0 +1,80 @@
+"""
+Hard-negative mining for training-set generation
+Finds near-miss canonical values through a character-trigram inverted index
+"""
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(value: str) -> set:
+    """Character trigrams of a normalized, space-padded value."""
+    text = f"  {' '.join(value.lower().split())} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NegativeMiner:
+    """
+    Inverted trigram index over a set of canonical values.
+
+    A query only touches the posting lists of its own trigrams, so finding
+    the most similar canonicals costs time proportional to the postings it
+    overlaps rather than to the catalog size (a query whose postings cover
+    much of the catalog is counted densely instead). Similarity is the Dice coefficient of
+    the trigram sets. Trigrams occurring in more than `max_df` of the values
+    carry little signal and are left out of the index.
+    """
+
+    def __init__(self, canonical_values: Sequence[str], max_df: float = 0.5):
+        self.values: List[str] = list(dict.fromkeys(canonical_values))
+        self.sizes = np.zeros(len(self.values), dtype=np.int32)
+
+        postings: Dict[str, List[int]] = {}
+        for i, value in enumerate(self.values):
+            grams = trigrams(value)
+            self.sizes[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+
+        limit = max(2, int(max_df * len(self.values)))
+        self.postings = {
+            gram: np.array(ids, dtype=np.int32)
+            for gram, ids in postings.items() if len(ids) <= limit
+        }
+
+    def similar(self, value: str, k: int, exclude: Sequence[str] = (), min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        """Up to k most similar canonical values, skipping excluded ones."""
+        if not self.values or k <= 0:
+            return []
+
+        grams = trigrams(value)
+        postings = [ids for ids in map(self.postings.get, grams) if ids is not None]
+        if not postings:
+            return []
+        touched = np.concatenate(postings)
+        if touched.size * 16 < len(self.values):
+            # Few postings: count them sparsely, in time proportional to the overlap
+            candidates, overlap = np.unique(touched, return_counts=True)
+        else:
+            # Postings cover much of the catalog: a dense count is cheaper than sorting them
+            counts = np.bincount(touched, minlength=len(self.values))
+            candidates = np.flatnonzero(counts)
+            overlap = counts[candidates]
+
+        scores = 2.0 * overlap / (len(grams) + self.sizes[candidates])
+        excluded = set(exclude)
+        take = min(candidates.size, k + len(excluded))
+        top = np.argpartition(-scores, take - 1)[:take]
+
+        results = []
+        for j in top[np.argsort(-scores[top], kind="stable")]:
+            candidate = self.values[candidates[j]]
+            if candidate in excluded or scores[j] < min_similarity:
+                continue
+            results.append((candidate, float(scores[j])))
+            if len(results) == k:
+                break
+        return results
@@ -0,0 +1,84 @@
+"""
+Compact records
+Interned strings, pooled dedupe records and slotted training examples for
+the resolution and training paths
+"""
+import sys
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Resolved match fields, positionally aligned with the service's match fields:
+# (mapped value or PASSTHROUGH, confidence), or None for a field not in the record
+ResolvedFields = Tuple[Optional[Tuple[Any, float]], ...]
+
+
+def intern_value(value: Any) -> Any:
+    """The interned copy of a string; other values are returned as they are."""
+    return sys.intern(value) if type(value) is str else value
+
+
+class RecordPool:
+    """
+    One dedupe record per distinct combination of match-field values.
+
+    Training sets repeat the same values many times over: a label's messy
+    value recurs in its rejected corrections and mined negatives, and a
+    canonical value in every label that maps to it. The pool hands out a
+    single dict, with interned field names and values, for each distinct
+    record, so examples, messy data and the canonical index share them.
+    Pooled records are shared and must not be modified.
+    """
+
+    __slots__ = ("fields", "_records")
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(intern_value(field) for field in fields)
+        self._records: Dict[Tuple, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def record(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Dedupe record with every match field; missing values are None."""
+        key = tuple(
+            intern_value(str(value)) if value not in (None, '') else None
+            for value in map(values.get, self.fields)
+        )
+        record = self._records.get(key)
+        if record is None:
+            record = self._records[key] = dict(zip(self.fields, key))
+        return record
+
+
+class LabelledPair:
+    """
+    A training example: messy and canonical field values, whether they
+    match, its weight and, for a target tenant's shared model, the source
+    tenant it was labelled for. Callers of DedupeService.train_model may
+    pass the equivalent dicts instead.
+    """
+
+    __slots__ = ("messy", "canonical", "is_match", "weight", "source")
+
+    def __init__(
+        self,
+        messy: Dict[str, Any],
+        canonical: Dict[str, Any],
+        is_match: bool = True,
+        weight: float = 1.0,
+        source: Optional[str] = None
+    ):
+        self.messy = messy
+        self.canonical = canonical
+        self.is_match = is_match
+        self.weight = weight
+        self.source = source
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "LabelledPair":
+        return cls(
+            item['messy'],
+            item['canonical'],
+            is_match=bool(item.get('is_match', True)),
+            weight=float(item.get('weight', 1.0)),
+            source=item.get('source')
+        )
@@ -0,0 +1,59 @@
+"""
+Per-request context shared between the API layer and the services
+Carries the caller's deadline so services can stop work nobody is waiting for
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+# Absolute deadline on the time.monotonic() clock, None when unbounded
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before a stage completes."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+
+def set_deadline(timeout_seconds: Optional[float]):
+    """Start a deadline for the current context; returns a token for reset_deadline()."""
+    deadline = time.monotonic() + timeout_seconds if timeout_seconds is not None else None
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, or None when there is no deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline(stage: str) -> None:
+    """Raise DeadlineExceeded if the deadline has already passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(stage)
+
+
+async def with_deadline(awaitable: Awaitable[Any], stage: str) -> Any:
+    """Await something, cancelling it once the request deadline passes."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(stage)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(stage)
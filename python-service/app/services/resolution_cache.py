@@ -0,0 +1,192 @@
+"""
+Resolution memoization for entity resolution
+Bounded per-tenant-pair memo cache plus single-flight de-duplication of concurrent lookups
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Callable, Awaitable, Hashable
+
+from app.services.request_context import DeadlineExceeded, check_deadline
+
+logger = logging.getLogger(__name__)
+
+# Marker for "value was passed through unchanged" so a cached miss echoes
+# the caller's own spelling rather than the first request's spelling
+PASSTHROUGH = object()
+
+
+def normalize_value(value: Any) -> Any:
+    """Normalize a match-field value for use in a cache key."""
+    if isinstance(value, str):
+        return ' '.join(value.lower().split())
+    return value
+
+
+class ResolutionCache:
+    """
+    Per-tenant-pair LRU cache of resolved match fields.
+
+    Entries are keyed on the normalized (product, supplier) values. Each pair
+    has a version that is bumped on invalidation, so results computed before
+    an invalidation are never stored after it. Entries that were resolved via
+    the shared knowledge base also remember the knowledge-base generation and
+    are ignored once the knowledge base changes.
+    """
+
+    def __init__(self, max_entries_per_pair: int = 10000):
+        self.max_entries_per_pair = max_entries_per_pair
+        self._pairs: Dict[str, OrderedDict] = {}
+        self._versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries_per_pair > 0
+
+    def version(self, model_key: str) -> int:
+        """Current version of a pair; pass it back to put()."""
+        return self._versions.get(model_key, 0)
+
+    def get(self, model_key: str, key: Tuple, kb_generation: int) -> Optional[Tuple]:
+        """Return the cached resolution for a key, or None on a miss."""
+        entries = self._pairs.get(model_key)
+        entry = entries.get(key) if entries else None
+
+        if entry is None or (entry[1] is not None and entry[1] != kb_generation):
+            self.misses += 1
+            return None
+
+        entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(
+        self,
+        model_key: str,
+        key: Tuple,
+        fields: Tuple,
+        version: int,
+        kb_generation: Optional[int] = None
+    ) -> None:
+        """
+        Store a resolution.
+
+        Args:
+            model_key: Tenant pair identifier
+            key: Normalized match-field values
+            fields: (mapped value, confidence) per match field
+            version: Pair version observed before the computation started
+            kb_generation: Knowledge-base generation the result depends on, if any
+        """
+        if not self.enabled or version != self.version(model_key):
+            return
+
+        entries = self._pairs.setdefault(model_key, OrderedDict())
+        # (fields, kb_generation): a tuple is a fraction of a dict's size
+        entries[key] = (fields, kb_generation)
+        entries.move_to_end(key)
+        if len(entries) > self.max_entries_per_pair:
+            entries.popitem(last=False)
+
+    def pair_keys(self) -> List[str]:
+        """Tenant pairs with cached resolutions."""
+        return list(self._pairs)
+
+    def entries(self, model_key: str) -> List[Tuple[Tuple, Tuple, Optional[int]]]:
+        """A pair's (key, fields, kb_generation) entries, least recently used first."""
+        return [(key, fields, kb_generation) for key, (fields, kb_generation) in self._pairs.get(model_key, {}).items()]
+
+    def restore(self, model_key: str, entries: Iterable[Tuple[Tuple, Tuple, Optional[int]]]) -> int:
+        """
+        Add restored entries of a pair, least recently used first. Entries
+        resolved meanwhile are kept and count as more recent; the oldest
+        entries beyond the size limit are dropped. Returns how many
+        restored entries were kept.
+        """
+        if not self.enabled:
+            return 0
+        current = self._pairs.get(model_key, OrderedDict())
+        restored = OrderedDict(
+            (key, (fields, kb_generation)) for key, fields, kb_generation in entries if key not in current
+        )
+        kept = len(restored)
+        restored.update(current)
+        while len(restored) > self.max_entries_per_pair:
+            restored.popitem(last=False)
+            kept -= 1
+        self._pairs[model_key] = restored
+        return max(kept, 0)
+
+    def invalidate_pair(self, model_key: str) -> None:
+        """Drop all cached resolutions for a tenant pair."""
+        self._versions[model_key] = self.version(model_key) + 1
+        dropped = len(self._pairs.pop(model_key, ()))
+        if dropped:
+            logger.info(f"Invalidated {dropped} cached resolutions for {model_key}")
+
+    def get_stats(self, model_key: Optional[str] = None) -> Dict[str, Any]:
+        """Hit/miss counters and sizes, optionally for one pair."""
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "pairs": len(self._pairs),
+            "entries": sum(len(e) for e in self._pairs.values()),
+        }
+        if model_key is not None:
+            stats["pairEntries"] = len(self._pairs.get(model_key, ()))
+        return stats
+
+
+class _Flight:
+    """A computation in flight and how many callers await it."""
+
+    __slots__ = ("task", "callers")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.callers = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one computation.
+
+    The first caller starts the coroutine in its own task; callers arriving
+    while it is in flight await the same result (or exception). A caller
+    that is cancelled (its client went away) stops waiting without
+    affecting the others; the computation is cancelled only once nobody
+    awaits it. The computation runs under the deadline of the caller that
+    started it, so when that deadline passes, callers with time left
+    recompute under their own deadline instead of sharing the timeout.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight(asyncio.ensure_future(fn()))
+                flight.task.add_done_callback(lambda _, flight=flight: self._forget(key, flight))
+            else:
+                self.shared += 1
+
+            flight.callers += 1
+            try:
+                return await asyncio.shield(flight.task)
+            except DeadlineExceeded:
+                # Raises if this caller's own deadline has passed too
+                check_deadline("resolution")
+            finally:
+                flight.callers -= 1
+                if not flight.callers and not flight.task.done():
+                    flight.task.cancel()
+                    self._forget(key, flight)
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
@@ -0,0 +1,195 @@
+"""
+Tiered resolution cascade
+Tier configuration, the token alias automaton and per-tier cost accounting
+"""
+import logging
+import math
+import re
+from collections import deque
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tiers from cheapest to most expensive
+TIERS = ("exact", "automaton", "ngram", "model")
+
+# A tier's answer ends the cascade once its confidence reaches the tier's threshold
+DEFAULT_TIER_THRESHOLDS = {
+    "exact": 0.95,
+    "automaton": 0.9,
+    "ngram": 0.9,
+    "model": 0.7,
+}
+
+_ALIAS_TOKEN = re.compile(r"\w+%?")
+
+
+def parse_tiers(value: str) -> Tuple[str, ...]:
+    """Parse 'exact,ngram,model' into a tier order."""
+    tiers = tuple(dict.fromkeys(filter(None, (p.strip().lower() for p in value.split(",")))))
+    unknown = [tier for tier in tiers if tier not in TIERS]
+    if unknown:
+        raise ValueError(f"Unknown resolution tiers: {', '.join(unknown)} (known: {', '.join(TIERS)})")
+    return tiers
+
+
+def parse_thresholds(value: str) -> Dict[str, float]:
+    """Parse 'exact=0.95,ngram=0.85' into per-tier thresholds over the defaults."""
+    thresholds = dict(DEFAULT_TIER_THRESHOLDS)
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        tier, _, threshold = part.partition("=")
+        tier = tier.strip().lower()
+        if tier not in TIERS:
+            raise ValueError(f"Unknown resolution tier: {tier}")
+        thresholds[tier] = float(threshold)
+    return thresholds
+
+
+def alias_tokens(value: str) -> Tuple[str, ...]:
+    """Lowercase word tokens of a value; a trailing % stays on its number."""
+    return tuple(_ALIAS_TOKEN.findall(value.lower()))
+
+
+class AliasAutomaton:
+    """
+    Aho-Corasick automaton over the word tokens of known aliases.
+
+    Finds every alias occurring as a whole-word run inside a value in one
+    pass over its tokens ("WPC 80 instant" contains "wpc 80"), however
+    many aliases there are. The confidence of a canonical grows with the
+    share of the value's tokens its aliases cover, and is discounted when
+    another canonical covers as much.
+    """
+
+    AMBIGUITY = 0.6
+
+    def __init__(self, aliases: Dict[str, str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (alias length in tokens, canonical) of the alias ending there
+        self._output: List[Optional[Tuple[int, str]]] = [None]
+        # Per state: nearest state along the failure chain with an output
+        self._next_output: List[int] = [0]
+
+        for alias, canonical in aliases.items():
+            tokens = alias_tokens(alias)
+            if tokens:
+                self._insert(tokens, canonical)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def _insert(self, tokens: Sequence[str], canonical: str) -> None:
+        state = 0
+        for token in tokens:
+            following = self._goto[state].get(token)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][token] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._next_output.append(0)
+            state = following
+        if self._output[state] is None:
+            self._output[state] = (len(tokens), canonical)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, following in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[following] = target if target != following else 0
+                link = self._fail[following]
+                self._next_output[following] = link if self._output[link] is not None else self._next_output[link]
+                queue.append(following)
+
+    def find(self, value: str) -> Optional[Tuple[str, float]]:
+        """Best canonical whose aliases occur in the value, with its confidence."""
+        tokens = alias_tokens(value)
+        if not tokens:
+            return None
+
+        covered: Dict[str, set] = {}
+        state = 0
+        for end, token in enumerate(tokens, start=1):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+
+            match = state if self._output[state] is not None else self._next_output[state]
+            while match:
+                length, canonical = self._output[match]
+                covered.setdefault(canonical, set()).update(range(end - length, end))
+                match = self._next_output[match]
+
+        if not covered:
+            return None
+        ranked = sorted(covered.items(), key=lambda item: len(item[1]), reverse=True)
+        canonical, positions = ranked[0]
+        score = 0.98 * math.sqrt(len(positions) / len(tokens))
+        if len(ranked) > 1 and len(ranked[1][1]) == len(positions):
+            score *= self.AMBIGUITY
+        return canonical, round(score, 4)
+
+
+class CascadeStats:
+    """
+    Per-tier call counts, outcomes and time of computed resolutions.
+
+    Lookups answered by the resolution memo cache never reach the cascade
+    and are not counted here.
+    """
+
+    def __init__(self, tiers: Sequence[str]):
+        self.tiers = tuple(tiers)
+        self.lookups = 0
+        self.unresolved = 0
+        self._calls = {tier: 0 for tier in self.tiers}
+        self._candidates = {tier: 0 for tier in self.tiers}
+        self._exits = {tier: 0 for tier in self.tiers}
+        self._resolved = {tier: 0 for tier in self.tiers}
+        self._seconds = {tier: 0.0 for tier in self.tiers}
+
+    def record(self, tier: str, seconds: float, candidate: bool, exited: bool) -> None:
+        """Account one run of a tier."""
+        self._calls[tier] += 1
+        self._seconds[tier] += seconds
+        if candidate:
+            self._candidates[tier] += 1
+        if exited:
+            self._exits[tier] += 1
+
+    def finish(self, tier: Optional[str]) -> None:
+        """Account the tier whose answer a lookup used, or None if it stayed unresolved."""
+        self.lookups += 1
+        if tier is None:
+            self.unresolved += 1
+        else:
+            self._resolved[tier] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        total_seconds = sum(self._seconds.values())
+        tiers = {}
+        for tier in self.tiers:
+            calls = self._calls[tier]
+            tiers[tier] = {
+                "calls": calls,
+                "candidates": self._candidates[tier],
+                "earlyExits": self._exits[tier],
+                "resolved": self._resolved[tier],
+                "hitRate": round(self._resolved[tier] / calls, 4) if calls else 0.0,
+                "totalMs": round(self._seconds[tier] * 1000, 3),
+                "meanMs": round(self._seconds[tier] * 1000 / calls, 4) if calls else 0.0,
+                "timeShare": round(self._seconds[tier] / total_seconds, 4) if total_seconds else 0.0,
+            }
+        return {
+            "lookups": self.lookups,
+            "unresolved": self.unresolved,
+            "tiers": tiers,
+        }
@@ -0,0 +1,323 @@
+"""
+Scoring worker pool
+Runs gazetteer scoring in CPU-pinned worker processes that keep models loaded
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import lru_cache
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import dedupe
+
+from app.services.model_artifact import (
+    CANONICAL, SETTINGS, ArtifactError, ModelArtifact, artifact_path, decode_json
+)
+
+logger = logging.getLogger(__name__)
+
+
+def load_gazetteer(model_path: Path, model_key: str, key: Optional[bytes] = None) -> Optional[dedupe.Gazetteer]:
+    """
+    Trained gazetteer of a pair with its canonical records indexed, or None without one.
+
+    Reads the pair's model artifact, whose settings and canonical sections
+    are verified before anything is unpickled. Pairs trained before the
+    artifact format still load from their settings file, unless artifacts
+    must be signed (a key is configured).
+    """
+    artifact_file = artifact_path(model_path, model_key)
+    if artifact_file.exists():
+        with ModelArtifact(artifact_file, key) as artifact:
+            sections = artifact.read_many([SETTINGS, CANONICAL])
+        gazetteer = dedupe.StaticGazetteer(io.BytesIO(sections[SETTINGS]), num_cores=0)
+        canonical = decode_json(sections[CANONICAL]) if CANONICAL in sections else {}
+    else:
+        settings_file = model_path / f"{model_key}_settings"
+        if not settings_file.exists():
+            return None
+        if key is not None:
+            raise ArtifactError(f"{settings_file.name} is an unsigned legacy settings file")
+        with open(settings_file, 'rb') as f:
+            gazetteer = dedupe.StaticGazetteer(f, num_cores=0)
+        canonical_file = model_path / f"{model_key}_canonical.json"
+        canonical = {}
+        if canonical_file.exists():
+            with open(canonical_file, 'r') as f:
+                canonical = json.load(f)
+
+    if canonical:
+        gazetteer.index(canonical)
+    return gazetteer
+
+
+def search_best(
+    gazetteer: dedupe.Gazetteer,
+    record: Dict[str, Any],
+    threshold: float
+) -> Optional[Tuple[Dict[str, Any], float]]:
+    """Best canonical record for a messy record and its score, if any reaches threshold."""
+    results = gazetteer.search({'messy': record}, threshold=threshold, n_matches=1)
+    matches = results[0][1] if results else ()
+    if not matches:
+        return None
+    canonical_id, score = matches[0]
+    return gazetteer.indexed_data[canonical_id], float(score)
+
+
+def score_pairs(gazetteer: dedupe.Gazetteer, pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[float]:
+    """Match probability of each (messy, canonical) record pair under a gazetteer's classifier."""
+    features = gazetteer.data_model.distances(pairs)
+    return [float(score) for score in gazetteer.classifier.predict_proba(features)[:, -1]]
+
+
+# Worker process state: model path, artifact key, how many models to keep
+# and model key -> (registry version, gazetteer), least recently used first
+_worker_model_path: Optional[Path] = None
+_worker_artifact_key: Optional[bytes] = None
+_worker_max_models = 0
+_worker_models: "OrderedDict[str, Tuple[int, dedupe.Gazetteer]]" = OrderedDict()
+
+
+def _init_worker(model_path: str, artifact_key: Optional[bytes], cpu: Optional[int], max_models: int) -> None:
+    global _worker_model_path, _worker_artifact_key, _worker_max_models
+    _worker_model_path = Path(model_path)
+    _worker_artifact_key = artifact_key
+    _worker_max_models = max_models
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError as e:
+            logger.warning(f"Cannot pin scoring worker {os.getpid()} to CPU {cpu}: {e}")
+    try:
+        # One worker per core: keep BLAS from starting threads of its own
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:  # pragma: no cover - installed with scikit-learn
+        pass
+
+
+def _worker_gazetteer(model_key: str, version: int) -> dedupe.Gazetteer:
+    cached = _worker_models.get(model_key)
+    if cached is not None and cached[0] == version:
+        _worker_models.move_to_end(model_key)
+        return cached[1]
+    # Free a stale version before loading its replacement
+    _worker_models.pop(model_key, None)
+    gazetteer = load_gazetteer(_worker_model_path, model_key, _worker_artifact_key)
+    if gazetteer is None:
+        raise FileNotFoundError(f"No trained model for {model_key}")
+    _worker_models[model_key] = (version, gazetteer)
+    while len(_worker_models) > _worker_max_models:
+        _worker_models.popitem(last=False)
+    return gazetteer
+
+
+def _worker_release(model_key: str, version: int) -> None:
+    cached = _worker_models.get(model_key)
+    if cached is not None and cached[0] < version:
+        del _worker_models[model_key]
+
+
+def _worker_search(model_key: str, version: int, record: Dict[str, Any], threshold: float):
+    return search_best(_worker_gazetteer(model_key, version), record, threshold)
+
+
+def _worker_score_pairs(model_key: str, version: int, pairs):
+    return score_pairs(_worker_gazetteer(model_key, version), pairs)
+
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+@dataclass(frozen=True)
+class PooledModel:
+    """Reference to a trained model that lives in the scoring workers."""
+    model_key: str
+    # Model registry version; workers reload the model when it changes
+    version: int
+
+
+class _Worker:
+    def __init__(self, model_path: Path, artifact_key: Optional[bytes], cpu: Optional[int], max_models: int):
+        self.model_path = model_path
+        self.artifact_key = artifact_key
+        self.cpu = cpu
+        self.max_models = max_models
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.evictions = 0
+        # Mirror of the process's model cache: model key -> registry version,
+        # least recently used first. Requests run one at a time in submission
+        # order, so it evicts what the process evicts.
+        self.models: "OrderedDict[str, int]" = OrderedDict()
+        self._start()
+
+    def _start(self) -> None:
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(self.model_path), self.artifact_key, self.cpu, self.max_models)
+        )
+        # Spawn the process now rather than on the first request
+        self.executor.submit(_worker_ping)
+
+    def restart(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.models.clear()
+        self.restarts += 1
+        self._start()
+
+    def use(self, model_key: str, version: int) -> None:
+        self.models[model_key] = version
+        self.models.move_to_end(model_key)
+        while len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+            self.evictions += 1
+
+
+class ScoringPool:
+    """
+    Gazetteer scoring in a pool of worker processes.
+
+    Each worker is a single process, optionally pinned to its own CPU, that
+    loads the models it is sent on first use and keeps the max_models most
+    recently used ones, so blocking, predicate evaluation and classification
+    run outside the event loop and in parallel across cores. Requests carry
+    the model's registry version and a worker reloads a model once it
+    changes (after a retrain); release() drops superseded versions right
+    away instead of when the model is next used.
+
+    Model keys have a stable preference order over the workers (rendezvous
+    hashing): a request goes to the first worker in its key's order that
+    has fewer than spill_depth requests in flight, so each model is
+    normally loaded by a single worker, and a hot model spills over to its
+    next worker only while its own is saturated.
+    """
+
+    def __init__(
+        self,
+        model_path: Path,
+        workers: int,
+        pin_cpus: bool = True,
+        spill_depth: int = 4,
+        artifact_key: Optional[bytes] = None,
+        max_models: int = 32
+    ):
+        self.model_path = model_path
+        self.spill_depth = max(1, spill_depth)
+        self.max_models = max(1, max_models)
+
+        cpus: List[Optional[int]] = [None]
+        if pin_cpus and hasattr(os, "sched_getaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))
+        self.workers = [
+            _Worker(model_path, artifact_key, cpus[i % len(cpus)], self.max_models)
+            for i in range(workers)
+        ]
+
+        logger.info(f"Scoring pool started with {workers} worker processes")
+
+    def __len__(self) -> int:
+        return len(self.workers)
+
+    def has_model(self, model_key: str) -> bool:
+        return any(model_key in worker.models for worker in self.workers)
+
+    def release(self, model_key: str, version: int) -> None:
+        """Drop a model's versions older than the given one from the workers that hold them."""
+        for worker in self.workers:
+            cached = worker.models.get(model_key)
+            if cached is not None and cached < version:
+                del worker.models[model_key]
+                worker.executor.submit(_worker_release, model_key, version)
+
+    async def search(
+        self,
+        model: PooledModel,
+        record: Dict[str, Any],
+        threshold: float
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Best canonical record for a messy record, scored in a worker."""
+        return await self._submit(model, _worker_search, record, threshold)
+
+    async def score_pairs(self, model: PooledModel, pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[float]:
+        """Match probabilities of record pairs, scored in a worker."""
+        return await self._submit(model, _worker_score_pairs, pairs)
+
+    async def _submit(self, model: PooledModel, fn, *args):
+        worker = self._worker_for(model.model_key)
+        worker.pending += 1
+        worker.use(model.model_key, model.version)
+        executor = worker.executor
+        try:
+            result = await asyncio.wrap_future(
+                executor.submit(fn, model.model_key, model.version, *args)
+            )
+        except BrokenProcessPool:
+            worker.failed += 1
+            # Requests in flight on a dead worker all fail; restart it once
+            if worker.executor is executor:
+                logger.error(f"Scoring worker for CPU {worker.cpu} died, restarting it")
+                worker.restart()
+            raise
+        except Exception:
+            worker.failed += 1
+            raise
+        finally:
+            worker.pending -= 1
+        worker.completed += 1
+        return result
+
+    def _worker_for(self, model_key: str) -> _Worker:
+        ranking = _ranking(model_key, len(self.workers))
+        for i in ranking:
+            if self.workers[i].pending < self.spill_depth:
+                return self.workers[i]
+        return min((self.workers[i] for i in ranking), key=lambda worker: worker.pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self.workers),
+            "spillDepth": self.spill_depth,
+            "maxModels": self.max_models,
+            "perWorker": [
+                {
+                    "cpu": worker.cpu,
+                    "pending": worker.pending,
+                    "completed": worker.completed,
+                    "failed": worker.failed,
+                    "restarts": worker.restarts,
+                    "models": len(worker.models),
+                    "evictions": worker.evictions,
+                }
+                for worker in self.workers
+            ],
+        }
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=65536)
+def _ranking(model_key: str, workers: int) -> Tuple[int, ...]:
+    """Rendezvous order of the workers for a model key."""
+    return tuple(sorted(
+        range(workers),
+        key=lambda i: zlib.crc32(f"{i}:{model_key}".encode("utf-8")),
+        reverse=True
+    ))
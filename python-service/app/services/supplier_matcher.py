@@ -0,0 +1,309 @@
+"""
+Supplier resolution against a tenant's known counterparties
+Legal-form-aware name normalization with token-blocked candidate lookup
+"""
+import logging
+import math
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Legal-form suffixes (as normalized token sequences) and their canonical form
+LEGAL_FORMS = {
+    ("bv",): "bv",
+    ("besloten", "vennootschap"): "bv",
+    ("nv",): "nv",
+    ("vof",): "vof",
+    ("cv",): "cv",
+    ("bvba",): "bv",
+    ("sprl",): "bv",
+    ("gmbh",): "gmbh",
+    ("gmbh", "co", "kg"): "gmbh & co kg",
+    ("gmbh", "und", "co", "kg"): "gmbh & co kg",
+    ("co", "kg"): "kg",
+    ("kg",): "kg",
+    ("ag",): "ag",
+    ("ug",): "ug",
+    ("ltd",): "ltd",
+    ("limited",): "ltd",
+    ("pty", "ltd"): "pty ltd",
+    ("plc",): "plc",
+    ("llc",): "llc",
+    ("llp",): "llp",
+    ("inc",): "inc",
+    ("incorporated",): "inc",
+    ("corp",): "corp",
+    ("corporation",): "corp",
+    ("co",): "co",
+    ("company",): "co",
+    ("sa",): "sa",
+    ("sas",): "sas",
+    ("sarl",): "sarl",
+    ("srl",): "srl",
+    ("spa",): "spa",
+    ("sl",): "sl",
+    ("oy",): "oy",
+    ("ab",): "ab",
+    ("as",): "as",
+    ("aps",): "aps",
+    ("sp", "z", "o", "o"): "sp zoo",
+    ("sp", "z", "oo"): "sp zoo",
+    ("sp", "zoo"): "sp zoo",
+}
+_MAX_FORM_LENGTH = max(len(form) for form in LEGAL_FORMS)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_company(name: str) -> Tuple[Tuple[str, ...], Optional[str]]:
+    """
+    Split a company name into its core tokens and canonical legal form.
+
+    "Acme Dairy B.V." and "ACME dairy bv" both give (("acme", "dairy"), "bv").
+    Only trailing legal forms are stripped, and never the whole name.
+    """
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    # Join dotted abbreviations so "b.v." reads as "bv"
+    text = re.sub(r"\b([a-z])\.(?=[a-z]\.)", r"\1", text).replace("&", " ")
+    tokens = _TOKEN.findall(text)
+    if tokens and tokens[0] == "the":
+        tokens = tokens[1:]
+
+    legal_form = None
+    for length in range(min(_MAX_FORM_LENGTH, len(tokens) - 1), 0, -1):
+        form = LEGAL_FORMS.get(tuple(tokens[-length:]))
+        if form is not None:
+            legal_form = form
+            tokens = tokens[:-length]
+            break
+
+    return tuple(tokens), legal_form
+
+
+class SupplierMatcher:
+    """
+    Indexed matcher over a target tenant's counterparties.
+
+    Every counterparty name and alias is indexed under its normalized core
+    (exact lookup), its core with spaces removed, and blocking keys: each
+    core token and its 4-character prefix. A lookup only scores the
+    counterparties sharing a blocking key with the query, ranked by IDF
+    overlap first, so its cost is independent of the number of
+    counterparties.
+
+    Scores combine IDF-weighted token overlap with character similarity of
+    the cores, and are discounted when both names carry different legal
+    forms (an "Acme B.V." is not an "Acme GmbH").
+
+    Aliases learned from corrections are also kept by normalized core and
+    checked first: a user's correction settles the names it covers, even
+    where two counterparties would otherwise tie.
+    """
+
+    LEGAL_FORM_MISMATCH = 0.85
+    AMBIGUITY = 0.6
+    MAX_CANDIDATES = 32
+    # Blocking keys shared by more names than this only rank, never add, candidates
+    MAX_BLOCK_SIZE = 1000
+
+    def __init__(self, counterparties: List[Dict[str, Any]]):
+        self.counterparties: List[Dict[str, Any]] = []
+        # Per indexed name: (counterparty index, core tokens, core text, legal form)
+        self._names: List[Tuple[int, Tuple[str, ...], str, Optional[str]]] = []
+        self._exact: Dict[str, List[int]] = {}
+        self._compact: Dict[str, List[int]] = {}
+        self._blocks: Dict[str, List[int]] = {}
+        self._idf: Dict[str, float] = {}
+        # Learned alias core -> (counterparty index, legal form of the alias)
+        self._learned: Dict[str, Tuple[int, Optional[str]]] = {}
+
+        for counterparty in counterparties:
+            self._add_counterparty(counterparty)
+        self._compute_idf()
+
+    def __len__(self) -> int:
+        return len(self.counterparties)
+
+    def _add_counterparty(self, counterparty: Dict[str, Any]) -> None:
+        index = len(self.counterparties)
+        entry = {
+            "name": counterparty["name"],
+            "relationId": counterparty.get("relationId"),
+            "tenantCode": counterparty.get("tenantCode"),
+            "aliases": [],
+            "learnedAliases": [],
+        }
+        self.counterparties.append(entry)
+        self._index_name(index, entry["name"])
+        for alias in counterparty.get("aliases") or []:
+            if self._index_name(index, alias):
+                entry["aliases"].append(alias)
+        for alias in counterparty.get("learnedAliases") or []:
+            self._learn(index, alias)
+
+    def _indexed(self, index: int, core: str) -> bool:
+        """Whether a name with this core is indexed for the counterparty."""
+        return any(self._names[name_id][0] == index for name_id in self._exact.get(core, ()))
+
+    def _index_name(self, index: int, name: str, default_form: Optional[str] = None) -> bool:
+        """
+        Index a name of a counterparty; False if it adds nothing (empty, or a
+        known core). A name without a legal form is indexed with default_form.
+        """
+        tokens, legal_form = normalize_company(name)
+        legal_form = legal_form or default_form
+        core = " ".join(tokens)
+        if not tokens or self._indexed(index, core):
+            return False
+        name_id = len(self._names)
+        self._names.append((index, tokens, core, legal_form))
+        self._exact.setdefault(core, []).append(name_id)
+        self._compact.setdefault(core.replace(" ", ""), []).append(name_id)
+        for key in self._block_keys(tokens):
+            self._blocks.setdefault(key, []).append(name_id)
+        return True
+
+    def _learn(self, index: int, alias: str) -> bool:
+        """Record a learned alias of a counterparty; False if it was already known."""
+        tokens, legal_form = normalize_company(alias)
+        if not tokens:
+            return False
+        core = " ".join(tokens)
+        previous = self._learned.get(core)
+        if previous is not None and previous[0] == index:
+            return False
+        if previous is not None:
+            # A newer correction moves the alias to another counterparty
+            learned = self.counterparties[previous[0]]["learnedAliases"]
+            learned[:] = [name for name in learned if " ".join(normalize_company(name)[0]) != core]
+        self._learned[core] = (index, legal_form)
+        self.counterparties[index]["learnedAliases"].append(alias)
+        # Indexed with the counterparty's legal form, so a bare learned name
+        # does not become an exact match under a different legal form
+        self._index_name(index, alias, normalize_company(self.counterparties[index]["name"])[1])
+        return True
+
+    @staticmethod
+    def _block_keys(tokens: Tuple[str, ...]) -> Set[str]:
+        keys = set(tokens)
+        keys.update(f"{token[:4]}*" for token in tokens if len(token) > 4)
+        return keys
+
+    def _compute_idf(self) -> None:
+        n = max(len(self._names), 1)
+        document_frequency: Dict[str, int] = {}
+        for _, tokens, _, _ in self._names:
+            for token in set(tokens):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        self._idf = {token: math.log((n + 1) / (df + 0.5)) for token, df in document_frequency.items()}
+        self._default_idf = math.log((n + 1) / 0.5)
+
+    def add_alias(self, alias: str, name: str) -> bool:
+        """
+        Teach the matcher that alias refers to the counterparty called name,
+        adding the counterparty if it is unknown. Returns False if the alias
+        was already known.
+        """
+        index = next((i for i, counterparty in enumerate(self.counterparties) if counterparty["name"] == name), None)
+        if index is None:
+            index = len(self.counterparties)
+            self._add_counterparty({"name": name})
+        if not self._learn(index, alias):
+            return False
+        self._compute_idf()
+        return True
+
+    def match(self, value: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Best counterparty for a supplier value, with its confidence."""
+        tokens, legal_form = normalize_company(value)
+        if not tokens:
+            return None
+        core = " ".join(tokens)
+
+        # A learned alias covers the same name with its own legal form, the
+        # counterparty's, or none ("Acme GmbH" is not taught by "ACME -> Acme B.V.")
+        learned = self._learned.get(core)
+        if learned is not None:
+            index, alias_form = learned
+            counterparty = self.counterparties[index]
+            if legal_form in (None, alias_form, normalize_company(counterparty["name"])[1]):
+                return counterparty, 1.0
+
+        exact = self._exact.get(core)
+        if exact:
+            return self._best_of(exact, lambda name_id: self._form_factor(legal_form, name_id))
+
+        compact = self._compact.get(core.replace(" ", ""))
+        if compact:
+            return self._best_of(compact, lambda name_id: 0.97 * self._form_factor(legal_form, name_id))
+
+        # Candidates sharing a blocking key, ranked by shared IDF weight;
+        # oversized blocks (common words) are scanned only if nothing else matches
+        blocks = sorted(
+            ((self._blocks[key], self._idf.get(key.rstrip("*"), self._default_idf))
+             for key in self._block_keys(tokens) if key in self._blocks),
+            key=lambda block: len(block[0])
+        )
+        overlap: Dict[int, float] = {}
+        for name_ids, weight in blocks:
+            if overlap and len(name_ids) > self.MAX_BLOCK_SIZE:
+                members = set(name_ids)
+                for name_id in overlap:
+                    if name_id in members:
+                        overlap[name_id] += weight
+                continue
+            for name_id in name_ids:
+                overlap[name_id] = overlap.get(name_id, 0.0) + weight
+        if not overlap:
+            return None
+
+        candidates = sorted(overlap, key=overlap.get, reverse=True)[:self.MAX_CANDIDATES]
+        return self._best_of(candidates, lambda name_id: self._score(tokens, core, legal_form, name_id))
+
+    def _best_of(self, name_ids, score_fn) -> Tuple[Dict[str, Any], float]:
+        scores = {}
+        for name_id in name_ids:
+            index = self._names[name_id][0]
+            scores[index] = max(scores.get(index, 0.0), score_fn(name_id))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best, score = ranked[0]
+        # Two counterparties fit equally well ("Acme" for Acme B.V. and Acme GmbH)
+        if len(ranked) > 1 and ranked[1][1] >= score - 1e-9:
+            score *= self.AMBIGUITY
+        return self.counterparties[best], round(score, 4)
+
+    def _form_factor(self, legal_form: Optional[str], name_id: int) -> float:
+        candidate_form = self._names[name_id][3]
+        if legal_form and candidate_form and legal_form != candidate_form:
+            return self.LEGAL_FORM_MISMATCH
+        return 1.0
+
+    def _score(self, tokens: Tuple[str, ...], core: str, legal_form: Optional[str], name_id: int) -> float:
+        _, candidate_tokens, candidate_core, _ = self._names[name_id]
+
+        # IDF-weighted overlap where misspelled tokens count by their similarity
+        query_weights = {t: self._idf.get(t, self._default_idf) for t in tokens}
+        candidate_weights = {t: self._idf.get(t, self._default_idf) for t in candidate_tokens}
+        shared = 0.0
+        for token, weight in query_weights.items():
+            if token in candidate_weights:
+                shared += weight
+                continue
+            similarity = max(SequenceMatcher(None, token, other).ratio() for other in candidate_tokens)
+            if similarity >= 0.8:
+                shared += similarity * min(weight, max(candidate_weights.values()))
+        token_score = min(1.0, shared / math.sqrt(sum(query_weights.values()) * sum(candidate_weights.values())))
+
+        char_score = SequenceMatcher(None, core, candidate_core).ratio()
+        # Capped below exact matches, which score 1.0
+        return 0.95 * (0.4 * token_score + 0.6 * char_score) * self._form_factor(legal_form, name_id)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [
+            {**counterparty, "aliases": list(counterparty["aliases"]),
+             "learnedAliases": list(counterparty["learnedAliases"])}
+            for counterparty in self.counterparties
+        ]
@@ -0,0 +1,115 @@
+"""
+Training coordination
+Serializes model retraining per tenant pair so pairs can train concurrently
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+
+class TrainingCoordinator:
+    """
+    Per-pair async locks around retraining.
+
+    At most one retrain runs for a (source, target) pair at a time, while
+    different pairs never wait on each other. Callers that only want a
+    retrain if none is running (feedback-triggered retrains) pass
+    wait=False and are skipped instead of queueing a redundant run; the
+    labels they would have trained on stay pending for the next trigger.
+    Locks are dropped once nobody holds or waits for them.
+
+    start() runs such a retrain as a background task instead, so the
+    request that triggered it does not wait for the training; close()
+    cancels the ones still running at shutdown.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Pair, asyncio.Lock] = {}
+        self._users: Dict[Pair, int] = {}
+        self._tasks: Dict[Pair, asyncio.Task] = {}
+        self.runs = 0
+        self.skipped = 0
+
+    def is_training(self, source_tenant: str, target_tenant: str) -> bool:
+        lock = self._locks.get((source_tenant, target_tenant))
+        return lock is not None and lock.locked()
+
+    async def run(
+        self,
+        source_tenant: str,
+        target_tenant: str,
+        fn: Callable[[], Awaitable[Any]],
+        wait: bool = True
+    ) -> Optional[Any]:
+        """
+        Run fn while holding the pair's training lock.
+
+        Returns fn's result, or None when wait is False and a retrain for
+        the pair is already in progress.
+        """
+        pair = (source_tenant, target_tenant)
+        lock = self._locks.get(pair)
+        if lock is not None and lock.locked() and not wait:
+            self.skipped += 1
+            logger.info(f"Retraining already in progress for {source_tenant} -> {target_tenant}, skipping")
+            return None
+
+        if lock is None:
+            lock = self._locks[pair] = asyncio.Lock()
+        self._users[pair] = self._users.get(pair, 0) + 1
+        try:
+            async with lock:
+                self.runs += 1
+                return await fn()
+        finally:
+            self._users[pair] -= 1
+            if self._users[pair] == 0:
+                del self._users[pair]
+                del self._locks[pair]
+
+    def start(self, source_tenant: str, target_tenant: str, fn: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Run fn under the pair's lock in a background task, unless a retrain
+        for the pair is already started or in progress.
+
+        Returns whether a task was started.
+        """
+        pair = (source_tenant, target_tenant)
+        if pair in self._tasks or self.is_training(source_tenant, target_tenant):
+            self.skipped += 1
+            logger.info(f"Retraining already in progress for {source_tenant} -> {target_tenant}, skipping")
+            return False
+
+        task = asyncio.create_task(self.run(source_tenant, target_tenant, fn, wait=False))
+        self._tasks[pair] = task
+        task.add_done_callback(lambda done: self._finished(pair, done))
+        return True
+
+    def _finished(self, pair: Pair, task: asyncio.Task) -> None:
+        if self._tasks.get(pair) is task:
+            del self._tasks[pair]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"Background retraining failed for {pair[0]} -> {pair[1]}: {task.exception()}",
+                exc_info=task.exception()
+            )
+
+    async def close(self) -> None:
+        """Cancel background retrains and wait for them to stop."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "training": sorted(f"{s}_{t}" for (s, t), lock in self._locks.items() if lock.locked()),
+            "background": len(self._tasks),
+            "waiting": sum(self._users.values()) - sum(1 for lock in self._locks.values() if lock.locked()),
+            "runs": self.runs,
+            "skipped": self.skipped
+        }
@@ -2,13 +2,19 @@
 Training Service for Active Learning
 Processes user feedback and retrains dedupe models
 """
+import asyncio
 import os
-import json
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from pathlib import Path
 
+from app.services.model_overlay import SHARED_SOURCE
+from app.services.negative_miner import NegativeMiner
+from app.services.records import LabelledPair, intern_value
+from app.services.training_coordinator import TrainingCoordinator
+from app.services.training_store import TrainingStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,6 +27,19 @@ class TrainingService:
 
         self.min_samples_for_training = int(os.getenv("DEDUPE_MIN_TRAINING_SAMPLES", "50"))
         self.retrain_threshold = int(os.getenv("RETRAIN_THRESHOLD", "10"))
+        # Near-miss negatives mined per label, and how similar they must be
+        self.hard_negatives_per_label = int(os.getenv("HARD_NEGATIVES_PER_LABEL", "2"))
+        self.hard_negative_min_similarity = float(os.getenv("HARD_NEGATIVE_MIN_SIMILARITY", "0.2"))
+        # Warm-start retrains from the previous model instead of training from scratch
+        self.incremental_training = os.getenv("INCREMENTAL_TRAINING", "true").lower() == "true"
+
+        self.store = TrainingStore(
+            Path(os.getenv("TRAINING_DB_PATH") or self.training_data_path / "training.db"),
+            conflict_policy=os.getenv("LABEL_CONFLICT_POLICY", "latest")
+        )
+        self.store.migrate_jsonl(self.training_data_path)
+        # One retrain at a time per tenant pair (per target tenant with shared models)
+        self.coordinator = TrainingCoordinator()
 
         self.dedupe_service = dedupe_service
 
@@ -28,6 +47,29 @@ class TrainingService:
         """Set the dedupe service for model retraining."""
         self.dedupe_service = dedupe_service
 
+    @property
+    def shared_models(self) -> bool:
+        """Whether models are shared per target tenant rather than trained per pair."""
+        return self.dedupe_service is not None and self.dedupe_service.model_sharing == "target"
+
+    def _model_source(self, source_tenant: str) -> str:
+        """Source tenant code of the model that a pair's labels train."""
+        return SHARED_SOURCE if self.shared_models else source_tenant
+
+    def _count_changed_labels(self, source_tenant: str, target_tenant: str, since_last_attempt: bool = False) -> int:
+        """
+        Untrained label changes of the model that a pair's labels train;
+        with since_last_attempt, only those made after the model's last
+        training run, so labels a failed run could not train on do not
+        trigger it again.
+        """
+        since = 0
+        if since_last_attempt:
+            since = self.store.attempted_snapshot(self._model_source(source_tenant), target_tenant)
+        if self.shared_models:
+            return self.store.count_changed_target_labels(target_tenant, since)
+        return self.store.count_changed_labels(source_tenant, target_tenant, since)
+
     async def process_feedback(
         self,
         source_tenant: str,
@@ -62,25 +104,44 @@ class TrainingService:
                 "correctedValue": corrected_value
             }
 
-            # Save feedback to training data file
-            feedback_file = self.training_data_path / f"{source_tenant}_{target_tenant}_feedback.jsonl"
-
-            with open(feedback_file, 'a') as f:
-                f.write(json.dumps(feedback_entry) + '\n')
+            # Save feedback to the training store, coalescing it into the pair's labels
+            changed = self.store.add_feedback([feedback_entry])
 
             logger.info(
                 f"Feedback saved: {source_tenant} -> {target_tenant}, "
                 f"{source_field}:{source_value} = {corrected_value}"
             )
 
+            # A shared model's source overlay applies the correction at once
+            if self.shared_models:
+                self.dedupe_service.add_overlay_alias(
+                    source_tenant, target_tenant, target_field, source_value, corrected_value
+                )
             # Update the knowledge base immediately for product corrections
             if target_field == 'product' and self.dedupe_service:
                 self.dedupe_service.add_to_knowledge_base(source_value, corrected_value)
-
-            # Check if we have enough feedback to retrain
-            feedback_count = self._count_feedback_entries(feedback_file)
-            if feedback_count >= self.retrain_threshold and feedback_count % self.retrain_threshold == 0:
-                await self._retrain_model(source_tenant, target_tenant)
+            # and learn supplier corrections as counterparty aliases
+            if target_field == 'supplier' and self.dedupe_service:
+                self.dedupe_service.add_supplier_alias(target_tenant, source_value, corrected_value)
+
+            # Retrain in the background once enough labels carry new
+            # information since the last attempt; repeats of a known
+            # correction never count. A retrain already running for the pair
+            # picks these labels up on the next trigger instead.
+            if changed and self._count_changed_labels(
+                source_tenant, target_tenant, since_last_attempt=True
+            ) >= self.retrain_threshold:
+                self.coordinator.start(
+                    self._model_source(source_tenant),
+                    target_tenant,
+                    lambda: self._retrain_model(
+                        source_tenant,
+                        target_tenant,
+                        min_samples=self.min_samples_for_training,
+                        min_changed=self.retrain_threshold,
+                        since_last_attempt=True
+                    )
+                )
 
             return True
 
@@ -88,165 +149,205 @@ class TrainingService:
             logger.error(f"Failed to process feedback: {str(e)}", exc_info=True)
             return False
 
-    def _count_feedback_entries(self, feedback_file: Path) -> int:
-        """Count number of feedback entries in file"""
-        if not feedback_file.exists():
-            return 0
-
-        with open(feedback_file, 'r') as f:
-            return sum(1 for _ in f)
-
-    def _load_feedback(self, feedback_file: Path) -> List[Dict[str, Any]]:
-        """Load all feedback entries from file."""
-        entries = []
-        if feedback_file.exists():
-            with open(feedback_file, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        entries.append(json.loads(line))
-        return entries
-
-    async def _retrain_model(self, source_tenant: str, target_tenant: str) -> bool:
-        """
-        Retrain dedupe model with accumulated feedback.
+    async def _retrain_model(
+        self,
+        source_tenant: str,
+        target_tenant: str,
+        min_samples: int,
+        min_changed: int = 1,
+        since_last_attempt: bool = False
+    ) -> bool:
         """
-        logger.info(f"Starting model retraining for {source_tenant} -> {target_tenant}")
+        Retrain dedupe model with all labels collected for the pair.
+
+        Labels are the coalesced history of every correction, so each
+        retrain sees the full history while only changed labels add cost.
+        Must run under the pair's coordinator lock; thresholds are passed
+        per call and re-checked here, since a run that held the lock before
+        us may already have trained on the labels that triggered this one.
+
+        With shared models this retrains the target tenant's model on the
+        labels of all its sources (under the target's lock).
 
-        feedback_file = self.training_data_path / f"{source_tenant}_{target_tenant}_feedback.jsonl"
-        feedback_entries = self._load_feedback(feedback_file)
+        Args:
+            source_tenant: Source tenant code
+            target_tenant: Target tenant code
+            min_samples: Minimum number of labels to train on
+            min_changed: Minimum number of untrained label changes
+            since_last_attempt: Count only changes made after the model's last
+                training run, successful or not
+        """
+        model_source = self._model_source(source_tenant)
+        sources = self.store.label_sources(target_tenant) if self.shared_models else [source_tenant]
+        snapshots = {source: self.store.label_snapshot(source, target_tenant) for source in sources}
+        labels_by_source = {source: self.store.load_labels(source, target_tenant) for source in sources}
+        labels = [label for source_labels in labels_by_source.values() for label in source_labels]
+        changed_labels = self._count_changed_labels(source_tenant, target_tenant, since_last_attempt)
+
+        if changed_labels < min_changed:
+            logger.info(
+                f"No retraining needed for {model_source} -> {target_tenant}: "
+                f"{changed_labels} changed labels < {min_changed}"
+            )
+            return False
 
-        if len(feedback_entries) < self.min_samples_for_training:
+        if len(labels) < min_samples:
             logger.info(
-                f"Not enough samples for training: {len(feedback_entries)} < {self.min_samples_for_training}"
+                f"Not enough samples for training: {len(labels)} < {min_samples}"
             )
             return False
 
-        # Convert feedback to training format
-        training_data = self._convert_to_training_format(feedback_entries)
+        logger.info(f"Starting model retraining for {model_source} -> {target_tenant}")
+
+        # Convert labels to training format, tagging a shared model's items with their source
+        training_data = []
+        for source, source_labels in labels_by_source.items():
+            # Mining negatives over a large catalog is CPU-bound
+            items = await asyncio.to_thread(self._convert_to_training_format, source_labels, target_tenant)
+            if self.shared_models:
+                for item in items:
+                    item.source = source
+            training_data.extend(items)
 
         if not self.dedupe_service:
             logger.warning("No dedupe service available for retraining")
             return False
 
         # Train the model
-        model_key = f"{source_tenant}_{target_tenant}"
-        result = await self.dedupe_service.train_model(model_key, training_data)
+        model_key = f"{model_source}_{target_tenant}"
+        run_id = self.store.start_run(model_source, target_tenant, max(snapshots.values(), default=0))
+        try:
+            result = await self.dedupe_service.train_model(
+                model_key,
+                training_data,
+                incremental=self.incremental_training,
+                min_samples=min_samples
+            )
+        except BaseException as e:
+            self.store.finish_run(run_id, {"success": False, "message": str(e) or type(e).__name__}, len(training_data))
+            raise
+        self.store.finish_run(run_id, result, len(training_data))
 
         if result["success"]:
-            logger.info(f"Model retrained successfully for {model_key}")
-            # Archive the processed feedback
-            await self._archive_feedback(feedback_file, source_tenant, target_tenant)
+            logger.info(f"Model retrained successfully for {model_key} ({changed_labels} changed labels)")
+            for source, snapshot in snapshots.items():
+                self.store.mark_trained(source, target_tenant, snapshot, run_id)
+            await self._calibrate_catalogs(target_tenant, labels)
         else:
             logger.error(f"Model retraining failed: {result['message']}")
 
         return result["success"]
 
+    async def _calibrate_catalogs(self, target_tenant: str, labels: List[Dict[str, Any]]) -> None:
+        """Refit the target's catalog score calibration from the labels of a retrain."""
+        by_field: Dict[str, List[tuple]] = {}
+        for label in labels:
+            by_field.setdefault(label.get("targetField", "product"), []).append(
+                (label["sourceValue"], label["correctedValue"])
+            )
+
+        for target_field, pairs in by_field.items():
+            if target_field in self.dedupe_service.match_fields:
+                await self.dedupe_service.calibrate_catalog(target_tenant, target_field, pairs)
+
     def _convert_to_training_format(
         self,
-        feedback_entries: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+        labels: List[Dict[str, Any]],
+        target_tenant: Optional[str] = None
+    ) -> List[LabelledPair]:
         """
-        Convert feedback entries to dedupe training format.
-        Groups by field type and creates messy/canonical pairs.
+        Convert resolved labels to dedupe training format.
+        Each label is one weighted positive; corrections it overruled
+        are known negatives. A label's examples share its messy values.
         """
         training_data = []
 
-        for entry in feedback_entries:
-            target_field = entry.get("targetField", "product")
-
-            training_item = {
-                "messy": {
-                    target_field: entry["sourceValue"]
-                },
-                "canonical": {
-                    target_field: entry["correctedValue"]
-                },
-                "is_match": True  # User corrections are positive examples
-            }
+        for label in labels:
+            target_field = intern_value(label.get("targetField", "product"))
+            messy = {target_field: label["sourceValue"]}
 
-            training_data.append(training_item)
+            # User corrections are positive examples
+            training_data.append(
+                LabelledPair(messy, {target_field: label["correctedValue"]}, weight=label.get("weight", 1.0))
+            )
+
+            for rejected_value in label.get("rejectedValues", []):
+                training_data.append(LabelledPair(messy, {target_field: rejected_value}, is_match=False))
 
-        # Add some synthetic negative examples if we have enough data
-        if len(training_data) >= 10:
-            training_data.extend(self._generate_negative_examples(feedback_entries))
+        # Add mined near-miss negatives if we have enough data
+        if len(labels) >= 10:
+            training_data.extend(self._generate_negative_examples(labels, target_tenant))
 
         return training_data
 
     def _generate_negative_examples(
         self,
-        feedback_entries: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+        labels: List[Dict[str, Any]],
+        target_tenant: Optional[str] = None
+    ) -> List[LabelledPair]:
         """
-        Generate negative training examples by pairing non-matching entries.
+        Generate hard negative examples: for each label, the canonical
+        values most similar to its source value that are not its own
+        canonical value, drawn from the pair's labels and the target
+        tenant's catalog.
         """
         negative_examples = []
-        unique_values = set()
-
-        for entry in feedback_entries:
-            unique_values.add((entry["sourceValue"], entry["correctedValue"]))
 
-        values_list = list(unique_values)
-
-        # Create some non-matching pairs
-        for i, (source1, target1) in enumerate(values_list):
-            for source2, target2 in values_list[i+1:i+3]:  # Limit pairs
-                if target1 != target2:  # Different canonical values
-                    negative_examples.append({
-                        "messy": {"product": source1},
-                        "canonical": {"product": target2},
-                        "is_match": False
-                    })
-
-        return negative_examples[:len(feedback_entries) // 2]  # Limit negatives
-
-    async def _archive_feedback(
-        self,
-        feedback_file: Path,
-        source_tenant: str,
-        target_tenant: str
-    ) -> None:
-        """Archive processed feedback after successful training."""
-        if not feedback_file.exists():
-            return
-
-        archive_dir = self.training_data_path / "archive"
-        archive_dir.mkdir(exist_ok=True)
-
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        archive_file = archive_dir / f"{source_tenant}_{target_tenant}_{timestamp}.jsonl"
-
-        # Move feedback to archive
-        feedback_file.rename(archive_file)
-        logger.info(f"Archived feedback to {archive_file}")
+        by_field: Dict[str, List[Dict[str, Any]]] = {}
+        for label in labels:
+            by_field.setdefault(label.get("targetField", "product"), []).append(label)
+
+        for target_field, field_labels in by_field.items():
+            canonical_values = sorted({label["correctedValue"] for label in field_labels})
+            miners = [NegativeMiner(canonical_values)]
+            if self.dedupe_service and target_tenant and target_field in self.dedupe_service.match_fields:
+                catalog_miner = self.dedupe_service.catalog_miner(target_tenant, target_field)
+                if catalog_miner is not None:
+                    miners.append(catalog_miner)
+
+            for label in field_labels:
+                exclude = [label["correctedValue"], *label.get("rejectedValues", [])]
+                messy = {target_field: label["sourceValue"]}
+                candidates: Dict[str, float] = {}
+                for miner in miners:
+                    for candidate, score in miner.similar(
+                        label["sourceValue"],
+                        self.hard_negatives_per_label,
+                        exclude=exclude,
+                        min_similarity=self.hard_negative_min_similarity
+                    ):
+                        candidates[candidate] = max(score, candidates.get(candidate, 0.0))
+                best = sorted(candidates.items(), key=lambda item: -item[1])[:self.hard_negatives_per_label]
+                for candidate, _ in best:
+                    negative_examples.append(LabelledPair(messy, {target_field: candidate}, is_match=False))
+
+        return negative_examples
 
     def get_training_stats(self, source_tenant: str, target_tenant: str) -> Dict[str, Any]:
         """Get training statistics for a tenant pair"""
-        feedback_file = self.training_data_path / f"{source_tenant}_{target_tenant}_feedback.jsonl"
-
-        if not feedback_file.exists():
-            stats = {
-                "feedbackCount": 0,
-                "lastUpdated": None,
-                "readyForTraining": False,
-                "samplesNeeded": self.min_samples_for_training
-            }
-        else:
-            feedback_count = self._count_feedback_entries(feedback_file)
-            last_modified = datetime.fromtimestamp(
-                feedback_file.stat().st_mtime
-            ).isoformat()
-
-            stats = {
-                "feedbackCount": feedback_count,
-                "lastUpdated": last_modified,
-                "readyForTraining": feedback_count >= self.min_samples_for_training,
-                "samplesNeeded": max(0, self.min_samples_for_training - feedback_count)
-            }
+        store_stats = self.store.get_stats(source_tenant, target_tenant)
+        feedback_count = store_stats["pendingFeedback"]
+
+        stats = {
+            "feedbackCount": feedback_count,
+            "lastUpdated": store_stats["lastFeedbackAt"],
+            "readyForTraining": feedback_count >= self.min_samples_for_training,
+            "samplesNeeded": max(0, self.min_samples_for_training - feedback_count),
+            "totalFeedback": store_stats["totalFeedback"],
+            "feedbackByField": store_stats["feedbackByField"],
+            "labelledPairs": store_stats["labelledPairs"],
+            "conflictingLabels": store_stats["conflictingLabels"],
+            "changedLabels": store_stats["changedLabels"],
+            "lastTrainingRun": (
+                self.store.last_run(SHARED_SOURCE, target_tenant) if self.shared_models
+                else store_stats["lastTrainingRun"]
+            ),
+            "trainingInProgress": self.coordinator.is_training(self._model_source(source_tenant), target_tenant)
+        }
 
         # Add model stats if dedupe service is available
         if self.dedupe_service:
-            model_key = f"{source_tenant}_{target_tenant}"
-            model_stats = self.dedupe_service.get_model_stats(model_key)
+            model_stats = self.dedupe_service.get_pair_model_stats(source_tenant, target_tenant)
             stats["modelExists"] = model_stats.get("exists", False)
             stats["modelCached"] = model_stats.get("cached", False)
 
@@ -255,25 +356,22 @@ class TrainingService:
     async def force_retrain(self, source_tenant: str, target_tenant: str) -> Dict[str, Any]:
         """
         Force model retraining regardless of sample count.
-        Useful for admin-triggered retraining.
+        Useful for admin-triggered retraining. Waits for a retrain already
+        running for the pair rather than racing it.
         """
-        feedback_file = self.training_data_path / f"{source_tenant}_{target_tenant}_feedback.jsonl"
-        feedback_count = self._count_feedback_entries(feedback_file)
+        feedback_count = self._count_changed_labels(source_tenant, target_tenant)
 
         if feedback_count == 0:
             return {
                 "success": False,
-                "message": "No feedback available for training"
+                "message": "No new labels available for training"
             }
 
-        # Temporarily lower the threshold
-        original_threshold = self.min_samples_for_training
-        self.min_samples_for_training = 1
-
-        success = await self._retrain_model(source_tenant, target_tenant)
-
-        # Restore threshold
-        self.min_samples_for_training = original_threshold
+        success = await self.coordinator.run(
+            self._model_source(source_tenant),
+            target_tenant,
+            lambda: self._retrain_model(source_tenant, target_tenant, min_samples=1)
+        )
 
         return {
             "success": success,
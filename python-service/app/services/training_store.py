@@ -0,0 +1,505 @@
+"""
+Training data store
+Embedded SQLite (WAL) store for feedback, consolidated labelled pairs and training runs
+"""
+import json
+import logging
+import math
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_tenant TEXT NOT NULL,
+    target_tenant TEXT NOT NULL,
+    source_field TEXT,
+    source_value TEXT NOT NULL,
+    target_field TEXT NOT NULL,
+    corrected_value TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    -- Set once a training run has consumed the entry (replaces archiving)
+    training_run_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS feedback_pair_pending_idx
+    ON feedback (source_tenant, target_tenant, training_run_id, id);
+CREATE INDEX IF NOT EXISTS feedback_pair_field_time_idx
+    ON feedback (source_tenant, target_tenant, target_field, created_at);
+
+-- Every distinct correction of a source value, with how often and when it was given
+CREATE TABLE IF NOT EXISTS label_votes (
+    source_tenant TEXT NOT NULL,
+    target_tenant TEXT NOT NULL,
+    target_field TEXT NOT NULL,
+    source_value TEXT NOT NULL,
+    corrected_value TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    last_seen TEXT,
+    PRIMARY KEY (source_tenant, target_tenant, target_field, source_value, corrected_value)
+);
+
+-- One resolved label per (pair, field, source value)
+CREATE TABLE IF NOT EXISTS labelled_pairs (
+    source_tenant TEXT NOT NULL,
+    target_tenant TEXT NOT NULL,
+    target_field TEXT NOT NULL,
+    source_value TEXT NOT NULL,
+    corrected_value TEXT NOT NULL,
+    votes INTEGER NOT NULL,
+    total_votes INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    -- Feedback id that last changed corrected_value
+    updated_seq INTEGER NOT NULL,
+    -- corrected_value as of the last successful training run
+    trained_value TEXT,
+    PRIMARY KEY (source_tenant, target_tenant, target_field, source_value)
+);
+CREATE INDEX IF NOT EXISTS labelled_pairs_target_idx
+    ON labelled_pairs (target_tenant, source_tenant);
+
+CREATE TABLE IF NOT EXISTS training_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_tenant TEXT NOT NULL,
+    target_tenant TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    mode TEXT,
+    samples INTEGER,
+    new_labels INTEGER,
+    success INTEGER,
+    message TEXT,
+    -- Highest feedback id reflected in the labels the run trained on
+    label_snapshot INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS training_runs_pair_idx
+    ON training_runs (source_tenant, target_tenant, id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+CONFLICT_POLICIES = ("latest", "majority")
+
+FEEDBACK_COLUMNS = (
+    "source_tenant", "target_tenant", "source_field", "source_value",
+    "target_field", "corrected_value", "created_at"
+)
+
+
+class TrainingStore:
+    """
+    Indexed store of training data for all tenant pairs.
+
+    Feedback rows are an append-only log that stays pending until a
+    training run consumes it. Ingestion coalesces corrections into votes
+    per (pair, field, source value) and resolves them into one weighted
+    label using the conflict policy: "latest" (most recent correction wins)
+    or "majority" (most frequent wins, ties go to the most recent).
+    """
+
+    def __init__(self, db_path: Path, conflict_policy: str = "latest"):
+        if conflict_policy not in CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy: {conflict_policy}")
+        self.conflict_policy = conflict_policy
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Hold the lock and run the block in one write transaction, rolled
+        back if anything in it (or the commit) fails, so the shared
+        connection is never left inside an open transaction.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+    def _write(self, sql: str, rows: Iterable[Tuple]) -> None:
+        """Run one statement over many rows in a single transaction."""
+        with self._transaction() as conn:
+            conn.executemany(sql, rows)
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # Feedback
+
+    def add_feedback(self, entries: List[Dict[str, Any]], consumed_run_id: Optional[int] = None) -> int:
+        """
+        Log feedback entries and coalesce them into labels in one transaction.
+
+        Returns:
+            Number of labels whose resolved value changed, i.e. new information
+        """
+        with self._transaction():
+            changed = self._insert_feedback(entries, consumed_run_id)
+        return len(changed)
+
+    def _insert_feedback(self, entries: List[Dict[str, Any]], consumed_run_id: Optional[int]) -> Set[Tuple]:
+        """Insert and coalesce feedback inside the caller's transaction; returns the changed label groups."""
+        changed = set()
+        for entry in entries:
+            row = self._feedback_row(entry)
+            seq = self._conn.execute(
+                f"INSERT INTO feedback ({', '.join(FEEDBACK_COLUMNS)}, training_run_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row + (consumed_run_id,)
+            ).lastrowid
+            source_tenant, target_tenant, _, source_value, target_field, corrected_value, created_at = row
+            group = (source_tenant, target_tenant, target_field, source_value)
+            self._vote(group, corrected_value, 1, created_at)
+            if self._resolve(group, seq):
+                changed.add(group)
+        return changed
+
+    def _vote(self, group: Tuple, corrected_value: str, count: int, last_seen: Optional[str]) -> None:
+        self._conn.execute(
+            "INSERT INTO label_votes VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT DO UPDATE SET count = count + excluded.count, "
+            "last_seen = MAX(COALESCE(last_seen, ''), COALESCE(excluded.last_seen, ''))",
+            group + (corrected_value, count, last_seen)
+        )
+
+    def _resolve(self, group: Tuple, seq: int) -> bool:
+        """Re-resolve the label of one source value; True if its value changed."""
+        order = "count DESC, last_seen DESC" if self.conflict_policy == "majority" else "last_seen DESC, count DESC"
+        votes = self._conn.execute(
+            "SELECT corrected_value, count FROM label_votes WHERE source_tenant = ? AND target_tenant = ? "
+            f"AND target_field = ? AND source_value = ? ORDER BY {order}",
+            group
+        ).fetchall()
+        winner, winner_votes = votes[0][0], votes[0][1]
+        total_votes = sum(row[1] for row in votes)
+        # Repeated agreement raises the weight, disagreement lowers it
+        weight = (winner_votes / total_votes) * (1.0 + math.log(winner_votes))
+
+        current = self._conn.execute(
+            "SELECT corrected_value FROM labelled_pairs WHERE source_tenant = ? AND target_tenant = ? "
+            "AND target_field = ? AND source_value = ?",
+            group
+        ).fetchone()
+        if current is not None and current[0] == winner:
+            self._conn.execute(
+                "UPDATE labelled_pairs SET votes = ?, total_votes = ?, weight = ? WHERE source_tenant = ? "
+                "AND target_tenant = ? AND target_field = ? AND source_value = ?",
+                (winner_votes, total_votes, weight) + group
+            )
+            return False
+
+        self._conn.execute(
+            "INSERT INTO labelled_pairs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL) "
+            "ON CONFLICT DO UPDATE SET corrected_value = excluded.corrected_value, votes = excluded.votes, "
+            "total_votes = excluded.total_votes, weight = excluded.weight, updated_seq = excluded.updated_seq",
+            group + (winner, winner_votes, total_votes, weight, seq)
+        )
+        return True
+
+    def _feedback_row(self, entry: Dict[str, Any]) -> Tuple:
+        return (
+            entry["sourceTenant"],
+            entry["targetTenant"],
+            entry.get("sourceField"),
+            entry["sourceValue"],
+            entry.get("targetField", "product"),
+            entry["correctedValue"],
+            entry.get("timestamp") or datetime.utcnow().isoformat(),
+        )
+
+    def count_pending(self, source_tenant: str, target_tenant: str) -> int:
+        """Number of feedback entries not yet consumed by a training run."""
+        return self._query(
+            "SELECT COUNT(*) FROM feedback WHERE source_tenant = ? AND target_tenant = ? "
+            "AND training_run_id IS NULL",
+            (source_tenant, target_tenant)
+        )[0][0]
+
+    def iter_feedback(
+        self,
+        source_tenant: Optional[str] = None,
+        target_tenant: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorded feedback entries, pending and consumed, oldest first,
+        optionally of one source and/or target tenant and created in
+        [since, until). Rows are fetched in batches, not all at once, each
+        batch under the lock so writers can interleave between them.
+        """
+        conditions, params = [], []
+        for column, value, operator in (
+            ("source_tenant", source_tenant, "="),
+            ("target_tenant", target_tenant, "="),
+            ("created_at", since, ">="),
+            ("created_at", until, "<"),
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        conditions.append("id > ?")
+        sql = (
+            f"SELECT id, {', '.join(FEEDBACK_COLUMNS)} FROM feedback "
+            f"WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+        )
+        last_id = 0
+        while True:
+            rows = self._query(sql, tuple(params) + (last_id, batch_size))
+            for row in rows:
+                yield {
+                    "timestamp": row["created_at"],
+                    "sourceTenant": row["source_tenant"],
+                    "targetTenant": row["target_tenant"],
+                    "sourceField": row["source_field"],
+                    "sourceValue": row["source_value"],
+                    "targetField": row["target_field"],
+                    "correctedValue": row["corrected_value"],
+                }
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]["id"]
+
+    # Labelled pairs
+
+    def load_labels(self, source_tenant: str, target_tenant: str) -> List[Dict[str, Any]]:
+        """Resolved labels of a pair with their weight and the corrections they overruled."""
+        pair = (source_tenant, target_tenant)
+        rejected: Dict[Tuple[str, str], List[str]] = {}
+        for row in self._query(
+            "SELECT v.target_field, v.source_value, v.corrected_value FROM label_votes v "
+            "JOIN labelled_pairs l USING (source_tenant, target_tenant, target_field, source_value) "
+            "WHERE v.source_tenant = ? AND v.target_tenant = ? AND v.corrected_value != l.corrected_value",
+            pair
+        ):
+            rejected.setdefault((row[0], row[1]), []).append(row[2])
+
+        rows = self._query(
+            "SELECT target_field, source_value, corrected_value, votes, total_votes, weight FROM labelled_pairs "
+            "WHERE source_tenant = ? AND target_tenant = ?",
+            pair
+        )
+        return [
+            {
+                "targetField": row["target_field"],
+                "sourceValue": row["source_value"],
+                "correctedValue": row["corrected_value"],
+                "votes": row["votes"],
+                "totalVotes": row["total_votes"],
+                "weight": row["weight"],
+                "rejectedValues": rejected.get((row["target_field"], row["source_value"]), []),
+            }
+            for row in rows
+        ]
+
+    def label_sources(self, target_tenant: str) -> List[str]:
+        """Source tenants with labels for a target tenant."""
+        return [
+            row[0] for row in self._query(
+                "SELECT DISTINCT source_tenant FROM labelled_pairs WHERE target_tenant = ? ORDER BY source_tenant",
+                (target_tenant,)
+            )
+        ]
+
+    def count_changed_labels(self, source_tenant: str, target_tenant: str, since: int = 0) -> int:
+        """
+        Labels that are new or changed since the pair's last successful
+        training run, counting only changes after feedback id `since`.
+        """
+        return self._query(
+            "SELECT COUNT(*) FROM labelled_pairs WHERE source_tenant = ? AND target_tenant = ? "
+            "AND (trained_value IS NULL OR trained_value != corrected_value) AND updated_seq > ?",
+            (source_tenant, target_tenant, since)
+        )[0][0]
+
+    def count_changed_target_labels(self, target_tenant: str, since: int = 0) -> int:
+        """Changed labels of all source tenants of a target tenant."""
+        return self._query(
+            "SELECT COUNT(*) FROM labelled_pairs WHERE target_tenant = ? "
+            "AND (trained_value IS NULL OR trained_value != corrected_value) AND updated_seq > ?",
+            (target_tenant, since)
+        )[0][0]
+
+    def label_snapshot(self, source_tenant: str, target_tenant: str) -> int:
+        """Highest feedback id reflected in the pair's labels, for mark_trained()."""
+        return self._query(
+            "SELECT COALESCE(MAX(id), 0) FROM feedback WHERE source_tenant = ? AND target_tenant = ?",
+            (source_tenant, target_tenant)
+        )[0][0]
+
+    def mark_trained(self, source_tenant: str, target_tenant: str, snapshot: int, run_id: int) -> None:
+        """
+        Record labels and feedback up to a snapshot as used by a successful run.
+        Idempotent: feedback already consumed keeps its run, so repeating the
+        call, or a late call for an older snapshot, changes nothing.
+        """
+        pair = (source_tenant, target_tenant)
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE labelled_pairs SET trained_value = corrected_value WHERE source_tenant = ? "
+                "AND target_tenant = ? AND updated_seq <= ?",
+                pair + (snapshot,)
+            )
+            conn.execute(
+                "UPDATE feedback SET training_run_id = ? WHERE source_tenant = ? AND target_tenant = ? "
+                "AND training_run_id IS NULL AND id <= ?",
+                (run_id,) + pair + (snapshot,)
+            )
+
+    # Training runs
+
+    def start_run(self, source_tenant: str, target_tenant: str, label_snapshot: int = 0) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO training_runs (source_tenant, target_tenant, started_at, label_snapshot) "
+                "VALUES (?, ?, ?, ?)",
+                (source_tenant, target_tenant, datetime.utcnow().isoformat(), label_snapshot)
+            )
+            return cursor.lastrowid
+
+    def attempted_snapshot(self, source_tenant: str, target_tenant: str) -> int:
+        """Label snapshot of the pair's last training run, whether it succeeded or not."""
+        rows = self._query(
+            "SELECT label_snapshot FROM training_runs WHERE source_tenant = ? AND target_tenant = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (source_tenant, target_tenant)
+        )
+        return rows[0][0] if rows else 0
+
+    def finish_run(self, run_id: int, result: Dict[str, Any], samples: int) -> None:
+        self._write(
+            "UPDATE training_runs SET finished_at = ?, mode = ?, samples = ?, new_labels = ?, "
+            "success = ?, message = ? WHERE id = ?",
+            [(
+                datetime.utcnow().isoformat(),
+                result.get("mode"),
+                samples,
+                result.get("newLabels"),
+                int(bool(result.get("success"))),
+                result.get("message"),
+                run_id,
+            )]
+        )
+
+    def last_run(self, source_tenant: str, target_tenant: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT * FROM training_runs WHERE source_tenant = ? AND target_tenant = ? ORDER BY id DESC LIMIT 1",
+            (source_tenant, target_tenant)
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return {
+            "id": row["id"],
+            "startedAt": row["started_at"],
+            "finishedAt": row["finished_at"],
+            "mode": row["mode"],
+            "samples": row["samples"],
+            "newLabels": row["new_labels"],
+            "success": bool(row["success"]),
+            "message": row["message"],
+        }
+
+    # Stats
+
+    def get_stats(self, source_tenant: str, target_tenant: str) -> Dict[str, Any]:
+        """Aggregate feedback, label and run statistics for a pair."""
+        pair = (source_tenant, target_tenant)
+        feedback = self._query(
+            "SELECT COUNT(*), SUM(training_run_id IS NULL), MAX(created_at) FROM feedback "
+            "WHERE source_tenant = ? AND target_tenant = ?",
+            pair
+        )[0]
+        by_field = self._query(
+            "SELECT target_field, COUNT(*) FROM feedback WHERE source_tenant = ? AND target_tenant = ? "
+            "GROUP BY target_field",
+            pair
+        )
+        labels = self._query(
+            "SELECT COUNT(*), SUM(total_votes > votes) FROM labelled_pairs "
+            "WHERE source_tenant = ? AND target_tenant = ?",
+            pair
+        )[0]
+        return {
+            "totalFeedback": feedback[0],
+            "pendingFeedback": feedback[1] or 0,
+            "lastFeedbackAt": feedback[2],
+            "feedbackByField": {row[0]: row[1] for row in by_field},
+            "labelledPairs": labels[0],
+            "conflictingLabels": labels[1] or 0,
+            "changedLabels": self.count_changed_labels(source_tenant, target_tenant),
+            "lastTrainingRun": self.last_run(source_tenant, target_tenant),
+        }
+
+    # Migration
+
+    def migrate_jsonl(self, training_data_path: Path) -> None:
+        """
+        One-shot import of the JSONL feedback files used before this store.
+
+        Pending `*_feedback.jsonl` files become pending feedback and archived
+        files become consumed feedback. Everything, including the marker that
+        the migration ran, is written in one transaction, so an interrupted
+        migration leaves nothing behind and is simply repeated. The files are
+        left in place.
+        """
+        if self._query("SELECT 1 FROM meta WHERE key = 'jsonl_migrated'"):
+            return
+
+        training_data_path = Path(training_data_path)
+        pending = [
+            entry
+            for feedback_file in sorted(training_data_path.glob("*_feedback.jsonl"))
+            for entry in self._read_jsonl(feedback_file)
+        ]
+        archive_dir = training_data_path / "archive"
+        archived = [
+            entry
+            for archive_file in (sorted(archive_dir.glob("*.jsonl")) if archive_dir.exists() else [])
+            for entry in self._read_jsonl(archive_file)
+        ]
+
+        with self._transaction() as conn:
+            self._insert_feedback(pending, None)
+            # Run id 0 marks feedback consumed before training runs were recorded
+            self._insert_feedback(archived, 0)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('jsonl_migrated', ?)", (datetime.utcnow().isoformat(),)
+            )
+
+        if pending or archived:
+            logger.info(f"Migrated {len(pending) + len(archived)} feedback entries from JSONL files")
+
+    def _read_jsonl(self, path: Path) -> List[Dict[str, Any]]:
+        entries = []
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+        return entries
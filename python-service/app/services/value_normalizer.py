@@ -0,0 +1,359 @@
+"""
+Value normalization
+Deterministic parsing of quantities, units, prices, currencies and dates in
+extracted contract data, one record at a time or column-wise for bulk imports
+"""
+import logging
+import re
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+QUANTITY = "quantity"
+UNIT = "unit"
+PRICE = "pricePerUnit"
+CURRENCY = "currency"
+DELIVERY_DATE = "deliveryDate"
+
+NORMALIZED_FIELDS = (QUANTITY, UNIT, PRICE, CURRENCY, DELIVERY_DATE)
+
+# Canonical unit -> spellings (compared lowercased, without dots)
+UNITS = {
+    "MT": ("mt", "mts", "t", "to", "tm", "ton", "tons", "tonne", "tonnes", "metric ton", "metric tons",
+           "metric tonne", "metric tonnes", "m/t"),
+    "kg": ("kg", "kgs", "kilo", "kilos", "kilogram", "kilograms", "kilogramme", "kilogrammes"),
+    "g": ("g", "gr", "grs", "gram", "grams", "gramme", "grammes"),
+    "lb": ("lb", "lbs", "pound", "pounds", "#"),
+    "L": ("l", "ltr", "ltrs", "litre", "litres", "liter", "liters"),
+}
+UNIT_ALIASES = {alias: unit for unit, aliases in UNITS.items() for alias in aliases}
+
+# Currency symbols and names (compared lowercased); other three-letter codes are uppercased
+CURRENCY_ALIASES = {
+    "€": "EUR", "eur": "EUR", "euro": "EUR", "euros": "EUR",
+    "$": "USD", "us$": "USD", "usd": "USD", "dollar": "USD", "dollars": "USD", "us dollar": "USD",
+    "£": "GBP", "gbp": "GBP", "sterling": "GBP", "pound sterling": "GBP",
+    "¥": "JPY", "chf": "CHF", "sfr": "CHF", "fr.": "CHF",
+}
+
+# Month names by their first three letters: English, plus the Dutch, German
+# and French ones that differ
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+    "mrt": 3, "mär": 3, "mae": 3, "mei": 5, "mai": 5, "okt": 10, "dez": 12,
+    "fév": 2, "fev": 2, "avr": 4, "aoû": 8, "aou": 8, "déc": 12,
+}
+
+# An amount with whatever precedes and follows it: "EUR 1.234,50/MT", "25 MT"
+_AMOUNT = re.compile(r"^(?P<prefix>[^\d\-]*?)\s*(?P<number>-?\d(?:[\d.,'\s]*\d)?)\s*(?P<suffix>\D*?)$")
+_SPACES = re.compile(r"[\s']")
+_TOKENS = re.compile(r"[\s/]+")
+
+_ISO_DATE = re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[T\s].*)?$")
+_COMPACT_DATE = re.compile(r"^(\d{4})(\d{2})(\d{2})$")
+_NUMERIC_DATE = re.compile(r"^(\d{1,2})[-/.\s](\d{1,2})[-/.\s](\d{4}|\d{2})$")
+_DAY_MONTH_NAME = re.compile(r"^(\d{1,2})(?:st|nd|rd|th)?[-/.\s]+([^\W\d_]+)\.?[-/.,\s]+(\d{4}|\d{2})$")
+_MONTH_NAME_DAY = re.compile(r"^([^\W\d_]+)\.?[-\s]+(\d{1,2})(?:st|nd|rd|th)?,?[-\s]+(\d{4}|\d{2})$")
+
+
+def _to_number(digits: str) -> Optional[float]:
+    """
+    A number in US or European notation: "1,234.50", "1.234,50", "1 234,5".
+
+    When both separators occur, the last one is the decimal mark; a separator
+    that repeats groups thousands. A single separator followed by exactly
+    three digits groups thousands too ("12,500", "25.000"), otherwise it is
+    the decimal mark ("3,5", "0.125").
+    """
+    digits = _SPACES.sub("", digits)
+    comma, dot = digits.rfind(","), digits.rfind(".")
+    if comma >= 0 and dot >= 0:
+        if comma > dot:
+            digits = digits.replace(".", "").replace(",", ".")
+        else:
+            digits = digits.replace(",", "")
+    elif comma >= 0 or dot >= 0:
+        separator = "," if comma >= 0 else "."
+        position = max(comma, dot)
+        integer_part = digits[:position].lstrip("-")
+        if digits.count(separator) > 1 or (len(digits) - position == 4 and integer_part != "0"):
+            digits = digits.replace(separator, "")
+        else:
+            digits = digits.replace(",", ".")
+    try:
+        number = float(digits)
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() and abs(number) < 1e15 else number
+
+
+def _amount(value: Any) -> Tuple[Optional[float], Tuple[str, ...]]:
+    """A number and the words around it: "EUR 1.234,50/MT" -> (1234.5, ("EUR", "MT"))."""
+    if isinstance(value, bool):
+        return None, ()
+    if isinstance(value, (int, float)):
+        return (value if value == value else None), ()
+    if not isinstance(value, str):
+        return None, ()
+    match = _AMOUNT.match(value.strip())
+    if not match:
+        return None, ()
+    tokens = _TOKENS.split(f"{match.group('prefix')} {match.group('suffix')}".strip())
+    return _to_number(match.group("number")), _phrases([token for token in tokens if token])
+
+
+def _phrases(words: List[str]) -> Tuple[str, ...]:
+    """Words with multi-word units and currencies joined: ("metric", "tons") -> ("metric tons",)."""
+    phrases: List[str] = []
+    for word in words:
+        if phrases:
+            joined = f"{phrases[-1]} {word}"
+            if parse_unit(joined) or joined.lower() in CURRENCY_ALIASES:
+                phrases[-1] = joined
+                continue
+        phrases.append(word)
+    return tuple(phrases)
+
+
+def parse_quantity(value: Any) -> Tuple[Optional[float], Optional[str]]:
+    """A quantity and the unit written with it ("25 MT"); None unless every word is a unit."""
+    number, words = _amount(value)
+    units = [parse_unit(word) for word in words]
+    if number is None or not all(units):
+        return None, None
+    return number, units[0] if units else None
+
+
+def parse_price(value: Any) -> Tuple[Optional[float], Optional[str]]:
+    """
+    A price and the currency written with it ("EUR 1.234,50", "$2.10/lb");
+    None unless every word is a currency, the unit priced or "per".
+    """
+    number, words = _amount(value)
+    if number is None:
+        return None, None
+    currency = None
+    for word in words:
+        if word.lower() == "per" or parse_unit(word):
+            continue
+        parsed = parse_currency(word)
+        if parsed is None:
+            return None, None
+        currency = currency or parsed
+    return number, currency
+
+
+def parse_unit(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    return UNIT_ALIASES.get(value.strip().lower().replace(".", ""))
+
+
+def parse_currency(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    key = value.strip().lower()
+    currency = CURRENCY_ALIASES.get(key)
+    if currency is None and len(key) == 3 and key.isascii() and key.isalpha():
+        return key.upper()
+    return currency
+
+
+def parse_date(value: Any, day_first: bool = True) -> Optional[str]:
+    """
+    A date as YYYY-MM-DD, from ISO dates and timestamps, 20250307, 7.3.2025,
+    07/03/25, 7 Mar 2025, 7-mrt-2025 or March 7th, 2025. Numeric dates are
+    read day first unless day_first is False; a first number over 12 is
+    always the day.
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+
+    match = _ISO_DATE.match(text) or _COMPACT_DATE.match(text)
+    if match:
+        return _date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    match = _NUMERIC_DATE.match(text)
+    if match:
+        day, month = int(match.group(1)), int(match.group(2))
+        if not day_first:
+            day, month = month, day
+        if month > 12 >= day:
+            day, month = month, day
+        return _date(_year(match.group(3)), month, day)
+    match = _DAY_MONTH_NAME.match(text)
+    if match:
+        return _date(_year(match.group(3)), _month(match.group(2)), int(match.group(1)))
+    match = _MONTH_NAME_DAY.match(text)
+    if match:
+        return _date(_year(match.group(3)), _month(match.group(1)), int(match.group(2)))
+    return None
+
+
+def _year(text: str) -> int:
+    return 2000 + int(text) if len(text) == 2 else int(text)
+
+
+def _month(name: str) -> int:
+    return MONTHS.get(name[:3].lower(), 0)
+
+
+def _date(year: int, month: int, day: int) -> Optional[str]:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+class ValueNormalizer:
+    """
+    Normalizes the quantity, unit, pricePerUnit, currency and deliveryDate
+    fields of extracted contract data: numbers become numbers, units and
+    currencies their canonical codes and dates YYYY-MM-DD. A unit written
+    into the quantity ("25 MT") or a currency into the price ("EUR 1.234,50")
+    fills that field when the record has none. Values that do not parse are
+    left as they are.
+
+    normalize() handles one record; normalize_frame() does the same for a
+    column per field, parsing each distinct value of a column once.
+    """
+
+    def __init__(self, day_first: bool = True):
+        self.day_first = day_first
+
+    def normalize(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """A copy of the record with its normalizable fields normalized."""
+        if not any(field in record for field in NORMALIZED_FIELDS):
+            return record
+        normalized = dict(record)
+
+        if UNIT in record:
+            normalized[UNIT] = parse_unit(record[UNIT]) or record[UNIT]
+        if CURRENCY in record:
+            normalized[CURRENCY] = parse_currency(record[CURRENCY]) or record[CURRENCY]
+        if QUANTITY in record:
+            quantity, unit = parse_quantity(record[QUANTITY])
+            if quantity is not None:
+                normalized[QUANTITY] = quantity
+                if unit and not record.get(UNIT):
+                    normalized[UNIT] = unit
+        if PRICE in record:
+            price, currency = parse_price(record[PRICE])
+            if price is not None:
+                normalized[PRICE] = price
+                if currency and not record.get(CURRENCY):
+                    normalized[CURRENCY] = currency
+        if DELIVERY_DATE in record:
+            normalized[DELIVERY_DATE] = parse_date(record[DELIVERY_DATE], self.day_first) or record[DELIVERY_DATE]
+        return normalized
+
+    def normalize_records(self, records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """normalize() for many records, column-wise."""
+        frame = pd.DataFrame(
+            [{field: record[field] for field in NORMALIZED_FIELDS if field in record} for record in records],
+            columns=NORMALIZED_FIELDS,
+            dtype=object
+        )
+        frame = self.normalize_frame(frame)
+        columns = {field: frame[field].tolist() for field in NORMALIZED_FIELDS}
+        normalized = []
+        for index, record in enumerate(records):
+            record = dict(record)
+            for field, values in columns.items():
+                value = values[index]
+                if field in record or (value is not None and value == value):
+                    record[field] = value
+            normalized.append(record)
+        return normalized
+
+    def normalize_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """A copy of a frame with its normalizable columns normalized, as normalize() would."""
+        frame = frame.copy()
+        missing_unit = self._missing(frame, UNIT)
+        missing_currency = self._missing(frame, CURRENCY)
+
+        if QUANTITY in frame:
+            frame[QUANTITY], units = self._amount_column(frame[QUANTITY], parse_quantity)
+            if missing_unit.any():
+                frame[UNIT] = frame[UNIT].where(~missing_unit | units.isna(), units) if UNIT in frame else units
+        if UNIT in frame:
+            frame[UNIT] = self._map_column(frame[UNIT], parse_unit)
+        if PRICE in frame:
+            frame[PRICE], currencies = self._amount_column(frame[PRICE], parse_price)
+            if missing_currency.any():
+                frame[CURRENCY] = (
+                    frame[CURRENCY].where(~missing_currency | currencies.isna(), currencies)
+                    if CURRENCY in frame else currencies
+                )
+        if CURRENCY in frame:
+            frame[CURRENCY] = self._map_column(frame[CURRENCY], parse_currency)
+        if DELIVERY_DATE in frame:
+            frame[DELIVERY_DATE] = self._date_column(frame[DELIVERY_DATE])
+        return frame
+
+    @staticmethod
+    def _missing(frame: pd.DataFrame, field: str) -> pd.Series:
+        if field not in frame:
+            return pd.Series(True, index=frame.index)
+        column = frame[field]
+        return column.isna() | (column == "")
+
+    @staticmethod
+    def _distinct(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """Codes and distinct values of a column; missing values get code -1."""
+        codes, uniques = pd.factorize(column, use_na_sentinel=True)
+        return codes, np.asarray(uniques, dtype=object)
+
+    @staticmethod
+    def _expand(codes: np.ndarray, parsed: np.ndarray, column: pd.Series) -> pd.Series:
+        """Parsed distinct values back in row order; rows that did not parse keep their value."""
+        values = np.empty(len(parsed) + 1, dtype=object)
+        values[:-1] = parsed
+        values[-1] = None
+        result = values[codes]
+        unparsed = pd.isna(result)
+        if unparsed.any():
+            result[unparsed] = column.to_numpy(dtype=object)[unparsed]
+        return pd.Series(result, index=column.index, dtype=object)
+
+    def _amount_column(
+        self,
+        column: pd.Series,
+        parse: Callable[[Any], Tuple[Optional[float], Optional[str]]]
+    ) -> Tuple[pd.Series, pd.Series]:
+        """Parsed amounts, and the unit or currency written with each."""
+        if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            return column, pd.Series(None, index=column.index, dtype=object)
+        codes, uniques = self._distinct(column)
+        numbers = np.empty(len(uniques), dtype=object)
+        words = np.empty(len(uniques) + 1, dtype=object)
+        for i, value in enumerate(uniques):
+            numbers[i], words[i] = parse(value)
+        words[-1] = None
+        return self._expand(codes, numbers, column), pd.Series(words[codes], index=column.index, dtype=object)
+
+    def _map_column(self, column: pd.Series, parse: Callable[[Any], Optional[str]]) -> pd.Series:
+        codes, uniques = self._distinct(column)
+        parsed = np.array([parse(value) for value in uniques], dtype=object)
+        return self._expand(codes, parsed, column)
+
+    def _date_column(self, column: pd.Series) -> pd.Series:
+        codes, uniques = self._distinct(column)
+        parsed = np.empty(len(uniques), dtype=object)
+        # ISO dates, by far the most common, are parsed in one pass
+        is_text = np.array([isinstance(value, str) for value in uniques], dtype=bool)
+        if is_text.any():
+            iso = pd.to_datetime(pd.Series(uniques[is_text]).str.strip(), format="%Y-%m-%d", errors="coerce")
+            parsed[is_text] = iso.dt.strftime("%Y-%m-%d").to_numpy(dtype=object)
+        for i in np.flatnonzero(pd.isna(parsed)):
+            parsed[i] = parse_date(uniques[i], self.day_first)
+        return self._expand(codes, parsed, column)
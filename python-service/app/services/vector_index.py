@@ -0,0 +1,494 @@
+"""
+Vector retrieval over large canonical catalogs
+Hashed character-n-gram TF-IDF vectors searched with batched matrix products
+"""
+import copy
+import json
+import logging
+import math
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZES = (2, 3, 4)
+
+# Platt scaling of cosine similarity: cosine 0.58 maps to 0.5, 0.9 to ~0.98
+DEFAULT_CALIBRATION = (12.0, -7.0)
+
+
+# FNV-1a over code points, seeded per n-gram size. Unlike hash() it is
+# stable across processes, so a saved index stays valid after a restart.
+_FNV_PRIME = np.uint64(0x100000001B3)
+_FNV_SEEDS = {n: np.uint64(0xCBF29CE484222325 + n) for n in NGRAM_SIZES}
+
+
+def calibration_path(path: Path) -> Path:
+    """Sidecar file holding an index's calibration once it was refitted after saving."""
+    return path.with_name(f"{path.stem}.calibration.json")
+
+
+def save_calibration(path: Path, calibration: Tuple[float, float]) -> None:
+    """Persist a refitted calibration of the index saved at path, without rewriting the index."""
+    sidecar = calibration_path(path)
+    tmp_file = sidecar.with_name(f"{sidecar.name}.tmp")
+    tmp_file.write_text(json.dumps(list(calibration)))
+    tmp_file.replace(sidecar)
+
+
+def _pack_values(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Values as one UTF-8 blob and the int64 byte offsets delimiting them.
+
+    A fixed-width unicode array would pad every value to four bytes per
+    code point of the longest one.
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_values(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[start:end].decode("utf-8") for start, end in zip(bounds, bounds[1:])]
+
+
+def _normalize(value: str) -> str:
+    return f" {' '.join(value.lower().split())} "
+
+
+def ngram_hashes(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row and 64-bit hash of every character 2-, 3- and 4-gram of the
+    normalized, space-padded values, computed with array operations over
+    all values at once.
+    """
+    texts = [_normalize(value) for value in values]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    row_of = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+
+    rows, hashes = [], []
+    for n in NGRAM_SIZES:
+        m = codes.size - n + 1
+        if m <= 0:
+            continue
+        # Windows must not straddle two values
+        inside = row_of[:m] == row_of[n - 1:]
+        h = np.full(m, _FNV_SEEDS[n], dtype=np.uint64)
+        for j in range(n):
+            h = (h ^ codes[j:j + m]) * _FNV_PRIME
+        # Final avalanche so low bits (the bucket) depend on every character
+        h ^= h >> np.uint64(33)
+        h *= np.uint64(0xFF51AFD7ED558CCD)
+        h ^= h >> np.uint64(33)
+        rows.append(row_of[:m][inside])
+        hashes.append(h[inside])
+
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+    return np.concatenate(rows), np.concatenate(hashes)
+
+
+def fit_calibration(scores: Sequence[float], labels: Sequence[int], iterations: int = 50) -> Tuple[float, float]:
+    """
+    Fit Platt scaling parameters (a, b) so that sigmoid(a * score + b)
+    estimates the probability that a retrieved candidate is a true match.
+
+    Args:
+        scores: Raw cosine scores of labelled candidates
+        labels: 1 for true matches, 0 otherwise
+    """
+    x = np.asarray(scores, dtype=np.float64)
+    y = np.asarray(labels, dtype=np.float64)
+    if x.size == 0 or y.min() == y.max():
+        return DEFAULT_CALIBRATION
+
+    # Platt's smoothed targets keep the fit finite on separable data
+    positives = y.sum()
+    negatives = y.size - positives
+    t = np.where(y > 0, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+    def loss(a: float, b: float) -> float:
+        z = a * x + b
+        return float(np.sum(np.logaddexp(0.0, z) - t * z))
+
+    # Newton's method with step halving, as in Lin et al.'s Platt scaling
+    a, b = DEFAULT_CALIBRATION
+    current = loss(a, b)
+    for _ in range(iterations):
+        p = 0.5 * (1.0 + np.tanh(0.5 * (a * x + b)))
+        w = p * (1 - p) + 1e-12
+        grad = np.array([np.dot(p - t, x), np.sum(p - t)])
+        hessian = np.array([[np.dot(w, x * x), np.dot(w, x)], [np.dot(w, x), w.sum()]])
+        step = np.linalg.solve(hessian + 1e-9 * np.eye(2), grad)
+
+        scale = 1.0
+        while scale > 1e-6 and loss(a - scale * step[0], b - scale * step[1]) > current:
+            scale /= 2
+        a, b = a - scale * step[0], b - scale * step[1]
+        previous, current = current, loss(a, b)
+        if previous - current < 1e-9 * max(1.0, abs(previous)):
+            break
+    return float(a), float(b)
+
+
+class NgramVectorIndex:
+    """
+    Dense retrieval index over canonical names.
+
+    Each name becomes a signed, hashed vector of its character n-grams
+    (sublinear TF times IDF, L2-normalized), so cosine similarity is a dot
+    product and a batch of queries is scored against a block of the catalog
+    with one matrix product. Rows are stored as float32, or as int8 with a
+    per-row scale when `quantize` is set (4x smaller, scores within ~1%).
+
+    With `partitions` > 1 the rows are clustered around spherical k-means
+    centroids and a query only scans the `probes` partitions whose
+    centroids are closest: approximate search for very large catalogs.
+
+    Scores returned by search() are calibrated into match probabilities
+    with Platt scaling; see fit_calibration().
+    """
+
+    def __init__(
+        self,
+        dim: int = 512,
+        quantize: bool = False,
+        partitions: int = 0,
+        probes: int = 8,
+        chunk_rows: int = 16384,
+        calibration: Tuple[float, float] = DEFAULT_CALIBRATION
+    ):
+        if dim & (dim - 1):
+            raise ValueError(f"dim must be a power of two, got {dim}")
+        self.dim = dim
+        self.quantize = quantize
+        self.partitions = partitions
+        self.probes = probes
+        self.chunk_rows = chunk_rows
+        self.calibration = calibration
+
+        self.values: List[str] = []
+        self.matrix = np.zeros((0, dim), dtype=np.int8 if quantize else np.float32)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.df = np.zeros(dim, dtype=np.int64)
+        self.idf = np.ones(dim, dtype=np.float32)
+        # Catalog size when IDF was last computed
+        self._idf_rows = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self._members: Optional[List[np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.scales.nbytes
+
+    def clone(self) -> "NgramVectorIndex":
+        """
+        Copy that can be updated while searches keep using the original;
+        add() and remove() replace arrays rather than writing into them.
+        """
+        clone = copy.copy(self)
+        clone.values = list(self.values)
+        clone.df = self.df.copy()
+        return clone
+
+    # Encoding
+
+    def _hashed(self, values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Row, bucket and signed term frequency of every distinct n-gram bucket."""
+        rows, hashes = ngram_hashes(values)
+        if not hashes.size:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float32)
+
+        buckets = (hashes & np.uint64(self.dim - 1)).astype(np.int64)
+        signs = np.where(hashes >> np.uint64(63), 1.0, -1.0)
+
+        keys, inverse = np.unique(rows * self.dim + buckets, return_inverse=True)
+        counts = np.bincount(inverse, weights=signs)
+        tf = np.sign(counts) * (1.0 + np.log(np.maximum(np.abs(counts), 1.0)))
+        return keys // self.dim, keys % self.dim, tf.astype(np.float32)
+
+    def _document_frequency(self, values: Sequence[str]) -> np.ndarray:
+        df = np.zeros(self.dim, dtype=np.int64)
+        for start in range(0, len(values), self.chunk_rows):
+            _, buckets, _ = self._hashed(values[start:start + self.chunk_rows])
+            df += np.bincount(buckets, minlength=self.dim)
+        return df
+
+    def _encode_hashed(self, n: int, rows: np.ndarray, buckets: np.ndarray, tf: np.ndarray) -> np.ndarray:
+        vectors = np.zeros((n, self.dim), dtype=np.float32)
+        vectors[rows, buckets] = tf * self.idf[buckets]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def encode(self, values: Sequence[str]) -> np.ndarray:
+        """Unit-length float32 vectors of values under the current IDF."""
+        return self._encode_hashed(len(values), *self._hashed(values))
+
+    def _store(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.quantize:
+            return vectors, np.ones(len(vectors), dtype=np.float32)
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _block(self, start: int, end: int) -> np.ndarray:
+        block = self.matrix[start:end]
+        if self.quantize:
+            return block.astype(np.float32) * self.scales[start:end, None]
+        return block
+
+    # Building
+
+    @classmethod
+    def build(cls, values: Sequence[str], **options) -> "NgramVectorIndex":
+        """Index a catalog from scratch, computing IDF over all of it."""
+        index = cls(**options)
+        index._rebuild(list(dict.fromkeys(v for v in values if v)))
+        return index
+
+    def _rebuild(self, values: List[str]) -> None:
+        """
+        Two passes over the values, one for document frequencies and one
+        encoding into a preallocated matrix, so peak memory beyond the
+        index itself is one chunk of rows.
+        """
+        self.values = values
+        self.df = self._document_frequency(values)
+        self.idf = (np.log((1.0 + len(values)) / (1.0 + self.df)) + 1.0).astype(np.float32)
+        self._idf_rows = len(values)
+
+        self.matrix = np.empty((len(values), self.dim), dtype=np.int8 if self.quantize else np.float32)
+        self.scales = np.empty(len(values), dtype=np.float32)
+        for start in range(0, len(values), self.chunk_rows):
+            chunk = values[start:start + self.chunk_rows]
+            block, scales = self._store(self.encode(chunk))
+            self.matrix[start:start + len(chunk)] = block
+            self.scales[start:start + len(chunk)] = scales
+        self._partition()
+
+    def add(self, values: Iterable[str]) -> int:
+        """
+        Append values not yet in the index and return how many were added.
+
+        New rows are encoded with the existing IDF; once the catalog has
+        doubled since IDF was last computed, the whole index is rebuilt.
+        """
+        known = set(self.values)
+        new_values = [v for v in dict.fromkeys(values) if v and v not in known]
+        if not new_values:
+            return 0
+
+        if len(self.values) + len(new_values) > 2 * max(self._idf_rows, 1):
+            self._rebuild(self.values + new_values)
+            return len(new_values)
+
+        start = len(self.values)
+        self.matrix = np.resize(self.matrix, (start + len(new_values), self.dim))
+        self.scales = np.resize(self.scales, start + len(new_values))
+        for offset in range(0, len(new_values), self.chunk_rows):
+            chunk = new_values[offset:offset + self.chunk_rows]
+            rows, buckets, tf = self._hashed(chunk)
+            self.df += np.bincount(buckets, minlength=self.dim)
+            block, scales = self._store(self._encode_hashed(len(chunk), rows, buckets, tf))
+            self.matrix[start + offset:start + offset + len(chunk)] = block
+            self.scales[start + offset:start + offset + len(chunk)] = scales
+        self.values.extend(new_values)
+
+        if self.centroids is not None:
+            assignments = self._assign(self.matrix[start:], self.scales[start:])
+        else:
+            assignments = np.zeros(len(new_values), dtype=np.int32)
+        self.assignments = np.concatenate([self.assignments, assignments])
+        self._members = None
+        return len(new_values)
+
+    def remove(self, values: Iterable[str]) -> int:
+        """Drop values from the index and return how many were present."""
+        removed = set(values)
+        keep = np.fromiter((v not in removed for v in self.values), dtype=bool, count=len(self.values))
+        dropped = [v for v, kept in zip(self.values, keep) if not kept]
+        if not dropped:
+            return 0
+
+        self.df -= self._document_frequency(dropped)
+        self.values = [v for v, kept in zip(self.values, keep) if kept]
+        self.matrix = self.matrix[keep]
+        self.scales = self.scales[keep]
+        self.assignments = self.assignments[keep]
+        self._members = None
+        return len(dropped)
+
+    def _assign(self, block: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        vectors = block.astype(np.float32) * scales[:, None] if self.quantize else block
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _partition(self, iterations: int = 8) -> None:
+        """Cluster rows with spherical k-means on a sample of the catalog."""
+        self.centroids = None
+        self._members = None
+        n = len(self.values)
+        if self.partitions <= 1 or n < self.partitions * 4:
+            self.assignments = np.zeros(n, dtype=np.int32)
+            return
+
+        rng = np.random.default_rng(0)
+        sample_ids = rng.choice(n, size=min(n, self.partitions * 64), replace=False)
+        sample = self.matrix[sample_ids]
+        if self.quantize:
+            sample = sample.astype(np.float32) * self.scales[sample_ids, None]
+        centroids = sample[rng.choice(len(sample), size=self.partitions, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for p in range(self.partitions):
+                members = sample[labels == p]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[p] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        self.centroids = centroids.astype(np.float32)
+
+        self.assignments = np.concatenate([
+            self._assign(self.matrix[start:start + self.chunk_rows], self.scales[start:start + self.chunk_rows])
+            for start in range(0, n, self.chunk_rows)
+        ])
+
+    def _partition_members(self) -> List[np.ndarray]:
+        if self._members is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(self.partitions + 1))
+            self._members = [order[bounds[p]:bounds[p + 1]] for p in range(self.partitions)]
+        return self._members
+
+    # Searching
+
+    def calibrate(self, scores: np.ndarray) -> np.ndarray:
+        a, b = self.calibration
+        return 1.0 / (1.0 + np.exp(-(a * scores + b)))
+
+    def search(
+        self,
+        queries: Sequence[str],
+        k: int = 5,
+        calibrated: bool = True
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k catalog rows for each query, best first.
+
+        Returns:
+            For each query a list of (row, score) pairs; look rows up in
+            `values`. Scores are match probabilities, or raw cosine
+            similarities when calibrated is False.
+        """
+        if not queries:
+            return []
+        if not self.values or k <= 0:
+            return [[] for _ in queries]
+
+        k = min(k, len(self.values))
+        vectors = self.encode(queries)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+
+        if self.centroids is None:
+            for start in range(0, len(self.values), self.chunk_rows):
+                scores = vectors @ self._block(start, start + self.chunk_rows).T
+                self._merge(best_scores, best_rows, np.arange(len(queries)), scores, start, k)
+        else:
+            probes = min(self.probes, self.partitions)
+            nearest = np.argsort(-(vectors @ self.centroids.T), axis=1)[:, :probes]
+            members = self._partition_members()
+            for p in np.unique(nearest):
+                rows = members[p]
+                query_ids = np.flatnonzero((nearest == p).any(axis=1))
+                if rows.size == 0:
+                    continue
+                block = self.matrix[rows]
+                if self.quantize:
+                    block = block.astype(np.float32) * self.scales[rows, None]
+                scores = vectors[query_ids] @ block.T
+                self._merge(best_scores, best_rows, query_ids, scores, rows, k)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        if calibrated:
+            best_scores = np.where(np.isfinite(best_scores), self.calibrate(best_scores), best_scores)
+
+        return [
+            [(int(row), float(score)) for row, score in zip(rows, scores) if math.isfinite(score)]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    @staticmethod
+    def _merge(best_scores, best_rows, query_ids, scores, rows, k) -> None:
+        """Fold a block of scores (queries x rows) into the running top-k."""
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), (scores.shape[0], scores.shape[1]))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        top_rows = top + rows if isinstance(rows, int) else rows[top]
+
+        merged_scores = np.concatenate([best_scores[query_ids], top_scores], axis=1)
+        merged_rows = np.concatenate([best_rows[query_ids], top_rows], axis=1)
+        keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        best_scores[query_ids] = np.take_along_axis(merged_scores, keep, axis=1)
+        best_rows[query_ids] = np.take_along_axis(merged_rows, keep, axis=1)
+
+    # Persistence
+
+    def save(self, path: Path) -> None:
+        """Write the index atomically as a single .npz file."""
+        tmp_file = path.with_name(f"{path.stem}.tmp.npz")
+        value_blob, value_offsets = _pack_values(self.values)
+        np.savez(
+            tmp_file,
+            value_blob=value_blob,
+            value_offsets=value_offsets,
+            matrix=self.matrix,
+            scales=self.scales,
+            df=self.df,
+            idf=self.idf,
+            centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), dtype=np.float32),
+            assignments=self.assignments,
+            options=np.array([self.dim, int(self.quantize), self.partitions, self.probes, self._idf_rows]),
+            calibration=np.array(self.calibration, dtype=np.float64)
+        )
+        tmp_file.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "NgramVectorIndex":
+        with np.load(path) as data:
+            dim, quantize, partitions, probes, idf_rows = (int(v) for v in data["options"])
+            index = cls(
+                dim=dim,
+                quantize=bool(quantize),
+                partitions=partitions,
+                probes=probes,
+                calibration=tuple(float(v) for v in data["calibration"])
+            )
+            if "value_blob" in data.files:
+                index.values = _unpack_values(data["value_blob"], data["value_offsets"])
+            else:
+                # Indexes saved before values were stored as UTF-8
+                index.values = data["values"].tolist()
+            index.matrix = data["matrix"]
+            index.scales = data["scales"]
+            index.df = data["df"]
+            index.idf = data["idf"]
+            index.centroids = data["centroids"] if len(data["centroids"]) else None
+            index.assignments = data["assignments"]
+            index._idf_rows = idf_rows
+        sidecar = calibration_path(path)
+        if sidecar.exists():
+            index.calibration = tuple(float(v) for v in json.loads(sidecar.read_text()))
+        return index
@@ -0,0 +1,117 @@
+"""
+Warm-state snapshots
+A process's warmed in-memory state (hot models and indexes, knowledge-base
+and feedback aliases, memoized resolutions) saved periodically to a local
+file, so a restarted process restores it instead of re-warming request by
+request
+"""
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.services.model_artifact import ArtifactError, ModelArtifact, decode_json, encode_json, write_artifact
+
+logger = logging.getLogger(__name__)
+
+WARM_STATE_FORMAT = 1
+
+# Section with everything but the resolutions
+STATE = "state"
+# One section of memoized resolutions per tenant pair
+RESOLUTIONS_PREFIX = "resolutions/"
+
+
+def resolutions_section(model_key: str) -> str:
+    return f"{RESOLUTIONS_PREFIX}{model_key}"
+
+
+def file_fingerprint(paths: Iterable[Path]) -> List[List[Any]]:
+    """Name, size and modification time of each existing file, to tell whether files changed."""
+    fingerprint = []
+    for path in sorted(paths):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        fingerprint.append([path.name, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def write_snapshot(
+    path: Path,
+    state: Dict[str, Any],
+    resolutions: Dict[str, List[Any]],
+    compression: str = "zstd",
+    key: Optional[bytes] = None
+) -> int:
+    """
+    Write a warm-state snapshot, replacing the previous one atomically.
+
+    The snapshot is a model artifact container (checksummed sections,
+    signed with the model artifact key when one is configured) with the
+    state in one section and each pair's resolutions in its own, so they
+    can be restored pair by pair. Returns the file size.
+    """
+    sections = {STATE: encode_json({"format": WARM_STATE_FORMAT, **state})}
+    for model_key, entries in resolutions.items():
+        sections[resolutions_section(model_key)] = encode_json(entries)
+    write_artifact(path, sections, metadata={"kind": "warm-state"}, compression=compression, key=key)
+    return path.stat().st_size
+
+
+class WarmSnapshot:
+    """
+    An open warm-state snapshot.
+
+    The state section is read when it is opened; each pair's resolutions
+    are read and decoded only when take() asks for them, so a restarted
+    process pays for the pairs it actually serves. Sections are read from
+    the snapshot that was opened even if a newer one replaces it meanwhile.
+    """
+
+    def __init__(self, artifact: ModelArtifact, state: Dict[str, Any]):
+        self._artifact = artifact
+        self.state = state
+        self.pending: Set[str] = {
+            name[len(RESOLUTIONS_PREFIX):] for name in artifact.sections if name.startswith(RESOLUTIONS_PREFIX)
+        }
+
+    @classmethod
+    def open(cls, path: Path, key: Optional[bytes] = None) -> Optional["WarmSnapshot"]:
+        """The snapshot at path, or None if there is none or it cannot be used."""
+        if not path.exists():
+            return None
+        try:
+            artifact = ModelArtifact(path, key)
+        except (ArtifactError, OSError) as e:
+            logger.warning(f"Ignoring warm-state snapshot {path}: {e}")
+            return None
+        try:
+            if artifact.metadata.get("kind") != "warm-state":
+                raise ArtifactError(f"{path.name} is not a warm-state snapshot")
+            state = decode_json(artifact.read(STATE))
+            if state.get("format") != WARM_STATE_FORMAT:
+                raise ArtifactError(f"{path.name} has warm-state format {state.get('format')}")
+        except (ArtifactError, KeyError, ValueError) as e:
+            artifact.close()
+            logger.warning(f"Ignoring warm-state snapshot {path}: {e}")
+            return None
+        return cls(artifact, state)
+
+    def take(self, model_key: str) -> Optional[List[Any]]:
+        """A pair's resolutions, once; None if there are none (left)."""
+        if model_key not in self.pending:
+            return None
+        self.pending.discard(model_key)
+        try:
+            entries = decode_json(self._artifact.read(resolutions_section(model_key)))
+        except (ArtifactError, ValueError) as e:
+            logger.warning(f"Ignoring warm resolutions of {model_key}: {e}")
+            entries = None
+        if not self.pending:
+            self.close()
+        return entries
+
+    def close(self) -> None:
+        self.pending.clear()
+        self._artifact.close()
@@ -0,0 +1 @@
+"""Offline benchmark suite for the QbilHub Intelligence Service"""
@@ -0,0 +1,207 @@
+"""
+Synthetic data generators for benchmarks
+Produces partner document layouts, canonical product catalogs and feedback streams
+"""
+import random
+import string
+from typing import Dict, Any, List, Tuple
+
+# Source field name variants per target field, as seen from trading partners
+FIELD_VARIANTS = {
+    'contractNumber': ['contract_no', 'Contract Number', 'contractnr', 'PO-Number', 'order_number', 'contractNumber'],
+    'supplier': ['supplier_name', 'Vendor', 'seller', 'vendor_name', 'supplier'],
+    'product': ['product_name', 'mat_id', 'Material', 'item', 'article', 'product'],
+    'quantity': ['qty', 'Amount', 'order_qty', 'quantity'],
+    'unit': ['uom', 'Unit of Measure', 'unit'],
+    'pricePerUnit': ['price', 'unit_price', 'Rate', 'pricePerUnit'],
+    'currency': ['ccy', 'curr', 'currency_code', 'currency'],
+    'deliveryDate': ['delivery_date', 'ETA', 'ship_date', 'deliveryDate'],
+    'deliveryLocation': ['ship_to', 'destination', 'Delivery Address', 'deliveryLocation'],
+}
+
+# Partner-specific fields that never map to the target schema
+EXTRA_FIELDS = ['incoterm', 'payment_terms', 'broker_ref', 'internal_note', 'quality_spec', 'packaging']
+
+PRODUCT_FAMILIES = [
+    'Whey Protein Concentrate', 'Whey Protein Isolate', 'Skimmed Milk Powder', 'Whole Milk Powder',
+    'Butter', 'Anhydrous Milk Fat', 'Lactose Powder', 'Casein', 'Milk Protein Concentrate',
+    'Palm Oil', 'Coconut Oil', 'Sunflower Oil', 'Rapeseed Oil', 'Soybean Oil',
+    'Wheat', 'Corn/Maize', 'Barley', 'Oats', 'Cocoa Butter', 'Sugar',
+]
+
+PRODUCT_GRADES = ['Food Grade', 'Feed Grade', 'Organic', 'Instant', 'Agglomerated', 'Refined', 'Crude']
+
+SUPPLIERS = [
+    'FrieslandCampina', 'Arla Foods', 'Lactalis', 'Fonterra', 'Müller', 'Sodiaal',
+    'Glanbia', 'Hochwald', 'Bunge', 'Cargill', 'Wilmar', 'Olam', 'ADM', 'Louis Dreyfus',
+]
+
+LEGAL_FORMS = ['B.V.', 'GmbH', 'Ltd', 'S.A.', 'N.V.', 'Inc.', '']
+
+
+def _abbreviate(name: str) -> str:
+    """Turn a canonical product name into a partner-style short code."""
+    words = [w for w in name.replace('/', ' ').split() if w[0].isalpha()]
+    initials = ''.join(w[0] for w in words).upper()
+    digits = ''.join(c for c in name if c.isdigit())
+    return f"{initials} {digits}".strip()
+
+
+def _misspell(rng: random.Random, value: str) -> str:
+    """Introduce a single typo (drop, swap or duplicate a character)."""
+    if len(value) < 4:
+        return value
+    i = rng.randrange(1, len(value) - 1)
+    op = rng.choice(('drop', 'swap', 'dup'))
+    if op == 'drop':
+        return value[:i] + value[i + 1:]
+    if op == 'swap':
+        return value[:i - 1] + value[i] + value[i - 1] + value[i + 1:]
+    return value[:i] + value[i] + value[i:]
+
+
+def messy_variant(rng: random.Random, canonical: str) -> str:
+    """Produce a messy source-side spelling of a canonical product name."""
+    style = rng.random()
+    if style < 0.3:
+        return _abbreviate(canonical)
+    if style < 0.6:
+        return _misspell(rng, canonical.lower())
+    if style < 0.8:
+        return canonical.upper().replace('%', '')
+    return canonical
+
+
+def product_catalog(size: int, seed: int = 42) -> Dict[str, str]:
+    """
+    Generate a knowledge-base style catalog of `size` entries.
+
+    Keys are lowercased aliases (as in DedupeService.PRODUCT_KNOWLEDGE_BASE),
+    values are canonical product names.
+    """
+    rng = random.Random(seed)
+    catalog: Dict[str, str] = {}
+    i = 0
+    while len(catalog) < size:
+        family = PRODUCT_FAMILIES[i % len(PRODUCT_FAMILIES)]
+        grade = PRODUCT_GRADES[(i // len(PRODUCT_FAMILIES)) % len(PRODUCT_GRADES)]
+        canonical = f"{family} {grade} {(i * 7) % 100}% #{i}"
+        catalog[f"{_abbreviate(canonical).lower()} {i}"] = canonical
+        i += 1
+        if len(catalog) < size and rng.random() < 0.5:
+            catalog[f"{_misspell(rng, canonical.lower())}"] = canonical
+    return catalog
+
+
+def partner_layouts(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate `count` raw_data documents using varied partner field layouts."""
+    rng = random.Random(seed)
+    documents = []
+    for n in range(count):
+        raw_data: Dict[str, Any] = {}
+        for target_field, variants in FIELD_VARIANTS.items():
+            if rng.random() < 0.9:
+                raw_data[rng.choice(variants)] = sample_value(rng, target_field, n)
+        for extra in rng.sample(EXTRA_FIELDS, rng.randint(0, 3)):
+            raw_data[extra] = ''.join(rng.choices(string.ascii_letters, k=12))
+        documents.append(raw_data)
+    return documents
+
+
+def sample_value(rng: random.Random, target_field: str, n: int) -> Any:
+    """Sample a plausible raw value for a target schema field."""
+    if target_field == 'contractNumber':
+        return f"PO-{2024 + n % 3}-{n:06d}"
+    if target_field == 'supplier':
+        return f"{rng.choice(SUPPLIERS)} {rng.choice(LEGAL_FORMS)}".strip()
+    if target_field == 'product':
+        return messy_variant(rng, rng.choice(PRODUCT_FAMILIES))
+    if target_field == 'quantity':
+        return rng.choice([f"{rng.randint(1, 500)}", f"{rng.randint(1, 50)},{rng.randint(0, 999):03d}", rng.randint(1, 500)])
+    if target_field == 'unit':
+        return rng.choice(['MT', 'kg', 'KG', 'lb', 'mt', 'tonnes'])
+    if target_field == 'pricePerUnit':
+        return rng.choice([f"{rng.uniform(500, 5000):.2f}", f"{rng.randint(1, 9)}.{rng.randint(100, 999)},50"])
+    if target_field == 'currency':
+        return rng.choice(['EUR', 'USD', 'GBP', '€', 'usd'])
+    if target_field == 'deliveryDate':
+        day, month = rng.randint(1, 28), rng.randint(1, 12)
+        return rng.choice([f"2025-{month:02d}-{day:02d}", f"{day:02d}.{month:02d}.2025", f"{day}/{month}/2025"])
+    return f"Port of {rng.choice(['Rotterdam', 'Hamburg', 'Antwerp', 'Le Havre'])}"
+
+
+def resolution_requests(count: int, catalog: Dict[str, str], seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate extractedData payloads whose products refer to catalog entries."""
+    rng = random.Random(seed)
+    aliases = list(catalog.keys())
+    requests = []
+    for n in range(count):
+        alias = rng.choice(aliases)
+        product = alias if rng.random() < 0.5 else messy_variant(rng, catalog[alias])
+        requests.append({
+            'contractNumber': f"PO-{n:06d}",
+            'supplier': sample_value(rng, 'supplier', n),
+            'product': product,
+            'quantity': rng.randint(1, 500),
+            'unit': 'MT',
+        })
+    return requests
+
+
+def feedback_stream(
+    count: int,
+    catalog: Dict[str, str],
+    tenant_pairs: int = 1,
+    seed: int = 42
+) -> List[Dict[str, Any]]:
+    """
+    Generate `count` feedback corrections in FeedbackRequest shape.
+
+    Repeats are frequent on purpose: real users correct the same
+    product strings many times.
+    """
+    rng = random.Random(seed)
+    canonical_values = sorted(set(catalog.values()))
+    hot = canonical_values[:max(1, len(canonical_values) // 10)]
+    pairs: List[Tuple[str, str]] = [(f"SRC{i:03d}", f"TGT{i % 7:03d}") for i in range(tenant_pairs)]
+
+    stream = []
+    for _ in range(count):
+        source_tenant, target_tenant = rng.choice(pairs)
+        canonical = rng.choice(hot) if rng.random() < 0.7 else rng.choice(canonical_values)
+        stream.append({
+            'sourceTenantCode': source_tenant,
+            'targetTenantCode': target_tenant,
+            'sourceField': 'product_name',
+            'sourceValue': messy_variant(rng, canonical),
+            'targetField': 'product',
+            'correctedValue': canonical,
+        })
+    return stream
+
+
+def training_set(count: int, catalog: Dict[str, str], seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Generate `count` labelled matches in DedupeService.train_model format,
+    with a distinct (non-matching) item after roughly a third of them.
+    """
+    rng = random.Random(seed)
+    aliases = list(catalog.keys())
+    items = []
+    for _ in range(count):
+        canonical = catalog[rng.choice(aliases)]
+        supplier = rng.choice(SUPPLIERS)
+        messy = {'product': messy_variant(rng, canonical), 'supplier': supplier}
+        items.append({
+            'messy': messy,
+            'canonical': {'product': canonical, 'supplier': f"{supplier} {rng.choice(LEGAL_FORMS)}".strip()},
+            'is_match': True,
+        })
+        other = catalog[rng.choice(aliases)]
+        if other != canonical and rng.random() < 0.3:
+            items.append({
+                'messy': messy,
+                'canonical': {'product': other, 'supplier': rng.choice(SUPPLIERS)},
+                'is_match': False,
+            })
+    return items
@@ -0,0 +1,223 @@
+"""
+Load-test harness simulating concurrent Symfony messenger workers
+
+Each simulated worker behaves like `messenger:consume async`: it handles one
+message at a time and makes a single blocking call to the intelligence
+service with the same timeouts as PythonServiceClient. The message mix is
+configurable, and a sweep over worker counts shows where throughput stops
+scaling.
+
+Usage:
+    # against a running service (optionally backed by benchmarks.openai_stub)
+    python -m benchmarks.load_harness --target http://127.0.0.1:8000 --workers 4,8,16,32 --duration 30
+
+    # in-process, LLM mode against a local stub
+    python -m benchmarks.openai_stub --port 8100 --error-rate 0.05 &
+    python -m benchmarks.load_harness --in-process --llm-base-url http://127.0.0.1:8100/v1 \\
+        --stub-stats-url http://127.0.0.1:8100/stats --mix extract=0.5,resolve=0.4,feedback=0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from benchmarks import generators
+
+logger = logging.getLogger("benchmarks.load")
+
+# Per-call timeouts used by src/Service/PythonServiceClient.php
+ENDPOINTS = {
+    "extract": ("/api/extract-schema", 30.0),
+    "resolve": ("/api/resolve-entities", 60.0),
+    "feedback": ("/api/feedback", 10.0),
+}
+
+DEFAULT_MIX = "extract=0.45,resolve=0.45,feedback=0.10"
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse 'extract=0.5,resolve=0.4,feedback=0.1' into normalized weights."""
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint in mix: {name}")
+        weights[name.strip()] = float(weight)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+class Workload:
+    """Pre-generated payloads for every endpoint in the mix."""
+
+    def __init__(self, size: int, tenant_pairs: int, seed: int):
+        catalog = generators.product_catalog(1_000, seed=seed)
+        feedback = generators.feedback_stream(size, catalog, tenant_pairs=tenant_pairs, seed=seed)
+        pairs = [(f["sourceTenantCode"], f["targetTenantCode"]) for f in feedback]
+        self.payloads = {
+            "extract": [{"rawData": raw} for raw in generators.partner_layouts(size, seed=seed)],
+            "resolve": [
+                {"extractedData": data, "sourceTenantCode": src, "targetTenantCode": tgt}
+                for data, (src, tgt) in zip(generators.resolution_requests(size, catalog, seed=seed), pairs)
+            ],
+            "feedback": feedback,
+        }
+
+    def pick(self, rng: random.Random, endpoint: str) -> Dict[str, Any]:
+        return rng.choice(self.payloads[endpoint])
+
+
+class LevelStats:
+    """Results for one worker-count level."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.statuses: Dict[str, Counter] = {name: Counter() for name in ENDPOINTS}
+
+    def record(self, endpoint: str, status: str, latency: float) -> None:
+        self.statuses[endpoint][status] += 1
+        if status == "200":
+            self.latencies[endpoint].append(latency)
+
+    def summary(self, elapsed: float, workers: int) -> Dict[str, Any]:
+        endpoints = {}
+        total_ok = 0
+        for name in ENDPOINTS:
+            ordered = sorted(self.latencies[name])
+            count = sum(self.statuses[name].values())
+            if not count:
+                continue
+            total_ok += len(ordered)
+            endpoints[name] = {
+                "requests": count,
+                "ok_per_sec": round(len(ordered) / elapsed, 2),
+                "statuses": dict(self.statuses[name]),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2) if ordered else None,
+                "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 2) if ordered else None,
+                "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2) if ordered else None,
+            }
+        return {
+            "workers": workers,
+            "duration_s": round(elapsed, 2),
+            "ok_per_sec": round(total_ok / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+async def run_worker(
+    client,
+    workload: Workload,
+    mix: Dict[str, float],
+    stats: LevelStats,
+    deadline: float,
+    rng: random.Random
+) -> None:
+    """Sequentially process 'messages' until the deadline, like one messenger worker."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.monotonic() < deadline:
+        endpoint = rng.choices(names, weights)[0]
+        path, timeout = ENDPOINTS[endpoint]
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, json=workload.pick(rng, endpoint), timeout=timeout)
+            status = str(response.status_code)
+        except Exception as e:  # timeouts and transport errors are results, not failures
+            status = type(e).__name__
+        stats.record(endpoint, status, time.perf_counter() - started)
+
+
+async def run_level(client, workload, mix, workers: int, duration: float, seed: int) -> Dict[str, Any]:
+    stats = LevelStats()
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*(
+        run_worker(client, workload, mix, stats, deadline, random.Random(seed + i))
+        for i in range(workers)
+    ))
+    return stats.summary(time.monotonic() - started, workers)
+
+
+async def fetch_stub_stats(url: Optional[str], reset: bool = False) -> Optional[Dict[str, Any]]:
+    """Read (and optionally reset) counters from benchmarks.openai_stub."""
+    if not url:
+        return None
+    import httpx
+    async with httpx.AsyncClient() as client:
+        if reset:
+            await client.post(url.rstrip("/") + "/reset")
+            return None
+        return (await client.get(url)).json()
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+
+    mix = parse_mix(args.mix)
+    workload = Workload(size=2_000, tenant_pairs=args.tenant_pairs, seed=args.seed)
+    limits = httpx.Limits(max_connections=max(args.workers) * 2, max_keepalive_connections=max(args.workers))
+    levels = []
+
+    async def sweep(client):
+        for workers in args.workers:
+            await fetch_stub_stats(args.stub_stats_url, reset=True)
+            logger.info(f"Running {workers} workers for {args.duration}s...")
+            level = await run_level(client, workload, mix, workers, args.duration, args.seed)
+            level["llm_stub"] = await fetch_stub_stats(args.stub_stats_url)
+            logger.info(f"  {level['ok_per_sec']} ok/s")
+            levels.append(level)
+
+    if args.in_process:
+        from app.main import app, services
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://load", limits=limits) as client:
+                await sweep(client)
+                llm_mode = "openai" if services.llm_service.use_llm else "rule-based"
+    else:
+        async with httpx.AsyncClient(base_url=args.target, limits=limits) as client:
+            await sweep(client)
+            llm_mode = (await client.get("/health")).json()["components"].get("llm_mode")
+
+    return {"mix": mix, "llm_mode": llm_mode, "levels": levels}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Messenger-worker load harness")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="Base URL of a running service")
+    parser.add_argument("--in-process", action="store_true", help="Drive the app in-process via ASGI")
+    parser.add_argument("--llm-base-url", help="OpenAI-compatible endpoint for --in-process LLM mode")
+    parser.add_argument("--stub-stats-url", help="benchmarks.openai_stub /stats URL to include in the report")
+    parser.add_argument("--workers", type=lambda v: [int(x) for x in v.split(",")], default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per worker-count level")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--tenant-pairs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("app").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.in_process and args.llm_base_url:
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+        os.environ["OPENAI_BASE_URL"] = args.llm_base_url
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Local OpenAI-compatible stand-in server for load testing
+
+Implements POST /v1/chat/completions well enough for LLMService (ChatOpenAI).
+Schema-extraction prompts are answered with schema-valid
+SchemaExtractionResult JSON derived from the rule-based extractor; other
+prompts get a short plain-text analysis. Latency, error rate and rate
+limiting are configurable so provider degradation can be simulated.
+Streamed answers ("stream": true) send their first chunk after a tenth of
+the sampled latency and spread the rest over the remaining chunks.
+
+Usage:
+    python -m benchmarks.openai_stub --port 8100 --latency-median-ms 800 --latency-p99-ms 4000 \\
+        --error-rate 0.02 --rate-limit-rate 0.05 --rpm 600
+
+    # point the service at it
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:8100/v1 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class StubConfig:
+    """Degradation profile of the simulated provider"""
+    latency_median_ms: float = 600.0
+    latency_p99_ms: float = 3000.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    rpm: int = 0  # 0 = unlimited
+    retry_after_s: float = 1.0
+    stream_chunk_chars: int = 4
+    seed: Optional[int] = None
+
+
+@dataclass
+class StubStats:
+    """Counters exposed on /stats"""
+    requests: int = 0
+    completed: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    latency_ms_total: float = 0.0
+    by_kind: Dict[str, int] = field(default_factory=dict)
+
+
+class _TokenBucket:
+    """Requests-per-minute limiter in the style of the OpenAI rate limits."""
+
+    def __init__(self, rpm: int):
+        self.capacity = float(rpm)
+        self.tokens = float(rpm)
+        self.rate = rpm / 60.0
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    """Build the stub FastAPI application for a given degradation profile."""
+    from app.services.llm_service import LLMService, SchemaExtractionResult
+
+    app = FastAPI(title="OpenAI stub")
+    rng = random.Random(config.seed)
+    stats = StubStats()
+    bucket = _TokenBucket(config.rpm) if config.rpm > 0 else None
+    extractor = LLMService()
+
+    # Lognormal latency fitted to the configured median and p99
+    mu = math.log(max(config.latency_median_ms, 0.001))
+    sigma = max(0.0, math.log(max(config.latency_p99_ms, config.latency_median_ms, 0.001) / max(config.latency_median_ms, 0.001)) / 2.326)
+
+    def sample_latency() -> float:
+        return rng.lognormvariate(mu, sigma) / 1000.0 if config.latency_median_ms > 0 else 0.0
+
+    def error_body(message: str, error_type: str, code: str) -> Dict[str, Any]:
+        return {"error": {"message": message, "type": error_type, "param": None, "code": code}}
+
+    def answer(messages) -> tuple:
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        try:
+            raw_data = json.loads(user[user.index("{"):user.rindex("}") + 1])
+        except ValueError:
+            raw_data = {}
+
+        if "schema extraction" in system:
+            result = extractor._rule_based_extract_schema(raw_data)
+            # Members in the order the output parser's format instructions ask for
+            return "extract", json.dumps({name: result[name] for name in SchemaExtractionResult.model_fields})
+        fields = ", ".join(raw_data.keys()) or "none"
+        return "analyze", (
+            "Document type: purchase contract (simulated).\n"
+            f"Key fields: {fields}.\n"
+            "No partner-specific conventions detected by the stub."
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        stats.requests += 1
+        body = await request.json()
+
+        if (bucket is not None and not bucket.try_acquire()) or rng.random() < config.rate_limit_rate:
+            stats.rate_limited += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(config.retry_after_s)},
+                content=error_body("Rate limit reached for requests", "requests", "rate_limit_exceeded"),
+            )
+
+        stream = bool(body.get("stream"))
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        latency = sample_latency()
+        try:
+            # Streamed answers start after a tenth of the latency
+            await asyncio.sleep(latency / 10 if stream else latency)
+        finally:
+            stats.in_flight -= 1
+        stats.latency_ms_total += latency * 1000
+
+        if rng.random() < config.error_rate:
+            stats.errors += 1
+            return JSONResponse(
+                status_code=500,
+                content=error_body("The server had an error while processing your request.", "server_error", None),
+            )
+
+        kind, content = answer(body.get("messages", []))
+        stats.completed += 1
+        stats.by_kind[kind] = stats.by_kind.get(kind, 0) + 1
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+
+        if stream:
+            return StreamingResponse(stream_chunks(body, content, latency * 0.9), media_type="text/event-stream")
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    async def stream_chunks(body: Dict[str, Any], content: str, duration: float):
+        """chat.completion.chunk events of an answer, spread over duration seconds."""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        size = max(1, config.stream_chunk_chars)
+        pieces = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> bytes:
+            return ("data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + "\n\n").encode()
+
+        yield chunk({"role": "assistant", "content": ""})
+        for n, piece in enumerate(pieces):
+            if n:
+                await asyncio.sleep(duration / len(pieces))
+            yield chunk({"content": piece})
+        yield chunk({}, "stop")
+        yield b"data: [DONE]\n\n"
+
+    @app.get("/stats")
+    async def get_stats():
+        result = asdict(stats)
+        result["config"] = asdict(config)
+        return result
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        nonlocal stats
+        stats = StubStats()
+        return {"reset": True}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-median-ms", type=float, default=StubConfig.latency_median_ms)
+    parser.add_argument("--latency-p99-ms", type=float, default=StubConfig.latency_p99_ms)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests-per-minute limit (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429 responses")
+    parser.add_argument("--stream-chunk-chars", type=int, default=StubConfig.stream_chunk_chars,
+                        help="Characters per chunk of streamed answers")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_median_ms=args.latency_median_ms,
+        latency_p99_ms=args.latency_p99_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm=args.rpm,
+        retry_after_s=args.retry_after,
+        stream_chunk_chars=args.stream_chunk_chars,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
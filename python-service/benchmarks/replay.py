@@ -0,0 +1,354 @@
+"""
+Offline replay of recorded feedback through entity resolution
+
+Streams recorded corrections (the training store's feedback, pending and
+consumed, or JSONL feedback files such as training_data/archive/*.jsonl)
+through DedupeService.resolve_entities, with this environment's models,
+catalogs and counterparties and the resolution tiers chosen on the command
+line. Each correction is one lookup of its source value; the lookup is
+correct when it resolves to the corrected value. Per tenant pair and
+overall, the report has precision and recall at confidence thresholds
+(precision over lookups answered at or above the threshold, recall over
+all lookups) and per-lookup latency percentiles.
+
+Tenant pairs are spread over worker processes, one per core by default;
+each pair always goes to the same worker, so its model is loaded once.
+The resolution memo cache is off unless --cache is given, so every lookup
+runs the matchers.
+
+Models were usually trained on the very corrections being replayed; use
+--since to replay only feedback recorded after the models were trained.
+
+Usage:
+    python -m benchmarks.replay --output replay.json
+    python -m benchmarks.replay --tiers exact,automaton,ngram --target TENANT_B
+    python -m benchmarks.replay --jsonl training_data/archive/*.jsonl --workers 4
+    python -m benchmarks.replay --baseline replay.json --tolerance 0.01
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("benchmarks.replay")
+
+DEFAULT_THRESHOLDS = "0.5,0.7,0.9"
+
+# A lookup: (target field, source value, corrected value)
+Lookup = Tuple[str, str, str]
+Pair = Tuple[str, str]
+
+
+# Worker process state
+_service = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(env: Dict[str, str]) -> None:
+    global _service, _loop
+    os.environ.update(env)
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logging.getLogger("dedupe").setLevel(logging.WARNING)
+
+    from app.services.dedupe_service import DedupeService
+
+    _service = DedupeService()
+    _loop = asyncio.new_event_loop()
+
+
+def _replay_chunk(pair: Pair, lookups: List[Lookup]) -> Tuple[Pair, Dict[str, np.ndarray], int]:
+    """Resolve a chunk of one pair's lookups; returns per-lookup results and the skipped count."""
+    return pair, *_loop.run_until_complete(_replay(pair, lookups))
+
+
+async def _replay(pair: Pair, lookups: List[Lookup]) -> Tuple[Dict[str, np.ndarray], int]:
+    from app.services.resolution_cache import normalize_value
+
+    source_tenant, target_tenant = pair
+    confidences, correct, latencies = [], [], []
+    skipped = 0
+    for field, source_value, corrected_value in lookups:
+        # Only match fields are resolved; anything else is passed through
+        if field not in _service.match_fields:
+            skipped += 1
+            continue
+        started = time.perf_counter()
+        result = await _service.resolve_entities({field: source_value}, source_tenant, target_tenant)
+        latencies.append(time.perf_counter() - started)
+        confidences.append(result["confidenceScores"][field])
+        correct.append(normalize_value(result["mappedData"][field]) == normalize_value(corrected_value))
+
+    return {
+        "confidence": np.array(confidences, dtype=np.float32),
+        "correct": np.array(correct, dtype=bool),
+        "latency": np.array(latencies, dtype=np.float64),
+    }, skipped
+
+
+def read_feedback(args) -> Iterator[Dict[str, Any]]:
+    """Feedback entries to replay, oldest first."""
+    if args.jsonl:
+        for path in args.jsonl:
+            with open(path, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if args.source and entry.get("sourceTenant") != args.source:
+                        continue
+                    if args.target and entry.get("targetTenant") != args.target:
+                        continue
+                    timestamp = entry.get("timestamp") or ""
+                    if (args.since and timestamp < args.since) or (args.until and timestamp >= args.until):
+                        continue
+                    yield entry
+        return
+
+    from app.services.training_store import TrainingStore
+
+    training_data_path = Path(os.getenv("TRAINING_DATA_PATH", "./training_data"))
+    store = TrainingStore(args.db or Path(os.getenv("TRAINING_DB_PATH") or training_data_path / "training.db"))
+    try:
+        yield from store.iter_feedback(args.source, args.target, since=args.since, until=args.until)
+    finally:
+        store.close()
+
+
+class PairResults:
+    """Per-lookup results of one tenant pair, accumulated over chunks."""
+
+    def __init__(self):
+        self.chunks: List[Dict[str, np.ndarray]] = []
+        self.skipped = 0
+
+    def add(self, chunk: Dict[str, np.ndarray], skipped: int) -> None:
+        self.chunks.append(chunk)
+        self.skipped += skipped
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            name: np.concatenate([chunk[name] for chunk in self.chunks])
+            for name in ("confidence", "correct", "latency")
+        }
+
+
+def summarize(results: Dict[str, np.ndarray], thresholds: List[float], skipped: int = 0) -> Dict[str, Any]:
+    """Accuracy, precision/recall per threshold and latency percentiles of a set of lookups."""
+    confidence, correct, latency = results["confidence"], results["correct"], results["latency"]
+    n = int(correct.size)
+    summary: Dict[str, Any] = {"n": n, "skipped": skipped}
+    if n == 0:
+        return summary
+
+    summary["accuracy"] = round(float(correct.mean()), 4)
+    summary["thresholds"] = {}
+    for threshold in thresholds:
+        answered = confidence >= threshold
+        hits = int((answered & correct).sum())
+        summary["thresholds"][f"{threshold:g}"] = {
+            "answered": int(answered.sum()),
+            "precision": round(hits / int(answered.sum()), 4) if answered.any() else None,
+            "recall": round(hits / n, 4),
+        }
+    latency_ms = latency * 1000
+    summary["latency_ms"] = {
+        "mean": round(float(latency_ms.mean()), 4),
+        "p50": round(float(np.percentile(latency_ms, 50)), 4),
+        "p95": round(float(np.percentile(latency_ms, 95)), 4),
+        "p99": round(float(np.percentile(latency_ms, 99)), 4),
+        "max": round(float(latency_ms.max()), 4),
+    }
+    return summary
+
+
+def run(args) -> Dict[str, Any]:
+    thresholds = [float(t) for t in args.thresholds.split(",") if t.strip()]
+    env = {"SCORING_WORKERS": "0"}
+    if not args.cache:
+        env["RESOLUTION_CACHE_SIZE"] = "0"
+    if args.tiers:
+        env["RESOLUTION_TIERS"] = args.tiers
+    if args.model_sharing:
+        env["MODEL_SHARING"] = args.model_sharing
+
+    workers = [
+        ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"), initializer=_init_worker, initargs=(env,))
+        for _ in range(max(1, args.workers))
+    ]
+    pairs: Dict[Pair, PairResults] = {}
+    buffers: Dict[Pair, List[Lookup]] = {}
+    in_flight: Set[Future] = set()
+    max_in_flight = len(workers) * 4
+
+    def collect(done) -> None:
+        for future in done:
+            pair, chunk, skipped = future.result()
+            pairs.setdefault(pair, PairResults()).add(chunk, skipped)
+
+    def submit(pair: Pair, lookups: List[Lookup]) -> None:
+        nonlocal in_flight
+        if len(in_flight) >= max_in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+        worker = workers[zlib.crc32(f"{pair[0]}_{pair[1]}".encode("utf-8")) % len(workers)]
+        in_flight.add(worker.submit(_replay_chunk, pair, lookups))
+
+    started = time.perf_counter()
+    replayed = 0
+    try:
+        for entry in read_feedback(args):
+            pair = (entry["sourceTenant"], entry["targetTenant"])
+            buffer = buffers.setdefault(pair, [])
+            buffer.append((entry.get("targetField", "product"), entry["sourceValue"], entry["correctedValue"]))
+            if len(buffer) >= args.chunk_size:
+                submit(pair, buffers.pop(pair))
+            replayed += 1
+            if args.limit and replayed >= args.limit:
+                break
+            if replayed % 10_000 == 0:
+                logger.info(f"Queued {replayed} lookups...")
+        for pair, lookups in buffers.items():
+            submit(pair, lookups)
+        collect(wait(in_flight).done)
+    finally:
+        for worker in workers:
+            worker.shutdown(cancel_futures=True)
+    elapsed = time.perf_counter() - started
+
+    per_pair = {}
+    all_results = []
+    skipped = 0
+    for (source_tenant, target_tenant), results in sorted(pairs.items()):
+        arrays = results.arrays()
+        all_results.append(arrays)
+        skipped += results.skipped
+        per_pair[f"{source_tenant}_{target_tenant}"] = summarize(arrays, thresholds, results.skipped)
+
+    overall = {"n": 0, "skipped": skipped}
+    if all_results:
+        overall = summarize(
+            {name: np.concatenate([r[name] for r in all_results]) for name in ("confidence", "correct", "latency")},
+            thresholds,
+            skipped
+        )
+    overall["lookups_per_sec"] = round(overall["n"] / elapsed, 2) if elapsed > 0 else None
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "source": [str(path) for path in args.jsonl] if args.jsonl else "training_store",
+            "since": args.since,
+            "until": args.until,
+            "tiers": args.tiers or os.getenv("RESOLUTION_TIERS", "exact,automaton,ngram,model"),
+            "model_sharing": args.model_sharing or os.getenv("MODEL_SHARING", "pair"),
+            "cache": args.cache,
+            "workers": len(workers),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "overall": overall,
+        "pairs": per_pair,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare precision and recall against a baseline report, overall and per pair.
+
+    Returns a list of human-readable regression descriptions.
+    """
+    regressions = []
+    scopes = [("overall", report["overall"], baseline.get("overall", {}))]
+    scopes += [
+        (pair, summary, baseline.get("pairs", {}).get(pair, {}))
+        for pair, summary in report["pairs"].items()
+    ]
+    for scope, current, previous in scopes:
+        for threshold, metrics in current.get("thresholds", {}).items():
+            before = previous.get("thresholds", {}).get(threshold)
+            if not before:
+                continue
+            for metric in ("precision", "recall"):
+                if metrics[metric] is None or before[metric] is None:
+                    continue
+                drop = before[metric] - metrics[metric]
+                if drop > tolerance:
+                    regressions.append(
+                        f"{scope}: {metric}@{threshold} {before[metric]} -> {metrics[metric]} (-{drop:.4f})"
+                    )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded feedback through entity resolution")
+    parser.add_argument("--db", type=Path, help="Training store (default TRAINING_DB_PATH or TRAINING_DATA_PATH/training.db)")
+    parser.add_argument("--jsonl", type=Path, nargs="+", help="Replay these JSONL feedback files instead of the store")
+    parser.add_argument("--source", help="Only feedback of this source tenant")
+    parser.add_argument("--target", help="Only feedback of this target tenant")
+    parser.add_argument("--since", help="Only feedback recorded at or after this ISO timestamp")
+    parser.add_argument("--until", help="Only feedback recorded before this ISO timestamp")
+    parser.add_argument("--limit", type=int, default=0, help="Replay at most this many lookups")
+    parser.add_argument("--tiers", help="Resolution tiers to replay with (default RESOLUTION_TIERS)")
+    parser.add_argument("--model-sharing", choices=("pair", "target"), help="Model sharing mode (default MODEL_SHARING)")
+    parser.add_argument("--cache", action="store_true", help="Keep the resolution memo cache on")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Lookups per unit of work")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help=f"Confidence thresholds (default {DEFAULT_THRESHOLDS})")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", type=Path, help="Baseline replay report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="Allowed absolute precision or recall drop before it counts as regressed (default 0.01)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("app").setLevel(logging.WARNING)
+    logging.getLogger("dedupe").setLevel(logging.WARNING)
+
+    report = run(args)
+
+    regressions = []
+    if args.baseline and args.baseline.exists():
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+    report["regressions"] = regressions
+
+    thresholds = [f"{float(t):g}" for t in args.thresholds.split(",") if t.strip()]
+    header = f"{'pair':32s} {'n':>8} {'acc':>7} " + " ".join(f"{'P/R@' + t:>15}" for t in thresholds)
+    logger.info(header + f" {'p50 ms':>9} {'p95 ms':>9}")
+    for name, summary in [*report["pairs"].items(), ("overall", report["overall"])]:
+        if not summary["n"]:
+            continue
+        cells = []
+        for t in thresholds:
+            metrics = summary["thresholds"][t]
+            precision = f"{metrics['precision']:.3f}" if metrics["precision"] is not None else "-"
+            cells.append(f"{precision + '/' + format(metrics['recall'], '.3f'):>15}")
+        logger.info(
+            f"{name:32s} {summary['n']:>8} {summary['accuracy']:>7.3f} " + " ".join(cells)
+            + f" {summary['latency_ms']['p50']:>9} {summary['latency_ms']['p95']:>9}"
+        )
+    logger.info(f"{report['overall']['lookups_per_sec']} lookups/s with {report['meta']['workers']} workers")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if regressions:
+        for regression in regressions:
+            logger.error(f"REGRESSION {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
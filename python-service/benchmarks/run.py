@@ -0,0 +1,682 @@
+"""
+Benchmark runner for the intelligence service hot paths
+
+Runs fully offline: OpenAI is never contacted (the LLM is replaced by an
+in-process stub) and models/training data live in a temporary directory.
+
+Usage:
+    python -m benchmarks.run --suite quick --output results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --update-baseline
+
+Exits with status 1 when any benchmark is slower than its baseline by more
+than the configured tolerance.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+# Isolate the service from the developer environment before importing it
+_WORKDIR = tempfile.mkdtemp(prefix="qbilhub-bench-")
+os.environ.pop("OPENAI_API_KEY", None)
+os.environ["DEDUPE_MODEL_PATH"] = str(Path(_WORKDIR) / "models")
+os.environ["TRAINING_DATA_PATH"] = str(Path(_WORKDIR) / "training_data")
+os.environ.setdefault("DEDUPE_MIN_TRAINING_SAMPLES", "10")
+
+from benchmarks import generators  # noqa: E402
+
+logger = logging.getLogger("benchmarks")
+
+SEED = 42
+
+SUITES = {
+    "quick": {
+        "catalog_sizes": [1_000, 10_000],
+        "layouts": 2_000,
+        "llm_paced_layouts": 20,
+        "llm_token_delay_ms": 12,
+        "normalize_rows": 100_000,
+        "queries": 200,
+        "train_sizes": [100],
+        "feedback": 2_000,
+        "http_requests": 500,
+        "http_concurrency": 16,
+    },
+    "full": {
+        "catalog_sizes": [1_000, 10_000, 100_000, 1_000_000],
+        "layouts": 20_000,
+        "llm_paced_layouts": 100,
+        "llm_token_delay_ms": 12,
+        "normalize_rows": 1_000_000,
+        "queries": 1_000,
+        "train_sizes": [100, 500],
+        "feedback": 20_000,
+        "http_requests": 5_000,
+        "http_concurrency": 64,
+    },
+}
+
+
+class StubChatModel:
+    """
+    Stand-in for ChatOpenAI used by LLMService.
+
+    Answers with schema-valid SchemaExtractionResult JSON derived from the
+    rule-based extractor, so the prompt formatting and output parsing of the
+    LLM path are exercised without any network access. With a token delay,
+    answers take that long per token of chunk_chars characters, whether
+    they are streamed or not.
+    """
+
+    def __init__(self, llm_service, token_delay: float = 0.0, chunk_chars: int = 4):
+        self.llm_service = llm_service
+        self.token_delay = token_delay
+        self.chunk_chars = chunk_chars
+
+    def _answer(self, messages) -> str:
+        from app.services.llm_service import SchemaExtractionResult
+
+        prompt = messages[-1].content
+        raw_data = json.loads(prompt[prompt.index("{"):prompt.rindex("}") + 1])
+        result = self.llm_service._rule_based_extract_schema(raw_data)
+        # Members in the order the output parser's format instructions ask for
+        return json.dumps({name: result[name] for name in SchemaExtractionResult.model_fields}, indent=2)
+
+    async def ainvoke(self, messages):
+        content = self._answer(messages)
+        if self.token_delay:
+            await asyncio.sleep(self.token_delay * -(-len(content) // self.chunk_chars))
+        return _StubMessage(content)
+
+    async def astream(self, messages):
+        content = self._answer(messages)
+        for i in range(0, len(content), self.chunk_chars):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield _StubMessage(content[i:i + self.chunk_chars])
+
+
+class _StubMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+def _summarize(latencies: List[float], elapsed: float, **extra) -> Dict[str, Any]:
+    """Turn per-operation latencies (seconds) into a result record."""
+    ordered = sorted(latencies)
+    n = len(ordered)
+    result = {
+        "n": n,
+        "ops_per_sec": round(n / elapsed, 2) if elapsed > 0 else None,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p50_ms": round(ordered[n // 2] * 1000, 4),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))] * 1000, 4),
+        "p99_ms": round(ordered[min(n - 1, int(n * 0.99))] * 1000, 4),
+    }
+    result.update(extra)
+    return result
+
+
+def measure(fn: Callable[[Any], Any], inputs: List[Any], **extra) -> Dict[str, Any]:
+    """Time a synchronous callable over every input."""
+    latencies = []
+    start = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return _summarize(latencies, time.perf_counter() - start, **extra)
+
+
+async def measure_async(
+    fn: Callable[[Any], Awaitable[Any]],
+    inputs: List[Any],
+    concurrency: int = 1,
+    **extra
+) -> Dict[str, Any]:
+    """Time an async callable over every input with bounded concurrency."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(item):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await fn(item)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(item) for item in inputs))
+    return _summarize(latencies, time.perf_counter() - start, **extra)
+
+
+def peak_memory_mb(fn: Callable[[], Any]) -> float:
+    """Peak Python heap allocation while running fn once, in MB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_schema_extraction(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    from app.services.extraction_cache import ExtractionCache
+    from app.services.llm_service import LLMService
+
+    service = LLMService()
+    layouts = generators.partner_layouts(config["layouts"], seed=SEED)
+    results = {
+        "rule_based_extract_schema": measure(service._rule_based_extract_schema, layouts)
+    }
+
+    # LLM path with the stubbed chat model (prompt build + output parsing)
+    service.api_key = "stub"
+    service.use_llm = True
+    service._init_llm()
+    service.llm = StubChatModel(service)
+    service.result_cache = ExtractionCache(0)
+    sample = layouts[:max(1, config["layouts"] // 10)]
+    results["llm_extract_schema_stub"] = asyncio.run(
+        measure_async(service.extract_schema, sample)
+    )
+
+    # Time to the first field vs. the whole answer at a realistic token rate
+    service.llm = StubChatModel(service, token_delay=config["llm_token_delay_ms"] / 1000)
+    service.result_cache = ExtractionCache(len(layouts))
+    paced = layouts[:config["llm_paced_layouts"]]
+    first_field = []
+
+    async def stream_first_field(raw_data):
+        t0 = time.perf_counter()
+        first = None
+        async for event, _ in service.stream_extract_schema(raw_data):
+            if event == "field" and first is None:
+                first = time.perf_counter() - t0
+        first_field.append(first)
+
+    # Paced calls mostly sleep, so they run concurrently to keep the suite short
+    half = len(paced) // 2
+    results["llm_extract_schema_paced"] = asyncio.run(
+        measure_async(service.extract_schema, paced[:half], concurrency=half)
+    )
+    results["llm_stream_extract_schema_paced"] = asyncio.run(
+        measure_async(stream_first_field, paced[half:], concurrency=half)
+    )
+    first_field.sort()
+    results["llm_stream_extract_schema_paced"]["first_field_p50_ms"] = round(
+        first_field[len(first_field) // 2] * 1000, 4
+    )
+    # Every document now has a cached result
+    results["llm_extract_schema_cached"] = asyncio.run(measure_async(service.extract_schema, paced))
+    return results
+
+
+def bench_value_normalization(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Value normalization record by record vs. column-wise over a bulk import."""
+    import random
+
+    import pandas as pd
+
+    from app.services.value_normalizer import NORMALIZED_FIELDS, ValueNormalizer
+
+    normalizer = ValueNormalizer()
+    rng = random.Random(SEED)
+    rows = config["normalize_rows"]
+    records = [{field: generators.sample_value(rng, field, n) for field in NORMALIZED_FIELDS} for n in range(rows)]
+    values = rows * len(NORMALIZED_FIELDS)
+
+    start = time.perf_counter()
+    for record in records:
+        normalizer.normalize(record)
+    record_elapsed = time.perf_counter() - start
+    results = {
+        "normalize_record": measure(normalizer.normalize, records[:10_000]),
+    }
+    results["normalize_record"]["values_per_sec"] = round(values / record_elapsed)
+
+    frame = pd.DataFrame(records)
+    results[f"normalize_frame_{rows}"] = measure(normalizer.normalize_frame, [frame] * 3, rows=rows)
+    results[f"normalize_frame_{rows}"]["values_per_sec"] = round(
+        values * results[f"normalize_frame_{rows}"]["ops_per_sec"]
+    )
+    return results
+
+
+def bench_knowledge_base(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Product resolution through the cascade's knowledge-base tiers alone (no catalog, no model)."""
+    from app.services.dedupe_service import DedupeService
+
+    service = DedupeService()
+    results = {}
+    for size in config["catalog_sizes"]:
+        catalog = generators.product_catalog(size, seed=SEED)
+        service.PRODUCT_KNOWLEDGE_BASE = catalog
+        t0 = time.perf_counter()
+        service._knowledge_base_indexes()
+        build_ms = round((time.perf_counter() - t0) * 1000, 2)
+        queries = [r["product"] for r in generators.resolution_requests(config["queries"], catalog, seed=SEED)]
+        results[f"knowledge_base_{size}"] = asyncio.run(measure_async(
+            lambda query: service._cascade("product", query, {"product": query}, "BENCH_TGT", None),
+            queries,
+            catalog_size=size,
+            build_ms=build_ms
+        ))
+    return results
+
+
+def bench_resolution_cascade(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Full match-field resolution through the tier cascade, with a catalog and a trained model."""
+    from app.services.dedupe_service import DedupeService
+
+    service = DedupeService()
+    service.resolution_cache.max_entries_per_pair = 0
+    size = config["catalog_sizes"][0]
+    catalog = generators.product_catalog(size, seed=SEED)
+    service.PRODUCT_KNOWLEDGE_BASE = dict(list(catalog.items())[:size // 2])
+    service.set_catalog("BENCH_TGT", "product", sorted(set(catalog.values())))
+    try:
+        gazetteer = _fixture_gazetteer(service, catalog)
+    except Exception as e:
+        logger.warning(f"Skipping resolution_cascade: fixture training failed: {e}")
+        return {}
+    service.save_model("BENCH_SRC_BENCH_TGT", gazetteer)
+
+    requests = generators.resolution_requests(config["queries"], catalog, seed=SEED)
+    service._knowledge_base_indexes()
+    result = asyncio.run(measure_async(
+        lambda data: service._compute_match_fields(data, "BENCH_SRC_BENCH_TGT", "BENCH_TGT"),
+        requests
+    ))
+    stats = service.get_cascade_stats()
+    result["resolved_by"] = {tier: tier_stats["resolved"] for tier, tier_stats in stats["tiers"].items()}
+    result["time_share"] = {tier: tier_stats["timeShare"] for tier, tier_stats in stats["tiers"].items()}
+    return {f"resolution_cascade_{size}": result}
+
+
+def _fixture_gazetteer(service, catalog: Dict[str, str], labels: int = 200):
+    """Train a small gazetteer directly with dedupe to exercise the model path."""
+    import random
+    import dedupe
+
+    rng = random.Random(SEED)
+    canonical = {
+        f"c_{i}": {"product": value, "supplier": None}
+        for i, value in enumerate(sorted(set(catalog.values())))
+    }
+    canonical_records = list(canonical.values())
+    messy, matches, distinct = {}, [], []
+    for i in range(labels):
+        target = rng.choice(canonical_records)
+        record = {"product": generators.messy_variant(rng, target["product"]), "supplier": None}
+        messy[f"m_{i}"] = record
+        matches.append((record, target))
+        distinct.append((record, rng.choice(canonical_records)))
+
+    gazetteer = dedupe.Gazetteer(service.fields, num_cores=0)
+    training_file = io.StringIO(json.dumps({"match": matches, "distinct": distinct}))
+    gazetteer.prepare_training(messy, canonical, training_file=training_file, sample_size=500)
+    gazetteer.train(index_predicates=False)
+    gazetteer.index(canonical)
+    return gazetteer
+
+
+def bench_scoring_pool(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Concurrent model scoring over several tenant pairs, in-process vs. in scoring workers."""
+    from app.services.dedupe_service import DedupeService
+    from app.services.scoring_pool import ScoringPool
+
+    service = DedupeService()
+    size = config["catalog_sizes"][0]
+    catalog = generators.product_catalog(size, seed=SEED)
+    try:
+        gazetteer = _fixture_gazetteer(service, catalog)
+    except Exception as e:
+        logger.warning(f"Skipping scoring_pool: fixture training failed: {e}")
+        return {}
+
+    workers = os.cpu_count() or 1
+    model_keys = [f"BENCH_SRC{i}_BENCH_TGT" for i in range(workers * 2)]
+    for model_key in model_keys:
+        service.save_model(model_key, gazetteer)
+
+    requests = generators.resolution_requests(config["queries"], catalog, seed=SEED)
+    inputs = [(model_keys[i % len(model_keys)], data) for i, data in enumerate(requests)]
+    concurrency = workers * 4
+
+    async def run(pooled: bool) -> Dict[str, Any]:
+        async def resolve(item):
+            model_key, data = item
+            model = service._trained_model(model_key)
+            await service._model_tier("product", data["product"], data, model, None)
+
+        # Load every model once before timing
+        await asyncio.gather(*(resolve((model_key, requests[0])) for model_key in model_keys))
+        return await measure_async(resolve, inputs, concurrency=concurrency, workers=workers if pooled else 0)
+
+    results = {f"scoring_inprocess_{size}": asyncio.run(run(False))}
+    service.scoring_pool = ScoringPool(service.model_path, workers)
+    try:
+        results[f"scoring_pool_{size}"] = asyncio.run(run(True))
+    finally:
+        service.close()
+    return results
+
+
+def bench_model_artifact(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Cold model loads from an artifact vs. the legacy settings and canonical files."""
+    from app.services.dedupe_service import DedupeService
+    from app.services.model_artifact import ArtifactError, ModelArtifact, artifact_path
+    from app.services.scoring_pool import load_gazetteer
+
+    service = DedupeService()
+    size = config["catalog_sizes"][-1]
+    catalog = generators.product_catalog(size, seed=SEED)
+    try:
+        gazetteer = _fixture_gazetteer(service, catalog)
+    except Exception as e:
+        logger.warning(f"Skipping model_artifact: fixture training failed: {e}")
+        return {}
+
+    model_key = "BENCH_SRC_BENCH_TGT"
+    service.save_model(model_key, gazetteer)
+    artifact_file = artifact_path(service.model_path, model_key)
+
+    legacy_path = Path(_WORKDIR) / "legacy_models"
+    legacy_path.mkdir(exist_ok=True)
+    with open(legacy_path / f"{model_key}_settings", 'wb') as f:
+        gazetteer.write_settings(f)
+    with open(legacy_path / f"{model_key}_canonical.json", 'w') as f:
+        json.dump(dict(gazetteer.indexed_data), f)
+    legacy_bytes = sum(path.stat().st_size for path in legacy_path.iterdir())
+
+    loads = 5
+    results = {
+        f"model_load_legacy_{size}": measure(
+            lambda _: load_gazetteer(legacy_path, model_key), range(loads), bytes=legacy_bytes
+        ),
+        f"model_load_artifact_{size}": measure(
+            lambda _: load_gazetteer(service.model_path, model_key), range(loads),
+            bytes=artifact_file.stat().st_size
+        ),
+    }
+
+    # A damaged header is rejected before any section is read
+    corrupt_file = legacy_path / f"corrupt{artifact_file.suffix}"
+    data = bytearray(artifact_file.read_bytes())
+    data[60] ^= 0xFF
+    corrupt_file.write_bytes(bytes(data))
+
+    def open_corrupt(_):
+        try:
+            ModelArtifact(corrupt_file).close()
+        except ArtifactError:
+            pass
+
+    results["model_reject_corrupt"] = measure(open_corrupt, range(config["queries"]))
+    return results
+
+
+def bench_train_model(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    from app.services.dedupe_service import DedupeService
+
+    service = DedupeService()
+    catalog = generators.product_catalog(config["catalog_sizes"][0], seed=SEED)
+    results = {}
+    for size in config["train_sizes"]:
+        training_data = generators.training_set(size, catalog, seed=SEED)
+        outcome = {}
+
+        async def train(data):
+            outcome.update(await service.train_model(f"BENCH_TRAIN_{size}", data))
+
+        result = asyncio.run(measure_async(train, [training_data] * 3))
+        result["success"] = bool(outcome.get("success"))
+        result["peak_mb"] = peak_memory_mb(lambda: asyncio.run(train(training_data)))
+        results[f"train_model_{size}"] = result
+
+        # Warm-started retrain after ~10% new labels on top of a trained model
+        extra = generators.training_set(max(1, size // 10), catalog, seed=SEED + 1)
+        model_key = f"BENCH_INCR_{size}"
+        asyncio.run(service.train_model(model_key, training_data))
+        outcome.clear()
+
+        async def retrain(data):
+            outcome.update(await service.train_model(model_key, data, incremental=True))
+
+        result = asyncio.run(measure_async(retrain, [training_data + extra] * 3))
+        result["success"] = outcome.get("mode") == "incremental"
+        results[f"train_model_incremental_{size}"] = result
+    return results
+
+
+def bench_process_feedback(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    from app.services.dedupe_service import DedupeService
+    from app.services.training_service import TrainingService
+
+    dedupe_service = DedupeService()
+    service = TrainingService(dedupe_service=dedupe_service)
+    # Measure the ingestion path only; retraining is covered by train_model
+    service.retrain_threshold = sys.maxsize
+
+    catalog = generators.product_catalog(config["catalog_sizes"][0], seed=SEED)
+    stream = generators.feedback_stream(config["feedback"], catalog, tenant_pairs=20, seed=SEED)
+
+    async def submit(entry):
+        await service.process_feedback(
+            source_tenant=entry["sourceTenantCode"],
+            target_tenant=entry["targetTenantCode"],
+            source_field=entry["sourceField"],
+            source_value=entry["sourceValue"],
+            target_field=entry["targetField"],
+            corrected_value=entry["correctedValue"],
+        )
+
+    return {"process_feedback": asyncio.run(measure_async(submit, stream))}
+
+
+def bench_negative_mining(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    from app.services.negative_miner import NegativeMiner
+
+    results = {}
+    for size in config["catalog_sizes"]:
+        catalog = generators.product_catalog(size, seed=SEED)
+        t0 = time.perf_counter()
+        miner = NegativeMiner(sorted(set(catalog.values())))
+        build_ms = round((time.perf_counter() - t0) * 1000, 2)
+        queries = [r["product"] for r in generators.resolution_requests(config["queries"], catalog, seed=SEED)]
+        results[f"negative_mining_{size}"] = measure(
+            lambda value: miner.similar(value, 2), queries, catalog_size=size, build_ms=build_ms
+        )
+    return results
+
+
+def bench_vector_search(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    from app.services.vector_index import NgramVectorIndex
+
+    results = {}
+    for size in config["catalog_sizes"]:
+        catalog = generators.product_catalog(size, seed=SEED)
+        t0 = time.perf_counter()
+        index = NgramVectorIndex.build(sorted(set(catalog.values())))
+        build_ms = round((time.perf_counter() - t0) * 1000, 2)
+        requests = generators.resolution_requests(config["queries"], catalog, seed=SEED)
+        queries = [r["product"] for r in requests]
+        batches = [queries[i:i + 64] for i in range(0, len(queries), 64)]
+
+        results[f"vector_search_{size}"] = measure(
+            lambda value: index.search([value], k=5), queries, catalog_size=size, build_ms=build_ms
+        )
+        results[f"vector_search_batch64_{size}"] = measure(
+            lambda batch: index.search(batch, k=5), batches, catalog_size=size, queries_per_op=64
+        )
+    return results
+
+
+async def _http_bench(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    import httpx
+    from app.main import app
+
+    catalog = generators.product_catalog(config["catalog_sizes"][0], seed=SEED)
+    count = config["http_requests"]
+    workloads = {
+        "http_extract_schema": (
+            "/api/extract-schema",
+            [{"rawData": raw} for raw in generators.partner_layouts(count, seed=SEED)],
+        ),
+        "http_resolve_entities": (
+            "/api/resolve-entities",
+            [
+                {"extractedData": data, "sourceTenantCode": "BENCH_SRC", "targetTenantCode": "BENCH_TGT"}
+                for data in generators.resolution_requests(count, catalog, seed=SEED)
+            ],
+        ),
+        "http_feedback": (
+            "/api/feedback",
+            generators.feedback_stream(count, catalog, tenant_pairs=20, seed=SEED),
+        ),
+    }
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        from app.main import services
+        services.training_service.retrain_threshold = sys.maxsize
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, (path, payloads) in workloads.items():
+                errors = 0
+
+                async def post(payload):
+                    nonlocal errors
+                    response = await client.post(path, json=payload)
+                    if response.status_code != 200:
+                        errors += 1
+
+                results[name] = await measure_async(
+                    post, payloads, concurrency=config["http_concurrency"]
+                )
+                results[name]["errors"] = errors
+    return results
+
+
+def bench_http(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return asyncio.run(_http_bench(config))
+
+
+BENCHMARKS = {
+    "schema_extraction": bench_schema_extraction,
+    "value_normalization": bench_value_normalization,
+    "knowledge_base": bench_knowledge_base,
+    "resolution_cascade": bench_resolution_cascade,
+    "scoring_pool": bench_scoring_pool,
+    "model_artifact": bench_model_artifact,
+    "train_model": bench_train_model,
+    "process_feedback": bench_process_feedback,
+    "negative_mining": bench_negative_mining,
+    "vector_search": bench_vector_search,
+    "http": bench_http,
+}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare throughput against a baseline report.
+
+    Returns a list of human-readable regression descriptions.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous.get("ops_per_sec") or not current.get("ops_per_sec"):
+            continue
+        ratio = current["ops_per_sec"] / previous["ops_per_sec"]
+        current["baseline_ops_per_sec"] = previous["ops_per_sec"]
+        current["ratio"] = round(ratio, 3)
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{name}: {current['ops_per_sec']} ops/s vs baseline "
+                f"{previous['ops_per_sec']} ops/s ({(1 - ratio) * 100:.1f}% slower)"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="QbilHub intelligence service benchmarks")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="Run a subset of benchmarks")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", type=Path, help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed throughput drop before a benchmark counts as regressed (default 0.25)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Overwrite the baseline file with this run's results")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # The service logs every request at INFO; keep benchmark output readable
+    logging.getLogger("app").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("dedupe").setLevel(logging.WARNING)
+
+    from app.services.dedupe_service import DedupeService
+
+    config = SUITES[args.suite]
+    results: Dict[str, Any] = {}
+    seed_knowledge_base = dict(DedupeService.PRODUCT_KNOWLEDGE_BASE)
+    for name in args.only or BENCHMARKS:
+        logger.info(f"Running {name}...")
+        results.update(BENCHMARKS[name](config))
+        # Feedback benchmarks grow the shared knowledge base; reset between runs
+        DedupeService.PRODUCT_KNOWLEDGE_BASE.clear()
+        DedupeService.PRODUCT_KNOWLEDGE_BASE.update(seed_knowledge_base)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "suite": args.suite,
+            "seed": SEED,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline and args.baseline.exists() and not args.update_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline, args.tolerance)
+    report["regressions"] = regressions
+
+    for name, result in results.items():
+        ratio = f"  x{result['ratio']}" if "ratio" in result else ""
+        logger.info(f"{name:32s} {result['ops_per_sec']:>12} ops/s  p95 {result['p95_ms']:>10} ms{ratio}")
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    if args.update_baseline and args.baseline:
+        args.baseline.write_text(text)
+        logger.info(f"Baseline written to {args.baseline}")
+
+    if regressions:
+        for regression in regressions:
+            logger.error(f"REGRESSION {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Shared fixtures
+Services run against temporary model and training-data directories and
+never contact OpenAI
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Isolate the service from the developer environment before importing it
+_WORKDIR = tempfile.mkdtemp(prefix="qbilhub-tests-")
+os.environ.pop("OPENAI_API_KEY", None)
+os.environ["DEDUPE_MODEL_PATH"] = str(Path(_WORKDIR) / "models")
+os.environ["TRAINING_DATA_PATH"] = str(Path(_WORKDIR) / "training_data")
+os.environ["WARM_STATE_SNAPSHOT_SECONDS"] = "0"
+
+
+@pytest.fixture
+def service_env(tmp_path, monkeypatch):
+    """Point the services at directories of their own for one test."""
+    monkeypatch.setenv("DEDUPE_MODEL_PATH", str(tmp_path / "models"))
+    monkeypatch.setenv("TRAINING_DATA_PATH", str(tmp_path / "training_data"))
+    return tmp_path
+
+
+@pytest.fixture
+def dedupe_service(service_env):
+    from app.services.dedupe_service import DedupeService
+
+    # Feedback grows the class-level knowledge base; restore it afterwards
+    knowledge_base = dict(DedupeService.PRODUCT_KNOWLEDGE_BASE)
+    service = DedupeService()
+    yield service
+    service.close()
+    DedupeService.PRODUCT_KNOWLEDGE_BASE.clear()
+    DedupeService.PRODUCT_KNOWLEDGE_BASE.update(knowledge_base)
+
+
+@pytest.fixture
+def services(monkeypatch):
+    """The app's service container, emptied for one test; tests plug in fakes."""
+    from app import main
+
+    for name in ("llm_service", "dedupe_service", "training_service", "admission_controller"):
+        monkeypatch.setattr(main.services, name, None)
+    return main.services
+
+
+@pytest.fixture
+def client(services):
+    """Client of the full app (middleware included) without running its startup."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
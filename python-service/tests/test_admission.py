@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import BULK, INTERACTIVE, AdmissionController, AdmissionRejected, pair_key
+
+
+async def _record_order(controller, requests):
+    """Admit requests while a slot is held; return the order they ran in."""
+    order = []
+
+    async def run(tenant, priority, name):
+        async with controller.admit(tenant, priority):
+            order.append(name)
+            await asyncio.sleep(0.001)
+
+    async with controller.admit("holder"):
+        tasks = []
+        for tenant, priority, name in requests:
+            tasks.append(asyncio.ensure_future(run(tenant, priority, name)))
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_interactive_requests_go_before_bulk_ones():
+    controller = AdmissionController(max_concurrency=1, tenant_concurrency=1, max_queue_wait=5, weights={})
+
+    order = asyncio.run(_record_order(controller, [
+        ("A", BULK, "bulk"),
+        ("B", INTERACTIVE, "interactive"),
+    ]))
+
+    assert order == ["interactive", "bulk"]
+
+
+def test_weights_share_slots_between_tenants():
+    controller = AdmissionController(max_concurrency=1, tenant_concurrency=1, max_queue_wait=5, weights={"A": 2})
+
+    order = asyncio.run(_record_order(controller, [("A", BULK, "A")] * 6 + [("B", BULK, "B")] * 3))
+
+    # A gets two slots for every one of B's
+    assert order[:6].count("A") == 4
+    assert order[:6].count("B") == 2
+
+
+def test_full_queues_are_rejected_with_a_retry_hint():
+    controller = AdmissionController(max_concurrency=1, tenant_concurrency=1, tenant_queue_size=0, weights={})
+
+    async def main():
+        async with controller.admit("A"):
+            async with controller.admit("A"):
+                pass
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        asyncio.run(main())
+    assert exc_info.value.retry_after >= 1
+    assert controller.get_stats()["rejected"] == 1
+
+
+def test_waits_beyond_the_queue_limit_are_rejected():
+    controller = AdmissionController(max_concurrency=1, tenant_concurrency=1, max_queue_wait=0.01, weights={})
+
+    async def main():
+        async with controller.admit("A"):
+            async with controller.admit("B"):
+                pass
+
+    with pytest.raises(AdmissionRejected, match="queue wait exceeded"):
+        asyncio.run(main())
+    assert controller.get_stats()["active"] == 0
+
+
+def test_pairs_inherit_their_target_tenants_weight():
+    controller = AdmissionController(weights={"TGT": 3, pair_key("SRC", "OTHER"): 0.5})
+
+    assert controller._weight(pair_key("SRC", "TGT")) == 3
+    assert controller._weight(pair_key("SRC", "OTHER")) == 0.5
+    assert controller._weight(pair_key("SRC", "NEW")) == 1.0
+
+
+class _FakeDedupeService:
+    async def resolve_entities(self, extracted_data, source_tenant, target_tenant):
+        return {"mappedData": extracted_data, "confidenceScores": {}}
+
+
+def _item(source):
+    return {"extractedData": {"product": "cocoa"}, "sourceTenantCode": source, "targetTenantCode": "TGT"}
+
+
+@pytest.fixture
+def busy_pair(services):
+    """Admission where SRC->TGT has no free slot and no queue."""
+    services.dedupe_service = _FakeDedupeService()
+    services.admission_controller = AdmissionController(
+        max_concurrency=8, tenant_concurrency=1, tenant_queue_size=0, weights={}
+    )
+    services.admission_controller.active_by_tenant[pair_key("SRC", "TGT")] = 1
+    return services.admission_controller
+
+
+def test_rejected_requests_get_429_with_retry_after(client, busy_pair):
+    response = client.post("/api/resolve-entities", json=_item("SRC"))
+
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+
+def test_sources_of_one_target_are_admitted_separately(client, busy_pair):
+    response = client.post("/api/resolve-entities", json=_item("OTHER"))
+
+    assert response.status_code == 200
+
+
+def test_fully_rejected_batches_get_429(client, busy_pair):
+    response = client.post("/api/resolve-entities/batch", json={"items": [_item("SRC"), _item("SRC")]})
+
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+
+def test_partly_rejected_batches_report_item_errors(client, busy_pair):
+    response = client.post("/api/resolve-entities/batch", json={"items": [_item("SRC"), _item("OTHER")]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body["errors"]) == ["0"]
+    assert body["results"][1] is not None
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import batching
+from app.api.batching import check_batch_size, run_batch
+
+
+def test_run_batch_keeps_item_order_and_collects_failures():
+    async def double(item):
+        if item == 3:
+            raise ValueError("bad item")
+        await asyncio.sleep(0.001 * (5 - item))
+        return item * 2
+
+    results, errors = asyncio.run(run_batch([0, 1, 2, 3, 4], double))
+
+    assert results == [0, 2, 4, None, 8]
+    assert errors == {"3": "bad item"}
+
+
+def test_run_batch_bounds_concurrency():
+    running = []
+    peak = []
+
+    async def work(item):
+        running.append(item)
+        peak.append(len(running))
+        await asyncio.sleep(0.001)
+        running.remove(item)
+        return item
+
+    asyncio.run(run_batch(list(range(20)), work, concurrency=3))
+
+    assert max(peak) == 3
+
+
+def test_oversized_batches_are_rejected_with_413(monkeypatch):
+    monkeypatch.setattr(batching, "MAX_BATCH_SIZE", 2)
+
+    with pytest.raises(HTTPException) as exc_info:
+        check_batch_size([1, 2, 3])
+    assert exc_info.value.status_code == 413
+    check_batch_size([1, 2])
+
+
+class _FakeDedupeService:
+    async def resolve_entities(self, extracted_data, source_tenant, target_tenant):
+        if "fail" in extracted_data:
+            raise RuntimeError("resolution failed")
+        return {"mappedData": extracted_data, "confidenceScores": {"product": 0.9}}
+
+
+def _item(data, source="SRC"):
+    return {"extractedData": data, "sourceTenantCode": source, "targetTenantCode": "TGT"}
+
+
+def test_batch_endpoint_reports_item_errors_by_index(client, services):
+    services.dedupe_service = _FakeDedupeService()
+
+    response = client.post("/api/resolve-entities/batch", json={
+        "items": [_item({"product": "a"}), _item({"fail": True}), _item({"product": "c"})]
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [r and r["mappedData"] for r in body["results"]] == [{"product": "a"}, None, {"product": "c"}]
+    assert body["errors"] == {"1": "resolution failed"}
+
+
+def test_batch_endpoint_without_service_is_unavailable(client, services):
+    response = client.post("/api/resolve-entities/batch", json={"items": [_item({})]})
+
+    assert response.status_code == 503
@@ -0,0 +1,44 @@
+import asyncio
+
+from benchmarks import generators
+from benchmarks.run import compare, measure, measure_async
+
+
+def test_measure_summarizes_every_input():
+    result = measure(lambda item: item * 2, list(range(50)), rows=50)
+
+    assert result["n"] == 50
+    assert result["rows"] == 50
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+
+def test_measure_async_bounds_concurrency():
+    running = []
+    peak = []
+
+    async def work(_):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.001)
+        running.pop()
+
+    result = asyncio.run(measure_async(work, list(range(20)), concurrency=4))
+
+    assert result["n"] == 20
+    assert max(peak) <= 4
+
+
+def test_compare_flags_only_drops_beyond_tolerance():
+    baseline = {"results": {"fast": {"ops_per_sec": 100.0}, "slow": {"ops_per_sec": 100.0}}}
+    results = {"fast": {"ops_per_sec": 80.0}, "slow": {"ops_per_sec": 60.0}, "new": {"ops_per_sec": 5.0}}
+
+    regressions = compare(results, baseline, tolerance=0.25)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("slow:")
+    assert results["fast"]["ratio"] == 0.8
+    assert "ratio" not in results["new"]
+
+
+def test_generators_are_seeded():
+    assert generators.product_catalog(100, seed=7) == generators.product_catalog(100, seed=7)
@@ -0,0 +1,165 @@
+"""Streaming catalog ingestion and the catalog upload endpoints"""
+import gzip
+import json
+
+import pytest
+
+from app.api.transport import stream_decompressor
+from app.services.catalog_ingest import CSV, NDJSON, CatalogIngest, LineTooLong, catalog_format
+
+FIELDS = ("product", "supplier")
+
+
+def ingest(body: bytes, fmt=NDJSON, chunk_size=7, **options):
+    catalog = CatalogIngest(fmt, FIELDS, **options)
+    for start in range(0, len(body), chunk_size):
+        catalog.feed(body[start:start + chunk_size])
+    catalog.close()
+    return catalog
+
+
+def ndjson(*rows):
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+
+@pytest.mark.parametrize("content_type, expected", [
+    ("", NDJSON),
+    ("application/x-ndjson", NDJSON),
+    ("application/jsonl; charset=utf-8", NDJSON),
+    ("Text/CSV", CSV),
+])
+def test_catalog_format(content_type, expected):
+    assert catalog_format(content_type) == expected
+
+
+def test_unsupported_content_type():
+    with pytest.raises(ValueError):
+        catalog_format("application/xml")
+
+
+def test_ndjson_rows_reduce_to_distinct_values_per_field():
+    body = ndjson(
+        {"product": "Polypropylène H350", "supplier": "Sabic"},
+        {"product": " Polypropylène H350 ", "extra": 1},
+        {"product": "LDPE 2102", "_op": "DELETE"},
+        {"sku": "no match field"},
+        ["not", "an", "object"],
+    ) + b"{broken\n\n"
+
+    # Chunks of 7 bytes split lines and multi-byte characters
+    catalog = ingest(b"\xef\xbb\xbf" + body)
+
+    assert catalog.upserts == {"product": {"Polypropylène H350"}, "supplier": {"Sabic"}}
+    assert catalog.deletes == {"product": {"LDPE 2102"}, "supplier": set()}
+    assert catalog.present_fields == {"product", "supplier"}
+    assert (catalog.rows, catalog.invalid_rows) == (6, 3)
+    assert catalog.bytes == len(body) + 3
+
+
+def test_last_line_needs_no_newline():
+    catalog = ingest(b'{"product": "PP"}\n{"product": "PE"}')
+
+    assert catalog.upserts["product"] == {"PP", "PE"}
+
+
+def test_csv_with_quoted_multiline_fields_and_crlf():
+    body = (
+        'product,supplier,_op\r\n'
+        '"PP, homo",Sabic,\r\n'
+        '"Multi\r\nline",,\r\n'
+        'LDPE,,delete\r\n'
+        ',,\r\n'
+        '"unterminated,Sabic\r\n'
+    ).encode()
+
+    catalog = ingest(body, fmt=CSV, chunk_size=5)
+
+    assert catalog.upserts == {"product": {"PP, homo", "Multi\nline"}, "supplier": {"Sabic"}}
+    assert catalog.deletes["product"] == {"LDPE"}
+    assert (catalog.rows, catalog.invalid_rows) == (4, 2)
+
+
+def test_a_line_without_end_is_rejected():
+    with pytest.raises(LineTooLong):
+        ingest(b'{"product": "' + b"x" * 100, max_line_length=50)
+
+
+def test_a_quoted_csv_record_without_end_is_rejected():
+    with pytest.raises(LineTooLong):
+        ingest(b'product\n"' + b"x\n" * 50, fmt=CSV, max_line_length=50)
+
+
+def test_compressed_catalogs_are_decoded_as_they_stream():
+    rows = [{"product": f"Grade {i}"} for i in range(2000)]
+    body = gzip.compress(ndjson(*rows))
+
+    catalog = ingest(body, chunk_size=1024, decompressor=stream_decompressor("gzip"))
+
+    assert len(catalog.upserts["product"]) == 2000
+    assert catalog.bytes == len(body)
+
+
+@pytest.fixture
+def catalog_client(client, services, dedupe_service):
+    services.dedupe_service = dedupe_service
+    return client
+
+
+def test_put_builds_and_patch_updates_the_catalog(catalog_client, dedupe_service):
+    values = [f"Grade {i}" for i in range(100)]
+
+    response = catalog_client.put(
+        "/api/catalog/TGT",
+        content="product\n" + "\n".join(values) + "\n",
+        headers={"content-type": "text/csv"}
+    )
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["mode"] == "replace" and body["rows"] == 100
+    assert body["fields"] == {"product": {"mode": "built", "values": 100, "added": 100, "removed": 0}}
+
+    response = catalog_client.patch(
+        "/api/catalog/TGT",
+        content=gzip.compress(ndjson({"product": "Grade 100"}, {"product": "Grade 0", "_op": "delete"})),
+        headers={"content-type": "application/x-ndjson", "content-encoding": "gzip"}
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["fields"]["product"] == {"mode": "delta", "values": 100, "added": 1, "removed": 1}
+    assert catalog_client.get("/api/catalog/TGT").json()["product"]["values"] == 100
+    assert "Grade 0" not in dedupe_service._catalog_index("TGT", "product").values
+
+
+def test_put_applies_only_the_difference(catalog_client):
+    first = ndjson(*({"product": f"Grade {i}"} for i in range(100)))
+    catalog_client.put("/api/catalog/TGT", content=first)
+
+    again = catalog_client.put("/api/catalog/TGT", content=first)
+    changed = catalog_client.put("/api/catalog/TGT", content=ndjson(*({"product": f"Grade {i}"} for i in range(1, 101))))
+
+    assert again.json()["fields"]["product"]["mode"] == "unchanged"
+    assert changed.json()["fields"]["product"] == {"mode": "delta", "values": 100, "added": 1, "removed": 1}
+
+
+def test_upload_errors(catalog_client):
+    assert catalog_client.put(
+        "/api/catalog/TGT", content=b"x", headers={"content-type": "application/xml"}
+    ).status_code == 415
+    assert catalog_client.put(
+        "/api/catalog/TGT", content=b"x", headers={"content-encoding": "br"}
+    ).status_code == 415
+    assert catalog_client.put("/api/catalog/TGT", content=ndjson({"sku": "1"})).status_code == 422
+
+
+def test_an_endless_line_gets_413(catalog_client):
+    from app.services.catalog_ingest import MAX_LINE_LENGTH
+
+    response = catalog_client.put("/api/catalog/TGT", content=b'{"product": "' + b"x" * (MAX_LINE_LENGTH + 1))
+
+    assert response.status_code == 413
+
+
+def test_catalog_endpoints_need_the_service(client):
+    assert client.put("/api/catalog/TGT", content=ndjson({"product": "PP"})).status_code == 503
+    assert client.get("/api/catalog/TGT").status_code == 503
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.api.deadline import DEADLINE_HEADER, MAX_REQUEST_TIMEOUT_MS, parse_timeout
+from app.services.request_context import (
+    DeadlineExceeded, check_deadline, remaining, reset_deadline, set_deadline, with_deadline
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (b"1500", 1.5),
+    (b"0", None),
+    (b"soon", None),
+    (str(MAX_REQUEST_TIMEOUT_MS * 10).encode(), MAX_REQUEST_TIMEOUT_MS / 1000.0),
+])
+def test_parse_timeout(value, expected):
+    assert parse_timeout([(DEADLINE_HEADER, value)]) == expected
+
+
+def test_no_deadline_means_unbounded():
+    assert remaining() is None
+    check_deadline("anything")
+
+
+def test_with_deadline_cancels_slow_work():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        token = set_deadline(0.01)
+        try:
+            await with_deadline(slow(), "llm")
+        finally:
+            reset_deadline(token)
+
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        asyncio.run(main())
+    assert exc_info.value.stage == "llm"
+    assert cancelled == [True]
+
+
+def test_with_deadline_does_not_start_work_once_expired():
+    started = []
+
+    async def work():
+        started.append(True)
+
+    async def main():
+        token = set_deadline(-1)
+        try:
+            await with_deadline(work(), "search")
+        finally:
+            reset_deadline(token)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert started == []
+
+
+class _SlowDedupeService:
+    def __init__(self):
+        self.cancelled = False
+
+    async def resolve_entities(self, extracted_data, source_tenant, target_tenant):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+class _ExpiringDedupeService:
+    async def resolve_entities(self, extracted_data, source_tenant, target_tenant):
+        raise DeadlineExceeded("resolution")
+
+
+REQUEST = {"extractedData": {"product": "cocoa"}, "sourceTenantCode": "SRC", "targetTenantCode": "TGT"}
+
+
+def test_requests_past_their_deadline_get_504_and_stop(client, services):
+    services.dedupe_service = _SlowDedupeService()
+
+    response = client.post("/api/resolve-entities", json=REQUEST, headers={"X-Request-Timeout-Ms": "50"})
+
+    assert response.status_code == 504
+    assert services.dedupe_service.cancelled
+
+
+def test_deadlines_hit_inside_a_service_map_to_504(client, services):
+    services.dedupe_service = _ExpiringDedupeService()
+
+    response = client.post("/api/resolve-entities", json=REQUEST)
+
+    assert response.status_code == 504
+    assert "resolution" in response.json()["detail"]
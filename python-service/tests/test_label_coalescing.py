@@ -0,0 +1,168 @@
+"""Coalescing corrections into weighted labels and resolving their conflicts"""
+import asyncio
+import math
+
+import pytest
+
+from app.services.training_store import TrainingStore
+
+
+def correction(source_value, corrected_value, timestamp, target_field="product"):
+    return {
+        "sourceTenant": "SRC",
+        "targetTenant": "TGT",
+        "sourceValue": source_value,
+        "targetField": target_field,
+        "correctedValue": corrected_value,
+        "timestamp": timestamp,
+    }
+
+
+def open_store(tmp_path, policy):
+    return TrainingStore(tmp_path / f"{policy}.db", conflict_policy=policy)
+
+
+def only_label(store):
+    labels = store.load_labels("SRC", "TGT")
+    assert len(labels) == 1
+    return labels[0]
+
+
+def test_repeated_corrections_become_one_heavier_label(tmp_path):
+    store = open_store(tmp_path, "latest")
+
+    changed = [
+        store.add_feedback([correction("PP H350", "PP Homo 350", f"2024-01-0{day}")])
+        for day in (1, 2, 3)
+    ]
+
+    # Only the first correction carries new information
+    assert changed == [1, 0, 0]
+    label = only_label(store)
+    assert (label["correctedValue"], label["votes"], label["totalVotes"]) == ("PP Homo 350", 3, 3)
+    assert label["weight"] == pytest.approx(1 + math.log(3))
+    assert label["rejectedValues"] == []
+    assert store.count_changed_labels("SRC", "TGT") == 1
+
+
+def test_latest_policy_lets_the_newest_correction_win(tmp_path):
+    store = open_store(tmp_path, "latest")
+    store.add_feedback([correction("PP H350", "PP Homo 350", "2024-01-01")])
+    store.add_feedback([correction("PP H350", "PP Homo 350", "2024-01-02")])
+
+    assert store.add_feedback([correction("PP H350", "PP Random 350", "2024-01-03")]) == 1
+
+    label = only_label(store)
+    assert label["correctedValue"] == "PP Random 350"
+    assert (label["votes"], label["totalVotes"]) == (1, 3)
+    assert label["weight"] == pytest.approx(1 / 3)
+    assert label["rejectedValues"] == ["PP Homo 350"]
+
+
+def test_majority_policy_keeps_the_most_frequent_correction(tmp_path):
+    store = open_store(tmp_path, "majority")
+    store.add_feedback([correction("PP H350", "PP Homo 350", "2024-01-01")])
+    store.add_feedback([correction("PP H350", "PP Homo 350", "2024-01-02")])
+
+    assert store.add_feedback([correction("PP H350", "PP Random 350", "2024-01-03")]) == 0
+
+    label = only_label(store)
+    assert label["correctedValue"] == "PP Homo 350"
+    assert (label["votes"], label["totalVotes"]) == (2, 3)
+    assert label["weight"] == pytest.approx((2 / 3) * (1 + math.log(2)))
+    assert label["rejectedValues"] == ["PP Random 350"]
+
+
+def test_majority_ties_go_to_the_most_recent_correction(tmp_path):
+    store = open_store(tmp_path, "majority")
+    store.add_feedback([correction("PP H350", "PP Homo 350", "2024-01-01")])
+
+    assert store.add_feedback([correction("PP H350", "PP Random 350", "2024-01-02")]) == 1
+
+    assert only_label(store)["correctedValue"] == "PP Random 350"
+
+
+def test_labels_are_kept_per_target_field(tmp_path):
+    store = open_store(tmp_path, "latest")
+    store.add_feedback([
+        correction("Sabic", "SABIC Europe B.V.", "2024-01-01", target_field="supplier"),
+        correction("Sabic", "SABIC", "2024-01-01", target_field="product"),
+    ])
+
+    labels = {label["targetField"]: label["correctedValue"] for label in store.load_labels("SRC", "TGT")}
+
+    assert labels == {"supplier": "SABIC Europe B.V.", "product": "SABIC"}
+
+
+def test_changed_labels_count_only_changes_after_the_trained_snapshot(tmp_path):
+    store = open_store(tmp_path, "latest")
+    store.add_feedback([correction("PP H350", "PP Homo 350", "2024-01-01")])
+    snapshot = store.label_snapshot("SRC", "TGT")
+    store.mark_trained("SRC", "TGT", snapshot, store.start_run("SRC", "TGT", snapshot))
+
+    # A repeat of the trained correction is not a change; overruling it is
+    store.add_feedback([correction("PP H350", "PP Homo 350", "2024-01-02")])
+    assert store.count_changed_labels("SRC", "TGT") == 0
+    store.add_feedback([correction("PP H350", "PP Random 350", "2024-01-03")])
+    assert store.count_changed_labels("SRC", "TGT") == 1
+    assert store.count_changed_labels("SRC", "TGT", since=store.label_snapshot("SRC", "TGT")) == 0
+    # Correcting it back to the trained value undoes the change
+    store.add_feedback([correction("PP H350", "PP Homo 350", "2024-01-04")])
+    assert store.count_changed_labels("SRC", "TGT") == 0
+
+
+@pytest.fixture
+def training_service(service_env, monkeypatch):
+    from app.services.training_service import TrainingService
+
+    monkeypatch.setenv("RETRAIN_THRESHOLD", "2")
+    service = TrainingService()
+    started = []
+    monkeypatch.setattr(service.coordinator, "start", lambda source, target, job: started.append((source, target)))
+    service.started = started
+    yield service
+    service.store.close()
+
+
+def submit(service, source_value, corrected_value):
+    return asyncio.run(service.process_feedback("SRC", "TGT", "name", source_value, "product", corrected_value))
+
+
+def test_only_new_information_counts_towards_a_retrain(training_service):
+    for _ in range(5):
+        assert submit(training_service, "PP H350", "PP Homo 350")
+    assert training_service.started == []
+
+    submit(training_service, "LDPE", "LDPE 2102")
+
+    assert training_service.started == [("SRC", "TGT")]
+
+
+def test_a_retrain_is_not_retriggered_before_the_threshold_is_crossed_again(training_service):
+    submit(training_service, "PP H350", "PP Homo 350")
+    submit(training_service, "LDPE", "LDPE 2102")
+    # The run starts and fails, so nothing is marked trained
+    store = training_service.store
+    run_id = store.start_run("SRC", "TGT", store.label_snapshot("SRC", "TGT"))
+    store.finish_run(run_id, {"success": False, "message": "failed"}, samples=2)
+
+    submit(training_service, "HDPE", "HDPE 5502")
+    assert len(training_service.started) == 1
+    submit(training_service, "PET", "PET Bottle Grade")
+    assert len(training_service.started) == 2
+
+
+def test_overruled_corrections_train_as_negatives(training_service):
+    labels = [{
+        "targetField": "product",
+        "sourceValue": "PP H350",
+        "correctedValue": "PP Random 350",
+        "weight": 0.5,
+        "rejectedValues": ["PP Homo 350"],
+    }]
+
+    positive, negative = training_service._convert_to_training_format(labels)
+
+    assert (positive.canonical, positive.is_match, positive.weight) == ({"product": "PP Random 350"}, True, 0.5)
+    assert (negative.canonical, negative.is_match) == ({"product": "PP Homo 350"}, False)
+    assert positive.messy == negative.messy == {"product": "PP H350"}
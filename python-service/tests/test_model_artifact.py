@@ -0,0 +1,185 @@
+"""Checksummed, optionally signed model artifacts"""
+import json
+import os
+import struct
+import zlib
+
+import pytest
+
+from app.services import model_artifact
+from app.services.model_artifact import (
+    CANONICAL,
+    FEATURES,
+    SETTINGS,
+    ArtifactError,
+    ModelArtifact,
+    _PREFIX,
+    resolve_compression,
+    write_artifact,
+)
+from app.services.scoring_pool import load_gazetteer
+
+KEY = b"k" * 32
+SECTIONS = {
+    SETTINGS: b"pickled settings " * 200,
+    CANONICAL: json.dumps({str(i): {"product": f"Grade {i}"} for i in range(100)}).encode(),
+    FEATURES: os.urandom(256),
+}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "A_B.model"
+
+
+def rewrite_header(path, change):
+    """Edit an artifact's header in place, keeping its CRC valid and its signature as it was."""
+    data = path.read_bytes()
+    magic, fmt, flags, length, _, signature = _PREFIX.unpack(data[:_PREFIX.size])
+    header = json.loads(data[_PREFIX.size:_PREFIX.size + length])
+    change(header)
+    header_bytes = json.dumps(header, sort_keys=True).encode()
+    prefix = _PREFIX.pack(magic, fmt, flags, len(header_bytes), zlib.crc32(header_bytes), signature)
+    path.write_bytes(prefix + header_bytes + data[_PREFIX.size + length:])
+
+
+def flip(path, offset):
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_sections_round_trip(path, compression):
+    write_artifact(path, SECTIONS, metadata={"mode": "full"}, compression=compression)
+
+    with ModelArtifact(path) as artifact:
+        assert artifact.read_many(SECTIONS) == SECTIONS
+        assert artifact.metadata == {"mode": "full"}
+        described = artifact.describe()
+
+    # Incompressible sections are stored as they are
+    assert described["sections"][FEATURES]["compression"] == "none"
+    expected = "none" if compression == "none" else resolve_compression(compression)
+    assert described["sections"][SETTINGS]["compression"] == expected
+    assert not described["signed"]
+
+
+def test_large_sections_are_read_in_parallel(path, monkeypatch):
+    monkeypatch.setattr(model_artifact, "PARALLEL_READ_BYTES", 1)
+    write_artifact(path, SECTIONS)
+
+    with ModelArtifact(path) as artifact:
+        assert artifact.read_many([SETTINGS, CANONICAL, "missing"]) == {
+            SETTINGS: SECTIONS[SETTINGS], CANONICAL: SECTIONS[CANONICAL]
+        }
+
+
+def test_unknown_compression_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_compression("lz4")
+
+
+def test_other_files_are_rejected(path):
+    path.write_bytes(b"\x80\x04 a pickle, not an artifact")
+
+    with pytest.raises(ArtifactError, match="not a model artifact"):
+        ModelArtifact(path)
+
+
+def test_a_corrupt_header_is_rejected(path):
+    write_artifact(path, SECTIONS)
+    flip(path, _PREFIX.size + 5)
+
+    with pytest.raises(ArtifactError, match="corrupt header"):
+        ModelArtifact(path)
+
+
+def test_a_newer_format_is_rejected(path):
+    write_artifact(path, SECTIONS)
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<H", data, 8, model_artifact.FORMAT + 1)
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ArtifactError, match="newer than supported"):
+        ModelArtifact(path)
+
+
+def test_a_model_of_another_dedupe_release_is_rejected(path, monkeypatch):
+    monkeypatch.setattr(model_artifact, "DEDUPE_VERSION", "1.0.0")
+    write_artifact(path, SECTIONS)
+    monkeypatch.setattr(model_artifact, "DEDUPE_VERSION", "2.0.0")
+
+    with pytest.raises(ArtifactError, match="incompatible"):
+        ModelArtifact(path)
+
+
+def test_a_corrupt_section_is_rejected_before_it_is_decoded(path):
+    write_artifact(path, SECTIONS, compression="zlib")
+    with ModelArtifact(path) as artifact:
+        offset = artifact._data_offset + artifact.sections[CANONICAL]["offset"]
+    flip(path, offset + 3)
+
+    with ModelArtifact(path) as artifact:
+        assert artifact.read(SETTINGS) == SECTIONS[SETTINGS]
+        with pytest.raises(ArtifactError, match=f"Section {CANONICAL} .* is corrupt"):
+            artifact.read(CANONICAL)
+        with pytest.raises(KeyError):
+            artifact.read("missing")
+
+
+def test_signed_artifacts_need_the_key(path):
+    write_artifact(path, SECTIONS, key=KEY)
+
+    with ModelArtifact(path, KEY) as artifact:
+        assert artifact.signed and artifact.read(SETTINGS) == SECTIONS[SETTINGS]
+    # Readers without a key still verify checksums
+    with ModelArtifact(path) as artifact:
+        assert artifact.read(SETTINGS) == SECTIONS[SETTINGS]
+    with pytest.raises(ArtifactError, match="not signed with the configured key"):
+        ModelArtifact(path, b"another key")
+
+
+def test_unsigned_artifacts_are_rejected_when_a_key_is_configured(path):
+    write_artifact(path, SECTIONS)
+
+    with pytest.raises(ArtifactError, match="not signed"):
+        ModelArtifact(path, KEY)
+
+
+def test_a_re_signed_tampered_header_is_rejected(path):
+    write_artifact(path, SECTIONS, key=KEY)
+    # A header pointing at other section checksums, with a valid CRC
+    rewrite_header(path, lambda header: header["sections"][SETTINGS].update(sha256="0" * 64))
+
+    with pytest.raises(ArtifactError, match="not signed"):
+        ModelArtifact(path, KEY)
+
+
+def test_zlib_sections_never_inflate_past_their_recorded_size(path):
+    write_artifact(path, {SETTINGS: b"\0" * 100_000}, compression="zlib")
+    rewrite_header(path, lambda header: header["sections"][SETTINGS].update(size=1000))
+
+    with ModelArtifact(path) as artifact:
+        with pytest.raises(ArtifactError, match="recorded size"):
+            artifact.read(SETTINGS)
+
+
+def test_writes_replace_the_artifact_atomically(path):
+    write_artifact(path, SECTIONS)
+    with ModelArtifact(path) as artifact:
+        write_artifact(path, {SETTINGS: b"retrained"})
+        # An open artifact keeps reading the file it opened
+        assert artifact.read(SETTINGS) == SECTIONS[SETTINGS]
+
+    with ModelArtifact(path) as artifact:
+        assert artifact.read(SETTINGS) == b"retrained"
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+
+def test_legacy_settings_files_are_refused_when_artifacts_must_be_signed(tmp_path):
+    (tmp_path / "A_B_settings").write_bytes(b"\x80\x04 pickle")
+
+    with pytest.raises(ArtifactError, match="unsigned legacy settings file"):
+        load_gazetteer(tmp_path, "A_B", KEY)
+    assert load_gazetteer(tmp_path, "OTHER", KEY) is None
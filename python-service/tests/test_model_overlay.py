@@ -0,0 +1,129 @@
+"""Shared per-target models with per-source overlays"""
+import asyncio
+
+import pytest
+
+from app.services.model_overlay import SHARED_SOURCE, SourceOverlay, parse_sharing, shared_model_key
+from app.services.records import LabelledPair
+from benchmarks import generators
+
+
+def test_parse_sharing():
+    assert parse_sharing("") == "pair"
+    assert parse_sharing(" Target ") == "target"
+    with pytest.raises(ValueError):
+        parse_sharing("global")
+    assert shared_model_key("TGT") == f"{SHARED_SOURCE}_TGT"
+
+
+def test_overlay_aliases_are_normalized():
+    overlay = SourceOverlay()
+
+    assert overlay.add_alias("product", "  PP   H350 ", "PP Homo 350")
+    assert not overlay.add_alias("product", "pp h350", "PP Homo 350")
+
+    assert overlay.alias("product", "PP H350") == "PP Homo 350"
+    assert overlay.alias("supplier", "PP H350") is None
+
+
+def test_overlay_calibrates_scores_when_it_has_a_calibration():
+    assert SourceOverlay().adjust(0.42) == 0.42
+    overlay = SourceOverlay(calibration=(10.0, -5.0))
+    assert overlay.adjust(0.5) == 0.5
+    assert overlay.adjust(0.9) > 0.9
+
+
+def test_overlay_round_trips_through_its_dict_form():
+    overlay = SourceOverlay(aliases={"product": {"pp h350": "PP Homo 350"}}, calibration=(8.0, -4.0), labels=12)
+
+    assert SourceOverlay.from_dict(overlay.to_dict()) == overlay
+    assert SourceOverlay.from_dict({}) == SourceOverlay()
+
+
+@pytest.fixture
+def shared_service(service_env, monkeypatch):
+    from app.services.dedupe_service import DedupeService
+
+    monkeypatch.setenv("MODEL_SHARING", "target")
+    service = DedupeService()
+    yield service
+    service.close()
+
+
+def sourced(items, source):
+    pairs = [LabelledPair.from_dict(item) for item in items]
+    for pair in pairs:
+        pair.source = source
+    return pairs
+
+
+@pytest.fixture(scope="module")
+def trained(tmp_path_factory):
+    """A shared model trained once for the tests that only read it."""
+    from app.services.dedupe_service import DedupeService
+
+    path = tmp_path_factory.mktemp("shared")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("DEDUPE_MODEL_PATH", str(path / "models"))
+        monkeypatch.setenv("TRAINING_DATA_PATH", str(path / "training_data"))
+        monkeypatch.setenv("MODEL_SHARING", "target")
+        service = DedupeService()
+    catalog = generators.product_catalog(60, seed=7)
+    first = generators.training_set(40, catalog, seed=7)
+    second = generators.training_set(40, catalog, seed=8)
+    result = asyncio.run(service.train_model(
+        shared_model_key("TGT"), sourced(first, "S1") + sourced(second, "S2")
+    ))
+    assert result["success"], result
+    yield service, result, first
+    service.close()
+
+
+def test_a_shared_model_gets_an_overlay_per_source(trained):
+    service, result, first = trained
+    match = next(item for item in first if item["is_match"])
+
+    assert result["sources"] == 2
+    overlays = service._target_overlays("TGT")
+    assert set(overlays) == {"S1", "S2"}
+    assert overlays["S1"].alias("product", match["messy"]["product"]) == match["canonical"]["product"]
+    assert overlays["S1"].labels == sum(item["is_match"] for item in first)
+
+
+def test_a_source_resolves_through_its_own_aliases_first(trained):
+    service, _, first = trained
+    match = next(item for item in first if item["is_match"])
+
+    result = asyncio.run(service.resolve_entities({"product": match["messy"]["product"]}, "S1", "TGT"))
+
+    assert result["mappedData"]["product"] == match["canonical"]["product"]
+    assert result["confidenceScores"]["product"] == 0.98
+
+
+def test_pair_stats_describe_the_shared_model_and_the_overlay(trained):
+    service, _, _ = trained
+
+    stats = service.get_pair_model_stats("S1", "TGT")
+
+    assert stats["shared_model_key"] == shared_model_key("TGT")
+    assert stats["model_key"] == "S1_TGT"
+    assert stats["overlay"]["aliases"] > 0
+    assert service.get_pair_model_stats("S9", "TGT")["overlay"] is None
+
+
+def test_feedback_applies_to_the_overlay_at_once_and_is_pruned_once_trained(shared_service):
+    shared_service.add_overlay_alias("S1", "TGT", "product", "PP H350", "PP Homo 350")
+
+    assert shared_service._target_overlays("TGT")["S1"].alias("product", "pp h350") == "PP Homo 350"
+    result = asyncio.run(shared_service.resolve_entities({"product": "PP H350"}, "S1", "TGT"))
+    assert result["mappedData"]["product"] == "PP Homo 350"
+    other = asyncio.run(shared_service.resolve_entities({"product": "PP H350"}, "S2", "TGT"))
+    assert other["mappedData"]["product"] == "PP H350"
+
+    catalog = generators.product_catalog(60, seed=7)
+    items = sourced(generators.training_set(40, catalog, seed=7), "S1")
+    items.append(LabelledPair({"product": "PP H350"}, {"product": "PP Homo 350"}, source="S1"))
+    assert asyncio.run(shared_service.train_model(shared_model_key("TGT"), items))["success"]
+
+    assert shared_service.feedback_overlays["TGT"]["S1"].aliases["product"] == {}
+    assert shared_service._target_overlays("TGT")["S1"].alias("product", "pp h350") == "PP Homo 350"
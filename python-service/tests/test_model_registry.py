@@ -0,0 +1,100 @@
+"""Index of trained models and its shared manifest"""
+import json
+import time
+
+import pytest
+
+from app.services.model_artifact import CANONICAL, SETTINGS, artifact_path, encode_json, write_artifact
+from app.services.model_registry import MANIFEST_NAME, ModelRegistry
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "models"
+    path.mkdir()
+    return path
+
+
+def test_pairs_without_a_model_are_answered_from_memory(model_path):
+    registry = ModelRegistry(model_path)
+
+    assert registry.get("A_B") is None
+    assert registry.get_stats()["negatives"] == 1
+    assert (model_path / MANIFEST_NAME).exists()
+
+
+def test_every_training_run_gets_a_new_version(model_path):
+    registry = ModelRegistry(model_path)
+
+    first = registry.record("A_B", size=100, canonical_records=5, mode="full")
+    second = registry.record("A_B", size=120, canonical_records=6, mode="incremental")
+
+    assert (first.version, second.version) == (1, 2)
+    assert registry.get("A_B") == second
+    assert registry.get("A_B").to_dict()["sizeBytes"] == 120
+    # and persists across restarts
+    assert ModelRegistry(model_path).get("A_B") == second
+
+
+def test_processes_sharing_the_model_path_see_each_others_models(model_path):
+    ours = ModelRegistry(model_path, refresh_seconds=0.01)
+    theirs = ModelRegistry(model_path, refresh_seconds=0)
+
+    theirs.record("A_B", size=1, canonical_records=1)
+    time.sleep(0.02)
+
+    assert ours.get("A_B").version == 1
+    assert ours.get_stats()["reloads"] == 1
+    # Versions keep increasing whichever process trains
+    assert ours.record("A_B", size=1, canonical_records=1).version == 2
+    assert theirs.record("A_B", size=1, canonical_records=1).version == 3
+
+
+def test_entries_filter_by_tenant(model_path):
+    registry = ModelRegistry(model_path)
+    for model_key in ("A_T", "B_T", "A_U"):
+        registry.record(model_key, size=1, canonical_records=1)
+
+    assert [entry.model_key for entry in registry.entries(target_tenant="T")] == ["A_T", "B_T"]
+    assert [entry.model_key for entry in registry.entries(source_tenant="A")] == ["A_T", "A_U"]
+
+
+def test_model_directory_is_scanned_without_a_manifest(model_path):
+    (model_path / "OLD_T_settings").write_bytes(b"x" * 10)
+    (model_path / "OLD_T_canonical.json").write_text(json.dumps({"1": {}, "2": {}}))
+    write_artifact(
+        artifact_path(model_path, "NEW_T"),
+        {SETTINGS: b"settings", CANONICAL: encode_json({"1": {}})},
+        metadata={"canonicalRecords": 1, "mode": "incremental"}
+    )
+    artifact_path(model_path, "BAD_T").write_bytes(b"not an artifact")
+
+    registry = ModelRegistry(model_path)
+
+    assert registry.get("OLD_T").canonical_records == 2
+    assert registry.get("NEW_T").mode == "incremental"
+    assert registry.get("BAD_T") is None
+    assert len(registry) == 2
+
+
+def test_artifacts_take_precedence_over_legacy_files_of_the_pair(model_path):
+    (model_path / "A_T_settings").write_bytes(b"x" * 10)
+    write_artifact(artifact_path(model_path, "A_T"), {SETTINGS: b"s" * 50}, metadata={"canonicalRecords": 7})
+
+    registry = ModelRegistry(model_path)
+
+    assert registry.get("A_T").canonical_records == 7
+
+
+def test_an_unreadable_manifest_is_rebuilt(model_path):
+    ModelRegistry(model_path).record("A_T", size=1, canonical_records=1)
+    (model_path / MANIFEST_NAME).write_text("{broken")
+    (model_path / "B_T_settings").write_bytes(b"x")
+
+    registry = ModelRegistry(model_path)
+
+    # Only what is on disk is known again
+    assert registry.get("A_T") is None
+    assert registry.get("B_T").version == 1
+    assert json.loads((model_path / MANIFEST_NAME).read_text())["models"].keys() == {"B_T"}
+
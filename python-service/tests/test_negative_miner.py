@@ -0,0 +1,81 @@
+"""Trigram-index hard-negative mining"""
+import random
+
+import pytest
+
+from app.services.negative_miner import NegativeMiner, trigrams
+from benchmarks import generators
+
+
+def dice(a, b):
+    a, b = trigrams(a), trigrams(b)
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def test_trigrams_normalize_case_and_whitespace():
+    assert trigrams("PP  Homo") == trigrams(" pp homo")
+    assert "  p" in trigrams("PP")
+
+
+@pytest.mark.parametrize("size", [50, 2000])
+def test_scores_match_brute_force_dice(size):
+    # Small catalogs are counted densely, large ones sparsely
+    values = sorted(set(generators.product_catalog(size, seed=3).values()))
+    miner = NegativeMiner(values, max_df=1.0)
+    query = random.Random(3).choice(values) + " bulk"
+
+    results = miner.similar(query, 5)
+
+    expected = sorted((dice(query, value) for value in values), reverse=True)[:5]
+    assert [score for _, score in results] == pytest.approx(expected)
+    for value, score in results:
+        assert score == pytest.approx(dice(query, value))
+
+
+def test_exclusions_and_similarity_floor_are_respected():
+    miner = NegativeMiner(["PP Homo 350", "PP Homo 355", "PP Random 350", "LDPE 2102"], max_df=1.0)
+
+    results = miner.similar("PP Homo 350", 2, exclude=["PP Homo 350"], min_similarity=0.3)
+
+    assert [value for value, _ in results] == ["PP Homo 355", "PP Random 350"]
+    assert all(score >= 0.3 for _, score in results)
+    assert miner.similar("PP Homo 350", 5, min_similarity=0.99) == [("PP Homo 350", 1.0)]
+
+
+def test_no_matches_and_degenerate_queries():
+    miner = NegativeMiner(["PP Homo 350", "LDPE 2102", "PP Homo 350"])
+
+    assert miner.values == ["PP Homo 350", "LDPE 2102"]
+    assert miner.similar("zzz", 3) == []
+    assert miner.similar("PP Homo 350", 0) == []
+    assert NegativeMiner([]).similar("PP Homo 350", 3) == []
+
+
+def test_common_trigrams_are_left_out_of_the_index():
+    values = [f"grade {i:03d}" for i in range(20)]
+    miner = NegativeMiner(values, max_df=0.5)
+
+    assert "gra" not in miner.postings
+    assert [value for value, _ in miner.similar("grade 007", 1)] == ["grade 007"]
+
+
+def test_training_mines_near_misses_other_than_the_label_and_its_rejections(service_env):
+    from app.services.training_service import TrainingService
+
+    service = TrainingService()
+    canonicals = sorted(set(generators.product_catalog(200, seed=3).values()))
+    labels = [
+        {"targetField": "product", "sourceValue": value, "correctedValue": value, "rejectedValues": []}
+        for value in canonicals
+    ]
+    label = labels[0]
+    nearest = [value for value, _ in NegativeMiner(canonicals).similar(label["sourceValue"], 2)]
+    label["rejectedValues"] = [nearest[1]]
+
+    negatives = service._generate_negative_examples(labels)
+
+    assert negatives and not any(pair.is_match for pair in negatives)
+    mined = [pair.canonical["product"] for pair in negatives if pair.messy == {"product": label["sourceValue"]}]
+    assert 0 < len(mined) <= service.hard_negatives_per_label
+    assert label["correctedValue"] not in mined and nearest[1] not in mined
+    service.store.close()
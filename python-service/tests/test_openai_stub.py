@@ -0,0 +1,51 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from benchmarks.openai_stub import StubConfig, create_app
+
+
+def _client(**options) -> TestClient:
+    return TestClient(create_app(StubConfig(latency_median_ms=0, latency_p99_ms=0, seed=1, **options)))
+
+
+def _messages(system: str):
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": 'Document: {"Product": "Cocoa Butter", "Qty": "10 MT"}'},
+    ]
+
+
+def test_schema_extraction_prompts_get_schema_json():
+    client = _client()
+
+    response = client.post("/v1/chat/completions", json={"messages": _messages("You do schema extraction.")})
+
+    assert response.status_code == 200
+    content = response.json()["choices"][0]["message"]["content"]
+    assert json.loads(content)["extractedSchema"]["product"] == "Cocoa Butter"
+    assert client.get("/stats").json()["by_kind"] == {"extract": 1}
+
+
+def test_streamed_answers_end_with_done():
+    client = _client()
+
+    response = client.post(
+        "/v1/chat/completions",
+        json={"messages": _messages("You analyze documents."), "stream": True}
+    )
+
+    events = [line for line in response.text.split("\n\n") if line]
+    assert events[-1] == "data: [DONE]"
+    assert json.loads(events[-2][len("data: "):])["choices"][0]["finish_reason"] == "stop"
+
+
+def test_rate_limit_answers_429_with_retry_after():
+    client = _client(rpm=1, retry_after_s=2.0)
+
+    client.post("/v1/chat/completions", json={"messages": _messages("x")})
+    response = client.post("/v1/chat/completions", json={"messages": _messages("x")})
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2.0"
+    assert client.get("/stats").json()["rate_limited"] == 1
@@ -0,0 +1,117 @@
+"""Interned values, pooled dedupe records and labelled pairs"""
+import asyncio
+
+from app.services.records import LabelledPair, RecordPool, intern_value
+
+
+def runtime_string(*parts):
+    """An equal string built at runtime, so a distinct object from any literal."""
+    return "".join(parts)
+
+
+def test_intern_value_shares_equal_strings():
+    first, second = runtime_string("Whey ", "Powder"), runtime_string("Whey Pow", "der")
+
+    assert first is not second
+    assert intern_value(first) is intern_value(second)
+
+
+def test_intern_value_leaves_other_values_alone():
+    values = [None, 42, 1.5, ["a"], {"a": 1}]
+
+    assert all(intern_value(value) is value for value in values)
+
+
+def test_pool_shares_records_with_equal_values():
+    pool = RecordPool(["product", "supplier"])
+
+    first = pool.record({"product": runtime_string("W", "PC 80"), "supplier": "Acme"})
+    second = pool.record({"supplier": "Acme", "product": runtime_string("WPC", " 80"), "extra": "ignored"})
+
+    assert first is second
+    assert first == {"product": "WPC 80", "supplier": "Acme"}
+    assert len(pool) == 1
+
+
+def test_pool_records_carry_every_field_as_a_string_or_none():
+    pool = RecordPool(["product", "supplier", "quantity"])
+
+    record = pool.record({"product": "WPC 80", "supplier": "", "quantity": 25})
+
+    assert record == {"product": "WPC 80", "supplier": None, "quantity": "25"}
+    assert pool.record({"product": "WPC 80", "quantity": "25"}) is record
+    assert pool.record({"product": "WPC 80"}) is not record
+    assert len(pool) == 2
+
+
+def test_pool_interns_field_names_and_values():
+    pool = RecordPool([runtime_string("pro", "duct")])
+
+    record = pool.record({"product": runtime_string("WPC", " 80")})
+
+    (field, value), = record.items()
+    assert field is intern_value("product")
+    assert value is intern_value(runtime_string("WPC 8", "0"))
+
+
+def test_labelled_pair_from_dict_defaults():
+    pair = LabelledPair.from_dict({"messy": {"product": "wpc80"}, "canonical": {"product": "WPC 80"}})
+
+    assert (pair.messy, pair.canonical) == ({"product": "wpc80"}, {"product": "WPC 80"})
+    assert (pair.is_match, pair.weight, pair.source) == (True, 1.0, None)
+
+
+def test_labelled_pair_from_dict_coerces_label_and_weight():
+    pair = LabelledPair.from_dict({
+        "messy": {}, "canonical": {}, "is_match": 0, "weight": "2.5", "source": "S1",
+    })
+
+    assert (pair.is_match, pair.weight, pair.source) == (False, 2.5, "S1")
+
+
+def test_labelled_pairs_have_no_instance_dict():
+    pair = LabelledPair({}, {})
+
+    assert not hasattr(pair, "__dict__")
+
+
+def test_training_pairs_share_pooled_records(dedupe_service):
+    pool = RecordPool(dedupe_service.match_fields)
+    items = [
+        LabelledPair({"product": "wpc80"}, {"product": "WPC 80"}),
+        LabelledPair({"product": "wpc80"}, {"product": "WPC 34"}, is_match=False),
+        LabelledPair({"product": runtime_string("wpc", "80")}, {"product": "WPC 80"}, weight=2.0),
+    ]
+
+    pairs = dedupe_service._extract_labeled_pairs(items, pool)
+
+    (first_messy, first_canonical), (second_messy, second_canonical) = pairs["match"]
+    (distinct_messy, distinct_canonical), = pairs["distinct"]
+    assert first_messy is second_messy is distinct_messy
+    assert first_canonical is second_canonical
+    assert distinct_canonical == dict.fromkeys(dedupe_service.match_fields) | {"product": "WPC 34"}
+    assert len(pool) == 3
+
+
+def test_resolutions_come_back_as_plain_dicts(dedupe_service):
+    record = {"product": "wpc80", "quantity": 25, "notes": "urgent"}
+
+    result = asyncio.run(dedupe_service.resolve_entities(record, "A", "B"))
+
+    assert result["mappedData"] == {"product": "Whey Protein Concentrate 80%", "quantity": 25, "notes": "urgent"}
+    assert set(result["confidenceScores"]) == set(record)
+    assert type(result["mappedData"]) is dict and type(result["confidenceScores"]) is dict
+
+
+def test_equal_lookups_share_one_memoized_resolution(dedupe_service):
+    async def resolve_twice():
+        first = await dedupe_service._resolve_match_fields(
+            {"product": runtime_string("wpc", "80")}, "A_B", "B")
+        second = await dedupe_service._resolve_match_fields(
+            {"product": runtime_string("wp", "c80")}, intern_value(runtime_string("A_", "B")), "B")
+        return first, second
+
+    first, second = asyncio.run(resolve_twice())
+
+    assert first is second
+    assert len(first) == len(dedupe_service.match_fields)
@@ -0,0 +1,126 @@
+"""Offline replay of recorded feedback"""
+import argparse
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks import replay
+from app.services.training_store import TrainingStore
+
+
+def feedback(source_value, corrected_value, source="SRC", target="TGT", timestamp="2024-01-01T00:00:00", field="product"):
+    return {
+        "timestamp": timestamp,
+        "sourceTenant": source,
+        "targetTenant": target,
+        "sourceValue": source_value,
+        "targetField": field,
+        "correctedValue": corrected_value,
+    }
+
+
+def args(**overrides):
+    values = {"jsonl": None, "db": None, "source": None, "target": None, "since": None, "until": None}
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def test_summary_reports_precision_and_recall_per_threshold():
+    results = {
+        "confidence": np.array([0.95, 0.8, 0.6, 0.4], dtype=np.float32),
+        "correct": np.array([True, False, True, False]),
+        "latency": np.array([0.001, 0.002, 0.003, 0.004]),
+    }
+
+    summary = replay.summarize(results, [0.5, 0.9, 0.99], skipped=2)
+
+    assert summary["n"] == 4 and summary["skipped"] == 2
+    assert summary["accuracy"] == 0.5
+    assert summary["thresholds"]["0.5"] == {"answered": 3, "precision": 0.6667, "recall": 0.5}
+    assert summary["thresholds"]["0.9"] == {"answered": 1, "precision": 1.0, "recall": 0.25}
+    assert summary["thresholds"]["0.99"] == {"answered": 0, "precision": None, "recall": 0.0}
+    assert summary["latency_ms"]["max"] == 4.0
+
+
+def test_summary_of_nothing():
+    empty = {name: np.array([]) for name in ("confidence", "correct", "latency")}
+
+    assert replay.summarize(empty, [0.5]) == {"n": 0, "skipped": 0}
+
+
+def test_compare_flags_drops_beyond_tolerance_per_scope():
+    metrics = lambda p, r: {"thresholds": {"0.7": {"precision": p, "recall": r}}}
+    baseline = {"overall": metrics(0.9, 0.8), "pairs": {"A_T": metrics(0.9, 0.8)}}
+    report = {"overall": metrics(0.895, 0.8), "pairs": {"A_T": metrics(0.8, None), "B_T": metrics(0.1, 0.1)}}
+
+    assert replay.compare(report, baseline, tolerance=0.01) == ["A_T: precision@0.7 0.9 -> 0.8 (-0.1000)"]
+
+
+def test_feedback_is_read_from_jsonl_files_with_filters(tmp_path):
+    path = tmp_path / "archive.jsonl"
+    path.write_text("\n".join(json.dumps(entry) for entry in [
+        feedback("a", "A", timestamp="2024-01-01"),
+        feedback("b", "B", timestamp="2024-02-01"),
+        feedback("c", "C", target="OTHER", timestamp="2024-02-01"),
+    ]) + "\n\n")
+
+    entries = list(replay.read_feedback(args(jsonl=[path], target="TGT", since="2024-01-15")))
+
+    assert [entry["sourceValue"] for entry in entries] == ["b"]
+
+
+def test_feedback_is_read_from_the_training_store(tmp_path):
+    db = tmp_path / "training.db"
+    store = TrainingStore(db)
+    store.add_feedback([feedback("a", "A"), feedback("b", "B", source="OTHER")])
+    store.close()
+
+    entries = list(replay.read_feedback(args(db=db, source="SRC")))
+
+    assert [entry["sourceValue"] for entry in entries] == ["a"]
+
+
+def test_lookups_are_scored_against_their_corrections(dedupe_service, monkeypatch):
+    monkeypatch.setattr(replay, "_service", dedupe_service)
+    lookups = [
+        ("product", "WPC 80", "Whey Protein Concentrate 80%"),
+        ("product", "wpc 80", "whey protein  concentrate 80%"),
+        ("product", "WPC 80", "Something else"),
+        ("incoterm", "FOB", "FOB"),
+    ]
+
+    results, skipped = asyncio.run(replay._replay(("SRC", "TGT"), lookups))
+
+    assert skipped == 1
+    assert results["correct"].tolist() == [True, True, False]
+    assert results["confidence"].tolist() == pytest.approx([0.98] * 3)
+    assert results["latency"].size == 3
+
+
+def test_replay_end_to_end(tmp_path):
+    path = tmp_path / "feedback.jsonl"
+    path.write_text("\n".join(json.dumps(entry) for entry in [
+        feedback("WPC 80", "Whey Protein Concentrate 80%"),
+        feedback("SMP", "Skimmed Milk Powder", source="OTHER"),
+        feedback("WPC 80", "Whey Protein Isolate 90%"),
+    ]) + "\n")
+    output = tmp_path / "replay.json"
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"overall": {"thresholds": {"0.5": {"precision": 1.0, "recall": 1.0}}}}))
+
+    status = replay.main([
+        "--jsonl", str(path), "--workers", "1", "--chunk-size", "2", "--thresholds", "0.5",
+        "--output", str(output), "--baseline", str(baseline),
+    ])
+
+    report = json.loads(output.read_text())
+    assert status == 1
+    assert report["overall"]["n"] == 3
+    assert report["pairs"]["SRC_TGT"]["accuracy"] == 0.5
+    assert report["pairs"]["OTHER_TGT"]["accuracy"] == 1.0
+    assert report["regressions"] == [
+        "overall: precision@0.5 1.0 -> 0.6667 (-0.3333)",
+        "overall: recall@0.5 1.0 -> 0.6667 (-0.3333)",
+    ]
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from app.services.resolution_cache import ResolutionCache, SingleFlight, normalize_value
+
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = ResolutionCache(max_entries_per_pair=2)
+    version = cache.version("A_B")
+    cache.put("A_B", ("x",), ("X",), version)
+    cache.put("A_B", ("y",), ("Y",), version)
+    cache.get("A_B", ("x",), 0)
+    cache.put("A_B", ("z",), ("Z",), version)
+
+    assert cache.get("A_B", ("x",), 0) == ("X",)
+    assert cache.get("A_B", ("y",), 0) is None
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_results_computed_before_an_invalidation_are_not_stored():
+    cache = ResolutionCache()
+    version = cache.version("A_B")
+    cache.invalidate_pair("A_B")
+    cache.put("A_B", ("x",), ("X",), version)
+
+    assert cache.get("A_B", ("x",), 0) is None
+
+
+def test_knowledge_base_results_expire_with_their_generation():
+    cache = ResolutionCache()
+    cache.put("A_B", ("kb",), ("KB",), 0, kb_generation=1)
+    cache.put("A_B", ("model",), ("M",), 0)
+
+    assert cache.get("A_B", ("kb",), 1) == ("KB",)
+    assert cache.get("A_B", ("kb",), 2) is None
+    assert cache.get("A_B", ("model",), 2) == ("M",)
+
+
+def test_normalize_value_folds_case_and_whitespace():
+    assert normalize_value("  Cocoa   BUTTER ") == "cocoa butter"
+    assert normalize_value(3) == 3
+
+
+def test_single_flight_shares_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.shared == 4
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", compute))
+        second = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "result"
+
+
+def test_single_flight_propagates_errors_to_every_caller():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.005)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(2)), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(main())] == ["boom", "boom"]
+
+
+@pytest.fixture
+def counting_service(dedupe_service):
+    """Service whose match-field computation is slow and counted."""
+    calls = []
+
+    async def compute_match_fields(match_data, model_key, target_tenant):
+        calls.append(model_key)
+        generation = len(calls)
+        await asyncio.sleep(0.02)
+        return ((f"resolved-{generation}", 0.9),), False
+
+    dedupe_service._compute_match_fields = compute_match_fields
+    dedupe_service.calls = calls
+    return dedupe_service
+
+
+def test_lookups_after_an_invalidation_do_not_join_the_stale_flight(counting_service):
+    service = counting_service
+    record = {"product": "Cocoa Butter"}
+
+    async def main():
+        before = asyncio.ensure_future(service._resolve_match_fields(record, "A_B", "B"))
+        await asyncio.sleep(0.005)
+        service.resolution_cache.invalidate_pair("A_B")
+        after = await service._resolve_match_fields(record, "A_B", "B")
+        return await before, after, await service._resolve_match_fields(record, "A_B", "B")
+
+    before, after, cached = asyncio.run(main())
+
+    assert len(service.calls) == 2
+    assert before[0][0] == "resolved-1"
+    assert after[0][0] == "resolved-2"
+    # Only the post-invalidation result was stored
+    assert cached == after
+
+
+def test_identical_concurrent_lookups_compute_once(counting_service):
+    service = counting_service
+
+    async def main():
+        return await asyncio.gather(*(
+            service._resolve_match_fields({"product": name}, "A_B", "B")
+            for name in ("Cocoa Butter", "cocoa  butter", "COCOA BUTTER")
+        ))
+
+    results = asyncio.run(main())
+
+    assert len(service.calls) == 1
+    assert results[0] == results[1] == results[2]
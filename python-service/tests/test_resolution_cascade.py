@@ -0,0 +1,180 @@
+"""Tiered resolution: tier configuration, the alias automaton and cost accounting"""
+import asyncio
+
+import pytest
+
+from app.services.resolution_cascade import (
+    DEFAULT_TIER_THRESHOLDS,
+    AliasAutomaton,
+    CascadeStats,
+    alias_tokens,
+    parse_thresholds,
+    parse_tiers,
+)
+
+ALIASES = {
+    "wpc 80": "Whey Protein Concentrate 80%",
+    "wpi": "Whey Protein Isolate 90%",
+    "skim milk powder": "Skimmed Milk Powder",
+    "milk powder": "Whole Milk Powder",
+    "fat 26%": "Whole Milk Powder",
+}
+
+
+def test_parse_tiers():
+    assert parse_tiers(" Exact, ngram,,exact ,model") == ("exact", "ngram", "model")
+    with pytest.raises(ValueError):
+        parse_tiers("exact,regex")
+
+
+def test_parse_thresholds():
+    thresholds = parse_thresholds("exact=0.9, NGRAM=0.8")
+
+    assert thresholds == {**DEFAULT_TIER_THRESHOLDS, "exact": 0.9, "ngram": 0.8}
+    assert parse_thresholds("") == DEFAULT_TIER_THRESHOLDS
+    with pytest.raises(ValueError):
+        parse_thresholds("regex=0.5")
+
+
+def test_alias_tokens_keep_percent_signs_on_numbers():
+    assert alias_tokens("WPC-80, fat 26 %") == ("wpc", "80", "fat", "26")
+    assert alias_tokens("Fat 26%") == ("fat", "26%")
+
+
+def test_automaton_finds_aliases_as_whole_words_inside_values():
+    automaton = AliasAutomaton(ALIASES)
+
+    assert automaton.find("WPC 80") == ("Whey Protein Concentrate 80%", 0.98)
+    canonical, score = automaton.find("Instant WPC 80 in 25kg bags")
+    assert canonical == "Whey Protein Concentrate 80%"
+    assert score == pytest.approx(0.98 * (2 / 6) ** 0.5, abs=1e-4)
+    # Only whole tokens match
+    assert automaton.find("wpc 800") is None
+    assert automaton.find("wpis") is None
+    assert automaton.find("") is None
+
+
+def test_automaton_reports_aliases_ending_inside_longer_ones():
+    automaton = AliasAutomaton(ALIASES)
+
+    # "milk powder" is found through the failure link of "skim milk powder"
+    # and both canonicals cover the value's tokens
+    canonical, score = automaton.find("skim milk powder fat 26%")
+    assert canonical == "Whole Milk Powder"
+    assert score == pytest.approx(0.98 * (4 / 5) ** 0.5, abs=1e-4)
+
+
+def test_automaton_discounts_ties_between_canonicals():
+    automaton = AliasAutomaton(ALIASES)
+
+    canonical, score = automaton.find("wpi wpc 80")
+    assert canonical == "Whey Protein Concentrate 80%"
+    assert score == pytest.approx(0.98 * (2 / 3) ** 0.5, abs=1e-4)
+    _, tied = automaton.find("wpi milk powder wpi")
+    assert tied == pytest.approx(0.98 * (2 / 4) ** 0.5 * AliasAutomaton.AMBIGUITY, abs=1e-4)
+
+
+def test_cascade_stats_account_calls_exits_and_time():
+    stats = CascadeStats(("exact", "ngram"))
+    stats.record("exact", 0.001, candidate=False, exited=False)
+    stats.record("ngram", 0.003, candidate=True, exited=True)
+    stats.finish("ngram")
+    stats.record("exact", 0.001, candidate=True, exited=True)
+    stats.finish("exact")
+    stats.record("exact", 0.001, candidate=False, exited=False)
+    stats.finish(None)
+
+    result = stats.get_stats()
+
+    assert (result["lookups"], result["unresolved"]) == (3, 1)
+    assert result["tiers"]["exact"] == {
+        "calls": 3, "candidates": 1, "earlyExits": 1, "resolved": 1, "hitRate": 0.3333,
+        "totalMs": 3.0, "meanMs": 1.0, "timeShare": 0.5,
+    }
+    assert result["tiers"]["ngram"]["hitRate"] == 1.0
+
+
+def resolve(service, product, source="SRC", target="TGT"):
+    result = asyncio.run(service.resolve_entities({"product": product}, source, target))
+    return result["mappedData"]["product"], result["confidenceScores"]["product"]
+
+
+def test_exact_matches_end_the_cascade(dedupe_service):
+    assert resolve(dedupe_service, "WPC 80") == ("Whey Protein Concentrate 80%", 0.98)
+
+    tiers = dedupe_service.get_cascade_stats()["tiers"]
+    assert tiers["exact"]["earlyExits"] == 1
+    assert tiers["automaton"]["calls"] == 0 and tiers["ngram"]["calls"] == 0
+
+
+def test_values_containing_an_alias_are_resolved_by_the_automaton(dedupe_service):
+    mapped, _ = resolve(dedupe_service, "SMP")
+    assert mapped == "Skimmed Milk Powder"
+
+    mapped, _ = resolve(dedupe_service, "WPC 80 instant")
+    assert mapped == "Whey Protein Concentrate 80%"
+    tiers = dedupe_service.get_cascade_stats()["tiers"]
+    assert tiers["automaton"]["candidates"] == 1
+
+
+def test_unknown_values_pass_through_unresolved(dedupe_service):
+    mapped, _ = resolve(dedupe_service, "Zirconium tetrachloride")
+    assert mapped == "Zirconium tetrachloride"
+
+    stats = dedupe_service.get_cascade_stats()
+    assert stats["unresolved"] == 1 and stats["lookups"] == 1
+
+
+def test_configured_tiers_and_thresholds_are_used(service_env, monkeypatch):
+    from app.services.dedupe_service import DedupeService
+
+    monkeypatch.setenv("RESOLUTION_TIERS", "ngram")
+    service = DedupeService()
+    try:
+        mapped, _ = resolve(service, "wpc 80")
+        stats = service.get_cascade_stats()
+    finally:
+        service.close()
+
+    assert mapped == "Whey Protein Concentrate 80%"
+    assert stats["order"] == ["ngram"]
+    assert stats["tiers"]["ngram"]["calls"] == 1
+
+
+def test_corrections_reach_exact_lookups_at_once_and_the_automaton_after_the_rebuild(dedupe_service):
+    async def scenario():
+        dedupe_service._knowledge_base_indexes()
+        generation = dedupe_service._indexed_kb_generation()
+
+        dedupe_service.add_to_knowledge_base("Caseinate XR", "Sodium Caseinate")
+        exact = dedupe_service._exact_tier("caseinate xr")
+        before_rebuild = dedupe_service._knowledge_base_indexes()[1].find("caseinate xr 25kg")
+        await dedupe_service._kb_rebuild
+        after_rebuild = dedupe_service._knowledge_base_indexes()[1].find("caseinate xr 25kg")
+        return generation, exact, before_rebuild, after_rebuild
+
+    generation, exact, before_rebuild, after_rebuild = asyncio.run(scenario())
+
+    assert exact == ("Sodium Caseinate", 0.98)
+    assert before_rebuild is None
+    assert after_rebuild[0] == "Sodium Caseinate"
+    assert dedupe_service._indexed_kb_generation() == generation + 2
+    assert dedupe_service._kb_indexes_current()
+
+
+def test_corrections_made_during_a_rebuild_are_kept(dedupe_service):
+    async def scenario():
+        dedupe_service._knowledge_base_indexes()
+        dedupe_service.add_to_knowledge_base("Caseinate XR", "Sodium Caseinate")
+        rebuild = dedupe_service._kb_rebuild
+        # Let the rebuild snapshot the knowledge base before the next correction
+        await asyncio.sleep(0)
+        dedupe_service.add_to_knowledge_base("Caseinate YR", "Calcium Caseinate")
+        assert dedupe_service._kb_pending == {"caseinate yr": "Calcium Caseinate"}
+        await rebuild
+
+    asyncio.run(scenario())
+
+    assert dedupe_service._exact_tier("caseinate xr") == ("Sodium Caseinate", 0.98)
+    assert dedupe_service._exact_tier("caseinate yr") == ("Calcium Caseinate", 0.98)
+    assert dedupe_service._knowledge_base_indexes()[1].find("caseinate yr")[0] == "Calcium Caseinate"
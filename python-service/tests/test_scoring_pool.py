@@ -0,0 +1,139 @@
+"""Gazetteer scoring in worker processes"""
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from app.services import scoring_pool
+from app.services.scoring_pool import PooledModel, ScoringPool, _Worker, _ranking, search_best
+from benchmarks import generators
+
+
+@pytest.fixture
+def worker_state(tmp_path, monkeypatch):
+    """This process set up as a scoring worker keeping two models, with loads recorded."""
+    loads = []
+
+    def load_gazetteer(model_path, model_key, key=None):
+        if model_key == "MISSING":
+            return None
+        loads.append(model_key)
+        return f"gazetteer of {model_key}"
+
+    monkeypatch.setattr(scoring_pool, "load_gazetteer", load_gazetteer)
+    monkeypatch.setattr(scoring_pool, "_worker_model_path", tmp_path)
+    monkeypatch.setattr(scoring_pool, "_worker_max_models", 2)
+    monkeypatch.setattr(scoring_pool, "_worker_models", OrderedDict())
+    return loads
+
+
+def test_worker_keeps_its_most_recently_used_models(worker_state):
+    for model_key in ("A", "B", "A", "C", "A", "B"):
+        assert scoring_pool._worker_gazetteer(model_key, 1) == f"gazetteer of {model_key}"
+
+    # B was evicted by C, then C by B
+    assert worker_state == ["A", "B", "C", "B"]
+    assert list(scoring_pool._worker_models) == ["A", "B"]
+
+
+def test_worker_reloads_a_model_once_its_version_changes(worker_state):
+    scoring_pool._worker_gazetteer("A", 1)
+    scoring_pool._worker_gazetteer("A", 2)
+    scoring_pool._worker_gazetteer("A", 2)
+
+    assert worker_state == ["A", "A"]
+
+
+def test_worker_release_drops_only_older_versions(worker_state):
+    scoring_pool._worker_gazetteer("A", 2)
+
+    scoring_pool._worker_release("A", 2)
+    assert "A" in scoring_pool._worker_models
+    scoring_pool._worker_release("A", 3)
+    assert "A" not in scoring_pool._worker_models
+
+
+def test_worker_without_the_model_fails(worker_state):
+    with pytest.raises(FileNotFoundError):
+        scoring_pool._worker_gazetteer("MISSING", 1)
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append((fn.__name__, args))
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+@pytest.fixture
+def fake_workers(monkeypatch):
+    """Workers that record what they are sent instead of starting processes."""
+    monkeypatch.setattr(_Worker, "_start", lambda self: setattr(self, "executor", FakeExecutor()))
+
+
+def test_pool_mirrors_worker_caches_and_releases_superseded_models(fake_workers, tmp_path):
+    pool = ScoringPool(tmp_path, workers=3, pin_cpus=False, max_models=2)
+    worker = pool.workers[_ranking("A", 3)[0]]
+
+    for model_key in ("A", "B", "C"):
+        worker.use(model_key, 1)
+    assert list(worker.models) == ["B", "C"] and worker.evictions == 1
+    assert not pool.has_model("A") and pool.has_model("C")
+
+    pool.release("C", 1)
+    pool.release("C", 2)
+
+    assert not pool.has_model("C")
+    assert worker.executor.submitted == [("_worker_release", ("C", 2))]
+    assert [w.executor.submitted for w in pool.workers if w is not worker] == [[], []]
+    stats = pool.get_stats()
+    assert stats["maxModels"] == 2
+    assert sorted(w["evictions"] for w in stats["perWorker"]) == [0, 0, 1]
+
+
+def test_a_model_spills_to_its_next_worker_only_when_its_own_is_saturated(fake_workers, tmp_path):
+    pool = ScoringPool(tmp_path, workers=3, pin_cpus=False, spill_depth=2)
+    first, second, third = (pool.workers[i] for i in _ranking("A", 3))
+
+    assert pool._worker_for("A") is first
+    first.pending = 2
+    assert pool._worker_for("A") is second
+    second.pending = 2
+    third.pending = 5
+    assert pool._worker_for("A") is first
+
+
+def test_model_keys_are_spread_over_the_workers():
+    owners = {_ranking(f"S{i}_T", 4)[0] for i in range(100)}
+
+    assert owners == {0, 1, 2, 3}
+    assert _ranking("S1_T", 4) == _ranking("S1_T", 4)
+
+
+def test_pooled_scoring_matches_in_process_scoring(dedupe_service):
+    catalog = generators.product_catalog(60, seed=7)
+    data = generators.training_set(60, catalog, seed=7)
+    assert asyncio.run(dedupe_service.train_model("A_B", data))["success"]
+    gazetteer = dedupe_service._load_model("A_B")
+    version = dedupe_service.model_registry.get("A_B").version
+    records = [item["messy"] for item in data[:5]]
+    pairs = [(item["messy"], item["canonical"]) for item in data[:5]]
+
+    pool = ScoringPool(dedupe_service.model_path, workers=1, pin_cpus=False)
+    try:
+        async def score():
+            model = PooledModel("A_B", version)
+            found = [await pool.search(model, record, 0.0) for record in records]
+            return found, await pool.score_pairs(model, pairs)
+
+        found, scores = asyncio.run(score())
+    finally:
+        pool.close()
+
+    assert found == [search_best(gazetteer, record, 0.0) for record in records]
+    assert scores == pytest.approx(scoring_pool.score_pairs(gazetteer, pairs))
+    assert pool.get_stats()["perWorker"][0]["completed"] == len(records) + 1
@@ -0,0 +1,279 @@
+"""Streamed schema extraction and document analysis: incremental JSON, the result cache and SSE"""
+import asyncio
+import json
+
+import pytest
+
+from app.api.transport import sse_event
+from app.services.admission import AdmissionController
+from app.services.extraction_cache import ExtractionCache, document_key
+from app.services.json_stream import JsonMemberStream
+from app.services.llm_service import ANALYSIS, EXTRACTION, LLMService
+from app.services.request_context import DeadlineExceeded
+
+DOCUMENT = {"Product Name": "WPC 80", "Qty": "25 MT", "Remarks": "urgent"}
+ANSWER = {
+    "fieldMappings": {"Product Name": "product", "Qty": "quantity", "Remarks": "Remarks"},
+    "confidence": {"product": 0.97, "quantity": 0.9, "Remarks": 0.4},
+    "extractedSchema": {"product": "WPC 80", "quantity": "25 MT", "Remarks": "urgent"},
+}
+COMPLETION = "```json\n" + json.dumps(ANSWER, indent=2) + "\n```"
+
+
+def members(stream, text, chunk_size):
+    found = []
+    for start in range(0, len(text), chunk_size):
+        found.extend(stream.feed(text[start:start + chunk_size]))
+    return found
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, len(COMPLETION)])
+def test_members_are_emitted_in_order_whatever_the_chunking(chunk_size):
+    stream = JsonMemberStream()
+
+    found = members(stream, COMPLETION, chunk_size)
+
+    assert found == [(section, key, value) for section, values in ANSWER.items() for key, value in values.items()]
+    assert stream.done
+
+
+def test_members_are_emitted_as_soon_as_they_complete():
+    stream = JsonMemberStream()
+
+    assert stream.feed('{"fieldMappings": {"Qty": "quantity", "Product') == [("fieldMappings", "Qty", "quantity")]
+    assert stream.feed(' Name": "prod') == []
+    assert stream.feed('uct"}') == [("fieldMappings", "Product Name", "product")]
+
+
+def test_structural_characters_inside_strings_are_ignored():
+    text = json.dumps({"extractedSchema": {
+        'say "hi", {ok}': "a\\b [c]: d}", "nested": {"x": [1, {"y": 2}]}, "n": None,
+    }})
+
+    found = members(JsonMemberStream(), text, 2)
+
+    assert found == [
+        ("extractedSchema", 'say "hi", {ok}', "a\\b [c]: d}"),
+        ("extractedSchema", "nested", {"x": [1, {"y": 2}]}),
+        ("extractedSchema", "n", None),
+    ]
+
+
+def test_invalid_members_and_trailing_text_are_skipped():
+    stream = JsonMemberStream()
+
+    found = stream.feed('{"confidence": {"a": 0.9, "b": nope, "c": 1}, "top": 5} and {"more": {"d": 1}}')
+
+    assert found == [("confidence", "a", 0.9), ("confidence", "c", 1)]
+    assert stream.done
+    assert stream.feed('{"more": {"e": 1}}') == []
+
+
+def test_cache_keys_ignore_member_order():
+    assert document_key(EXTRACTION, {"a": 1, "b": 2}) == document_key(EXTRACTION, {"b": 2, "a": 1})
+    assert document_key(EXTRACTION, DOCUMENT) != document_key(ANALYSIS, DOCUMENT)
+
+
+def test_cache_evicts_least_recently_used_results():
+    cache = ExtractionCache(max_entries=2)
+    cache.put(EXTRACTION, {"n": 1}, {"r": 1})
+    cache.put(EXTRACTION, {"n": 2}, {"r": 2})
+
+    assert cache.get(EXTRACTION, {"n": 1}) == {"r": 1}
+    cache.put(EXTRACTION, {"n": 3}, {"r": 3})
+
+    assert cache.get(EXTRACTION, {"n": 2}) is None
+    assert cache.get(EXTRACTION, {"n": 1}) == {"r": 1}
+    assert cache.get_stats() == {"hits": 2, "misses": 1, "entries": 2}
+
+
+def test_cached_results_are_copies():
+    cache = ExtractionCache()
+    cache.put(EXTRACTION, DOCUMENT, {"extractedSchema": {"product": "WPC 80"}})
+
+    cache.get(EXTRACTION, DOCUMENT)["extractedSchema"] = {"product": "replaced"}
+
+    assert cache.get(EXTRACTION, DOCUMENT) == {"extractedSchema": {"product": "WPC 80"}}
+
+
+def test_disabled_cache_keeps_nothing():
+    cache = ExtractionCache(max_entries=0)
+    cache.put(EXTRACTION, DOCUMENT, {"r": 1})
+
+    assert cache.get(EXTRACTION, DOCUMENT) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_sse_event_format():
+    assert sse_event("field", {"targetField": "product"}) == b'event: field\ndata: {"targetField":"product"}\n\n'
+
+
+class Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Chat model answering every prompt with the same text, streamed in small chunks."""
+
+    def __init__(self, text, fail_after=None, error=RuntimeError("connection reset")):
+        self.text = text
+        self.fail_after = fail_after
+        self.error = error
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return Chunk(self.text)
+
+    async def astream(self, messages):
+        self.calls += 1
+        for start in range(0, len(self.text), 5):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise self.error
+            yield Chunk(self.text[start:start + 5])
+
+
+@pytest.fixture
+def llm_service(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    service = LLMService()
+    service.llm = FakeLLM(COMPLETION)
+    return service
+
+
+def collect(events):
+    async def run():
+        return [event async for event in events]
+
+    return asyncio.run(run())
+
+
+def test_streamed_extraction_sends_fields_then_the_result(llm_service):
+    events = collect(llm_service.stream_extract_schema(DOCUMENT))
+
+    assert [name for name, _ in events] == ["field"] * 3 + ["confidence"] * 3 + ["result"]
+    assert events[1] == ("field", {"sourceField": "Qty", "targetField": "quantity", "value": 25})
+    assert events[3] == ("confidence", {"targetField": "product", "confidence": 0.97})
+    assert events[-1][1] == asyncio.run(llm_service.extract_schema(DOCUMENT))
+    assert events[-1][1]["extractedSchema"]["unit"] == "MT"
+
+
+def test_streamed_and_regular_extraction_share_the_cache(llm_service):
+    first = collect(llm_service.stream_extract_schema(DOCUMENT))
+
+    regular = asyncio.run(llm_service.extract_schema(DOCUMENT))
+    again = collect(llm_service.stream_extract_schema(DOCUMENT))
+
+    assert llm_service.llm.calls == 1
+    assert regular == first[-1][1]
+    assert again == first
+
+
+def test_failed_stream_falls_back_to_rules_without_resending_fields(llm_service):
+    llm_service.llm = FakeLLM(COMPLETION, fail_after=COMPLETION.index('"Remarks"'))
+
+    events = collect(llm_service.stream_extract_schema(DOCUMENT))
+
+    fields = [data["sourceField"] for name, data in events if name == "field"]
+    assert fields == ["Product Name", "Qty", "Remarks"]
+    assert events[-1][1]["fieldMappings"] == {"Product Name": "product", "Qty": "quantity", "Remarks": "Remarks"}
+    assert llm_service.result_cache.get(EXTRACTION, DOCUMENT) is None
+
+
+def test_deadline_ends_the_stream_without_a_fallback(llm_service):
+    llm_service.llm = FakeLLM(COMPLETION, fail_after=20, error=DeadlineExceeded("llm_call"))
+
+    with pytest.raises(DeadlineExceeded):
+        collect(llm_service.stream_extract_schema(DOCUMENT))
+
+
+def test_streamed_analysis_sends_deltas_then_the_result(llm_service):
+    llm_service.llm = FakeLLM("A purchase order with a product and a quantity.")
+
+    events = collect(llm_service.stream_analyze_document(DOCUMENT))
+
+    assert "".join(data["text"] for name, data in events if name == "delta") == llm_service.llm.text
+    assert events[-1] == ("result", {"analysis": llm_service.llm.text, "detected_fields": list(DOCUMENT)})
+    assert asyncio.run(llm_service.analyze_document_structure(DOCUMENT)) == events[-1][1]
+    assert collect(llm_service.stream_analyze_document(DOCUMENT)) == [
+        ("delta", {"text": llm_service.llm.text}), events[-1]
+    ]
+    assert llm_service.llm.calls == 1
+
+
+def parse_events(text):
+    events = []
+    for message in text.split("\n\n"):
+        if message:
+            event, data = message.split("\n")
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_endpoint_sends_server_sent_events(client, services, llm_service):
+    services.llm_service = llm_service
+
+    response = client.post(
+        "/api/extract-schema/stream", json={"rawData": DOCUMENT}, headers={"accept-encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    events = parse_events(response.text)
+    assert events[0] == ("field", {"sourceField": "Product Name", "targetField": "product", "value": "WPC 80"})
+    assert events[-1][0] == "result"
+
+
+def test_analysis_stream_endpoint(client, services, llm_service):
+    services.llm_service = llm_service
+    llm_service.llm = FakeLLM("An order.")
+
+    response = client.post("/api/analyze-document/stream", json={"rawData": DOCUMENT})
+
+    assert [name for name, _ in parse_events(response.text)] == ["delta", "delta", "result"]
+
+
+@pytest.mark.parametrize("path", ["/api/extract-schema/stream", "/api/analyze-document/stream"])
+def test_stream_endpoints_need_the_service(client, path):
+    assert client.post(path, json={"rawData": DOCUMENT}).status_code == 503
+
+
+def test_failures_after_the_stream_started_end_it_with_an_error_event(client, services, llm_service):
+    services.llm_service = llm_service
+    llm_service.llm = FakeLLM(COMPLETION, fail_after=40, error=DeadlineExceeded("llm_call"))
+
+    response = client.post("/api/extract-schema/stream", json={"rawData": DOCUMENT})
+
+    name, data = parse_events(response.text)[-1]
+    assert name == "error"
+    assert data["status"] == 504
+
+
+@pytest.fixture
+def admission(services):
+    services.admission_controller = AdmissionController(
+        max_concurrency=8, tenant_concurrency=1, tenant_queue_size=0, weights={}
+    )
+    return services.admission_controller
+
+
+def test_busy_tenants_get_429_before_the_stream_starts(client, services, llm_service, admission):
+    services.llm_service = llm_service
+    admission.active_by_tenant["anonymous"] = 1
+
+    response = client.post("/api/extract-schema/stream", json={"rawData": DOCUMENT})
+
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+
+def test_streams_release_their_admission_slot(client, services, llm_service, admission):
+    services.llm_service = llm_service
+
+    for _ in range(2):
+        response = client.post("/api/extract-schema/stream", json={"rawData": DOCUMENT})
+        assert response.status_code == 200
+
+    assert admission.active_by_tenant == {}
@@ -0,0 +1,123 @@
+"""Supplier resolution against a tenant's counterparties"""
+import json
+
+import pytest
+
+from app.services.supplier_matcher import SupplierMatcher, normalize_company
+
+COUNTERPARTIES = [
+    {"name": "Acme Dairy B.V.", "relationId": 1, "aliases": ["Acme Zuivel"]},
+    {"name": "Acme Dairy GmbH", "relationId": 2},
+    {"name": "Nordic Milk Products Oy", "relationId": 3},
+    {"name": "Polymer Trading Company Ltd", "relationId": 4},
+]
+
+
+@pytest.fixture
+def matcher():
+    return SupplierMatcher(COUNTERPARTIES)
+
+
+def matched(matcher, value):
+    match = matcher.match(value)
+    return match and (match[0]["name"], match[1])
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Acme Dairy B.V.", (("acme", "dairy"), "bv")),
+    ("ACME dairy bv", (("acme", "dairy"), "bv")),
+    ("Acme Dairy Besloten Vennootschap", (("acme", "dairy"), "bv")),
+    ("Müller GmbH & Co. KG", (("muller",), "gmbh & co kg")),
+    ("The Polymer Company", (("polymer",), "co")),
+    ("Foo Sp. z o.o.", (("foo",), "sp zoo")),
+    # A name is never only a legal form
+    ("Ltd", (("ltd",), None)),
+])
+def test_names_normalize_to_core_and_legal_form(name, expected):
+    assert normalize_company(name) == expected
+
+
+def test_exact_and_compact_names_match(matcher):
+    assert matched(matcher, "acme dairy bv") == ("Acme Dairy B.V.", 1.0)
+    assert matched(matcher, "Acme Zuivel") == ("Acme Dairy B.V.", 1.0)
+    assert matched(matcher, "AcmeDairy B.V.") == ("Acme Dairy B.V.", 0.97)
+
+
+def test_legal_forms_disambiguate(matcher):
+    assert matched(matcher, "Acme Dairy GmbH") == ("Acme Dairy GmbH", 1.0)
+    # Without a legal form both fit equally well
+    _, score = matched(matcher, "Acme Dairy")
+    assert score == pytest.approx(SupplierMatcher.AMBIGUITY)
+    # A different legal form than any candidate is discounted
+    _, score = matched(matcher, "Acme Dairy Ltd")
+    assert score < SupplierMatcher.LEGAL_FORM_MISMATCH
+
+
+def test_misspelled_names_are_found_through_blocking_keys(matcher):
+    name, score = matched(matcher, "Nordik Milk Products")
+    assert name == "Nordic Milk Products Oy" and 0.8 < score < 1.0
+    name, score = matched(matcher, "Polymer Tradng")
+    assert name == "Polymer Trading Company Ltd" and score < 0.95
+
+
+def test_unrelated_and_empty_values_do_not_match(matcher):
+    assert matcher.match("Unrelated Steel Works") is None
+    assert matcher.match("") is None
+
+
+def test_learned_aliases_win_within_their_legal_form(matcher):
+    assert matcher.add_alias("ACME", "Acme Dairy GmbH")
+    assert not matcher.add_alias("acme", "Acme Dairy GmbH")
+
+    assert matched(matcher, "ACME") == ("Acme Dairy GmbH", 1.0)
+    assert matched(matcher, "Acme GmbH") == ("Acme Dairy GmbH", 1.0)
+    assert matched(matcher, "Acme B.V.")[1] == pytest.approx(SupplierMatcher.LEGAL_FORM_MISMATCH)
+
+
+def test_a_newer_correction_moves_the_alias(matcher):
+    matcher.add_alias("ACME", "Acme Dairy GmbH")
+
+    assert matcher.add_alias("ACME", "Acme Dairy B.V.")
+
+    assert matched(matcher, "acme") == ("Acme Dairy B.V.", 1.0)
+    learned = {c["name"]: c["learnedAliases"] for c in matcher.to_list()}
+    assert learned["Acme Dairy GmbH"] == [] and learned["Acme Dairy B.V."] == ["ACME"]
+
+
+def test_an_alias_of_an_unknown_counterparty_adds_it(matcher):
+    assert matcher.add_alias("Sabic Europe", "SABIC Europe B.V.")
+
+    assert len(matcher) == len(COUNTERPARTIES) + 1
+    assert matched(matcher, "sabic europe") == ("SABIC Europe B.V.", 1.0)
+
+
+def test_matcher_round_trips_through_its_list_form(matcher):
+    matcher.add_alias("ACME", "Acme Dairy GmbH")
+
+    restored = SupplierMatcher(json.loads(json.dumps(matcher.to_list())))
+
+    assert restored.to_list() == matcher.to_list()
+    assert matched(restored, "ACME") == ("Acme Dairy GmbH", 1.0)
+
+
+def test_common_words_only_rank_candidates():
+    counterparties = [{"name": f"Dairy Trading {i} B.V."} for i in range(30)] + [{"name": "Zephyr Dairy B.V."}]
+    matcher = SupplierMatcher(counterparties)
+    matcher.MAX_BLOCK_SIZE = 10
+
+    assert matched(matcher, "Zephir Dairy")[0] == "Zephyr Dairy B.V."
+
+
+def test_service_keeps_learned_aliases_when_counterparties_are_replaced(dedupe_service):
+    dedupe_service.set_counterparties("TGT", COUNTERPARTIES)
+    dedupe_service.add_supplier_alias("TGT", "ACME", "Acme Dairy GmbH")
+
+    stats = dedupe_service.set_counterparties("TGT", COUNTERPARTIES[1:])
+
+    assert stats["counterparties"] == 3 and stats["with_relation_id"] == 3
+    assert dedupe_service._supplier_matching("ACME", "TGT") == ("Acme Dairy GmbH", 1.0)
+    assert dedupe_service._supplier_matching("Unrelated Steel Works", "TGT") == ("Unrelated Steel Works", 0.0)
+    assert dedupe_service._supplier_matching("ACME", "OTHER") is None
+    # and persists them
+    dedupe_service.supplier_matchers.clear()
+    assert dedupe_service._supplier_matching("ACME", "TGT") == ("Acme Dairy GmbH", 1.0)
@@ -0,0 +1,71 @@
+"""Full and warm-started (incremental) model training"""
+import asyncio
+
+import pytest
+
+from app.services.records import LabelledPair
+from benchmarks import generators
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return generators.product_catalog(60, seed=7)
+
+
+def test_first_training_is_full(dedupe_service, catalog):
+    data = generators.training_set(60, catalog, seed=7)
+
+    result = asyncio.run(dedupe_service.train_model("A_B", data, incremental=True))
+
+    assert result["success"], result
+    assert result["mode"] == "full"
+    assert result["newLabels"] == len(data)
+    assert dedupe_service.model_registry.get("A_B").version == 1
+
+
+def test_retrain_with_few_new_labels_warm_starts(dedupe_service, catalog):
+    data = generators.training_set(60, catalog, seed=7)
+    asyncio.run(dedupe_service.train_model("A_B", data))
+    extra = generators.training_set(5, catalog, seed=8)
+
+    result = asyncio.run(dedupe_service.train_model("A_B", data + extra, incremental=True))
+
+    assert result["success"], result
+    assert result["mode"] == "incremental"
+    assert 0 < result["newLabels"] <= len(extra)
+    assert dedupe_service.model_registry.get("A_B").version == 2
+
+
+def test_retrain_without_incremental_is_full(dedupe_service, catalog):
+    data = generators.training_set(60, catalog, seed=7)
+    asyncio.run(dedupe_service.train_model("A_B", data))
+
+    result = asyncio.run(dedupe_service.train_model("A_B", data))
+
+    assert result["mode"] == "full"
+
+
+def test_labelled_pairs_and_dicts_are_accepted_alike(dedupe_service, catalog):
+    data = generators.training_set(60, catalog, seed=7)
+    pairs = [LabelledPair.from_dict(item) for item in data]
+
+    result = asyncio.run(dedupe_service.train_model("A_B", pairs))
+
+    assert result["success"], result
+
+
+def test_too_few_samples_is_rejected(dedupe_service, catalog):
+    data = generators.training_set(10, catalog, seed=7)[:3]
+
+    result = asyncio.run(dedupe_service.train_model("A_B", data, min_samples=10))
+
+    assert result == {"success": False, "message": "Need at least 10 samples, got 3"}
+
+
+def test_single_class_labels_are_rejected(dedupe_service, catalog):
+    data = [item for item in generators.training_set(60, catalog, seed=7) if item["is_match"]]
+
+    result = asyncio.run(dedupe_service.train_model("A_B", data, min_samples=1))
+
+    assert not result["success"]
+    assert "matching and distinct" in result["message"]
@@ -0,0 +1,164 @@
+"""Per-pair training locks, background retrains and catalog recalibration"""
+import asyncio
+
+import pytest
+
+from app.services.training_coordinator import TrainingCoordinator
+from benchmarks import generators
+
+
+def test_retrains_of_one_pair_are_serialized_and_pairs_run_concurrently():
+    coordinator = TrainingCoordinator()
+    running = {}
+    overlaps = []
+
+    async def job(pair):
+        running[pair] = running.get(pair, 0) + 1
+        overlaps.append(dict(running))
+        await asyncio.sleep(0.01)
+        running[pair] -= 1
+        return pair
+
+    async def main():
+        return await asyncio.gather(
+            coordinator.run("A", "T", lambda: job("A")),
+            coordinator.run("A", "T", lambda: job("A")),
+            coordinator.run("B", "T", lambda: job("B")),
+        )
+
+    assert asyncio.run(main()) == ["A", "A", "B"]
+    assert max(state.get("A", 0) for state in overlaps) == 1
+    assert any(state.get("A") == 1 and state.get("B") == 1 for state in overlaps)
+    assert coordinator.runs == 3
+    # Locks are dropped once unused
+    assert coordinator._locks == {} and coordinator._users == {}
+
+
+def test_retrain_that_would_wait_is_skipped():
+    coordinator = TrainingCoordinator()
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def hold():
+            await gate.wait()
+            return "trained"
+
+        first = asyncio.create_task(coordinator.run("A", "T", hold))
+        await asyncio.sleep(0)
+        assert coordinator.is_training("A", "T")
+        assert coordinator.get_stats()["training"] == ["A_T"]
+        skipped = await coordinator.run("A", "T", hold, wait=False)
+        gate.set()
+        return skipped, await first
+
+    assert asyncio.run(main()) == (None, "trained")
+    assert coordinator.skipped == 1
+    assert not coordinator.is_training("A", "T")
+
+
+def test_background_retrain_is_started_once_and_cancelled_on_close():
+    coordinator = TrainingCoordinator()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        assert coordinator.start("A", "T", slow)
+        assert not coordinator.start("A", "T", slow)
+        assert coordinator.get_stats()["background"] == 1
+        await asyncio.sleep(0)
+        await coordinator.close()
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled == [True]
+    assert coordinator.skipped == 1
+    assert coordinator.get_stats()["background"] == 0
+
+
+def test_failed_background_retrain_frees_the_pair():
+    coordinator = TrainingCoordinator()
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return True
+
+    async def main():
+        coordinator.start("A", "T", fail)
+        await asyncio.sleep(0.01)
+        return coordinator.start("A", "T", ok)
+
+    assert asyncio.run(main())
+
+
+class RecordingDedupe:
+    """Stands in for DedupeService in training: records how it was asked to train."""
+
+    match_fields = ["product"]
+    model_sharing = "pair"
+
+    def __init__(self):
+        self.calls = []
+
+    async def train_model(self, model_key, training_data, incremental=False, min_samples=None):
+        self.calls.append((model_key, len(training_data), min_samples))
+        return {"success": True, "mode": "full", "newLabels": len(training_data)}
+
+    async def calibrate_catalog(self, target_tenant, field, labels):
+        return False
+
+    def add_to_knowledge_base(self, source_value, corrected_value):
+        pass
+
+
+@pytest.fixture
+def training_service(service_env):
+    from app.services.training_service import TrainingService
+
+    service = TrainingService(dedupe_service=RecordingDedupe())
+    yield service
+    service.store.close()
+
+
+def test_forced_retrain_passes_its_thresholds_without_changing_the_service(training_service):
+    asyncio.run(training_service.process_feedback("SRC", "TGT", "name", "PP H350", "product", "PP Homo 350"))
+    defaults = (training_service.min_samples_for_training, training_service.retrain_threshold)
+
+    result = asyncio.run(training_service.force_retrain("SRC", "TGT"))
+
+    assert result["success"] and result["samplesUsed"] == 1
+    assert training_service.dedupe_service.calls == [("SRC_TGT", 1, 1)]
+    assert (training_service.min_samples_for_training, training_service.retrain_threshold) == defaults
+    # The labels are trained now
+    assert asyncio.run(training_service.force_retrain("SRC", "TGT"))["success"] is False
+
+
+def test_catalog_recalibration_writes_a_sidecar_not_the_index(dedupe_service):
+    from app.services.vector_index import NgramVectorIndex, calibration_path
+
+    catalog = generators.product_catalog(200, seed=5)
+    dedupe_service.set_catalog("TGT", "product", sorted(set(catalog.values())))
+    catalog_file = dedupe_service._catalog_file("TGT", "product")
+    saved = catalog_file.read_bytes()
+    generation = dedupe_service.catalog_generations["TGT"]
+    labels = list(catalog.items())[:50]
+
+    assert asyncio.run(dedupe_service.calibrate_catalog("TGT", "product", labels))
+
+    calibration = dedupe_service._catalog_index("TGT", "product").calibration
+    assert catalog_file.read_bytes() == saved
+    assert calibration_path(catalog_file).exists()
+    assert NgramVectorIndex.load(catalog_file).calibration == calibration
+    assert dedupe_service.catalog_generations["TGT"] == generation + 1
+
+
+def test_recalibrating_an_unknown_catalog_does_nothing(dedupe_service):
+    assert not asyncio.run(dedupe_service.calibrate_catalog("NONE", "product", [("a", "b")]))
@@ -0,0 +1,178 @@
+"""SQLite training-data store: feedback log, paging, training runs and migration"""
+import json
+import sqlite3
+
+import pytest
+
+from app.services.training_store import TrainingStore
+
+
+def feedback(source_value, corrected_value, source="SRC", target="TGT", timestamp=None, **extra):
+    entry = {
+        "sourceTenant": source,
+        "targetTenant": target,
+        "sourceValue": source_value,
+        "correctedValue": corrected_value,
+        **extra,
+    }
+    if timestamp is not None:
+        entry["timestamp"] = timestamp
+    return entry
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TrainingStore(tmp_path / "training.db")
+    yield store
+    store.close()
+
+
+def test_unknown_conflict_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TrainingStore(tmp_path / "training.db", conflict_policy="oldest")
+
+
+def test_feedback_is_pending_until_a_run_consumes_it(store):
+    store.add_feedback([feedback("PP H350", "PP Homo 350"), feedback("LDPE", "LDPE 2102")])
+    store.add_feedback([feedback("LDPE", "LDPE 2102", target="OTHER")])
+    assert store.count_pending("SRC", "TGT") == 2
+
+    snapshot = store.label_snapshot("SRC", "TGT")
+    run_id = store.start_run("SRC", "TGT", snapshot)
+    store.mark_trained("SRC", "TGT", snapshot, run_id)
+
+    assert store.count_pending("SRC", "TGT") == 0
+    assert store.count_pending("SRC", "OTHER") == 1
+    assert store.count_changed_labels("SRC", "TGT") == 0
+
+
+def test_mark_trained_leaves_feedback_after_the_snapshot_pending(store):
+    store.add_feedback([feedback("PP H350", "PP Homo 350")])
+    snapshot = store.label_snapshot("SRC", "TGT")
+    store.add_feedback([feedback("LDPE", "LDPE 2102")])
+
+    store.mark_trained("SRC", "TGT", snapshot, store.start_run("SRC", "TGT", snapshot))
+
+    assert store.count_pending("SRC", "TGT") == 1
+    assert store.count_changed_labels("SRC", "TGT") == 1
+
+
+def test_mark_trained_is_idempotent(store):
+    store.add_feedback([feedback("PP H350", "PP Homo 350")])
+    snapshot = store.label_snapshot("SRC", "TGT")
+    first = store.start_run("SRC", "TGT", snapshot)
+    store.mark_trained("SRC", "TGT", snapshot, first)
+
+    store.mark_trained("SRC", "TGT", snapshot, store.start_run("SRC", "TGT", snapshot))
+
+    consumed = store._query("SELECT DISTINCT training_run_id FROM feedback")
+    assert [row[0] for row in consumed] == [first]
+
+
+def test_failed_write_rolls_back_the_whole_batch(store):
+    store.add_feedback([feedback("PP H350", "PP Homo 350")])
+
+    with pytest.raises(KeyError):
+        store.add_feedback([feedback("LDPE", "LDPE 2102"), {"sourceTenant": "SRC"}])
+
+    assert not store._conn.in_transaction
+    assert store.count_pending("SRC", "TGT") == 1
+    assert [label["sourceValue"] for label in store.load_labels("SRC", "TGT")] == ["PP H350"]
+    # The connection is still usable
+    store.add_feedback([feedback("LDPE", "LDPE 2102")])
+    assert store.count_pending("SRC", "TGT") == 2
+
+
+def test_iter_feedback_pages_in_order_and_filters(store):
+    store.add_feedback([
+        feedback(f"value {i}", f"canonical {i}", target="TGT" if i % 2 else "OTHER",
+                 timestamp=f"2024-01-{i + 1:02d}T00:00:00")
+        for i in range(10)
+    ])
+
+    everything = list(store.iter_feedback(batch_size=3))
+    assert [entry["sourceValue"] for entry in everything] == [f"value {i}" for i in range(10)]
+    assert everything[0]["targetField"] == "product"
+
+    odd = list(store.iter_feedback(target_tenant="TGT", batch_size=2))
+    assert [entry["sourceValue"] for entry in odd] == ["value 1", "value 3", "value 5", "value 7", "value 9"]
+
+    window = list(store.iter_feedback(since="2024-01-03", until="2024-01-05", batch_size=1))
+    assert [entry["sourceValue"] for entry in window] == ["value 2", "value 3"]
+
+
+def test_iter_feedback_lets_writers_in_between_batches(store):
+    store.add_feedback([feedback(f"value {i}", "canonical") for i in range(4)])
+
+    entries = store.iter_feedback(batch_size=2)
+    next(entries)
+    # Would deadlock if the reader held the lock for the whole iteration
+    store.add_feedback([feedback("late", "canonical")])
+
+    assert len(list(entries)) == 4
+
+
+def test_training_runs_are_recorded(store):
+    assert store.last_run("SRC", "TGT") is None
+    run_id = store.start_run("SRC", "TGT", label_snapshot=7)
+
+    store.finish_run(run_id, {"success": True, "mode": "incremental", "newLabels": 3, "message": "ok"}, samples=40)
+
+    run = store.last_run("SRC", "TGT")
+    assert run["id"] == run_id
+    assert run["mode"] == "incremental"
+    assert run["samples"] == 40
+    assert run["newLabels"] == 3
+    assert run["success"] is True
+    assert store.attempted_snapshot("SRC", "TGT") == 7
+
+
+def test_stats_aggregate_feedback_labels_and_runs(store):
+    store.add_feedback([
+        feedback("PP H350", "PP Homo 350"),
+        feedback("PP H350", "PP Random 350"),
+        feedback("5t", "5000", targetField="quantity"),
+    ])
+
+    stats = store.get_stats("SRC", "TGT")
+
+    assert stats["totalFeedback"] == 3
+    assert stats["pendingFeedback"] == 3
+    assert stats["feedbackByField"] == {"product": 2, "quantity": 1}
+    assert stats["labelledPairs"] == 2
+    assert stats["conflictingLabels"] == 1
+    assert stats["lastTrainingRun"] is None
+
+
+def test_jsonl_migration_imports_pending_and_archived_feedback_once(store, tmp_path):
+    data = tmp_path / "training_data"
+    (data / "archive").mkdir(parents=True)
+    (data / "SRC_TGT_feedback.jsonl").write_text(json.dumps(feedback("PP H350", "PP Homo 350")) + "\n\n")
+    (data / "archive" / "SRC_TGT_20240101.jsonl").write_text(json.dumps(feedback("LDPE", "LDPE 2102")) + "\n")
+
+    store.migrate_jsonl(data)
+    store.migrate_jsonl(data)
+
+    assert store.count_pending("SRC", "TGT") == 1
+    assert len(list(store.iter_feedback())) == 2
+
+
+def test_interrupted_jsonl_migration_leaves_nothing_behind(store, tmp_path):
+    data = tmp_path / "training_data"
+    data.mkdir()
+    (data / "A_feedback.jsonl").write_text(json.dumps(feedback("PP H350", "PP Homo 350")) + "\n")
+    (data / "B_feedback.jsonl").write_text(json.dumps({"sourceTenant": "SRC"}) + "\n")
+
+    with pytest.raises(KeyError):
+        store.migrate_jsonl(data)
+
+    assert list(store.iter_feedback()) == []
+    assert not store._query("SELECT 1 FROM meta WHERE key = 'jsonl_migrated'")
+
+
+def test_store_uses_wal(store):
+    conn = sqlite3.connect(str(store.db_path))
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
@@ -0,0 +1,131 @@
+import gzip
+from typing import Any, Dict
+
+import pytest
+import zstandard
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.transport import (
+    DECOMPRESS_CHUNK_SIZE, MAX_DECOMPRESSED_SIZE, BodyTooLarge, CompressionMiddleware, FastAPIRoute,
+    decompress, dumps, loads, negotiate_encoding, stream_decompressor
+)
+
+BOMB_SIZE = 8 * 1024 * 1024
+
+
+def _encode(body: bytes, encoding: str) -> bytes:
+    return gzip.compress(body) if encoding == "gzip" else zstandard.ZstdCompressor().compress(body)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_decompress_round_trips(encoding):
+    body = dumps({"items": list(range(1000))})
+
+    assert decompress(_encode(body, encoding), encoding) == body
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_decompress_stops_at_the_size_cap(encoding):
+    bomb = _encode(b"\0" * BOMB_SIZE, encoding)
+
+    with pytest.raises(BodyTooLarge):
+        decompress(bomb, encoding, max_size=1024 * 1024)
+
+
+def test_decompress_rejects_unknown_encodings():
+    with pytest.raises(ValueError):
+        decompress(b"data", "br")
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_stream_decompressor_emits_bounded_pieces(encoding):
+    decoder = stream_decompressor(encoding, max_size=BOMB_SIZE)
+    body = _encode(b"x" * (3 * DECOMPRESS_CHUNK_SIZE), encoding)
+    pieces = []
+
+    for start in range(0, len(body), 100):
+        decoder.decompress(body[start:start + 100], pieces.append)
+    decoder.flush(pieces.append)
+
+    assert sum(map(len, pieces)) == 3 * DECOMPRESS_CHUNK_SIZE
+    assert max(map(len, pieces)) <= DECOMPRESS_CHUNK_SIZE
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_stream_decompressor_stops_at_the_size_cap(encoding):
+    decoder = stream_decompressor(encoding, max_size=1024 * 1024)
+    received = []
+
+    with pytest.raises(BodyTooLarge):
+        decoder.decompress(_encode(b"\0" * BOMB_SIZE, encoding), received.append)
+    assert sum(map(len, received)) <= 1024 * 1024
+
+
+def test_stream_decompressor_passes_identity_through():
+    assert stream_decompressor("identity") is None
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, zstd", "zstd"),
+    ("gzip", "gzip"),
+    ("zstd;q=0, gzip;q=0.5", "gzip"),
+    ("*", "zstd"),
+    ("br", None),
+    ("", None),
+])
+def test_negotiate_encoding(accept, expected):
+    assert negotiate_encoding(accept) == expected
+
+
+def test_loads_reads_dumps():
+    payload = {"name": "Cocoa Butter", "qty": 10.5, "tags": ["a", "b"]}
+
+    assert loads(dumps(payload)) == payload
+
+
+@pytest.fixture
+def client():
+    router = APIRouter(route_class=FastAPIRoute)
+
+    @router.post("/echo")
+    async def echo(payload: Dict[str, Any]):
+        return payload
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(CompressionMiddleware, minimum_size=256)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_compressed_request_bodies_are_decoded(client, encoding):
+    body = dumps({"value": "x" * 100})
+
+    response = client.post("/echo", content=_encode(body, encoding), headers={
+        "content-type": "application/json", "content-encoding": encoding
+    })
+
+    assert response.status_code == 200
+    assert response.json() == {"value": "x" * 100}
+
+
+def test_oversized_request_bodies_get_413(client):
+    bomb = gzip.compress(b'{"value": "' + b" " * MAX_DECOMPRESSED_SIZE + b'"}', compresslevel=1)
+
+    response = client.post("/echo", content=bomb, headers={
+        "content-type": "application/json", "content-encoding": "gzip"
+    })
+
+    assert response.status_code == 413
+
+
+def test_large_responses_are_compressed(client):
+    payload = {"value": "x" * 1000}
+
+    response = client.post("/echo", json=payload, headers={"accept-encoding": "gzip"})
+    small = client.post("/echo", json={"value": "x"}, headers={"accept-encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == payload
+    assert "content-encoding" not in small.headers
@@ -0,0 +1,153 @@
+"""Parsing and normalization of quantities, units, prices, currencies and dates"""
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from app.services.value_normalizer import (
+    ValueNormalizer,
+    parse_currency,
+    parse_date,
+    parse_price,
+    parse_quantity,
+    parse_unit,
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("25 MT", (25, "MT")),
+    ("25", (25, None)),
+    (25.5, (25.5, None)),
+    ("1.234,5 kgs", (1234.5, "kg")),
+    ("1,234.5 lbs", (1234.5, "lb")),
+    ("12,500 kg", (12500, "kg")),
+    ("25.000 kg", (25000, "kg")),
+    ("3,5 tonnes", (3.5, "MT")),
+    ("0.125 t", (0.125, "MT")),
+    ("1 234 567 L", (1234567, "L")),
+    ("1'000 kg", (1000, "kg")),
+    ("1.000.000", (1000000, None)),
+    ("20 metric tons", (20, "MT")),
+    ("20 metric tonnes", (20, "MT")),
+    ("12 pound sterling", (None, None)),
+    ("25 bags", (None, None)),
+    ("about 25 MT", (None, None)),
+    ("n/a", (None, None)),
+    (True, (None, None)),
+    (None, (None, None)),
+    (float("nan"), (None, None)),
+])
+def test_parse_quantity(value, expected):
+    assert parse_quantity(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("EUR 1.234,50", (1234.5, "EUR")),
+    ("€1.234,50/MT", (1234.5, "EUR")),
+    ("$2.10/lb", (2.1, "USD")),
+    ("2.10 USD per kg", (2.1, "USD")),
+    ("1450 sek", (1450, "SEK")),
+    ("1450", (1450, None)),
+    ("GBP 12 per metric ton", (12, "GBP")),
+    ("12 pound sterling/kg", (12, "GBP")),
+    ("1450 FOB Rotterdam", (None, None)),
+])
+def test_parse_price(value, expected):
+    assert parse_price(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("M.T.", "MT"), ("Kgs", "kg"), ("#", "lb"), ("litres", "L"), ("bags", None), (5, None),
+])
+def test_parse_unit(value, expected):
+    assert parse_unit(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("€", "EUR"), ("US$", "USD"), ("pound sterling", "GBP"), ("sek", "SEK"), ("euro's", None), ("12€", None),
+])
+def test_parse_currency(value, expected):
+    assert parse_currency(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2025-03-07", "2025-03-07"),
+    ("2025/3/7", "2025-03-07"),
+    ("2025-03-07T10:00:00Z", "2025-03-07"),
+    ("20250307", "2025-03-07"),
+    ("7.3.2025", "2025-03-07"),
+    ("07/03/25", "2025-03-07"),
+    ("25/12/2025", "2025-12-25"),
+    ("7 Mar 2025", "2025-03-07"),
+    ("7-mrt-2025", "2025-03-07"),
+    ("1. Mai 2025", "2025-05-01"),
+    ("3 déc. 2025", "2025-12-03"),
+    ("March 7th, 2025", "2025-03-07"),
+    ("31/02/2025", None),
+    ("7 Foo 2025", None),
+    ("next week", None),
+    (date(2025, 3, 7), "2025-03-07"),
+    (datetime(2025, 3, 7, 12), "2025-03-07"),
+    (20250307, None),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+def test_month_first_dates():
+    assert parse_date("03/07/2025", day_first=False) == "2025-03-07"
+    # A first number over 12 is always the day
+    assert parse_date("25/12/2025", day_first=False) == "2025-12-25"
+
+
+def test_normalize_fills_unit_and_currency_from_amounts():
+    record = {"product": "PP", "quantity": "25 MT", "pricePerUnit": "EUR 1.234,50", "deliveryDate": "7 Mar 2025"}
+
+    normalized = ValueNormalizer().normalize(record)
+
+    assert normalized == {
+        "product": "PP", "quantity": 25, "unit": "MT", "pricePerUnit": 1234.5, "currency": "EUR",
+        "deliveryDate": "2025-03-07",
+    }
+    assert record["quantity"] == "25 MT"
+
+
+def test_normalize_keeps_explicit_fields_and_unparsed_values():
+    record = {"quantity": "25 MT", "unit": "kgs", "pricePerUnit": "on request", "currency": "eur",
+              "deliveryDate": "Q3"}
+
+    assert ValueNormalizer().normalize(record) == {
+        "quantity": 25, "unit": "kg", "pricePerUnit": "on request", "currency": "EUR", "deliveryDate": "Q3",
+    }
+
+
+def test_records_without_normalizable_fields_are_returned_as_they_are():
+    record = {"product": "PP"}
+
+    assert ValueNormalizer().normalize(record) is record
+
+
+RECORDS = [
+    {"product": "PP", "quantity": "25 MT", "pricePerUnit": "EUR 1.234,50", "deliveryDate": "2025-03-07"},
+    {"quantity": "25 MT", "unit": "kgs", "currency": "usd", "deliveryDate": "7/3/25"},
+    {"quantity": 12.5, "pricePerUnit": "$2.10/lb", "deliveryDate": "2025-03-07"},
+    {"quantity": "lots", "unit": "", "pricePerUnit": None, "deliveryDate": "Q3"},
+    {"product": "PE"},
+    {"quantity": "25 MT", "currency": "", "pricePerUnit": "1450 sek", "deliveryDate": "March 7th, 2025"},
+]
+
+
+def test_bulk_normalization_matches_record_by_record():
+    normalizer = ValueNormalizer()
+
+    assert normalizer.normalize_records(RECORDS) == [normalizer.normalize(record) for record in RECORDS]
+
+
+def test_frames_are_normalized_column_wise():
+    frame = pd.DataFrame({"quantity": [1, 2, 3], "deliveryDate": ["2025-03-07", "7.3.2025", None]})
+
+    normalized = ValueNormalizer().normalize_frame(frame)
+
+    assert normalized["quantity"].tolist() == [1, 2, 3]
+    assert normalized["deliveryDate"].tolist() == ["2025-03-07", "2025-03-07", None]
+    assert frame["deliveryDate"][1] == "7.3.2025"
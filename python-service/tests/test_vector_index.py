@@ -0,0 +1,169 @@
+"""Hashed character-n-gram vector retrieval"""
+import numpy as np
+import pytest
+
+from app.services.vector_index import (
+    DEFAULT_CALIBRATION,
+    NgramVectorIndex,
+    _pack_values,
+    _unpack_values,
+    fit_calibration,
+)
+from benchmarks import generators
+
+
+@pytest.fixture(scope="module")
+def values():
+    return sorted(set(generators.product_catalog(500, seed=11).values()))
+
+
+def brute_force(index, query, k):
+    vectors = index.encode(list(index.values))
+    scores = vectors @ index.encode([query])[0]
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [float(scores[row]) for row in order]
+
+
+def test_dimension_must_be_a_power_of_two():
+    with pytest.raises(ValueError):
+        NgramVectorIndex(dim=500)
+
+
+def test_search_matches_brute_force_across_blocks(values):
+    index = NgramVectorIndex.build(values, chunk_rows=64)
+    query = values[42].lower() + " grade"
+
+    [results] = index.search([query], k=5, calibrated=False)
+
+    assert [score for _, score in results] == pytest.approx(brute_force(index, query, 5), abs=1e-5)
+
+
+def test_a_catalog_value_finds_itself(values):
+    index = NgramVectorIndex.build(values)
+
+    results = index.search(values[:20], k=1, calibrated=False)
+
+    assert [index.values[result[0][0]] for result in results] == values[:20]
+    assert all(result[0][1] == pytest.approx(1.0, abs=1e-5) for result in results)
+
+
+def test_quantized_scores_stay_close(values):
+    exact = NgramVectorIndex.build(values)
+    quantized = NgramVectorIndex.build(values, quantize=True)
+    queries = values[:10]
+
+    for a, b in zip(exact.search(queries, k=3, calibrated=False), quantized.search(queries, k=3, calibrated=False)):
+        assert [score for _, score in b] == pytest.approx([score for _, score in a], abs=0.02)
+    assert quantized.nbytes < exact.nbytes / 3
+
+
+def test_partitioned_search_probes_the_nearest_clusters(values):
+    index = NgramVectorIndex.build(values, partitions=8, probes=3)
+
+    results = index.search(values[:50], k=1)
+
+    assert index.centroids is not None
+    hits = sum(index.values[result[0][0]] == value for result, value in zip(results, values[:50]))
+    assert hits >= 45
+
+
+def test_scores_are_calibrated_by_default(values):
+    index = NgramVectorIndex.build(values)
+
+    [[(_, raw)]] = index.search([values[0]], k=1, calibrated=False)
+    [[(_, calibrated)]] = index.search([values[0]], k=1)
+
+    a, b = DEFAULT_CALIBRATION
+    assert calibrated == pytest.approx(1 / (1 + np.exp(-(a * raw + b))), rel=1e-5)
+
+
+def test_empty_inputs():
+    index = NgramVectorIndex.build(["", "PP Homo 350"])
+
+    assert index.values == ["PP Homo 350"]
+    assert index.search([]) == []
+    assert index.search(["PP"], k=0) == [[]]
+    assert NgramVectorIndex().search(["PP"]) == [[]]
+
+
+def test_a_clone_is_updated_without_touching_the_original(values):
+    index = NgramVectorIndex.build(values[:200])
+    clone = index.clone()
+
+    assert clone.add(values[200:] + values[:5]) == len(values) - 200
+    assert clone.remove([values[0], "not there"]) == 1
+
+    assert len(index) == 200 and index.values[0] == values[0]
+    assert len(clone) == len(values) - 1
+    [[(row, _)]] = clone.search([values[250]], k=1)
+    assert clone.values[row] == values[250]
+    [[(row, _)]] = clone.search([values[0]], k=1)
+    assert clone.values[row] != values[0]
+
+
+def test_doubling_the_catalog_recomputes_idf(values):
+    index = NgramVectorIndex.build(values[:100])
+    index.add(values[100:])
+
+    assert index._idf_rows == len(values)
+    np.testing.assert_array_equal(index.df, NgramVectorIndex.build(values).df)
+
+
+def test_save_and_load_round_trip(values, tmp_path):
+    index = NgramVectorIndex.build(values + ["Polypropylène Ω 350"], quantize=True, partitions=4)
+    index.calibration = (10.0, -6.0)
+    path = tmp_path / "catalog.npz"
+
+    index.save(path)
+    loaded = NgramVectorIndex.load(path)
+
+    assert loaded.values == index.values
+    assert loaded.calibration == (10.0, -6.0)
+    assert (loaded.quantize, loaded.partitions) == (True, 4)
+    np.testing.assert_array_equal(loaded.matrix, index.matrix)
+    assert loaded.search(values[:5], k=2) == index.search(values[:5], k=2)
+    assert not list(tmp_path.glob("*.tmp.npz"))
+
+
+def test_indexes_saved_with_unicode_value_arrays_still_load(values, tmp_path):
+    index = NgramVectorIndex.build(values[:50])
+    path = tmp_path / "legacy.npz"
+    np.savez(
+        path,
+        values=np.array(index.values),
+        matrix=index.matrix,
+        scales=index.scales,
+        df=index.df,
+        idf=index.idf,
+        centroids=np.zeros((0, index.dim), dtype=np.float32),
+        assignments=index.assignments,
+        options=np.array([index.dim, 0, 0, index.probes, index._idf_rows]),
+        calibration=np.array(index.calibration)
+    )
+
+    loaded = NgramVectorIndex.load(path)
+
+    assert loaded.values == index.values
+    assert loaded.search(values[:3], k=1) == index.search(values[:3], k=1)
+
+
+def test_values_pack_into_utf8():
+    values = ["PP", "", "Polypropylène Ω", "x" * 300]
+
+    blob, offsets = _pack_values(values)
+
+    assert blob.dtype == np.uint8 and blob.nbytes == sum(len(v.encode("utf-8")) for v in values)
+    assert _unpack_values(blob, offsets) == values
+    assert _unpack_values(*_pack_values([])) == []
+
+
+def test_calibration_fit_separates_matches_from_misses():
+    scores = [0.95, 0.9, 0.85, 0.8, 0.5, 0.45, 0.4, 0.3]
+    labels = [1, 1, 1, 0, 1, 0, 0, 0]
+
+    a, b = fit_calibration(scores, labels)
+
+    assert a > 0
+    assert 1 / (1 + np.exp(-(a * 0.9 + b))) > 0.5 > 1 / (1 + np.exp(-(a * 0.35 + b)))
+    assert fit_calibration([0.9, 0.8], [1, 1]) == DEFAULT_CALIBRATION
+    assert fit_calibration([], []) == DEFAULT_CALIBRATION
@@ -0,0 +1,193 @@
+"""Warm-state snapshots: the snapshot file and the service's save and restore"""
+import asyncio
+
+import pytest
+
+from app.services.dedupe_service import DedupeService
+from app.services.model_artifact import encode_json, write_artifact
+from app.services.model_overlay import SourceOverlay
+from app.services.warm_state import STATE, WarmSnapshot, file_fingerprint, write_snapshot
+
+KEY = b"k" * 32
+STATE_VALUES = {"settings": {"tiers": ["exact"]}, "pairs": {"A_B": {"target": "B"}}}
+RESOLUTIONS = {"A_B": [[["wpc80"], [["WPC 80", 0.98]], True]], "C_B": [[["smp"], [None], False]]}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "warm_state.snapshot"
+
+
+def test_file_fingerprint_skips_missing_files_and_tracks_changes(tmp_path):
+    first, second = tmp_path / "b.npz", tmp_path / "a.json"
+    first.write_bytes(b"catalog")
+    second.write_bytes(b"counterparties")
+
+    fingerprint = file_fingerprint([first, second, tmp_path / "missing.npz"])
+
+    assert [name for name, _, _ in fingerprint] == ["a.json", "b.npz"]
+    first.write_bytes(b"catalog, changed")
+    assert file_fingerprint([first, second]) != fingerprint
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_snapshot_round_trip(path, compression):
+    size = write_snapshot(path, STATE_VALUES, RESOLUTIONS, compression=compression)
+
+    snapshot = WarmSnapshot.open(path)
+
+    assert size == path.stat().st_size
+    assert snapshot.state == {"format": 1, **STATE_VALUES}
+    assert snapshot.pending == {"A_B", "C_B"}
+    assert snapshot.take("A_B") == RESOLUTIONS["A_B"]
+    # Each pair's resolutions are handed out once
+    assert snapshot.take("A_B") is None
+    assert snapshot.take("D_B") is None
+    assert snapshot.take("C_B") == RESOLUTIONS["C_B"]
+    assert snapshot.pending == set()
+
+
+def test_open_snapshot_reads_the_file_it_opened(path):
+    write_snapshot(path, STATE_VALUES, RESOLUTIONS)
+    snapshot = WarmSnapshot.open(path)
+
+    write_snapshot(path, STATE_VALUES, {"A_B": []})
+
+    assert snapshot.take("A_B") == RESOLUTIONS["A_B"]
+    snapshot.close()
+
+
+def test_signed_snapshots_need_the_key(path):
+    write_snapshot(path, STATE_VALUES, RESOLUTIONS, key=KEY)
+
+    assert WarmSnapshot.open(path, KEY).state["pairs"] == STATE_VALUES["pairs"]
+    assert WarmSnapshot.open(path, b"another key") is None
+
+    write_snapshot(path, STATE_VALUES, RESOLUTIONS)
+    assert WarmSnapshot.open(path, KEY) is None
+
+
+def test_unusable_snapshots_are_ignored(path):
+    assert WarmSnapshot.open(path) is None
+
+    path.write_bytes(b"not a snapshot")
+    assert WarmSnapshot.open(path) is None
+
+    write_artifact(path, {STATE: b'{"format": 1}'}, metadata={"kind": "model"})
+    assert WarmSnapshot.open(path) is None
+
+    write_artifact(path, {STATE: b'{"format": 2}'}, metadata={"kind": "warm-state"})
+    assert WarmSnapshot.open(path) is None
+
+
+def test_corrupt_pair_section_loses_only_that_pair(path):
+    write_snapshot(path, STATE_VALUES, RESOLUTIONS, compression="none")
+    data = bytearray(path.read_bytes())
+    data[data.index(encode_json(RESOLUTIONS["A_B"]))] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    snapshot = WarmSnapshot.open(path)
+
+    assert snapshot.take("A_B") is None
+    assert snapshot.take("C_B") == RESOLUTIONS["C_B"]
+
+
+@pytest.fixture
+def warmed(dedupe_service):
+    """A service with a catalog, learned aliases and memoized resolutions, snapshot to disk."""
+    dedupe_service.set_catalog("B", "product", ["Skimmed Milk Powder 1.25%", "Lactose Monohydrate 200 Mesh"])
+    dedupe_service.add_to_knowledge_base("whey 80 instant", "Whey Protein Concentrate 80%")
+    overlay = SourceOverlay()
+    overlay.add_alias("product", "smp low heat", "Skimmed Milk Powder 1.25%")
+    dedupe_service.feedback_overlays["B"] = {"A": overlay}
+
+    async def warm():
+        for product in ("wpc80", "skimmed milk powder 1,25", "lactose 200 mesh", "unheard of"):
+            await dedupe_service.resolve_entities({"product": product}, "A", "B")
+        await dedupe_service.snapshot_warm_state()
+
+    asyncio.run(warm())
+    return dedupe_service
+
+
+def restarted():
+    """A new process's service over the same model directory."""
+    return DedupeService()
+
+
+def test_collected_state_describes_hot_pairs_and_reference_data(warmed):
+    state, resolutions = warmed._collect_warm_state()
+
+    assert state["catalogs"] == [["B", "product"]]
+    assert state["knowledgeBase"] == {"whey 80 instant": "Whey Protein Concentrate 80%"}
+    assert state["feedbackOverlays"]["B"]["A"]["aliases"] == {"product": {"smp low heat": "Skimmed Milk Powder 1.25%"}}
+    assert state["pairs"]["A_B"]["target"] == "B"
+    assert state["pairs"]["A_B"]["reference"] == warmed._reference_fingerprint("B")
+    assert len(resolutions["A_B"]) == 4
+
+
+def test_restart_restores_aliases_and_resolutions(warmed, monkeypatch):
+    expected = asyncio.run(warmed.resolve_entities({"product": "lactose 200 mesh"}, "A", "B"))
+    assert expected["mappedData"] == {"product": "Lactose Monohydrate 200 Mesh"}
+    warmed.PRODUCT_KNOWLEDGE_BASE.pop("whey 80 instant")
+    service = restarted()
+    try:
+        assert service.restore_warm_state()
+        assert service.PRODUCT_KNOWLEDGE_BASE["whey 80 instant"] == "Whey Protein Concentrate 80%"
+        assert service.feedback_overlays["B"]["A"].alias("product", "smp low heat") == "Skimmed Milk Powder 1.25%"
+        assert service.warm_snapshot.pending == {"A_B"}
+
+        asyncio.run(service.warm_up())
+        assert service.catalog_indexes[("B", "product")] is not None
+
+        async def not_recomputed(*args):
+            raise AssertionError("restored resolutions are recomputed")
+
+        monkeypatch.setattr(service, "_compute_match_fields", not_recomputed)
+        result = asyncio.run(service.resolve_entities({"product": "lactose 200 mesh"}, "A", "B"))
+        assert result == expected
+        assert asyncio.run(service.resolve_entities({"product": "unheard of"}, "A", "B"))["mappedData"] == {
+            "product": "unheard of"
+        }
+        assert service.warm_snapshot.pending == set()
+    finally:
+        service.close()
+
+
+def test_changed_reference_data_drops_restored_resolutions(warmed):
+    service = restarted()
+    try:
+        assert service.restore_warm_state()
+        service.set_catalog("B", "product", ["Lactose Monohydrate 100 Mesh"])
+
+        result = asyncio.run(service.resolve_entities({"product": "lactose 200 mesh"}, "A", "B"))
+
+        assert result["mappedData"]["product"] != "Lactose Monohydrate 200 Mesh"
+        assert service.warm_snapshot.pending == set()
+    finally:
+        service.close()
+
+
+def test_snapshot_under_other_settings_is_not_restored(warmed, monkeypatch):
+    monkeypatch.setenv("RESOLUTION_TIERS", "exact,ngram")
+    service = restarted()
+    try:
+        assert not service.restore_warm_state()
+        assert service.warm_snapshot is None
+    finally:
+        service.close()
+
+
+def test_snapshots_stop_when_cancelled(dedupe_service):
+    dedupe_service.warm_state_interval = 0.01
+
+    async def run():
+        task = asyncio.create_task(dedupe_service.run_warm_state_snapshots())
+        while not dedupe_service.warm_state_path.exists():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert WarmSnapshot.open(dedupe_service.warm_state_path).state["pairs"] == {}
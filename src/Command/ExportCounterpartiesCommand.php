@@ -0,0 +1,151 @@
+<?php
+
+declare(strict_types=1);
+
+namespace App\Command;
+
+use App\Entity\Tenant;
+use App\Repository\PurchaseContractRepository;
+use App\Repository\TenantRelationMappingRepository;
+use App\Repository\TenantRepository;
+use App\Service\PythonServiceClient;
+use App\Service\PythonServiceException;
+use Symfony\Component\Console\Attribute\AsCommand;
+use Symfony\Component\Console\Command\Command;
+use Symfony\Component\Console\Input\InputInterface;
+use Symfony\Component\Console\Input\InputOption;
+use Symfony\Component\Console\Output\OutputInterface;
+use Symfony\Component\Console\Style\SymfonyStyle;
+
+#[AsCommand(
+    name: 'app:export-counterparties',
+    description: 'Export tenant counterparties to the intelligence service for supplier resolution',
+)]
+class ExportCounterpartiesCommand extends Command
+{
+    public function __construct(
+        private readonly PythonServiceClient $pythonService,
+        private readonly TenantRepository $tenantRepository,
+        private readonly TenantRelationMappingRepository $relationMappingRepository,
+        private readonly PurchaseContractRepository $contractRepository
+    ) {
+        parent::__construct();
+    }
+
+    protected function configure(): void
+    {
+        $this
+            ->addOption('tenant', 't', InputOption::VALUE_OPTIONAL, 'Tenant code to export (default: all hub-active tenants)')
+            ->addOption('dry-run', null, InputOption::VALUE_NONE, 'Preview without actually sending')
+            ->setHelp(<<<'HELP'
+This command sends each tenant's known counterparties to the intelligence
+service, which resolves supplier names on incoming documents against them.
+
+Counterparties are collected from active relation mappings (named after the
+partner tenant, with the tenant's internal relation ID) and from the supplier
+names on the tenant's purchase contracts. The export replaces the previous
+one; aliases the service learned from supplier corrections are kept.
+
+Examples:
+  # Export counterparties of all hub-active tenants
+  php bin/console app:export-counterparties
+
+  # Export one tenant
+  php bin/console app:export-counterparties --tenant=QBIL001
+
+  # Preview without sending
+  php bin/console app:export-counterparties --dry-run
+HELP
+            );
+    }
+
+    protected function execute(InputInterface $input, OutputInterface $output): int
+    {
+        $io = new SymfonyStyle($input, $output);
+        $io->title('Exporting Counterparties');
+
+        $tenantCode = $input->getOption('tenant');
+        $dryRun = $input->getOption('dry-run');
+
+        if ($dryRun) {
+            $io->note('DRY RUN MODE - No data will be sent to the intelligence service');
+        }
+
+        if ($tenantCode) {
+            $tenant = $this->tenantRepository->findByTenantCode($tenantCode);
+            if ($tenant === null) {
+                $io->error(sprintf('Tenant "%s" not found', $tenantCode));
+                return Command::FAILURE;
+            }
+            $tenants = [$tenant];
+        } else {
+            $tenants = $this->tenantRepository->findActiveTenants();
+        }
+
+        $rows = [];
+        $failures = 0;
+
+        foreach ($tenants as $tenant) {
+            $counterparties = $this->collectCounterparties($tenant);
+
+            if ($dryRun) {
+                $rows[] = [$tenant->getTenantCode(), count($counterparties), '-'];
+                continue;
+            }
+
+            try {
+                $result = $this->pythonService->replaceCounterparties($tenant->getTenantCode(), $counterparties);
+                $rows[] = [$tenant->getTenantCode(), $result['counterparties'], $result['aliases']];
+            } catch (PythonServiceException $e) {
+                $failures++;
+                $io->error(sprintf('Export failed for %s: %s', $tenant->getTenantCode(), $e->getMessage()));
+
+                if ($e->isConnectionError()) {
+                    return Command::FAILURE;
+                }
+            }
+        }
+
+        $io->table(['Tenant', 'Counterparties', 'Aliases'], $rows);
+
+        if ($failures > 0) {
+            return Command::FAILURE;
+        }
+
+        $io->success(sprintf('%s counterparties of %d tenants', $dryRun ? 'Would export' : 'Exported', count($rows)));
+
+        return Command::SUCCESS;
+    }
+
+    /**
+     * @return list<array{name: string, relationId: ?string, tenantCode: ?string}>
+     */
+    private function collectCounterparties(Tenant $tenant): array
+    {
+        $counterparties = [];
+
+        foreach ($this->relationMappingRepository->findActiveByTenant($tenant) as $mapping) {
+            $partner = $this->tenantRepository->findByTenantCode($mapping->getExternalTenantCode());
+            $name = $partner?->getName() ?? $mapping->getExternalTenantCode();
+
+            $counterparties[mb_strtolower($name)] = [
+                'name' => $name,
+                'relationId' => $mapping->getInternalRelationId(),
+                'tenantCode' => $mapping->getExternalTenantCode(),
+            ];
+        }
+
+        foreach ($this->contractRepository->findSupplierNames($tenant) as $supplier) {
+            $key = mb_strtolower(trim($supplier));
+            if ($key !== '' && !isset($counterparties[$key])) {
+                $counterparties[$key] = [
+                    'name' => trim($supplier),
+                    'relationId' => null,
+                    'tenantCode' => null,
+                ];
+            }
+        }
+
+        return array_values($counterparties);
+    }
+}
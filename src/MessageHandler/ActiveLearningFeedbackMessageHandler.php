@@ -21,7 +21,8 @@ class ActiveLearningFeedbackMessageHandler
     public function __invoke(ActiveLearningFeedbackMessage $message): void
     {
         try {
-            // Send correction to Python service for model retraining
+            // Send correction to Python service for model retraining; queued
+            // work yields to interactive requests
             $this->pythonClient->submitFeedback([
                 'sourceTenantCode' => $message->getSourceTenantCode(),
                 'targetTenantCode' => $message->getTargetTenantCode(),
@@ -29,7 +30,7 @@ class ActiveLearningFeedbackMessageHandler
                 'sourceValue' => $message->getSourceValue(),
                 'targetField' => $message->getTargetField(),
                 'correctedValue' => $message->getCorrectedValue(),
-            ]);
+            ], PythonServiceClient::PRIORITY_BULK);
 
             $this->logger->info('Active learning feedback submitted', [
                 'sourceTenant' => $message->getSourceTenantCode(),
@@ -39,11 +39,13 @@ class EntityResolutionMessageHandler
         $this->notificationService->notifyProcessingStarted($document, 'Resolving entities');
 
         try {
-            // Call Python service to resolve entities (product matching)
+            // Call Python service to resolve entities (product matching);
+            // queued work yields to interactive requests
             $resolutionResult = $this->pythonClient->resolveEntities(
                 $message->getExtractedData(),
                 $message->getSourceTenantCode(),
-                $message->getTargetTenantCode()
+                $message->getTargetTenantCode(),
+                PythonServiceClient::PRIORITY_BULK
             );
 
             $document->setMappedData($resolutionResult['mappedData']);
@@ -65,6 +67,20 @@ class EntityResolutionMessageHandler
 
     private function handlePythonServiceError($document, PythonServiceException $e): void
     {
+        if ($e->isOverloaded()) {
+            // Service is shedding load - back off via Messenger retry without alarming the user
+            $this->logger->info('Python service busy during entity resolution, will retry', [
+                'documentId' => $document->getId(),
+                'error' => $e->getMessage()
+            ]);
+
+            throw new RecoverableMessageHandlingException(
+                'Python service busy, will retry',
+                0,
+                $e
+            );
+        }
+
         if ($e->isConnectionError()) {
             // Service is down - notify user and allow retry
             $this->logger->warning('Python service unavailable during entity resolution', [
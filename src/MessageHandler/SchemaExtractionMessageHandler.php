@@ -42,8 +42,13 @@ class SchemaExtractionMessageHandler
         $this->notificationService->notifyProcessingStarted($document, 'Extracting schema');
 
         try {
-            // Call Python service to extract schema
-            $extractedSchema = $this->pythonClient->extractSchema($message->getRawData());
+            // Call Python service to extract schema; queued work yields to
+            // interactive requests
+            $extractedSchema = $this->pythonClient->extractSchema(
+                $message->getRawData(),
+                $document->getTargetTenant()->getTenantCode(),
+                PythonServiceClient::PRIORITY_BULK
+            );
 
             $document->setExtractedSchema($extractedSchema);
             $document->setStatus('resolving_entities');
@@ -68,6 +73,20 @@ class SchemaExtractionMessageHandler
 
     private function handlePythonServiceError($document, PythonServiceException $e): void
     {
+        if ($e->isOverloaded()) {
+            // Service is shedding load - back off via Messenger retry without alarming the user
+            $this->logger->info('Python service busy during schema extraction, will retry', [
+                'documentId' => $document->getId(),
+                'error' => $e->getMessage()
+            ]);
+
+            throw new RecoverableMessageHandlingException(
+                'Python service busy, will retry',
+                0,
+                $e
+            );
+        }
+
         if ($e->isConnectionError()) {
             // Service is down - notify user and allow retry
             $this->logger->warning('Python service unavailable during schema extraction', [
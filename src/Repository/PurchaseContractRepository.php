@@ -33,4 +33,18 @@ class PurchaseContractRepository extends ServiceEntityRepository
     {
         return $this->findOneBy(['contractNumber' => $contractNumber]);
     }
+
+    /**
+     * @return string[] Distinct supplier names on the tenant's contracts
+     */
+    public function findSupplierNames(Tenant $tenant): array
+    {
+        return $this->createQueryBuilder('pc')
+            ->select('DISTINCT pc.supplier')
+            ->where('pc.tenant = :tenant')
+            ->setParameter('tenant', $tenant)
+            ->orderBy('pc.supplier', 'ASC')
+            ->getQuery()
+            ->getSingleColumnResult();
+    }
 }
@@ -32,6 +32,17 @@ class TenantRelationMappingRepository extends ServiceEntityRepository
             ->getOneOrNullResult();
     }
 
+    public function findActiveByTenant(Tenant $tenant): array
+    {
+        return $this->createQueryBuilder('trm')
+            ->where('trm.sourceTenant = :tenant')
+            ->andWhere('trm.isActive = :active')
+            ->setParameter('tenant', $tenant)
+            ->setParameter('active', true)
+            ->getQuery()
+            ->getResult();
+    }
+
     public function findActiveHubConnections(Tenant $tenant): array
     {
         return $this->createQueryBuilder('trm')
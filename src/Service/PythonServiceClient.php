@@ -13,21 +13,31 @@ class PythonServiceClient
     private bool $isHealthy = true;
     private ?\DateTimeImmutable $lastHealthCheck = null;
     private const HEALTH_CHECK_INTERVAL = 30; // seconds
+    private const COMPRESSION_THRESHOLD = 8192; // bytes; smaller bodies are sent uncompressed
+
+    // Admission priority classes: interactive requests are served before bulk ones
+    public const PRIORITY_INTERACTIVE = 'interactive';
+    public const PRIORITY_BULK = 'bulk';
 
     public function __construct(
         private readonly HttpClientInterface $httpClient,
         private readonly string $pythonServiceUrl,
-        private readonly LoggerInterface $logger
+        private readonly LoggerInterface $logger,
+        private readonly string $pythonServiceInternalToken = ''
     ) {
     }
 
-    public function extractSchema(array $rawData): array
-    {
+    public function extractSchema(
+        array $rawData,
+        ?string $tenantCode = null,
+        string $priority = self::PRIORITY_INTERACTIVE
+    ): array {
         try {
-            $response = $this->httpClient->request('POST', $this->pythonServiceUrl . '/api/extract-schema', [
-                'json' => ['rawData' => $rawData],
-                'timeout' => 30,
-            ]);
+            $response = $this->httpClient->request(
+                'POST',
+                $this->pythonServiceUrl . '/api/extract-schema',
+                $this->jsonRequestOptions(['rawData' => $rawData], 30, $tenantCode, $priority)
+            );
 
             if ($response->getStatusCode() !== 200) {
                 throw new PythonServiceException(
@@ -66,17 +76,22 @@ class PythonServiceClient
         }
     }
 
-    public function resolveEntities(array $extractedData, string $sourceTenantCode, string $targetTenantCode): array
-    {
+    public function resolveEntities(
+        array $extractedData,
+        string $sourceTenantCode,
+        string $targetTenantCode,
+        string $priority = self::PRIORITY_INTERACTIVE
+    ): array {
         try {
-            $response = $this->httpClient->request('POST', $this->pythonServiceUrl . '/api/resolve-entities', [
-                'json' => [
+            $response = $this->httpClient->request(
+                'POST',
+                $this->pythonServiceUrl . '/api/resolve-entities',
+                $this->jsonRequestOptions([
                     'extractedData' => $extractedData,
                     'sourceTenantCode' => $sourceTenantCode,
                     'targetTenantCode' => $targetTenantCode,
-                ],
-                'timeout' => 60,
-            ]);
+                ], 60, $targetTenantCode, $priority)
+            );
 
             if ($response->getStatusCode() !== 200) {
                 throw new PythonServiceException(
@@ -115,13 +130,14 @@ class PythonServiceClient
         }
     }
 
-    public function submitFeedback(array $feedbackData): void
+    public function submitFeedback(array $feedbackData, string $priority = self::PRIORITY_INTERACTIVE): void
     {
         try {
-            $response = $this->httpClient->request('POST', $this->pythonServiceUrl . '/api/feedback', [
-                'json' => $feedbackData,
-                'timeout' => 10,
-            ]);
+            $response = $this->httpClient->request(
+                'POST',
+                $this->pythonServiceUrl . '/api/feedback',
+                $this->jsonRequestOptions($feedbackData, 10, $feedbackData['targetTenantCode'] ?? null, $priority)
+            );
 
             if ($response->getStatusCode() !== 200 && $response->getStatusCode() !== 204) {
                 throw new PythonServiceException(
@@ -159,6 +175,65 @@ class PythonServiceClient
         }
     }
 
+    /**
+     * Replace the counterparties the service resolves supplier names against
+     * for every document sent to this tenant.
+     *
+     * @param list<array{name: string, relationId?: ?string, tenantCode?: ?string, aliases?: string[]}> $counterparties
+     *
+     * @return array{targetTenantCode: string, counterparties: int, aliases: int}
+     */
+    public function replaceCounterparties(string $tenantCode, array $counterparties): array
+    {
+        try {
+            $response = $this->httpClient->request(
+                'PUT',
+                $this->pythonServiceUrl . '/api/counterparties/' . rawurlencode($tenantCode),
+                $this->jsonRequestOptions(
+                    ['counterparties' => $counterparties],
+                    60,
+                    $tenantCode,
+                    self::PRIORITY_BULK
+                )
+            );
+
+            if ($response->getStatusCode() !== 200) {
+                throw new PythonServiceException(
+                    'Counterparty upload failed',
+                    PythonServiceException::ERROR_REFERENCE_DATA,
+                    $response->getStatusCode()
+                );
+            }
+
+            $this->markHealthy();
+            return $response->toArray();
+        } catch (TransportExceptionInterface $e) {
+            $this->markUnhealthy();
+            $this->logger->error('Python service connection failed during counterparty upload', [
+                'error' => $e->getMessage()
+            ]);
+            throw new PythonServiceException(
+                'Python service is unavailable: ' . $e->getMessage(),
+                PythonServiceException::ERROR_CONNECTION,
+                0,
+                $e
+            );
+        } catch (\Exception $e) {
+            if ($e instanceof PythonServiceException) {
+                throw $e;
+            }
+            $this->logger->error('Failed to upload counterparties to Python service', [
+                'error' => $e->getMessage()
+            ]);
+            throw new PythonServiceException(
+                'Counterparty upload failed: ' . $e->getMessage(),
+                PythonServiceException::ERROR_REFERENCE_DATA,
+                0,
+                $e
+            );
+        }
+    }
+
     public function checkHealth(): array
     {
         try {
@@ -193,6 +268,51 @@ class PythonServiceClient
         return $health['status'] === 'healthy';
     }
 
+    /**
+     * Build options for a JSON request to the Python service.
+     *
+     * Large bodies are gzip-compressed. Accept-Encoding is deliberately left
+     * unset so HttpClient negotiates and decodes compressed responses itself.
+     * The timeout is enforced as a total duration and sent along so the
+     * service can stop once we give up. Tenant and priority feed the
+     * service's per-tenant admission control.
+     */
+    private function jsonRequestOptions(
+        array $payload,
+        float $timeout,
+        ?string $tenantCode = null,
+        string $priority = self::PRIORITY_INTERACTIVE
+    ): array {
+        $body = json_encode($payload, JSON_THROW_ON_ERROR | JSON_UNESCAPED_UNICODE | JSON_PRESERVE_ZERO_FRACTION);
+        $headers = [
+            'Content-Type' => 'application/json',
+            // Deadline propagation: the service abandons work we have stopped waiting for
+            'X-Request-Timeout-Ms' => (string) (int) ($timeout * 1000),
+            'X-Request-Priority' => $priority,
+        ];
+
+        if ($tenantCode !== null) {
+            $headers['X-Tenant-Code'] = $tenantCode;
+        }
+
+        if (\strlen($body) >= self::COMPRESSION_THRESHOLD && \function_exists('gzencode')) {
+            $body = gzencode($body, 5);
+            $headers['Content-Encoding'] = 'gzip';
+        }
+
+        if ($this->pythonServiceInternalToken !== '') {
+            // Lets the service skip re-validating its own responses
+            $headers['X-Internal-Token'] = $this->pythonServiceInternalToken;
+        }
+
+        return [
+            'headers' => $headers,
+            'body' => $body,
+            'timeout' => $timeout,
+            'max_duration' => $timeout,
+        ];
+    }
+
     private function markHealthy(): void
     {
         $this->isHealthy = true;
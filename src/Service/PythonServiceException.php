@@ -10,6 +10,7 @@ class PythonServiceException extends \RuntimeException
     public const ERROR_SCHEMA_EXTRACTION = 'schema_extraction';
     public const ERROR_ENTITY_RESOLUTION = 'entity_resolution';
     public const ERROR_FEEDBACK = 'feedback';
+    public const ERROR_REFERENCE_DATA = 'reference_data';
 
     private string $errorType;
     private int $httpStatusCode;
@@ -40,10 +41,17 @@ class PythonServiceException extends \RuntimeException
         return $this->errorType === self::ERROR_CONNECTION;
     }
 
+    public function isOverloaded(): bool
+    {
+        // The service's admission control turned the request away; retry later
+        return $this->httpStatusCode === 429;
+    }
+
     public function isRetryable(): bool
     {
         // Connection errors and certain HTTP status codes are retryable
         return $this->isConnectionError()
+            || $this->isOverloaded()
             || $this->httpStatusCode === 503
             || $this->httpStatusCode === 502
             || $this->httpStatusCode === 504;